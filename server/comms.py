@@ -1,35 +1,59 @@
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Optional, TypeVar
 import logging
 from dataclasses import dataclass
+import numpy as np
 
 from ntcore import NetworkTableInstance, PubSubOptions
 from wpiutil import wpistruct
 
-from util.timestamp import Timestamp
+from util.timestamp import TimestampArray, Stamped
+from util.clock import WallClock
+from util.timemap import TimeMapper, DynamicOffsetMapper
 from util.log import child_logger
+from util.telemetry import MsgTelemetry
 from typedef.cfg import LocalConfig, NetworkTablesDirection
 from typedef.geom import Pose3d, Transform3d
 from typedef import net
-from wpi_compat.nt import DynamicPublisher, DynamicSubscriber
+from wpi_compat.nt import DynamicPublisher, DynamicSubscriber, PublishBatch
+from wpi_compat.struct_pack import register_packer, pose3d_fields
+from wpi_compat.clock import WpiClock
 
 if TYPE_CHECKING:
 	from .__main__ import MoeNet
 
-@wpistruct.make_wpistruct(name="CpuTimes")
-@dataclass
-class CpuTimes:
-	percent: float
-	user: float
-	system: float
-	children_user: float
-	children_system: float
-
-@wpistruct.make_wpistruct(name="MoenetTelemetry")
+T = TypeVar('T')
+
+@wpistruct.make_wpistruct(name="ProcessTelemetry")
 @dataclass
-class MoenetTelemetry:
-	cpu: CpuTimes
-	memory_percent: float
+class ProcessTelemetry:
+	"Telemetry for one MOEnet process (see [MsgTelemetry])"
+	pid: int
+	cpu_percent: float
+	rss_mb: float
 	threads: int
+	loop_hz: float
+	loop_p50_ms: float
+	loop_p90_ms: float
+	loop_p99_ms: float
+	loop_max_ms: float
+	queue_depth: int
+	dropped: int
+
+	@staticmethod
+	def from_msg(msg: MsgTelemetry) -> 'ProcessTelemetry':
+		return ProcessTelemetry(
+			pid=msg.pid,
+			cpu_percent=msg.cpu_percent,
+			rss_mb=msg.rss / (1024 * 1024),
+			threads=msg.threads,
+			loop_hz=msg.loop_hz,
+			loop_p50_ms=msg.loop_p50_ms,
+			loop_p90_ms=msg.loop_p90_ms,
+			loop_p99_ms=msg.loop_p99_ms,
+			loop_max_ms=msg.loop_max_ms,
+			queue_depth=msg.queue_depth,
+			dropped=msg.dropped,
+		)
 
 
 @wpistruct.make_wpistruct(name="ObjectDetection")
@@ -39,6 +63,14 @@ class SimpleObjectDetection:
 	confidence: wpistruct.dataclass.double
 	objectPose: Pose3d
 
+# Precompiled packers (these are published every frame)
+register_packer(ProcessTelemetry, '<iffif4fii', lambda t: (
+	t.pid, t.cpu_percent, t.rss_mb, t.threads,
+	t.loop_hz, t.loop_p50_ms, t.loop_p90_ms, t.loop_p99_ms, t.loop_max_ms,
+	t.queue_depth, t.dropped,
+))
+register_packer(SimpleObjectDetection, '<id7d', lambda d: (d.classsification, d.confidence, *pose3d_fields(d.objectPose)))
+
 
 class LogHandler(logging.Handler):
 	def __init__(self, comms: 'Comms') -> None:
@@ -57,37 +89,6 @@ class LogHandler(logging.Handler):
 		except Exception:
 			self.handleError(record)
 
-class TelemetryPublisher:
-	def __init__(self) -> None:
-		pass
-
-	def fetch(self):
-		try:
-			import psutil
-		except ImportError:
-			return
-		import os
-		p = psutil.Process(os.getpid())
-		with p.oneshot():
-			ct = p.cpu_times()
-			cpu = CpuTimes(
-				percent=p.cpu_percent(),
-				user=ct.user,
-				system=ct.system,
-				children_user=ct.children_user,
-				children_system=ct.children_system,
-			)
-			ram_percent = p.memory_percent()
-			threads = p.num_threads()
-		return MoenetTelemetry(
-			cpu=cpu,
-			memory_percent=ram_percent,
-			threads=threads,
-		)
-	
-	def poll(self):
-		pass
-
 class Comms:
 	def __init__(self, moenet: 'MoeNet', config: LocalConfig, log: Optional[logging.Logger] = None):
 		self.moenet = moenet
@@ -98,6 +99,8 @@ class Comms:
 		self.labels = list()
 
 		table_lazy = lambda: self.table
+		self.batch = PublishBatch()
+		"Values published during a main-loop iteration (committed by [flush])"
 
 		self._pub_ping   = DynamicPublisher.create(table_lazy, "client_ping", int)
 		self._pub_error  = DynamicPublisher.create(table_lazy, "client_error", str, PubSubOptions(sendAll=True))
@@ -105,23 +108,32 @@ class Comms:
 		self._pub_status = DynamicPublisher.create(table_lazy, "client_status", int, PubSubOptions(sendAll=True))
 		self._pub_config = DynamicPublisher.create(table_lazy, "client_config", str, PubSubOptions(sendAll=True, periodic=1))
 		"Publish config JSON"
-		self._pub_telem  = DynamicPublisher.create(table_lazy, "client_telemetry", MoenetTelemetry, PubSubOptions(periodic=0.5, keepDuplicates=True), mode='struct')
+		self._pub_telem  = DynamicPublisher.create(table_lazy, "client_telemetry", list[ProcessTelemetry], PubSubOptions(periodic=0.5, keepDuplicates=True), mode='struct', min_interval=1.0, batch=self.batch)
+		"Telemetry for each process (named in `client_telemetry_names`)"
+		self._pub_telem_names = DynamicPublisher.create(table_lazy, "client_telemetry_names", list[str], dedupe=True, batch=self.batch)
 
 		# Publish transforms
-		self._pub_tf_field_odom  = DynamicPublisher.create(table_lazy, "tf_field_odom", Pose3d, PubSubOptions(periodic=0.01), mode='struct')
-		self._pub_tf_field_robot = DynamicPublisher.create(table_lazy, "tf_field_robot", Pose3d, PubSubOptions(periodic=0.01), mode='struct')
+		self._pub_tf_field_odom  = DynamicPublisher.create(table_lazy, "tf_field_odom", Pose3d, PubSubOptions(periodic=0.01), mode='struct', batch=self.batch)
+		self._pub_tf_field_robot = DynamicPublisher.create(table_lazy, "tf_field_robot", Pose3d, PubSubOptions(periodic=0.01), mode='struct', batch=self.batch)
 		# self._pub_tf_field_robot2 = DynamicPublisher.create(lambda: self.nt.getDoubleArrayTopic(self.table.getPath() + "/tf_field_robot2"), PubSubOptions(periodic=0.01))
-		self._pub_tf_odom_robot  = DynamicPublisher.create(table_lazy, "tf_odom_robot", Transform3d, PubSubOptions(periodic=0.1), mode='struct')
+		self._pub_tf_odom_robot  = DynamicPublisher.create(table_lazy, "tf_odom_robot", Transform3d, PubSubOptions(periodic=0.1), mode='struct', dedupe=True, batch=self.batch)
 
 		dets_lazy = lambda: self.table.getSubTable("client_detections")
-		self._pub_detections_full = DynamicPublisher.create(dets_lazy, "full", net.ObjectDetections, PubSubOptions(periodic=0.05), mode='proto')
+		self._pub_detections_full = DynamicPublisher.create(dets_lazy, "full", net.ObjectDetections, PubSubOptions(periodic=0.05), mode='proto', batch=self.batch)
 		"Object detections, in protobuf format (self-contained)"
-		self._pub_detections = DynamicPublisher.create(dets_lazy, "simple", list[SimpleObjectDetection], PubSubOptions(periodic=0.05), mode='struct')
+		self._pub_detections = DynamicPublisher.create(dets_lazy, "simple", list[SimpleObjectDetection], PubSubOptions(periodic=0.05), mode='struct', batch=self.batch)
 		"Object detections, in simple format"
-		self._pub_detections_labels = DynamicPublisher.create(dets_lazy, "labels", list[str])
+		self._pub_detections_labels = DynamicPublisher.create(dets_lazy, "labels", list[str], dedupe=True, batch=self.batch)
 		"Object detection labels"
 
-		tf_sub_options = PubSubOptions(periodic=0.01, disableLocal=True)
+		self.nt_to_local: TimeMapper = DynamicOffsetMapper(WpiClock(), WallClock())
+		"Map NetworkTables timestamps to local time"
+		self.rio_field_to_robot: Optional[Stamped[Pose3d]] = None
+		"Latest field-to-robot from the Rio (if subscribed)"
+		self.rio_odom_to_robot: Optional[Stamped[Transform3d]] = None
+		"Latest odom-to-robot from the Rio (if subscribed)"
+		# Queue every update between polls (the Rio publishes odometry at 50Hz)
+		tf_sub_options = PubSubOptions(periodic=0.01, disableLocal=True, sendAll=True, pollStorage=64)
 		self._sub_tf_field_odom = DynamicSubscriber.create(table_lazy, 'tf_field_odom', Pose3d, Pose3d(), tf_sub_options)
 		self._sub_tf_field_robot = DynamicSubscriber.create(table_lazy, 'tf_field_robot', Pose3d, Pose3d(), tf_sub_options)
 		self._sub_tf_odom_robot = DynamicSubscriber.create(table_lazy, 'tf_odom_robot', Transform3d, Transform3d(), tf_sub_options)
@@ -132,12 +144,24 @@ class Comms:
 
 		# Field2d
 		f2d_lazy = lambda: self.nt.getTable("SmartDashboard")
-		self._pub_f2d_type = DynamicPublisher.create(f2d_lazy, ".type", str)
-		self._pub_f2d_f2o  = DynamicPublisher.create(f2d_lazy, "Odometry", list[float])
-		self._pub_f2d_f2r  = DynamicPublisher.create(f2d_lazy, "Robot", list[float])
-		self._pub_f2d_dets = DynamicPublisher.create(f2d_lazy, "Notes", list[float])
-
-		self._telemetry = TelemetryPublisher()
+		self._pub_f2d_type = DynamicPublisher.create(f2d_lazy, ".type", str, dedupe=True, batch=self.batch)
+		self._pub_f2d_f2o  = DynamicPublisher.create(f2d_lazy, "Odometry", list[float], batch=self.batch)
+		self._pub_f2d_f2r  = DynamicPublisher.create(f2d_lazy, "Robot", list[float], batch=self.batch)
+		self._pub_f2d_dets = DynamicPublisher.create(f2d_lazy, "Notes", list[float], dedupe=True, batch=self.batch)
+
+		self._publishers = {
+			name.removeprefix('_pub_'): pub
+			for name, pub in vars(self).items()
+			if isinstance(pub, DynamicPublisher)
+		}
+		"Publishers to report counters for"
+
+		# Publisher counters (one entry per topic in `client_nt_stats/topics`)
+		stats_lazy = lambda: self.table.getSubTable("client_nt_stats")
+		self._pub_nt_topics     = DynamicPublisher.create(stats_lazy, "topics", list[str], dedupe=True, batch=self.batch)
+		self._pub_nt_published  = DynamicPublisher.create(stats_lazy, "published", list[int], min_interval=1.0, batch=self.batch)
+		self._pub_nt_suppressed = DynamicPublisher.create(stats_lazy, "suppressed", list[int], batch=self.batch)
+		self._pub_nt_superseded = DynamicPublisher.create(stats_lazy, "superseded", list[int], batch=self.batch)
 
 		if not self.config.nt.enabled:
 			self.log.warning("NetworkTables is disabled")
@@ -182,6 +206,11 @@ class Comms:
 		self._pub_status.enabled = ntc.publishStatus
 		self._pub_config.enabled = ntc.publishConfig
 		self._pub_telem.enabled = ntc.publishSystemInfo
+		self._pub_telem_names.enabled = ntc.publishSystemInfo
+		self._pub_nt_topics.enabled = ntc.publishSystemInfo
+		self._pub_nt_published.enabled = ntc.publishSystemInfo
+		self._pub_nt_suppressed.enabled = ntc.publishSystemInfo
+		self._pub_nt_superseded.enabled = ntc.publishSystemInfo
 		self._pub_tf_field_odom.enabled   = (ntc.tfFieldToOdom  == NetworkTablesDirection.PUBLISH)
 		self._pub_tf_field_robot.enabled  = (ntc.tfFieldToRobot == NetworkTablesDirection.PUBLISH)
 		self._pub_tf_odom_robot.enabled   = (ntc.tfOodomToRobot == NetworkTablesDirection.PUBLISH)
@@ -217,35 +246,56 @@ class Comms:
 			sleep = self._sub_sleep.get()
 			self.moenet.sleeping = sleep
 		
-		# Publish telemetry
+		# Publish telemetry (skip collecting if it would be rate-limited)
 		try:
-			if self._pub_telem.enabled and (telem := self._telemetry.fetch()) is not None:
-				self._pub_telem.set(telem)
+			if self._pub_telem.is_due():
+				self.tx_telemetry(self.moenet.telemetry())
 		except Exception:
 			self.log.exception("Error publishing telemetry to NT")
+		if self._pub_nt_published.is_due():
+			self._tx_publisher_stats()
 		
-		# Get odometry
-		for odom_msg in self._sub_tf_field_odom.readQueue():
-			# Probably a better way to do this
-			timestamp = Timestamp.from_wpi(odom_msg.time)
-			pose = odom_msg.value
-			self.moenet.estimator.observe_f2o(timestamp, pose)
+		# Get odometry (every update since the last poll, not just the latest)
+		timestamps, poses = self._read_stamped(self._sub_tf_field_odom)
+		if len(poses) > 0:
+			self.moenet.estimator.record_f2o_many(timestamps, poses)
 			if self._pub_f2d_f2o.enabled:
+				pose = poses[-1]
 				self._pub_f2d_f2o.set([pose.translation().x, pose.translation().y, pose.rotation().z])
 		
 		# Check pose override
-		for pose_msg in self._sub_pose_override.readQueue():
-			timestamp = Timestamp.from_wpi(pose_msg.time)
-			pose = pose_msg.value
+		timestamps, poses = self._read_stamped(self._sub_pose_override)
+		for timestamp, pose in zip(timestamps, poses):
 			self.moenet.pose_override(pose, timestamp)
 		
-		# Get field-to-robot
-		if (tf_field_robot := self._sub_tf_field_robot.get_fresh(None)) is not None:
-			pass
+		# Get field-to-robot and odom-to-robot (nothing fuses these yet, so keep the latest)
+		timestamps, poses = self._read_stamped(self._sub_tf_field_robot)
+		if len(poses) > 0:
+			self.rio_field_to_robot = Stamped(poses[-1], timestamps[-1])
+		timestamps, transforms = self._read_stamped(self._sub_tf_odom_robot)
+		if len(transforms) > 0:
+			self.rio_odom_to_robot = Stamped(transforms[-1], timestamps[-1])
 
 		if self._pub_f2d_type.enabled:
 			self._pub_f2d_type.set("Field2d")
 
+	def _read_stamped(self, sub: DynamicSubscriber[T]) -> tuple[TimestampArray, list[T]]:
+		"Read every queued value from a subscriber, with timestamps mapped to local time"
+		values = sub.readQueue()
+		times = np.fromiter((value.time for value in values), dtype=np.int64, count=len(values))
+		timestamps = self.nt_to_local.a_to_b(TimestampArray.from_wpi(times, self.nt_to_local.clock_a))
+		return timestamps, [value.value for value in values]
+	
+	def _tx_publisher_stats(self):
+		stats = [pub.stats for pub in self._publishers.values()]
+		self._pub_nt_topics.set(list(self._publishers.keys()))
+		self._pub_nt_published.set([s.published for s in stats])
+		self._pub_nt_suppressed.set([s.suppressed for s in stats])
+		self._pub_nt_superseded.set([s.superseded for s in stats])
+	
+	def flush(self):
+		"Commit values staged this iteration, and send them"
+		self.batch.flush(self.nt)
 	
 	def tx_error(self, message: str):
 		"Send error message to NetworkTables"
@@ -269,8 +319,16 @@ class Comms:
 	def tx_correction(self, pose: Transform3d):
 		self._pub_tf_odom_robot.set(pose)
 
-	def tx_detections(self, detections: net.ObjectDetections):
+	def tx_telemetry(self, telemetry: list[MsgTelemetry]):
+		"Send telemetry for all processes"
+		self._pub_telem_names.set([msg.process for msg in telemetry])
+		self._pub_telem.set([ProcessTelemetry.from_msg(msg) for msg in telemetry])
+	
+	def tx_detections(self, detections: net.ObjectDetections, serialized: Optional[bytes] = None):
+		"Send detections (`serialized` is `detections`, pre-serialized, if available)"
 		self.log.debug("Sending %d detections", len(detections.detections))
+		if self._pub_detections_full.enabled:
+			self._pub_detections_full.set(detections if serialized is None else serialized)
 		self._pub_detections.set([
 			SimpleObjectDetection(
 				classsification=0,
@@ -0,0 +1,176 @@
+"""
+Loopback NetworkTables latency benchmark
+
+Starts an in-process NetworkTables server, and connects [Comms] to it over loopback. Synthetic `MsgPose` and
+`MsgDetections` are fed through the estimator (as [MoeNet.poll] does), and we measure the time from injection
+until each value is visible on the server. This is repeated for each set of publisher options used in [Comms].
+
+Usage: python -m comms_bench [--samples N] [--rate HZ] [--no-flush] [--port PORT]
+"""
+from argparse import ArgumentParser
+from types import SimpleNamespace
+import logging
+import time
+
+import numpy as np
+from ntcore import NetworkTableInstance, PubSubOptions
+
+from typedef.cfg import LocalConfig
+from typedef.geom import Pose3d, Translation3d, Rotation3d, Transform3d
+from worker.msg import MsgPose, MsgDetections, ObjectDetection
+from estimator import DataFusion
+from util.clock import WallClock
+from comms import Comms
+
+OPTIONS: dict[str, PubSubOptions] = {
+	'default': PubSubOptions(),
+	'periodic=0.01': PubSubOptions(periodic=0.01),
+	'periodic=0.05': PubSubOptions(periodic=0.05),
+	'periodic=0.1': PubSubOptions(periodic=0.1),
+	'sendAll': PubSubOptions(sendAll=True),
+	'periodic=0.01,sendAll': PubSubOptions(periodic=0.01, sendAll=True),
+	'periodic=0.5,keepDuplicates': PubSubOptions(periodic=0.5, keepDuplicates=True),
+}
+"Publisher options used in [Comms] (tf, detections, odom correction, logs, tf subscriptions, telemetry)"
+
+
+class LoopbackBench:
+	"[Comms] and [DataFusion], connected to a local NetworkTables server"
+	def __init__(self, port: int, log: logging.Logger) -> None:
+		self.server = NetworkTableInstance.create()
+		self.server.startServer(listen_address='127.0.0.1', port4=port)
+
+		self.config = LocalConfig.model_validate({
+			'nt': {
+				'host': '127.0.0.1',
+				'port': port,
+				'subscribeConfig': False,
+				'subscribeSleep': False,
+			},
+		})
+		self.clock = WallClock()
+		# Comms only uses MoeNet in update(), which we don't call
+		self.comms = Comms(None, self.config, log=log)
+		self.estimator = DataFusion(self.config.estimator, self.clock, log=log)
+		self.camera = SimpleNamespace(
+			idx=0,
+			robot_to_camera=Transform3d(),
+			config=SimpleNamespace(robot_to_camera=Transform3d(), dynamic_pose=None),
+		)
+		self.estimator.set_cameras([self.camera])
+
+		table = self.config.nt.table
+		sub_options = PubSubOptions(sendAll=True, pollStorage=64)
+		self.subs = {
+			'pose': self.server.getTopic(f'/{table}/tf_field_robot').genericSubscribe(sub_options),
+			'detections': self.server.getTopic(f'/{table}/client_detections/simple').genericSubscribe(sub_options),
+		}
+		"Server-side subscribers for each measured topic"
+		self.pubs = {
+			'pose': [self.comms._pub_tf_field_robot],
+			'detections': [self.comms._pub_detections, self.comms._pub_detections_full],
+		}
+		"Client publishers for each measured topic"
+
+	def wait_connected(self, timeout: float = 5.0):
+		deadline = time.monotonic() + timeout
+		while not self.comms.nt.isConnected():
+			if time.monotonic() > deadline:
+				raise TimeoutError("Comms didn't connect to the loopback server")
+			time.sleep(0.01)
+
+	def set_options(self, options: PubSubOptions):
+		for pubs in self.pubs.values():
+			for pub in pubs:
+				pub.options = options
+		# Let the server see the new publishers, and drop anything already queued
+		time.sleep(0.1)
+		for sub in self.subs.values():
+			sub.readQueue()
+
+	def inject(self, i: int):
+		"Feed one pose and one detection through the estimator, and publish the results"
+		now = self.clock.now()
+		pose = Pose3d(Translation3d(1.0 + i * 1e-3, 2.0, 0.0), Rotation3d(0.0, 0.0, i * 1e-3))
+		self.estimator.record_f2o(now, pose)
+		self.estimator.observe_f2r(self.camera, MsgPose(now.nanos, pose, np.eye(6) * 1e-2))
+		if f2r := self.estimator.field_to_robot(fresh=True):
+			self.comms.tx_pose(f2r)
+
+		detections = MsgDetections(
+			timestamp=now.nanos,
+			detections=[ObjectDetection('note', 0.9, Translation3d(2.0, 0.1 * (i % 5), 0.0))],
+		)
+		self.estimator.record_detections(self.camera.robot_to_camera, detections)
+		if dets := self.estimator.get_detections(fresh=True):
+			self.comms.tx_detections(dets, self.estimator.detections.serialize())
+
+	def sample(self, i: int, flush: bool, timeout: float) -> dict[str, tuple[int, int]]:
+		"Inject one sample. Returns (published, visible) latency (ns) for each topic that arrived."
+		start = time.perf_counter_ns()
+		self.inject(i)
+		if flush:
+			self.comms.flush()
+		else:
+			# Commit values, but leave sending to NT's periodic flush
+			self.comms.batch.flush(None)
+		published = time.perf_counter_ns() - start
+
+		res = dict()
+		waiting = set(self.subs.keys())
+		deadline = start + int(timeout * 1e9)
+		while len(waiting) > 0 and (now := time.perf_counter_ns()) < deadline:
+			for topic in list(waiting):
+				if len(self.subs[topic].readQueue()) > 0:
+					res[topic] = (published, now - start)
+					waiting.remove(topic)
+			time.sleep(0.0001)
+		return res
+
+	def close(self):
+		for sub in self.subs.values():
+			sub.close()
+		self.comms.close()
+		self.server.stopServer()
+
+
+def main():
+	parser = ArgumentParser(description="Measure estimator-to-NetworkTables latency over loopback, for each publisher option set")
+	parser.add_argument('--samples', type=int, default=200, help="Samples per option set")
+	parser.add_argument('--rate', type=float, default=50.0, help="Injection rate (Hz), like the main loop")
+	parser.add_argument('--no-flush', dest='flush', action='store_false', help="Don't flush NT after each sample (rely on periodic sends)")
+	parser.add_argument('--timeout', type=float, default=1.0, help="Time to wait for each value (seconds)")
+	parser.add_argument('--port', type=int, default=5820, help="Loopback NT4 server port")
+	parser.add_argument('--options', nargs='*', choices=list(OPTIONS.keys()), default=list(OPTIONS.keys()), help="Option sets to test")
+	args = parser.parse_args()
+
+	logging.basicConfig(level=logging.WARNING)
+	bench = LoopbackBench(args.port, logging.getLogger('bench'))
+	try:
+		bench.wait_connected()
+		period = 1.0 / args.rate
+		print(f"{'options':<28} {'topic':<11} {'arrived':>8} {'publish':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  (ms)")
+		for name in args.options:
+			bench.set_options(OPTIONS[name])
+			results: dict[str, list[tuple[int, int]]] = {topic: list() for topic in bench.subs.keys()}
+			next_time = time.monotonic()
+			for i in range(args.samples):
+				for topic, latency in bench.sample(i, args.flush, args.timeout).items():
+					results[topic].append(latency)
+				next_time += period
+				if (delay := next_time - time.monotonic()) > 0:
+					time.sleep(delay)
+
+			for topic, latencies in results.items():
+				if len(latencies) == 0:
+					print(f"{name:<28} {topic:<11} {0:>4}/{args.samples:<3}")
+					continue
+				published, visible = np.asarray(latencies, dtype=np.float64).T / 1e6
+				p50, p90, p99, pmax = np.percentile(visible, (50, 90, 99, 100))
+				print(f"{name:<28} {topic:<11} {len(latencies):>4}/{args.samples:<3} {np.median(published):8.3f} {p50:8.3f} {p90:8.3f} {p99:8.3f} {pmax:8.3f}")
+	finally:
+		bench.close()
+
+
+if __name__ == '__main__':
+	main()
@@ -1,22 +1,25 @@
-from typing import Optional, overload, TYPE_CHECKING
+from typing import Optional, Sequence, overload, TYPE_CHECKING
 import logging
-from collections import OrderedDict
+import numpy as np
 
 from wpiutil.log import DataLog, DoubleLogEntry
 
-from worker.msg import MsgPose, MsgDetections, MsgAprilTagPoses
-from wpi_compat.datalog import StructLogEntry, StructArrayLogEntry, ProtoLogEntry
+from worker.msg import MsgPose, MsgOdom, MsgDetections, MsgAprilTagPoses
+from wpi_compat.datalog import StructLogEntry, StructArrayLogEntry, ProtoLogEntry, AsyncDataLog
 from typedef.geom import Transform3d, Rotation3d, Pose3d
 from typedef import net, cfg
 from util.log import child_logger
 from util.clock import Clock, WallClock
 from util.timemap import TimeMapper, IdentityTimeMapper
-from util.timestamp import Timestamp
+from util.timestamp import Timestamp, TimestampArray
+from util.clock_sync import ClockSyncFit
 
 from .pose_simple import SimplePoseEstimator
 from .tracker import ObjectTracker
 from .tf import TfTracker, ReferenceFrameKind
 from .camera_tracker import CamerasTracker
+from .imu_tracker import ImuTracker
+from .detections import DetectionsMessage
 
 if TYPE_CHECKING:
 	from worker.controller import WorkerManager, WorkerHandle
@@ -26,42 +29,60 @@ class DataFusion:
 	pose_estimator: PoseEstimator
 	object_tracker: ObjectTracker
 
-	def __init__(self, config: cfg.EstimatorConfig, clock: Optional[Clock] = None, *, log: Optional[logging.Logger], datalog: Optional[DataLog] = None) -> None:
+	def __init__(self, config: cfg.EstimatorConfig, clock: Optional[Clock] = None, *, log: Optional[logging.Logger], datalog: Optional[DataLog] = None, datalog_writer: Optional[AsyncDataLog] = None) -> None:
 		self.log = child_logger("data", log)
 		self.datalog = datalog
 		self.clock = clock or WallClock()
 		self.config = config
 
 		self.camera_tracker = CamerasTracker(self.log.getChild('cam'), config.pose.history)
-		self.pose_estimator = SimplePoseEstimator(config.pose, self.clock, log=self.log.getChild('pose'), datalog=self.datalog)
-		tf_robot = TfTracker(
+		if config.pose.engine == cfg.PoseEstimatorEngine.PARTICLE:
+			from .pose_particle import ParticlePoseEstimator
+			self.pose_estimator = ParticlePoseEstimator(config.pose, self.clock, log=self.log.getChild('pose'), datalog=self.datalog)
+		elif config.pose.engine == cfg.PoseEstimatorEngine.SMOOTHER:
+			from .pose_smoother import SmootherPoseEstimator
+			self.pose_estimator = SmootherPoseEstimator(config.pose, self.clock, log=self.log.getChild('pose'), datalog=self.datalog)
+		else:
+			self.pose_estimator = SimplePoseEstimator(config.pose, self.clock, log=self.log.getChild('pose'), datalog=self.datalog)
+		self.imu = ImuTracker(self.clock, config.pose.history)
+		self.tf = TfTracker(
 			(ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT, self.pose_estimator),
 			(ReferenceFrameKind.FIELD, ReferenceFrameKind.ODOM, self.pose_estimator),
 			(ReferenceFrameKind.ROBOT, ReferenceFrameKind.CAMERA, self.camera_tracker),
 		)
 		self.object_tracker = ObjectTracker(
 			config.detections,
-			tf_robot,
+			self.tf,
 			self.log.getChild('obj'),
 		)
 
+		self.detections = DetectionsMessage()
+		"Latest detections (updated in place)"
+
 		# Datalogs
 		if self.datalog is not None:
-			self.log_f2r = StructLogEntry(self.datalog, 'filt/fieldToRobot', Pose3d)
-			self.log_f2o = StructLogEntry(self.datalog, 'filt/fieldToOdom', Pose3d)
-			self.log_o2r = StructLogEntry(self.datalog, 'filt/odomToRobot', Transform3d)
-			self.log_objdet = StructArrayLogEntry(self.datalog, 'filt/fieldToDetections', Pose3d)
-			self.log_objdet_full = ProtoLogEntry(self.datalog, 'filt/detections', net.ObjectDetections)
-			self.logFpsF2R = DoubleLogEntry(datalog, 'fps/field_to_robot')
-			self.logFpsF2O = DoubleLogEntry(datalog, 'fps/field_to_odom')
-			self.logFpsApriltag = DoubleLogEntry(datalog, 'fps/apriltag')
-			self.logFpsDetections = DoubleLogEntry(datalog, 'fps/detections')
+			# Serialize off the main loop, if we can
+			wrap = (lambda entry: entry) if datalog_writer is None else datalog_writer.wrap
+			self.log_f2r = wrap(StructLogEntry(self.datalog, 'filt/fieldToRobot', Pose3d))
+			self.log_f2o = wrap(StructLogEntry(self.datalog, 'filt/fieldToOdom', Pose3d))
+			self.log_o2r = wrap(StructLogEntry(self.datalog, 'filt/odomToRobot', Transform3d))
+			self.log_objdet = wrap(StructArrayLogEntry(self.datalog, 'filt/fieldToDetections', Pose3d))
+			self.log_objdet_full = wrap(ProtoLogEntry(self.datalog, 'filt/detections', net.ObjectDetections))
+			self.logFpsF2R = wrap(DoubleLogEntry(datalog, 'fps/field_to_robot'))
+			self.logFpsF2O = wrap(DoubleLogEntry(datalog, 'fps/field_to_odom'))
+			self.logFpsApriltag = wrap(DoubleLogEntry(datalog, 'fps/apriltag'))
+			self.logFpsDetections = wrap(DoubleLogEntry(datalog, 'fps/detections'))
+			self.log_imu_yaw = wrap(DoubleLogEntry(datalog, 'imu/yaw'))
+			self.log_imu_yaw_rate = wrap(DoubleLogEntry(datalog, 'imu/yawRate'))
 			now = clock.now()
 			self._last_f2r_ts = now
 			self._last_f2o_ts = now
 			self._last_apr_ts = now
 			self._last_det_ts = now
 
+		self.f2r_timestamp: Optional[Timestamp] = None
+		"Time of the measurement behind the last result of [field_to_robot]"
+
 		# Track fresh data
 		self.fresh_f2r = True
 		self.fresh_f2o = True
@@ -70,6 +91,7 @@ class DataFusion:
 	
 	def set_cameras(self, cameras: 'WorkerManager'):
 		self.camera_tracker.reset(cameras)
+		self.tf.invalidate(ReferenceFrameKind.ROBOT, ReferenceFrameKind.CAMERA)
 	
 	def observe_f2r_override(self, pose: Pose3d, timestamp: Timestamp):
 		self.pose_estimator.observe
@@ -80,28 +102,69 @@ class DataFusion:
 		#TODO: track camera?
 		robot_to_camera = self.camera_tracker.robot_to_camera(camera.idx, timestamp).value
 
-		self.pose_estimator.record_f2r(robot_to_camera, msg)
+		self.pose_estimator.record_f2r(timestamp, robot_to_camera, msg.pose, msg.poseCovariance)
 
 		if self.datalog is not None:
 			simple_f2o = msg.pose.transformBy(robot_to_camera.inverse())
 			self.log_f2o.append(simple_f2o)
 			
-			delta = timestamp - self._last_f2r_ts
+			delta_ns = timestamp.nanos - self._last_f2r_ts.nanos
 			self._last_f2r_ts = timestamp
-			self.logFpsF2R.append(1.0 / delta.total_seconds())
+			self.logFpsF2R.append(1e9 / delta_ns)
 		
+		self.tf.invalidate(ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT)
+		self.fresh_f2r = True
+		self.fresh_o2r = True
+	
+	def observe_odom(self, camera: 'WorkerHandle', msg: MsgOdom):
+		"Record SLAM odometry"
+		timestamp = Timestamp.from_nanos(msg.timestamp, WallClock())
+		robot_to_camera = self.camera_tracker.robot_to_camera(camera.idx, timestamp).value
+		self.pose_estimator.record_f2r(timestamp, robot_to_camera, msg.pose.mean, msg.pose.cov)
+		self.tf.invalidate(ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT)
 		self.fresh_f2r = True
 		self.fresh_o2r = True
 	
 	def record_f2o(self, timestamp: Timestamp, field_to_odom: Pose3d):
 		if self.datalog:
-			delta = timestamp - self._last_f2o_ts
+			delta_ns = timestamp.nanos - self._last_f2o_ts.nanos
 			self._last_f2o_ts = timestamp
-			self.logFpsF2O.append(1.0 / delta.total_seconds())
+			self.logFpsF2O.append(1e9 / delta_ns)
 		self.pose_estimator.record_f2o(timestamp, field_to_odom)
+		self.tf.invalidate(ReferenceFrameKind.FIELD, ReferenceFrameKind.ODOM)
 		self.fresh_f2o = True
 		self.fresh_o2r = True
 	
+	def record_f2o_many(self, timestamps: TimestampArray, poses: Sequence[Pose3d]):
+		"Record a batch of odometry poses (oldest first), e.g. everything received since the last poll"
+		if len(poses) == 0:
+			return
+		assert len(timestamps) == len(poses)
+		if self.datalog:
+			nanos = timestamps.nanos
+			deltas_ns = np.diff(nanos, prepend=self._last_f2o_ts.nanos)
+			self._last_f2o_ts = Timestamp.from_nanos(int(nanos[-1]), timestamps.clock)
+			for delta_ns in deltas_ns.tolist():
+				if delta_ns > 0:
+					self.logFpsF2O.append(1e9 / delta_ns)
+		for timestamp, field_to_odom in zip(timestamps, poses):
+			self.pose_estimator.record_f2o(timestamp, field_to_odom)
+		# Only invalidate once per batch
+		self.tf.invalidate(ReferenceFrameKind.FIELD, ReferenceFrameKind.ODOM)
+		self.fresh_f2o = True
+		self.fresh_o2r = True
+	
+	def record_imu(self, samples: np.ndarray, fit: Optional[ClockSyncFit] = None):
+		"Record a batch of IMU samples (from [ImuRing.drain]). `fit` maps sensor time to local time."
+		if len(samples) == 0:
+			return
+		times, yaws, rates = self.imu.record(samples, fit)
+		if self.datalog is not None:
+			# Log every sample (the datalog is the only full-rate record)
+			for t, yaw, rate in zip((times // 1_000).tolist(), yaws.tolist(), rates.tolist()):
+				self.log_imu_yaw.append(yaw, t)
+				self.log_imu_yaw_rate.append(rate, t)
+	
 	@overload
 	def odom_to_robot(self) -> Transform3d: ...
 	def odom_to_robot(self, fresh: bool = False) -> Optional[Transform3d]:
@@ -127,21 +190,31 @@ class DataFusion:
 		res = self.pose_estimator.field_to_robot(ts)
 		if res is None:
 			return None
+		# Stamp with the measurement the pose came from, not when we asked
+		latest = self.pose_estimator.latest_f2r()
+		self.f2r_timestamp = ts if latest is None else latest
 		if fresh:
 			self.fresh_f2r = False
 			if self.datalog is not None:
 				self.log_f2r.append(res)
 		return res
 	
+	def field_to_robot_variance(self, timestamp: Timestamp) -> Optional[np.ndarray]:
+		"Variance of (x, y, z, roll, pitch, yaw) of `field`→`robot` at `timestamp`, if known"
+		if (cov := self.pose_estimator.field_to_robot_cov(timestamp)) is None:
+			return None
+		return np.diagonal(cov)
+	
 	def record_apriltag(self, camera: 'WorkerHandle', apriltags: MsgAprilTagPoses):
 		timestamp = Timestamp.from_nanos(apriltags.timestamp, clock=WallClock())
 		if self.datalog:
-			delta = timestamp - self._last_apr_ts
+			delta_ns = timestamp.nanos - self._last_apr_ts.nanos
 			self._last_apr_ts = timestamp
-			self.logFpsApriltag.append(1.0 / delta.total_seconds())
+			self.logFpsApriltag.append(1e9 / delta_ns)
 		
 		self.fresh_f2r = True
 		self.pose_estimator.record_apriltag(timestamp, robot_to_camera, apriltags.poses)
+		self.tf.invalidate(ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT)
 	
 	def record_detections(self, robot_to_camera: Transform3d, detections: MsgDetections, mapper_loc: Optional[TimeMapper] = None):
 		"Record some detections for tracking"
@@ -153,9 +226,9 @@ class DataFusion:
 		timestamp_loc = timestamp if (mapper_loc is None) else mapper_loc.a_to_b(timestamp)
 
 		if self.datalog:
-			delta = timestamp - self._last_det_ts
+			delta_ns = timestamp.nanos - self._last_det_ts.nanos
 			self._last_det_ts = timestamp
-			self.logFpsDetections.append(1.0 / delta.total_seconds())
+			self.logFpsDetections.append(1e9 / delta_ns)
 
 		field_to_robot = self.pose_estimator.field_to_robot(timestamp_loc)
 
@@ -163,7 +236,7 @@ class DataFusion:
 		self.fresh_det = True
 
 	def get_detections(self, mapper_net: Optional[TimeMapper] = None, *, fresh = False) -> Optional[net.ObjectDetections]:
-		"Get any new detections"
+		"Get any new detections (the message is updated in place by later calls)"
 		if fresh and (not self.fresh_det):
 			return None
 		
@@ -171,47 +244,21 @@ class DataFusion:
 			mapper_net = IdentityTimeMapper(self.clock)
 		assert mapper_net.clock_a == self.clock
 
-		labels: OrderedDict[str, int] = OrderedDict()
-		res: list[net.ObjectDetection] = list()
-
-		for detection in self.object_tracker.items():
-			# Lookup or get next ID
-			label_id = labels.setdefault(detection.label, len(labels))
-
-			ts_loc = detection.last_seen
-			s, ns = mapper_net.a_to_b(ts_loc).split()
-			ts_net = net.Timestamp(seconds=s, nanos=ns)
-
-			# Compute transforms
-			field_to_robot = self.pose_estimator.field_to_robot(ts_loc)
-			field_to_object = detection.position
-			robot_to_object = detection.position_rel(field_to_robot)
-
-			# Fix datatype (ugh)
-			res.append(net.ObjectDetection(
-				timestamp=ts_net,
-				label_id=label_id,
-				confidence=detection.confidence,
-				positionRobot=net.Translation3d(
-					x=robot_to_object.x,
-					y=robot_to_object.y,
-					z=robot_to_object.z,
-				),
-				positionField=net.Translation3d(
-					x=field_to_object.x,
-					y=field_to_object.y,
-					z=field_to_object.z,
-				),
-			))
+		detections = list(self.object_tracker.items())
+		# Convert all timestamps at once
+		ts_net_s, ts_net_ns = mapper_net.a_to_b(self.object_tracker.last_seen(detections)).split()
+		res = self.detections.update(
+			detections,
+			ts_net_s.tolist(),
+			ts_net_ns.tolist(),
+			lambda detection: self.pose_estimator.field_to_robot(detection.last_seen),
+		)
 		if fresh:
 			self.fresh_det = False
 		
-		res = net.ObjectDetections(
-			labels=list(labels.keys()),
-			detections=res,
-		)
 		if self.datalog is not None:
-			self.log_objdet_full.append(res)
-			poses = [det.pose for det in self.object_tracker.items()]
+			# Share serialization with NT
+			self.log_objdet_full.append(self.detections.serialize())
+			poses = [det.pose for det in detections]
 			self.log_objdet.append(poses)
 		return res
\ No newline at end of file
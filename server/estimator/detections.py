@@ -0,0 +1,100 @@
+from typing import Optional, Sequence, Callable
+
+from typedef.geom import Pose3d, Translation3d
+from typedef import net
+
+from .tracker import TrackedObject
+
+
+class DetectionsMessage:
+	"""
+	A persistent `net.ObjectDetections`, updated in place (keyed by track ID).
+
+	Only tracks that changed since the last update are rewritten, and the message is serialized at most
+	once per update (so NetworkTables and the DataLog can share the bytes).
+	"""
+	def __init__(self) -> None:
+		self.message = net.ObjectDetections()
+		"Current message (reused between updates)"
+		self._ids: list[int] = list()
+		"Track ID for each entry of `message.detections`"
+		self._labels: dict[str, int] = dict()
+		self._state: dict[int, tuple] = dict()
+		"Inputs for each track when it was last written"
+		self._serialized: Optional[bytes] = None
+
+	def _remove_stale(self, live: set[int]) -> bool:
+		"Remove tracks that aren't in `live`"
+		if all(id in live for id in self._ids):
+			return False
+		detections = self.message.detections
+		for i in reversed(range(len(self._ids))):
+			id = self._ids[i]
+			if id not in live:
+				del detections[i]
+				del self._ids[i]
+				del self._state[id]
+		return True
+
+	def _label_id(self, label: str) -> int:
+		if (label_id := self._labels.get(label)) is None:
+			label_id = len(self._labels)
+			self._labels[label] = label_id
+			self.message.labels.append(label)
+		return label_id
+
+	def update(self, tracks: Sequence[TrackedObject], seconds: Sequence[int], nanos: Sequence[int], field_to_robot: Callable[[TrackedObject], Pose3d]) -> net.ObjectDetections:
+		"""
+		Update to the currently tracked objects
+
+		Parameters:
+		 - tracks: Tracked objects (in order)
+		 - seconds, nanos: When each object was last seen (network time)
+		 - field_to_robot: Robot pose when an object was last seen
+		"""
+		changed = self._remove_stale(set(track.id for track in tracks))
+		detections = self.message.detections
+		index = {id: i for i, id in enumerate(self._ids)}
+		for track, s, ns in zip(tracks, seconds, nanos):
+			f2r = field_to_robot(track)
+			state = (s, ns, track.n_detections, track.confidence, f2r)
+			if (i := index.get(track.id)) is None:
+				det = detections.add()
+				self._ids.append(track.id)
+			elif self._state[track.id] == state:
+				# Nothing changed
+				continue
+			else:
+				det = detections[i]
+			self._state[track.id] = state
+			changed = True
+
+			det.timestamp.seconds = s
+			det.timestamp.nanos = ns
+			det.label_id = self._label_id(track.label)
+			det.confidence = track.confidence
+			_set_translation(det.positionRobot, track.position_rel(f2r))
+			_set_translation(det.positionField, track.position)
+
+		if changed:
+			self._serialized = None
+		return self.message
+
+	def serialize(self) -> bytes:
+		"Serialized message (cached until the next change)"
+		if self._serialized is None:
+			self._serialized = self.message.SerializeToString()
+		return self._serialized
+
+	def clear(self):
+		self.message.Clear()
+		self._ids.clear()
+		self._labels.clear()
+		self._state.clear()
+		self._serialized = None
+
+
+def _set_translation(dst: net.Translation3d, src: Translation3d):
+	dst.x = src.x
+	dst.y = src.y
+	dst.z = src.z
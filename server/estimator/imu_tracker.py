@@ -0,0 +1,115 @@
+from typing import Optional, Union
+from datetime import timedelta
+import numpy as np
+
+from util.clock import Clock
+from util.clock_sync import ClockSyncFit
+from util.timestamp import Timestamp, Duration
+
+def _wrap(angle):
+	"Wrap angle(s) to [-pi, pi]"
+	return np.arctan2(np.sin(angle), np.cos(angle))
+
+class ImuTracker:
+	"""
+	Timestamped yaw, yaw rate, and linear acceleration from bulk IMU samples (see [ImuRing]).
+
+	History is kept in numpy arrays, so each batch costs a few array operations (not one per sample).
+	"""
+	def __init__(self, clock: Clock, historyLength: Union[Duration, timedelta], capacity: int = 1024) -> None:
+		self.clock = clock
+		self.historyLength = Duration.wrap(historyLength)
+		self.capacity = capacity
+		self.clear()
+
+	def __len__(self):
+		return len(self._t)
+
+	def clear(self):
+		self._t = np.empty(0, dtype=np.int64)
+		"Sample times (local clock)"
+		self._yaw = np.empty(0, dtype=float)
+		"Unwrapped yaw (radians, CCW+)"
+		self._rate = np.empty(0, dtype=float)
+		"Yaw rate (radians/sec)"
+		self._accel = np.empty((0, 3), dtype=float)
+		"World-frame linear acceleration (g)"
+
+	def record(self, samples: np.ndarray, fit: Optional[ClockSyncFit] = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""
+		Add a batch of [IMU_SAMPLE] records. Sensor timestamps are mapped to local time with `fit` (the
+		sensor -> local offset estimate), which is less jittery than when they were received.
+
+		Returns the local time, yaw, and yaw rate of each added sample.
+		"""
+		if fit is None:
+			times = samples['local_ns']
+		else:
+			sensor_ns = samples['sensor_ns']
+			times = np.where(sensor_ns > 0, sensor_ns + fit.offsets(sensor_ns), samples['local_ns'])
+		if len(self._t) > 0:
+			# Drop stale samples (e.g. after the fit moved)
+			keep = times > self._t[-1]
+			if not np.all(keep):
+				samples = samples[keep]
+				times = times[keep]
+		if len(times) == 0:
+			return times, np.empty(0), np.empty(0)
+
+		w, x, y, z = samples['quat'].T
+		yaw = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+		if len(self._t) > 0:
+			prev_t = self._t[-1:]
+			prev_yaw = self._yaw[-1:]
+		else:
+			prev_t = times[:1]
+			prev_yaw = yaw[:1]
+		yaw = np.unwrap(np.concatenate((prev_yaw, yaw)))
+		t = np.concatenate((prev_t, times))
+		dt = np.diff(t) * 1e-9
+		rate = np.divide(np.diff(yaw), dt, out=np.zeros_like(dt), where=dt > 0)
+
+		# Append, and trim to the history window
+		t_new = np.concatenate((self._t, times))
+		start = max(
+			len(t_new) - self.capacity,
+			int(np.searchsorted(t_new, t_new[-1] - self.historyLength.nanos)),
+		)
+		self._t = t_new[start:]
+		self._yaw = np.concatenate((self._yaw, yaw[1:]))[start:]
+		self._rate = np.concatenate((self._rate, rate))[start:]
+		self._accel = np.concatenate((self._accel, samples['accel']))[start:]
+		return times, _wrap(yaw[1:]), rate
+
+	@property
+	def last_timestamp(self) -> Optional[Timestamp]:
+		"Time of the most recent sample"
+		if len(self._t) == 0:
+			return None
+		return Timestamp.from_nanos(int(self._t[-1]), self.clock)
+
+	def yaw(self, timestamp: Optional[Timestamp] = None) -> Optional[float]:
+		"Yaw at `timestamp` (radians, in [-pi, pi]), or the latest yaw"
+		if len(self._t) == 0:
+			return None
+		if timestamp is None:
+			res = self._yaw[-1]
+		else:
+			res = np.interp(timestamp.nanos, self._t, self._yaw)
+		return float(_wrap(res))
+
+	def yaw_rate(self, timestamp: Optional[Timestamp] = None) -> Optional[float]:
+		"Yaw rate at `timestamp` (radians/sec), or the latest yaw rate"
+		if len(self._t) == 0:
+			return None
+		if timestamp is None:
+			return float(self._rate[-1])
+		return float(np.interp(timestamp.nanos, self._t, self._rate))
+
+	def accel(self, timestamp: Optional[Timestamp] = None) -> Optional[np.ndarray]:
+		"World-frame linear acceleration at `timestamp` (g), or the latest acceleration"
+		if len(self._t) == 0:
+			return None
+		if timestamp is None:
+			return self._accel[-1].copy()
+		return np.array([np.interp(timestamp.nanos, self._t, axis) for axis in self._accel.T])
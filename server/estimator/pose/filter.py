@@ -18,6 +18,7 @@ from util.clock import WallClock
 from .base import ControlMembers, StateMembers, Measurement, block
 from .ekf import EKF
 from .queue import Heap
+from ..util.snapshot import SnapshotRing
 
 def update_counts(acc: dict[StateMembers, int], updates: StateMembers, mask: StateMembers, map: StateMembers | None = None):
 	if map is None:
@@ -108,6 +109,8 @@ class PoseEstimatorConfig:
 
 	smooth_lagged_data: bool = False
 	history_length: timedelta = timedelta(seconds=0.0)
+	history_capacity: int = 1024
+	"Maximum number of filter states to keep for smoothing lagged data"
 	force_2d: bool = False
 	update_frequency: float = 30
 	publish_transform = True
@@ -142,7 +145,7 @@ class PoseEstimator:
 
 		self._sources: list[DataSource] = list()
 		self._measurement_queue: Heap[Measurement] = Heap()
-		self._filter_state_history = list()
+		self._filter_state_history = SnapshotRing(config.history_capacity, self._filter.state_len)
 		self._measurement_history: deque[Measurement] = deque()
 		
 		self._toggled_on = True
@@ -555,52 +558,48 @@ class PoseEstimator:
 			self._measurement_history.popleft()
 			popped_measurements += 1
 
-		while (len(self._filter_state_history) > 0) and self._filter_state_history[0].last_measurement_time < cutoff_time:
-			self._filter_state_history = self._filter_state_history[1:]
-			popped_states += 1
+		popped_states = self._filter_state_history.pop_before(cutoff_time)
 
 		self.log.debug("Popped %s measurements and %s states from their queues", popped_measurements, popped_states)
 	
+	def _saveFilterState(self):
+		self._filter_state_history.append(self._filter.last_measurement_time, self._filter.state, self._filter.estimate_error_covariance)
+	
 	def revert_to(self, time: Timestamp):
 		self.log.debug("Requested time was %s to revert", time)
 
-		# Walk back through the queue until we reach a filter state whose time stamp
-		# is less than or equal to the requested time. Since every saved state after
-		# that time will be overwritten/corrected, we can pop from the queue. If the
-		# history is insufficiently short, we just take the oldest state we have.
-		last_history_state = None
-		while (len(self._filter_state_history) > 0) and self._filter_state_history[-1].last_measurement_time > time:
-			last_history_state = self._filter_state_history.pop()
-
-		# If the state history is not empty at this point, it means that our history
-		# was large enough, and we should revert to the state at the back of the
-		# history deque.
-		ret_val = False
-		if len(self._filter_state_history) > 0:
-			ret_val = True
-			last_history_state = self._filter_state_history[-1]
-		else:
-			self.log.debug("Insufficient history to revert to time %s", time)
-
-			if last_history_state:
-				self.log.debug("Will revert to oldest state at %s", last_history_state.latest_control_time)
+		# Find the latest filter state whose time stamp is less than or equal to the
+		# requested time. Since every saved state after that time will be
+		# overwritten/corrected, we can drop them. If the history is insufficiently
+		# short, we just take the oldest state we have.
+		history = self._filter_state_history
+		kept_states = history.count_at_or_before(time)
+
+		ret_val = kept_states > 0
+		if len(history) > 0:
+			if ret_val:
+				state_idx = kept_states - 1
+			else:
+				self.log.debug("Insufficient history to revert to time %s", time)
+				state_idx = 0
+				self.log.debug("Will revert to oldest state at %s", history.timestamp(0))
 
-		# If we have a valid reversion state, revert
-		if last_history_state:
-			# Reset filter to the latest state from the queue.
-			state = last_history_state
-			self._filter.setState(state.state_)
-			self._filter.setEstimateErrorCovariance(state.estimate_error_covariance_)
-			self._filter.setLastMeasurementTime(state.last_measurement_time_)
+			# Reset filter to the latest state from the history (copy out of the ring,
+			# because later snapshots will overwrite the slot)
+			state_time, state, covariance = history[state_idx]
+			self._filter.state[:] = state
+			self._filter.estimate_error_covariance[:] = covariance
+			self._filter.last_measurement_time = state_time
+			history.truncate(kept_states)
 
-			self.log.debug("Reverted to state with time %s", state.last_measurement_time)
+			self.log.debug("Reverted to state with time %s", state_time)
 
 			# Repeat for measurements, but push every measurement onto the measurement
 			# queue as we go
 			restored_measurements = 0
 			while self._measurement_history and self._measurement_history[-1].stamp > time:
 				# Don't need to restore measurements that predate our earliest state time
-				if state.last_measurement_time <= self._measurement_history[-1].stamp:
+				if state_time <= self._measurement_history[-1].stamp:
 					self._measurement_queue.push(self._measurement_queue[-1])
 					restored_measurements += 1
 
@@ -682,7 +681,7 @@ class PoseEstimator:
 
 					# We should only save the filter state once per unique timstamp
 					if len(self._measurement_queue) == 0 or self._measurement_queue.peek().stamp != self._filter.last_measurement_time:
-						self._saveFilterState(self._filter);
+						self._saveFilterState()
 		elif self._filter.is_initialized:
 			# In the event that we don't get any measurements for a long time,
 			# we still need to continue to estimate our state. Therefore, we
@@ -0,0 +1,188 @@
+from typing import Optional
+import logging
+
+import numpy as np
+from wpiutil.log import DataLog
+
+from worker.msg import AprilTagPose
+from typedef.cfg import PoseEstimatorConfig, ParticleFilterConfig
+from typedef.geom import Transform3d, Pose3d, Pose2d, Rotation2d
+from util.clock import Clock
+from util.timestamp import Timestamp
+from .pose_simple import SimplePoseEstimator, planar_cov
+
+
+def _wrap_angle(theta: np.ndarray) -> np.ndarray:
+	"Wrap angles to [-π, π)"
+	return (theta + np.pi) % (2 * np.pi) - np.pi
+
+
+class ParticleFilter:
+	"""
+	Planar Monte Carlo localizer.
+
+	Particles are stored as rows of an (N, 3) array of (x, y, θ), with an (N,) array of weights.
+	Motion updates, measurement weighting, and resampling are each a few vectorized numpy ops.
+	"""
+	def __init__(self, config: ParticleFilterConfig) -> None:
+		self.count = config.count
+		self.odometry_noise = np.array(config.odometryNoise, dtype=float)
+		self.min_odometry_noise = np.array(config.minOdometryNoise, dtype=float)
+		self.inv_measurement_std = 1.0 / np.array(config.measurementStdDevs, dtype=float)
+		self.resample_threshold = config.resampleThreshold
+		self.rng = np.random.default_rng(config.seed)
+
+		self.particles = np.zeros((self.count, 3), dtype=float)
+		"Particle poses (x, y, θ)"
+		self.weights = np.full(self.count, 1.0 / self.count)
+		"Particle weights (normalized)"
+		self.initialized = False
+		self._noise = np.empty((self.count, 3), dtype=float)
+		"Scratch space for motion noise"
+		self._positions = np.arange(self.count, dtype=float) / self.count
+		"Systematic resampling offsets"
+
+	def reset(self):
+		self.weights.fill(1.0 / self.count)
+		self.initialized = False
+
+	def initialize(self, candidates: np.ndarray, candidate_weights: np.ndarray):
+		"Spread particles around (M, 3) candidate poses, proportional to their weights"
+		idx = self.rng.choice(len(candidates), size=self.count, p=candidate_weights)
+		self.rng.standard_normal(out=self._noise)
+		self._noise /= self.inv_measurement_std
+		np.add(candidates[idx], self._noise, out=self.particles)
+		self.particles[:, 2] = _wrap_angle(self.particles[:, 2])
+		self.weights.fill(1.0 / self.count)
+		self.initialized = True
+
+	def predict(self, delta: np.ndarray):
+		"Apply a (dx, dy, dθ) motion in the robot frame, with noise"
+		scale = np.abs(delta) * self.odometry_noise + self.min_odometry_noise
+		noise = self._noise
+		self.rng.standard_normal(out=noise)
+		noise *= scale
+		noise += delta
+
+		p = self.particles
+		c = np.cos(p[:, 2])
+		s = np.sin(p[:, 2])
+		p[:, 0] += c * noise[:, 0] - s * noise[:, 1]
+		p[:, 1] += s * noise[:, 0] + c * noise[:, 1]
+		p[:, 2] = _wrap_angle(p[:, 2] + noise[:, 2])
+
+	def update(self, candidates: np.ndarray, candidate_weights: np.ndarray):
+		"Weight particles by a mixture of (M, 3) candidate poses"
+		if not self.initialized:
+			self.initialize(candidates, candidate_weights)
+			return
+
+		# (N, M, 3) residuals
+		diff = self.particles[:, None, :] - candidates[None, :, :]
+		diff[..., 2] = _wrap_angle(diff[..., 2])
+		diff *= self.inv_measurement_std
+		likelihood = np.exp(-0.5 * np.einsum('nmk,nmk->nm', diff, diff)) @ candidate_weights
+
+		self.weights *= likelihood
+		total = self.weights.sum()
+		if not (total > 1e-300):
+			# No particles agree with the measurement, so we're lost
+			self.initialize(candidates, candidate_weights)
+			return
+		self.weights /= total
+
+		if self.effective_count() < self.resample_threshold * self.count:
+			self.resample()
+
+	def effective_count(self) -> float:
+		"Effective number of particles"
+		return 1.0 / np.dot(self.weights, self.weights)
+
+	def resample(self):
+		"Systematic resampling"
+		positions = self._positions + (self.rng.random() / self.count)
+		cumulative = np.cumsum(self.weights)
+		cumulative[-1] = 1.0
+		idx = np.searchsorted(cumulative, positions)
+		self.particles = self.particles[idx]
+		self.weights.fill(1.0 / self.count)
+
+	def estimate(self) -> np.ndarray:
+		"Weighted mean pose (x, y, θ)"
+		w = self.weights
+		p = self.particles
+		theta = np.arctan2(np.dot(w, np.sin(p[:, 2])), np.dot(w, np.cos(p[:, 2])))
+		return np.array([np.dot(w, p[:, 0]), np.dot(w, p[:, 1]), theta])
+
+	def covariance(self) -> np.ndarray:
+		"Weighted covariance (3, 3) of the particles"
+		diff = self.particles - self.estimate()
+		diff[:, 2] = _wrap_angle(diff[:, 2])
+		return (diff * self.weights[:, None]).T @ diff
+
+
+class ParticlePoseEstimator(SimplePoseEstimator):
+	"""
+	Pose estimator using Monte Carlo localization.
+
+	Instead of picking one AprilTag solution, all candidate poses are used to weight the particles,
+	so ambiguous solutions are resolved by odometry over time. Localization is planar.
+	"""
+	def __init__(self, config: PoseEstimatorConfig, clock: Clock, *, log: logging.Logger, datalog: Optional[DataLog] = None) -> None:
+		super().__init__(config, clock, log=log, datalog=datalog)
+		self.filter = ParticleFilter(config.particles)
+		self._last_f2o: Pose2d | None = None
+		"Last odometry pose (for motion updates)"
+
+	def _add_estimate(self, timestamp: Timestamp):
+		x, y, theta = self.filter.estimate()
+		self._add_f2r(timestamp, Pose3d(Pose2d(x, y, Rotation2d(theta))))
+
+	def _measure(self, timestamp: Timestamp, candidates: list[Pose3d], errors: list[float]):
+		poses = np.array([
+			(pose.X(), pose.Y(), pose.rotation().Z())
+			for pose in candidates
+		])
+		weights = 1.0 / np.maximum(np.array(errors, dtype=float), 1e-6)
+		weights /= weights.sum()
+		self.filter.update(poses, weights)
+		self._add_estimate(timestamp)
+
+	def record_f2r(self, timestamp: Timestamp, robot_to_camera: Transform3d, field_to_camera: Pose3d, covariance: Optional[np.ndarray] = None):
+		"Record SLAM pose (the particles track the covariance)"
+		field_to_robot = field_to_camera.transformBy(robot_to_camera.inverse())
+		if self.datalog is not None:
+			self.logFieldToRobot.append(field_to_robot, timestamp.as_wpi())
+		self._measure(timestamp, [field_to_robot], [1.0])
+
+	def record_apriltag(self, timestamp: Timestamp, robot_to_camera: Transform3d, detections: list[AprilTagPose]):
+		camera_to_robot = robot_to_camera.inverse()
+		candidates = list()
+		errors = list()
+		for det in detections:
+			if det.fieldToCam is None:
+				continue
+			candidates.append(det.fieldToCam.transformBy(camera_to_robot))
+			errors.append(det.error)
+		if len(candidates) > 0:
+			self._measure(timestamp, candidates, errors)
+
+	def field_to_robot_cov(self, time: Timestamp) -> Optional[np.ndarray]:
+		if not self.filter.initialized:
+			return super().field_to_robot_cov(time)
+		return planar_cov(self.filter.covariance())
+
+	def record_f2o(self, timestamp: Timestamp, field_to_odom: Pose3d):
+		"Record odometry pose"
+		f2o = field_to_odom.toPose2d()
+		if (self._last_f2o is not None) and self.filter.initialized:
+			delta = f2o.relativeTo(self._last_f2o)
+			self.filter.predict(np.array([delta.X(), delta.Y(), delta.rotation().radians()]))
+			self._add_estimate(timestamp)
+		self._last_f2o = f2o
+		super().record_f2o(timestamp, field_to_odom)
+
+	def clear(self):
+		super().clear()
+		self.filter.reset()
+		self._last_f2o = None
@@ -0,0 +1,53 @@
+"""
+Benchmark for ParticleFilter
+
+Usage: python -m estimator.pose_particle_bench [--particles N] [--rate HZ] [--steps N]
+"""
+from argparse import ArgumentParser
+from time import perf_counter_ns
+import numpy as np
+
+from typedef.cfg import ParticleFilterConfig
+from .pose_particle import ParticleFilter
+
+
+def main():
+	parser = ArgumentParser(description="Benchmark particle filter update rate")
+	parser.add_argument('--particles', type=int, default=10_000, help="Number of particles")
+	parser.add_argument('--rate', type=float, default=100, help="Target update rate (Hz)")
+	parser.add_argument('--steps', type=int, default=2_000, help="Number of updates to run")
+	parser.add_argument('--candidates', type=int, default=2, help="Candidate poses per measurement")
+	args = parser.parse_args()
+
+	pf = ParticleFilter(ParticleFilterConfig(count=args.particles, seed=0))
+	rng = np.random.default_rng(1)
+	truth = np.array([1.0, 1.0, 0.0])
+	pf.update(truth[None, :], np.array([1.0]))
+
+	delta = np.array([0.02, 0.0, 0.01])
+	candidate_weights = np.full(args.candidates, 1.0 / args.candidates)
+	times = np.empty(args.steps, dtype=np.int64)
+	for i in range(args.steps):
+		candidates = truth + rng.normal(0, 0.3, size=(args.candidates, 3))
+		candidates[0] = truth
+
+		start = perf_counter_ns()
+		# One loop iteration: motion update, measurement update (may resample), estimate
+		pf.predict(delta)
+		pf.update(candidates, candidate_weights)
+		pf.estimate()
+		times[i] = perf_counter_ns() - start
+
+		c, s = np.cos(truth[2]), np.sin(truth[2])
+		truth += (c * delta[0] - s * delta[1], s * delta[0] + c * delta[1], delta[2])
+
+	times_ms = times / 1e6
+	budget_ms = 1e3 / args.rate
+	p50, p99 = np.percentile(times_ms, [50, 99])
+	print(f"{args.particles} particles, {args.candidates} candidates, {args.steps} steps")
+	print(f"  mean {times_ms.mean():.3f}ms  p50 {p50:.3f}ms  p99 {p99:.3f}ms  max {times_ms.max():.3f}ms")
+	print(f"  max rate {1e3 / times_ms.mean():.0f}Hz (budget {budget_ms:.1f}ms @ {args.rate:g}Hz: {'OK' if p99 < budget_ms else 'OVER'})")
+
+
+if __name__ == '__main__':
+	main()
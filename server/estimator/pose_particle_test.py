@@ -0,0 +1,61 @@
+from unittest import TestCase
+import numpy as np
+
+from typedef.cfg import ParticleFilterConfig
+from .pose_particle import ParticleFilter
+
+
+class ParticleFilterTest(TestCase):
+	def make_filter(self, count: int = 2000) -> ParticleFilter:
+		return ParticleFilter(ParticleFilterConfig(count=count, seed=1234))
+
+	def test_initialize(self):
+		pf = self.make_filter()
+		pf.update(np.array([[1.0, 2.0, 0.5]]), np.array([1.0]))
+		self.assertTrue(pf.initialized)
+		np.testing.assert_allclose(pf.estimate(), [1.0, 2.0, 0.5], atol=0.02)
+
+	def test_predict(self):
+		pf = self.make_filter()
+		pf.update(np.array([[0.0, 0.0, np.pi / 2]]), np.array([1.0]))
+		# Move forward 1m (robot frame), so +y in field frame
+		for _ in range(10):
+			pf.predict(np.array([0.1, 0.0, 0.0]))
+		np.testing.assert_allclose(pf.estimate(), [0.0, 1.0, np.pi / 2], atol=0.05)
+
+	def test_covariance(self):
+		pf = self.make_filter()
+		pf.update(np.array([[1.0, 2.0, 0.0]]), np.array([1.0]))
+		std = 1.0 / pf.inv_measurement_std
+		cov = pf.covariance()
+		np.testing.assert_allclose(np.sqrt(np.diagonal(cov)), std, rtol=0.1)
+		np.testing.assert_allclose(cov, cov.T)
+
+	def test_resample(self):
+		pf = self.make_filter(1000)
+		pf.particles[:] = np.arange(1000)[:, None]
+		pf.weights[:] = 0
+		pf.weights[10] = 0.75
+		pf.weights[20] = 0.25
+		pf.resample()
+		self.assertEqual(set(pf.particles[:, 0]), {10, 20})
+		self.assertEqual(np.count_nonzero(pf.particles[:, 0] == 10), 750)
+		np.testing.assert_allclose(pf.weights, 1 / 1000)
+
+	def test_ambiguous(self):
+		"Consistent solution should win over an ambiguous one that jumps around"
+		pf = self.make_filter()
+		truth = np.array([1.0, 0.0, 0.0])
+		for i in range(20):
+			truth[0] += 0.05
+			pf.predict(np.array([0.05, 0.0, 0.0]))
+			flipped = np.array([truth[0], (-1.0) ** i, 0.6 * (-1.0) ** i])
+			pf.update(np.vstack([truth, flipped]), np.array([0.5, 0.5]))
+		np.testing.assert_allclose(pf.estimate(), truth, atol=0.05)
+
+	def test_lost(self):
+		pf = self.make_filter()
+		pf.update(np.array([[0.0, 0.0, 0.0]]), np.array([1.0]))
+		# Far away from every particle
+		pf.update(np.array([[10.0, 10.0, 0.0]]), np.array([1.0]))
+		np.testing.assert_allclose(pf.estimate(), [10.0, 10.0, 0.0], atol=0.02)
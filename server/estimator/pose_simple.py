@@ -1,6 +1,8 @@
 from typing import Optional
 import logging
 
+import numpy as np
+
 from wpimath.interpolation._interpolation import TimeInterpolatablePose3dBuffer
 from wpiutil.log import DataLog, DoubleArrayLogEntry, DoubleLogEntry
 
@@ -11,6 +13,17 @@ from typedef.geom import Transform3d, Pose3d, Translation3d, Rotation3d
 from util.clock import Clock
 from util.timestamp import Timestamp
 from .util import interpolate_pose3d
+from .util.cascade import Tracked, StaticValue
+from .tf import ReferenceFrame, ReferenceFrameKind
+
+
+def planar_cov(cov: np.ndarray) -> np.ndarray:
+	"Expand a planar (x, y, θ) covariance to (x, y, z, roll, pitch, yaw), with NaN variance on the other axes"
+	res = np.zeros((6, 6), dtype=float)
+	np.fill_diagonal(res, np.nan)
+	idx = [0, 1, 5]
+	res[np.ix_(idx, idx)] = cov
+	return res
 
 
 class SimplePoseEstimator:
@@ -41,29 +54,60 @@ class SimplePoseEstimator:
 		"Buffer for `field`→`robot` transforms (for sync with odometry)"
 		self.buf_field_to_odom = TimeInterpolatablePose3dBuffer(pose_history, interpolate_pose3d)
 		"Buffer for `field`→`odom` transforms (for sync with absolute pose)"
+		self._pose_history = pose_history
+
+		# Track the range of each buffer, so we can find the overlap without copying them
+		self._f2r_range: tuple[float, float] | None = None
+		"(first, last) timestamps in `buf_field_to_robot` (seconds)"
+		self._f2o_range: tuple[float, float] | None = None
+		"(first, last) timestamps in `buf_field_to_odom` (seconds)"
+		self._o2r_dirty = False
+		"Has new overlapping data arrived since `_last_o2r` was computed?"
+		self._latest_f2r: Optional[Timestamp] = None
+		"Time of the newest `field`→`robot` measurement"
+		self._f2r_cov: Optional[np.ndarray] = None
+		"Covariance of the newest `field`→`robot` measurement (if it had one)"
+	
+	def _update_range(self, range: tuple[float, float] | None, ts: float) -> tuple[float, float]:
+		"Update buffer range when a sample is added (the buffer drops samples older than its history)"
+		if range is None:
+			return (ts, ts)
+		first, last = range
+		last = max(last, ts)
+		first = max(min(first, ts), last - self._pose_history)
+		return (first, last)
+	
+	def _overlap(self) -> tuple[float, float] | None:
+		"Find overlapping range between field→odom and field→robot data"
+		if (self._f2o_range is None) or (self._f2r_range is None):
+			return None
+		ts_start = max(self._f2o_range[0], self._f2r_range[0])
+		ts_end = min(self._f2o_range[1], self._f2r_range[1])
+		if ts_end < ts_start:
+			return None
+		return ts_start, ts_end
+	
+	def _check_overlap(self, ts: float, prev_overlap: tuple[float, float] | None, prev_range: tuple[float, float] | None):
+		"Mark `odom`→`robot` as dirty if a sample at `ts` changed the overlap (`prev_range` is the updated buffer's range before the sample)"
+		overlap = self._overlap()
+		if overlap is None:
+			return
+		if (overlap != prev_overlap) or (ts <= overlap[1]):
+			self._o2r_dirty = True
+		elif (prev_range is not None) and (ts < prev_range[1]):
+			# Out-of-order sample: interpolating at the end of the overlap uses the next sample after it, which this may be
+			self._o2r_dirty = True
 	
 	def odom_to_robot(self) -> Transform3d:
 		"Get the best estimated `odom`→`robot` corrective transform"
-		samples_f2o = self.buf_field_to_odom.getInternalBuffer()
-		samples_f2r = self.buf_field_to_robot.getInternalBuffer()
-
-		# Return identity if we don't have any data
-		if (len(samples_f2o) == 0) or (len(samples_f2r) == 0):
-			self.log.debug("No data to compute odom→robot correction")
+		if not self._o2r_dirty:
 			return self._last_o2r
 		
 		# Find timestamps of overlapping range between field→odom and field→robot data
-		first_f2o = samples_f2o[0][0]
-		first_f2r = samples_f2r[0][0]
-		ts_start = max(first_f2o, first_f2r)
-
-		last_f2o = samples_f2o[-1][0]
-		last_f2r = samples_f2r[-1][0]
-		ts_end = min(last_f2o, last_f2r)
-		if ts_end < ts_start:
-			# No overlap
+		if (overlap := self._overlap()) is None:
 			self.log.debug("No overlap between field→odom and field→robot data")
 			return self._last_o2r
+		ts_end = overlap[1]
 		
 		# We want the most recent pair that overlap
 		f2o = self.buf_field_to_odom.sample(ts_end)
@@ -73,6 +117,7 @@ class SimplePoseEstimator:
 		
 		res = Transform3d(f2o, f2r)
 		self._last_o2r = res
+		self._o2r_dirty = False
 		return res
 	
 	def field_to_robot(self, time: Timestamp) -> Pose3d:
@@ -89,14 +134,51 @@ class SimplePoseEstimator:
 		# Return zero if we don't have any info
 		return Pose3d()
 	
-	def record_f2r(self, timestamp: Timestamp, robot_to_camera: Transform3d, field_to_camera: Pose3d):
-		"Record SLAM pose"
+	def latest_f2r(self) -> Optional[Timestamp]:
+		"Time of the newest `field`→`robot` measurement (the latest pose is extrapolated from it)"
+		return self._latest_f2r
+	
+	def field_to_robot_cov(self, time: Timestamp) -> Optional[np.ndarray]:
+		"Covariance (6, 6) of `field`→`robot` (x, y, z, roll, pitch, yaw), if known"
+		# Only the newest measurement's covariance is kept
+		return self._f2r_cov
+	
+	def track_tf(self, src: ReferenceFrame, dst: ReferenceFrame, timestamp: Timestamp | None = None) -> Tracked[Transform3d]:
+		"Get `field`→`robot` or `field`→`odom` transforms (for [TfTracker])"
+		if src.kind != ReferenceFrameKind.FIELD:
+			return NotImplemented
+		if timestamp is None:
+			timestamp = self.clock.now()
+		if dst.kind == ReferenceFrameKind.ROBOT:
+			pose = self.field_to_robot(timestamp)
+		elif dst.kind == ReferenceFrameKind.ODOM:
+			pose = self.field_to_odom(timestamp)
+		else:
+			return NotImplemented
+		return StaticValue(Transform3d(pose.translation(), pose.rotation()))
+	
+	def record_f2r(self, timestamp: Timestamp, robot_to_camera: Transform3d, field_to_camera: Pose3d, covariance: Optional[np.ndarray] = None):
+		"Record SLAM pose (`covariance` is of `field_to_camera`, in the field frame, so it's also that of `field`→`robot`)"
 		field_to_robot = field_to_camera.transformBy(robot_to_camera.inverse())
 
 		if self.datalog is not None:
 			self.logFieldToRobot.append(field_to_robot, timestamp.as_wpi())
 		
-		self.buf_field_to_robot.addSample(timestamp.as_seconds(), field_to_robot)
+		if self._add_f2r(timestamp, field_to_robot):
+			self._f2r_cov = covariance
+	
+	def _add_f2r(self, timestamp: Timestamp, field_to_robot: Pose3d) -> bool:
+		"Add a `field`→`robot` sample. Returns if it's the newest."
+		newest = (self._latest_f2r is None) or (timestamp > self._latest_f2r)
+		if newest:
+			self._latest_f2r = timestamp
+		ts = timestamp.as_seconds()
+		self.buf_field_to_robot.addSample(ts, field_to_robot)
+		prev_overlap = self._overlap()
+		prev_range = self._f2r_range
+		self._f2r_range = self._update_range(prev_range, ts)
+		self._check_overlap(ts, prev_overlap, prev_range)
+		return newest
 
 	def _select_apriltag(self, timestamp: Timestamp, robot_to_camera: Transform3d, detections: list[AprilTagPose]) -> Pose3d | None:
 		if len(detections) == 0:
@@ -133,9 +215,19 @@ class SimplePoseEstimator:
 		if self.datalog is not None:
 			self.logFieldToOdom.append(field_to_odom, timestamp.as_wpi())
 		
-		self.buf_field_to_odom.addSample(timestamp.as_seconds(), field_to_odom)
+		ts = timestamp.as_seconds()
+		self.buf_field_to_odom.addSample(ts, field_to_odom)
+		prev_overlap = self._overlap()
+		prev_range = self._f2o_range
+		self._f2o_range = self._update_range(prev_range, ts)
+		self._check_overlap(ts, prev_overlap, prev_range)
 	
 	def clear(self):
 		self.buf_field_to_odom.clear()
 		self.buf_field_to_robot.clear()
-		self._last_o2r = Transform3d()
\ No newline at end of file
+		self._f2r_range = None
+		self._f2o_range = None
+		self._o2r_dirty = False
+		self._last_o2r = Transform3d()
+		self._latest_f2r = None
+		self._f2r_cov = None
\ No newline at end of file
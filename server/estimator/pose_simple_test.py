@@ -1,5 +1,7 @@
 from unittest import TestCase
+import logging
 from datetime import timedelta
+import numpy as np
 
 from util.timestamp import Timestamp
 from typedef.geom import Pose3d, Twist3d, Translation3d
@@ -31,6 +33,7 @@ class PoseEstimatorTest(TestCase):
                 force2d=False,
             ),
             clock=self.clock,
+            log=logging.getLogger(),
         )
         r2c = Transform3d()
         # Start at f2r (0, 0, 0) t=0
@@ -57,4 +60,64 @@ class PoseEstimatorTest(TestCase):
         f2r_1 = estimator.field_to_robot(Timestamp(1e9)) # Correct value
         o2r_1 = estimator.odom_to_robot()
         f2r_1_ = f2o_1 + o2r_1 # Apply odometry correction
-        assert f2r_1 == f2r_1_
\ No newline at end of file
+        assert f2r_1 == f2r_1_
+    def test_o2r_cached(self):
+        estimator = SimplePoseEstimator(
+            PoseEstimatorConfig(
+                history=timedelta(seconds=10.0),
+                force2d=False,
+            ),
+            clock=self.clock,
+            log=logging.getLogger(),
+        )
+        r2c = Transform3d()
+        estimator.record_f2r(Timestamp(0), r2c, Pose3d())
+        estimator.record_f2r(Timestamp(2e9), r2c, Pose3d(Translation3d(2, 0, 0), Rotation3d()))
+        estimator.record_f2o(Timestamp(1e9), Pose3d(Translation3d(1, 1, 0), Rotation3d()))
+
+        o2r_1 = estimator.odom_to_robot()
+        # No new data, so we should get the cached value
+        assert estimator.odom_to_robot() is o2r_1
+
+        # Data after the overlap doesn't change the correction
+        estimator.record_f2r(Timestamp(3e9), r2c, Pose3d(Translation3d(3, 0, 0), Rotation3d()))
+        assert estimator.odom_to_robot() is o2r_1
+
+        # New overlapping data does
+        estimator.record_f2o(Timestamp(1.5e9), Pose3d(Translation3d(1, 1, 0), Rotation3d()))
+        o2r_2 = estimator.odom_to_robot()
+        assert o2r_2 == Transform3d(Translation3d(0.5, -1, 0), Rotation3d())
+
+    def test_o2r_out_of_order(self):
+        estimator = SimplePoseEstimator(
+            PoseEstimatorConfig(
+                history=timedelta(seconds=10.0),
+                force2d=False,
+            ),
+            clock=self.clock,
+            log=logging.getLogger(),
+        )
+        r2c = Transform3d()
+        estimator.record_f2r(Timestamp(0), r2c, Pose3d())
+        estimator.record_f2r(Timestamp(2e9), r2c, Pose3d(Translation3d(2, 0, 0), Rotation3d()))
+        estimator.record_f2o(Timestamp(1e9), Pose3d())
+        self.assertAlmostEqual(estimator.odom_to_robot().x, 1.0)
+
+        # A late sample after the end of the overlap (but before the last sample) changes the interpolation there
+        estimator.record_f2r(Timestamp(1.5e9), r2c, Pose3d(Translation3d(5, 0, 0), Rotation3d()))
+        self.assertAlmostEqual(estimator.odom_to_robot().x, 5.0 / 1.5)
+
+    def test_latest_cov(self):
+        estimator = SimplePoseEstimator(
+            PoseEstimatorConfig(history=timedelta(seconds=10.0)),
+            clock=self.clock,
+            log=logging.getLogger(),
+        )
+        self.assertIsNone(estimator.latest_f2r())
+        self.assertIsNone(estimator.field_to_robot_cov(Timestamp(0)))
+        r2c = Transform3d()
+        estimator.record_f2r(Timestamp(2e9), r2c, Pose3d(), np.eye(6) * 2)
+        # Older measurements don't replace the newest
+        estimator.record_f2r(Timestamp(1e9), r2c, Pose3d(), np.eye(6))
+        self.assertEqual(estimator.latest_f2r(), Timestamp(2e9))
+        np.testing.assert_array_equal(estimator.field_to_robot_cov(Timestamp(3e9)), np.eye(6) * 2)
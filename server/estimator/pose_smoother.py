@@ -0,0 +1,601 @@
+from typing import Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from time import perf_counter_ns
+import logging
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+from wpiutil.log import DataLog, DoubleLogEntry
+
+from worker.msg import AprilTagPose
+from typedef.cfg import PoseEstimatorConfig, SmootherConfig
+from typedef.geom import Transform3d, Pose3d, Pose2d, Rotation2d
+from util.clock import Clock
+from util.timestamp import Timestamp, Duration
+from .pose_simple import SimplePoseEstimator, planar_cov
+
+
+def _wrap_angle(theta: np.ndarray) -> np.ndarray:
+	"Wrap angles to [-π, π)"
+	return (theta + np.pi) % (2 * np.pi) - np.pi
+
+def _compose(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+	"Compose planar poses `a ∘ b` (..., 3)"
+	c = np.cos(a[..., 2])
+	s = np.sin(a[..., 2])
+	return np.stack([
+		a[..., 0] + c * b[..., 0] - s * b[..., 1],
+		a[..., 1] + s * b[..., 0] + c * b[..., 1],
+		a[..., 2] + b[..., 2],
+	], axis=-1)
+
+def _between(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+	"Relative planar pose `a⁻¹ ∘ b` (..., 3)"
+	c = np.cos(a[..., 2])
+	s = np.sin(a[..., 2])
+	dx = b[..., 0] - a[..., 0]
+	dy = b[..., 1] - a[..., 1]
+	return np.stack([
+		c * dx + s * dy,
+		-s * dx + c * dy,
+		b[..., 2] - a[..., 2],
+	], axis=-1)
+
+def _blocks(rows: np.ndarray, cols: np.ndarray, blocks: np.ndarray):
+	"Expand (K, 3, 3) blocks at block indices (K,) into COO (row, col, data)"
+	offset = np.arange(3)
+	r = np.broadcast_to(3 * rows[:, None, None] + offset[None, :, None], blocks.shape)
+	c = np.broadcast_to(3 * cols[:, None, None] + offset[None, None, :], blocks.shape)
+	return r.ravel(), c.ravel(), blocks.ravel()
+
+
+@dataclass
+class SmootherStats:
+	"Solve statistics for `PoseGraphSmoother`"
+	solves: int = 0
+	iterations: int = 0
+	"Total LM iterations"
+	over_budget: int = 0
+	"Solves that stopped because they ran out of time"
+	dropped: int = 0
+	"Measurements that were older than the window"
+	marginalized: int = 0
+	"Poses marginalized out of the window"
+	last_solve_time: Duration = Duration(0)
+	max_solve_time: Duration = Duration(0)
+	total_solve_time: Duration = Duration(0)
+
+	@property
+	def mean_solve_time(self) -> Duration:
+		return (self.total_solve_time // self.solves) if self.solves > 0 else Duration(0)
+
+
+@dataclass
+class _Prior:
+	"Linearized prior on a single node (from marginalization)"
+	t: float
+	"Node time"
+	x: np.ndarray
+	"Linearization point"
+	H: np.ndarray
+	"Information (3, 3)"
+	g: np.ndarray
+	"Gradient at the linearization point"
+
+
+class _Problem:
+	"Nonlinear least-squares problem over a fixed set of nodes"
+	def __init__(self, n: int, between_z: np.ndarray, between_info: np.ndarray, abs_idx: np.ndarray, abs_z: np.ndarray, abs_info: np.ndarray, prior: Optional[tuple[int, _Prior]], huber: float) -> None:
+		self.n = n
+		self.between_z = between_z
+		"Relative motion between consecutive nodes (N - 1, 3)"
+		self.between_info = between_info
+		"Square-root information (diagonal) of relative motion (N - 1, 3)"
+		self.abs_idx = abs_idx
+		self.abs_z = abs_z
+		self.abs_info = abs_info
+		self.prior = prior
+		self.huber = huber
+
+	def _between_residuals(self, x: np.ndarray) -> np.ndarray:
+		r = _between(x[:-1], x[1:]) - self.between_z
+		r[:, 2] = _wrap_angle(r[:, 2])
+		return r * self.between_info
+
+	def _abs_residuals(self, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+		"Whitened residuals, and robust weights"
+		r = x[self.abs_idx] - self.abs_z
+		r[:, 2] = _wrap_angle(r[:, 2])
+		r *= self.abs_info
+		norm = np.linalg.norm(r, axis=-1)
+		weights = np.minimum(1.0, self.huber / np.maximum(norm, 1e-12))
+		return r, weights
+
+	def _prior_dx(self, x: np.ndarray) -> np.ndarray:
+		idx, prior = self.prior
+		dx = x[idx] - prior.x
+		dx[2] = _wrap_angle(dx[2])
+		return dx
+
+	def cost(self, x: np.ndarray) -> float:
+		cost = 0.5 * np.sum(np.square(self._between_residuals(x)))
+		if len(self.abs_idx) > 0:
+			r, _ = self._abs_residuals(x)
+			norm = np.linalg.norm(r, axis=-1)
+			k = self.huber
+			cost += 0.5 * np.sum(np.where(norm <= k, np.square(norm), 2 * k * norm - k * k))
+		if self.prior is not None:
+			dx = self._prior_dx(x)
+			prior = self.prior[1]
+			cost += 0.5 * (dx @ prior.H @ dx) + prior.g @ dx
+		return float(cost)
+
+	def system(self, x: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""
+		Gauss-Newton normal equations, which are block-tridiagonal.
+
+		Returns diagonal blocks (N, 3, 3), upper off-diagonal blocks (N - 1, 3, 3) and the gradient (N, 3).
+		"""
+		n = self.n
+		D = np.zeros((n, 3, 3), dtype=float)
+		U = np.zeros((max(n - 1, 0), 3, 3), dtype=float)
+		g = np.zeros((n, 3), dtype=float)
+
+		if n > 1:
+			xi = x[:-1]
+			c = np.cos(xi[:, 2])
+			s = np.sin(xi[:, 2])
+			dx = x[1:, 0] - xi[:, 0]
+			dy = x[1:, 1] - xi[:, 1]
+			k = n - 1
+			# Jacobians w.r.t. x_i (A) and x_j (B)
+			A = np.zeros((k, 3, 3), dtype=float)
+			A[:, 0, 0] = -c
+			A[:, 0, 1] = -s
+			A[:, 1, 0] = s
+			A[:, 1, 1] = -c
+			A[:, 0, 2] = -s * dx + c * dy
+			A[:, 1, 2] = -c * dx - s * dy
+			A[:, 2, 2] = -1
+			B = np.zeros((k, 3, 3), dtype=float)
+			B[:, 0, 0] = c
+			B[:, 0, 1] = s
+			B[:, 1, 0] = -s
+			B[:, 1, 1] = c
+			B[:, 2, 2] = 1
+			A *= self.between_info[:, :, None]
+			B *= self.between_info[:, :, None]
+			r = self._between_residuals(x)[:, :, None]
+
+			At = np.swapaxes(A, -1, -2)
+			Bt = np.swapaxes(B, -1, -2)
+			D[:-1] += At @ A
+			D[1:] += Bt @ B
+			U[:] = At @ B
+			g[:-1] += (At @ r)[:, :, 0]
+			g[1:] += (Bt @ r)[:, :, 0]
+
+		if len(self.abs_idx) > 0:
+			# Jacobian is the identity, so JᵀJ is diagonal
+			r, weights = self._abs_residuals(x)
+			info = self.abs_info * weights[:, None]
+			diag = np.zeros((n, 3), dtype=float)
+			np.add.at(diag, self.abs_idx, info * self.abs_info)
+			D[:, [0, 1, 2], [0, 1, 2]] += diag
+			np.add.at(g, self.abs_idx, info * r)
+
+		if self.prior is not None:
+			idx, prior = self.prior
+			D[idx] += prior.H
+			g[idx] += prior.H @ self._prior_dx(x) + prior.g
+
+		return D, U, g
+
+
+@lru_cache(maxsize=8)
+def _block_tridiagonal_pattern(n: int, b: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"Sparsity pattern (mask, indices, indptr) of a block-tridiagonal matrix, as compressed rows"
+	# Each row of block row i has entries in block columns (i - 1, i, i + 1), where they exist
+	block_cols = np.arange(n)[:, None] + np.arange(-1, 2)[None, :]
+	cols = b * block_cols[:, None, :, None] + np.arange(b)[None, None, None, :]
+	cols = np.broadcast_to(cols, (n, b, 3, b)).reshape(n * b, 3 * b)
+	mask = (cols >= 0) & (cols < n * b)
+	counts = mask.sum(axis=1)
+	indptr = np.concatenate([[0], np.cumsum(counts)])
+	return mask, cols[mask], indptr
+
+def _block_tridiagonal(D: np.ndarray, U: np.ndarray) -> sparse.csc_matrix:
+	"Assemble a symmetric block-tridiagonal matrix from diagonal (N, b, b) and upper (N - 1, b, b) blocks"
+	n, b, _ = D.shape
+	blocks = np.zeros((n, 3, b, b), dtype=float)
+	blocks[1:, 0] = np.swapaxes(U, -1, -2)
+	blocks[:, 1] = D
+	blocks[:-1, 2] = U
+	mask, indices, indptr = _block_tridiagonal_pattern(n, b)
+	data = blocks.transpose(0, 2, 1, 3).reshape(n * b, 3 * b)[mask]
+	# The matrix is symmetric, so its compressed rows are also its compressed columns
+	return sparse.csc_matrix((data, indices, indptr), shape=(n * b, n * b))
+
+
+class PoseGraphSmoother:
+	"""
+	Fixed-lag smoother over planar robot poses.
+
+	Nodes are robot poses (x, y, θ) over the last `window` seconds. Consecutive nodes are joined by
+	relative-motion factors from SLAM odometry, and AprilTag poses are absolute factors on their nodes.
+	Each `solve()` runs a few Levenberg-Marquardt iterations (warm-started from the last solution) on
+	the sparse normal equations, and nodes older than the window are marginalized into a prior.
+
+	Because late measurements are just more factors on the graph, out-of-order AprilTag results
+	don't require replaying anything.
+	"""
+	def __init__(self, config: SmootherConfig) -> None:
+		self.window = config.window.total_seconds()
+		self.spacing = config.nodeSpacing.total_seconds()
+		self.budget_ns = config.budget.nanos
+		self.max_iterations = config.maxIterations
+		self.odometry_noise = np.array(config.odometryNoise, dtype=float)
+		self.min_odometry_noise = np.array(config.minOdometryNoise, dtype=float)
+		self.max_velocity = np.array(config.maxVelocity, dtype=float)
+		self.measurement_info = 1.0 / np.array(config.measurementStdDevs, dtype=float)
+		self.prior_info = 1.0 / np.square(np.array(config.priorStdDevs, dtype=float))
+		self.huber = config.huberThreshold
+		self.tolerance = 1e-4
+		"Stop iterating when every step is smaller than this (meters or radians)"
+		self.stats = SmootherStats()
+		self.clear()
+
+	def clear(self):
+		self._odom_t = np.empty(0, dtype=float)
+		"Odometry sample times"
+		self._odom_x = np.empty((0, 3), dtype=float)
+		"Odometry poses (with unwrapped θ, so they can be interpolated)"
+		self._node_t = np.empty(0, dtype=float)
+		"Node times"
+		self._node_x = np.empty((0, 3), dtype=float)
+		"Node poses (x, y, θ)"
+		self._abs_t = np.empty(0, dtype=float)
+		"Absolute factor times (each matches a node time)"
+		self._abs_z = np.empty((0, 3), dtype=float)
+		self._abs_info = np.empty((0, 3), dtype=float)
+		self._prior: Optional[_Prior] = None
+		self._lambda = 1e-4
+		"LM damping"
+		self.anchored = False
+		"Have we seen any absolute measurements?"
+
+	def __len__(self):
+		return len(self._node_t)
+
+	@property
+	def latest(self) -> Optional[float]:
+		"Time of the newest node"
+		return float(self._node_t[-1]) if len(self._node_t) > 0 else None
+
+	def poses(self) -> tuple[np.ndarray, np.ndarray]:
+		"Get (times, poses) of all nodes in the window"
+		return self._node_t.copy(), self._node_x.copy()
+
+	def _too_old(self, t: float) -> bool:
+		latest = self.latest
+		return (latest is not None) and (t < latest - self.window)
+
+	def _odom_at(self, t: np.ndarray) -> np.ndarray:
+		"Interpolate odometry (clamped to the range we have)"
+		if len(self._odom_t) == 0:
+			return np.zeros(np.shape(t) + (3,), dtype=float)
+		return np.stack([
+			np.interp(t, self._odom_t, self._odom_x[:, i])
+			for i in range(3)
+		], axis=-1)
+
+	def _odom_uncovered(self, ta: np.ndarray, tb: np.ndarray) -> np.ndarray:
+		"How much of each [ta, tb] interval isn't covered by odometry"
+		if len(self._odom_t) == 0:
+			return np.abs(tb - ta)
+		lo, hi = self._odom_t[0], self._odom_t[-1]
+		before = np.clip(lo, ta, tb) - ta
+		after = tb - np.clip(hi, ta, tb)
+		return before + after
+
+	def _relative(self, ta: np.ndarray, tb: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+		"Relative motion between times (from odometry), and its square-root information"
+		z = _between(self._odom_at(ta), self._odom_at(tb))
+		sigma = self.min_odometry_noise + np.abs(z) * self.odometry_noise
+		sigma = sigma + self._odom_uncovered(ta, tb)[..., None] * self.max_velocity
+		return z, 1.0 / sigma
+
+	def _predict(self, t: float) -> np.ndarray:
+		"Predict pose at time `t` from the nearest earlier (or later) node"
+		idx = np.searchsorted(self._node_t, t, side='right') - 1
+		if idx < 0:
+			idx = 0
+		z, _ = self._relative(self._node_t[idx], np.float64(t))
+		res = _compose(self._node_x[idx], z)
+		res[2] = _wrap_angle(res[2])
+		return res
+
+	def _insert_node(self, t: float, x: Optional[np.ndarray] = None) -> int:
+		if x is None:
+			x = self._predict(t)
+		idx = int(np.searchsorted(self._node_t, t))
+		self._node_t = np.insert(self._node_t, idx, t)
+		self._node_x = np.insert(self._node_x, idx, x, axis=0)
+		if self._prior is None:
+			self._prior = _Prior(t, x.copy(), np.diag(self.prior_info), np.zeros(3))
+		return idx
+
+	def add_odometry(self, t: float, pose: np.ndarray) -> bool:
+		"Add an odometry pose (x, y, θ) at time `t` (seconds)"
+		if self._too_old(t):
+			self.stats.dropped += 1
+			return False
+
+		idx = int(np.searchsorted(self._odom_t, t))
+		pose = np.array(pose, dtype=float)
+		if idx > 0:
+			# Unwrap θ relative to the previous sample
+			prev = self._odom_x[idx - 1, 2]
+			pose[2] = prev + _wrap_angle(pose[2] - prev)
+		self._odom_t = np.insert(self._odom_t, idx, t)
+		self._odom_x = np.insert(self._odom_x, idx, pose, axis=0)
+		if idx + 1 < len(self._odom_t):
+			# Re-unwrap newer samples
+			self._odom_x[idx:, 2] = np.unwrap(self._odom_x[idx:, 2])
+
+		if len(self._node_t) == 0:
+			self._insert_node(t, np.array([pose[0], pose[1], _wrap_angle(pose[2])]))
+		elif t >= self._node_t[-1] + self.spacing:
+			self._insert_node(t)
+		return True
+
+	def _node_for(self, t: float) -> int:
+		"Find (or create) a node at time `t`"
+		n = len(self._node_t)
+		if n > 0:
+			idx = int(np.searchsorted(self._node_t, t))
+			nearest = min(
+				(i for i in (idx - 1, idx) if 0 <= i < n),
+				key=lambda i: abs(self._node_t[i] - t),
+			)
+			if abs(self._node_t[nearest] - t) <= self.spacing / 2:
+				return nearest
+		return self._insert_node(t)
+
+	def add_absolute(self, t: float, candidates: np.ndarray, errors: np.ndarray) -> bool:
+		"""
+		Add an absolute pose measurement at time `t` (seconds).
+
+		When there are several (M, 3) candidate poses, we use the one closest to the current estimate
+		(or the one with the lowest error, if we don't have an estimate yet).
+		"""
+		if self._too_old(t):
+			self.stats.dropped += 1
+			return False
+
+		if len(self._node_t) == 0:
+			best = int(np.argmin(errors))
+			z = np.array(candidates[best], dtype=float)
+			idx = self._insert_node(t, z)
+		else:
+			idx = self._node_for(t)
+			if self.anchored:
+				diff = candidates - self._node_x[idx]
+				diff[:, 2] = _wrap_angle(diff[:, 2])
+				best = int(np.argmin(np.sum(np.square(diff * self.measurement_info), axis=-1)))
+			else:
+				best = int(np.argmin(errors))
+			z = np.array(candidates[best], dtype=float)
+
+		if not self.anchored:
+			# Move the whole window (rigidly) onto the first measurement
+			c, s = np.cos(self._node_x[idx, 2]), np.sin(self._node_x[idx, 2])
+			x_inv = np.array([
+				-c * self._node_x[idx, 0] - s * self._node_x[idx, 1],
+				s * self._node_x[idx, 0] - c * self._node_x[idx, 1],
+				-self._node_x[idx, 2],
+			])
+			tf = _compose(z, x_inv)
+			self._node_x = _compose(np.broadcast_to(tf, self._node_x.shape), self._node_x)
+			self._node_x[:, 2] = _wrap_angle(self._node_x[:, 2])
+			assert self._prior is not None
+			self._prior.x = self._node_x[np.searchsorted(self._node_t, self._prior.t)].copy()
+			self.anchored = True
+
+		self._abs_t = np.append(self._abs_t, self._node_t[idx])
+		self._abs_z = np.append(self._abs_z, z[None], axis=0)
+		self._abs_info = np.append(self._abs_info, self.measurement_info[None], axis=0)
+		return True
+
+	def _problem(self, node_t: np.ndarray, abs_mask: Optional[np.ndarray] = None) -> _Problem:
+		between_z, between_info = self._relative(node_t[:-1], node_t[1:])
+		abs_t, abs_z, abs_info = self._abs_t, self._abs_z, self._abs_info
+		if abs_mask is not None:
+			abs_t, abs_z, abs_info = abs_t[abs_mask], abs_z[abs_mask], abs_info[abs_mask]
+		prior = None
+		if (self._prior is not None) and (node_t[0] <= self._prior.t <= node_t[-1]):
+			prior = (int(np.searchsorted(node_t, self._prior.t)), self._prior)
+		return _Problem(
+			len(node_t),
+			between_z,
+			between_info,
+			np.searchsorted(node_t, abs_t),
+			abs_z,
+			abs_info,
+			prior,
+			self.huber,
+		)
+
+	def _marginalize(self):
+		"Marginalize nodes that have left the window"
+		latest = self.latest
+		if latest is None:
+			return
+		cutoff = latest - self.window
+		while len(self._node_t) > 1 and self._node_t[0] < cutoff:
+			t0, t1 = self._node_t[0], self._node_t[1]
+			abs_mask = (self._abs_t == t0)
+			problem = self._problem(self._node_t[:2], abs_mask)
+			D, U, g = problem.system(self._node_x[:2])
+			# Schur complement onto the next node
+			H10_H00_inv = U[0].T @ np.linalg.inv(D[0])
+			self._prior = _Prior(
+				t1,
+				self._node_x[1].copy(),
+				D[1] - H10_H00_inv @ U[0],
+				g[1] - H10_H00_inv @ g[0],
+			)
+
+			keep = ~abs_mask
+			self._abs_t = self._abs_t[keep]
+			self._abs_z = self._abs_z[keep]
+			self._abs_info = self._abs_info[keep]
+			self._node_t = self._node_t[1:]
+			self._node_x = self._node_x[1:]
+			self.stats.marginalized += 1
+
+		# We only need odometry from the start of the window
+		first = max(int(np.searchsorted(self._odom_t, self._node_t[0], side='right')) - 1, 0)
+		if first > 0:
+			self._odom_t = self._odom_t[first:]
+			self._odom_x = self._odom_x[first:]
+
+	def solve(self) -> float:
+		"Run LM iterations until converged (or out of time). Returns the final cost."
+		start = perf_counter_ns()
+		self._marginalize()
+		if len(self._node_t) == 0:
+			return 0.0
+
+		problem = self._problem(self._node_t)
+		x = self._node_x
+		cost = problem.cost(x)
+		over_budget = False
+		D, U, g = problem.system(x)
+		for _ in range(self.max_iterations):
+			# Levenberg-Marquardt damping
+			damped = D.copy()
+			damped[:, [0, 1, 2], [0, 1, 2]] *= 1 + self._lambda
+			delta = spsolve(_block_tridiagonal(damped, U), -g.ravel()).reshape(-1, 3)
+			self.stats.iterations += 1
+
+			x_new = x + delta
+			x_new[:, 2] = _wrap_angle(x_new[:, 2])
+			new_cost = problem.cost(x_new)
+			if new_cost <= cost:
+				x = x_new
+				cost = new_cost
+				self._lambda = max(self._lambda * 0.1, 1e-9)
+				if np.max(np.abs(delta)) < self.tolerance:
+					break
+				D, U, g = problem.system(x)
+			else:
+				self._lambda = min(self._lambda * 10, 1e6)
+
+			if perf_counter_ns() - start > self.budget_ns:
+				over_budget = True
+				break
+		self._node_x = x
+
+		elapsed = Duration(perf_counter_ns() - start)
+		stats = self.stats
+		stats.solves += 1
+		stats.over_budget += int(over_budget)
+		stats.last_solve_time = elapsed
+		stats.max_solve_time = max(stats.max_solve_time, elapsed)
+		stats.total_solve_time += elapsed
+		return cost
+
+	def estimate(self, t: float) -> Optional[np.ndarray]:
+		"Get the pose (x, y, θ) at time `t` (seconds)"
+		if len(self._node_t) == 0:
+			return None
+		return self._predict(t)
+
+	def covariance(self, t: float) -> Optional[np.ndarray]:
+		"Marginal covariance (3, 3) of the node that the estimate at time `t` is predicted from"
+		n = len(self._node_t)
+		if n == 0:
+			return None
+		idx = max(int(np.searchsorted(self._node_t, t, side='right')) - 1, 0)
+		D, U, _ = self._problem(self._node_t).system(self._node_x)
+		try:
+			# Schur complements of the (block-tridiagonal) information onto the node, from each end
+			left = D[0]
+			for i in range(1, idx + 1):
+				left = D[i] - U[i - 1].T @ np.linalg.solve(left, U[i - 1])
+			right = D[n - 1]
+			for i in range(n - 2, idx - 1, -1):
+				right = D[i] - U[i] @ np.linalg.solve(right, U[i].T)
+			return np.linalg.inv(left + right - D[idx])
+		except np.linalg.LinAlgError:
+			return None
+
+
+def _pose_to_vec(pose: Pose3d) -> np.ndarray:
+	return np.array([pose.X(), pose.Y(), pose.rotation().Z()], dtype=float)
+
+
+class SmootherPoseEstimator(SimplePoseEstimator):
+	"""
+	Pose estimator using a fixed-lag pose graph smoother.
+
+	SLAM poses (`record_f2r`) are used as odometry between poses, and AprilTag poses as absolute
+	measurements. Localization is planar.
+	"""
+	def __init__(self, config: PoseEstimatorConfig, clock: Clock, *, log: logging.Logger, datalog: Optional[DataLog] = None) -> None:
+		super().__init__(config, clock, log=log, datalog=datalog)
+		self.smoother = PoseGraphSmoother(config.smoother)
+		if self.datalog is not None:
+			self.logSolveTime = DoubleLogEntry(self.datalog, 'smoother/solveTime')
+
+	@property
+	def stats(self) -> SmootherStats:
+		return self.smoother.stats
+
+	def _solve(self, timestamp: Timestamp):
+		self.smoother.solve()
+		if self.datalog is not None:
+			self.logSolveTime.append(self.smoother.stats.last_solve_time.total_seconds(), timestamp.as_wpi())
+		if self.smoother.anchored:
+			x, y, theta = self.smoother.estimate(timestamp.as_seconds())
+			self._add_f2r(timestamp, Pose3d(Pose2d(x, y, Rotation2d(theta))))
+
+	def record_f2r(self, timestamp: Timestamp, robot_to_camera: Transform3d, field_to_camera: Pose3d, covariance: Optional[np.ndarray] = None):
+		"Record SLAM pose (used as odometry, so `covariance` is unused)"
+		slam_to_robot = field_to_camera.transformBy(robot_to_camera.inverse())
+		if self.datalog is not None:
+			self.logFieldToRobot.append(slam_to_robot, timestamp.as_wpi())
+		if self.smoother.add_odometry(timestamp.as_seconds(), _pose_to_vec(slam_to_robot)):
+			self._solve(timestamp)
+
+	def record_apriltag(self, timestamp: Timestamp, robot_to_camera: Transform3d, detections: list[AprilTagPose]):
+		camera_to_robot = robot_to_camera.inverse()
+		candidates = list()
+		errors = list()
+		for det in detections:
+			if det.fieldToCam is None:
+				continue
+			candidates.append(_pose_to_vec(det.fieldToCam.transformBy(camera_to_robot)))
+			errors.append(det.error)
+		if len(candidates) == 0:
+			return
+		if self.smoother.add_absolute(timestamp.as_seconds(), np.array(candidates), np.array(errors, dtype=float)):
+			self._solve(timestamp)
+
+	def field_to_robot(self, time: Timestamp) -> Pose3d:
+		if self.smoother.anchored and (res := self.smoother.estimate(time.as_seconds())) is not None:
+			x, y, theta = res
+			return Pose3d(Pose2d(x, y, Rotation2d(theta)))
+		return super().field_to_robot(time)
+
+	def field_to_robot_cov(self, time: Timestamp) -> Optional[np.ndarray]:
+		if self.smoother.anchored and (cov := self.smoother.covariance(time.as_seconds())) is not None:
+			return planar_cov(cov)
+		return super().field_to_robot_cov(time)
+
+	def clear(self):
+		super().clear()
+		self.smoother.clear()
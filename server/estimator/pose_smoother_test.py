@@ -0,0 +1,109 @@
+from unittest import TestCase
+from datetime import timedelta
+import numpy as np
+
+from typedef.cfg import SmootherConfig
+from .pose_smoother import PoseGraphSmoother, _compose, _wrap_angle
+
+
+def assert_pose_close(actual: np.ndarray, expected: np.ndarray, atol: float):
+	diff = actual - expected
+	diff[2] = _wrap_angle(diff[2])
+	np.testing.assert_allclose(diff, 0, atol=atol)
+
+
+class PoseGraphSmootherTest(TestCase):
+	def make_smoother(self, **kwargs) -> PoseGraphSmoother:
+		# Don't let the time budget make tests flaky
+		kwargs.setdefault('budget', timedelta(seconds=10))
+		return PoseGraphSmoother(SmootherConfig(**kwargs))
+
+	def drive(self, smoother: PoseGraphSmoother, steps: int, *, tag_every: int = 5, drift: float = 0.01, dt: float = 0.02):
+		"Drive in an arc with drifting odometry, and perfect tags. Returns the true trajectory."
+		truth = np.array([1.0, 2.0, 0.3])
+		# SLAM frame is offset from the field
+		slam_offset = np.array([-3.0, 0.5, 1.2])
+		odom = _compose(slam_offset, truth)
+		motion = np.array([0.04, 0.0, 0.02])
+		trajectory = list()
+		for i in range(steps):
+			t = i * dt
+			smoother.add_odometry(t, odom)
+			if i % tag_every == 0:
+				smoother.add_absolute(t, truth[None], np.array([1.0]))
+			smoother.solve()
+			trajectory.append((t, truth.copy()))
+			truth = _compose(truth, motion)
+			odom = _compose(odom, motion * (1 + drift))
+		return trajectory
+
+	def test_tracks(self):
+		smoother = self.make_smoother()
+		trajectory = self.drive(smoother, 100)
+		t, truth = trajectory[-1]
+		assert_pose_close(smoother.estimate(t), truth, atol=0.02)
+		self.assertTrue(smoother.anchored)
+
+	def test_window(self):
+		smoother = self.make_smoother(window=timedelta(seconds=0.5))
+		trajectory = self.drive(smoother, 200)
+		times, _ = smoother.poses()
+		self.assertLessEqual(times[-1] - times[0], 0.5 + 0.02 + 1e-9)
+		self.assertGreater(smoother.stats.marginalized, 0)
+		t, truth = trajectory[-1]
+		assert_pose_close(smoother.estimate(t), truth, atol=0.02)
+
+		# Too old
+		self.assertFalse(smoother.add_absolute(times[0] - 0.1, np.zeros((1, 3)), np.array([1.0])))
+		self.assertEqual(smoother.stats.dropped, 1)
+
+	def test_late_measurement(self):
+		smoother = self.make_smoother()
+		trajectory = self.drive(smoother, 50, tag_every=1000, drift=0.2)
+		# Only one tag at the start, so odometry drift has accumulated
+		t, truth = trajectory[-1]
+		before = np.linalg.norm(smoother.estimate(t)[:2] - truth[:2])
+		self.assertGreater(before, 0.1)
+
+		# Lagged tag results arrive (older than the newest pose)
+		for t_late, truth_late in trajectory[-10:-1]:
+			self.assertTrue(smoother.add_absolute(t_late + 0.001, truth_late[None], np.array([1.0])))
+		smoother.solve()
+		after = np.linalg.norm(smoother.estimate(t)[:2] - truth[:2])
+		self.assertLess(after, before / 2)
+
+	def test_ambiguous(self):
+		smoother = self.make_smoother()
+		trajectory = self.drive(smoother, 20)
+		t, truth = trajectory[-1]
+		flipped = truth + [0.0, 1.0, 0.8]
+		smoother.add_absolute(t, np.vstack([flipped, truth]), np.array([0.5, 1.0]))
+		smoother.solve()
+		assert_pose_close(smoother.estimate(t), truth, atol=0.02)
+
+	def test_stats(self):
+		smoother = self.make_smoother()
+		self.drive(smoother, 10)
+		stats = smoother.stats
+		self.assertEqual(stats.solves, 10)
+		self.assertGreaterEqual(stats.iterations, stats.solves)
+		self.assertGreater(stats.max_solve_time, timedelta(0))
+		self.assertGreaterEqual(stats.max_solve_time, stats.mean_solve_time)
+
+	def test_covariance(self):
+		smoother = self.make_smoother()
+		self.drive(smoother, 30)
+		times, _ = smoother.poses()
+		D, U, _ = smoother._problem(times).system(smoother._node_x)
+		n = len(times)
+		H = np.zeros((3 * n, 3 * n))
+		for i in range(n):
+			H[3 * i:3 * i + 3, 3 * i:3 * i + 3] = D[i]
+		for i in range(n - 1):
+			H[3 * i:3 * i + 3, 3 * i + 3:3 * i + 6] = U[i]
+			H[3 * i + 3:3 * i + 6, 3 * i:3 * i + 3] = U[i].T
+		dense = np.linalg.inv(H)
+		# Marginal of the node used for each time matches the dense inverse
+		for idx in (0, n // 2, n - 1):
+			np.testing.assert_allclose(smoother.covariance(times[idx] + 1e-6), dense[3 * idx:3 * idx + 3, 3 * idx:3 * idx + 3], rtol=1e-6, atol=1e-12)
+		self.assertIsNone(self.make_smoother().covariance(0.0))
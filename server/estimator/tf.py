@@ -0,0 +1,211 @@
+from typing import Optional, Protocol, Union
+from dataclasses import dataclass
+from datetime import timedelta
+import enum
+
+from typedef.geom import Transform3d
+from util.timestamp import Timestamp, Duration
+
+from .util.cascade import Tracked
+
+
+class ReferenceFrameKind(enum.Enum):
+	"Kinds of reference frame"
+	FIELD = enum.auto()
+	"Field origin (root of the transform tree)"
+	ODOM = enum.auto()
+	"Origin of robot odometry"
+	ROBOT = enum.auto()
+	"Robot center"
+	CAMERA = enum.auto()
+	"A camera (see `ReferenceFrame.idx`)"
+
+
+@dataclass(frozen=True)
+class ReferenceFrame:
+	"A node in the transform tree"
+	kind: ReferenceFrameKind
+	idx: int = 0
+	"Index (for cameras)"
+
+	def __str__(self) -> str:
+		if self.kind == ReferenceFrameKind.CAMERA:
+			return f'camera{self.idx}'
+		return self.kind.name.lower()
+
+
+class TfProvider(Protocol):
+	"Something that knows the transform for an edge of the transform tree"
+	def track_tf(self, src: ReferenceFrame, dst: ReferenceFrame, timestamp: Timestamp | None = None) -> Tracked[Transform3d]: ...
+
+
+Edge = tuple[ReferenceFrameKind, ReferenceFrameKind]
+CacheKey = tuple[ReferenceFrame, ReferenceFrame, Optional[int]]
+
+
+class _TfEntry:
+	"Cached transform"
+	__slots__ = ('key', 'value', 'edges', 'valid')
+	def __init__(self, key: CacheKey, value: Optional[Transform3d], edges: frozenset[Edge]) -> None:
+		self.key = key
+		self.value = value
+		self.edges = edges
+		"Edges this transform was computed from"
+		self.valid = True
+		"Cleared when any of `edges` is invalidated"
+
+
+class TrackedTf(Tracked[Optional[Transform3d]]):
+	"Handle to a cached transform. Freshness is pushed from the tracker, so `is_fresh` doesn't walk dependencies."
+	def __init__(self, tracker: 'TfTracker', src: ReferenceFrame, dst: ReferenceFrame, timestamp: Timestamp | None, entry: _TfEntry) -> None:
+		super().__init__()
+		self._tracker = tracker
+		self.src = src
+		self.dst = dst
+		self.timestamp = timestamp
+		self._entry = entry
+
+	@property
+	def value(self) -> Optional[Transform3d]:
+		return self._entry.value
+
+	@property
+	def is_fresh(self) -> bool:
+		return self._entry.valid
+
+	def refresh(self) -> 'TrackedTf':
+		if not self._entry.valid:
+			self._entry = self._tracker._lookup(self.src, self.dst, self.timestamp)
+		return self
+
+
+class TfTracker:
+	"""
+	Transform tree for field/odom/robot/camera frames.
+
+	Each edge (parent kind → child kind) is backed by a [TfProvider]. Composed transforms are
+	memoized per (src, dst, time bucket), and providers push invalidations (via `invalidate()`)
+	when their data changes, so repeated lookups are a dictionary hit.
+
+	Timestamps in the same bucket share a cache entry, so lookups are quantized to `bucket`.
+	"""
+	def __init__(self, *edges: tuple[ReferenceFrameKind, ReferenceFrameKind, TfProvider], bucket: Duration | timedelta = timedelta(milliseconds=1), max_entries: int = 1024) -> None:
+		self._providers: dict[Edge, TfProvider] = dict()
+		self._parents: dict[ReferenceFrameKind, ReferenceFrameKind] = dict()
+		for parent, child, provider in edges:
+			if child in self._parents:
+				raise ValueError(f'Reference frame {child.name} has multiple parents')
+			self._providers[(parent, child)] = provider
+			self._parents[child] = parent
+
+		roots = {parent for parent, _ in self._providers.keys() if parent not in self._parents}
+		if len(roots) > 1:
+			raise ValueError(f'Transform tree has multiple roots: {roots}')
+		self.root = ReferenceFrame(roots.pop() if roots else ReferenceFrameKind.FIELD)
+
+		self._bucket_ns = max(Duration.wrap(bucket).nanos, 1)
+		self.max_entries = max_entries
+		self._cache: dict[CacheKey, _TfEntry] = dict()
+		self._dependents: dict[Edge, set[CacheKey]] = dict()
+		"Cache entries that depend on each edge"
+		self.hits = 0
+		self.misses = 0
+
+	def _key(self, src: ReferenceFrame, dst: ReferenceFrame, timestamp: Timestamp | None) -> CacheKey:
+		return (src, dst, None if timestamp is None else (timestamp.nanos // self._bucket_ns))
+
+	def parent(self, frame: ReferenceFrame) -> Optional[ReferenceFrame]:
+		"Get parent frame"
+		if (kind := self._parents.get(frame.kind, None)) is None:
+			return None
+		return ReferenceFrame(kind)
+
+	def invalidate(self, parent: ReferenceFrameKind, child: ReferenceFrameKind):
+		"Notify that the transform for an edge has changed"
+		if (keys := self._dependents.pop((parent, child), None)) is None:
+			return
+		for key in keys:
+			if (entry := self._cache.pop(key, None)) is not None:
+				self._drop(key, entry)
+
+	def clear(self):
+		for entry in self._cache.values():
+			entry.valid = False
+		self._cache.clear()
+		self._dependents.clear()
+
+	def _drop(self, key: CacheKey, entry: _TfEntry):
+		"Invalidate an entry (already removed from the cache), and stop tracking its dependencies"
+		entry.valid = False
+		for edge in entry.edges:
+			if (deps := self._dependents.get(edge, None)) is not None:
+				deps.discard(key)
+
+	def _evict(self):
+		"Drop oldest entries until we're under `max_entries`"
+		while len(self._cache) >= self.max_entries:
+			key = next(iter(self._cache))
+			self._drop(key, self._cache.pop(key))
+
+	def _store(self, key: CacheKey, value: Optional[Transform3d], edges: frozenset[Edge]) -> _TfEntry:
+		self._evict()
+		entry = _TfEntry(key, value, edges)
+		self._cache[key] = entry
+		for edge in edges:
+			self._dependents.setdefault(edge, set()).add(key)
+		return entry
+
+	def _lookup(self, src: ReferenceFrame, dst: ReferenceFrame, timestamp: Timestamp | None) -> _TfEntry:
+		key = self._key(src, dst, timestamp)
+		if (entry := self._cache.get(key, None)) is not None:
+			self.hits += 1
+			return entry
+		self.misses += 1
+
+		if src == dst:
+			return self._store(key, Transform3d(), frozenset())
+
+		if (src_parent := self.parent(src)) == dst:
+			# Inverse of an edge
+			inv = self._lookup(dst, src, timestamp)
+			return self._store(key, None if inv.value is None else inv.value.inverse(), inv.edges)
+
+		if (dst_parent := self.parent(dst)) is not None:
+			edge = (dst_parent.kind, dst.kind)
+			if src == dst_parent:
+				# Direct edge
+				provider = self._providers[edge]
+				tracked = provider.track_tf(src, dst, timestamp)
+				value = None if (tracked is NotImplemented) else tracked.value
+				return self._store(key, value, frozenset((edge,)))
+			if src == self.root:
+				# root→dst = root→parent + parent→dst
+				a = self._lookup(src, dst_parent, timestamp)
+				b = self._lookup(dst_parent, dst, timestamp)
+				value = None if (a.value is None or b.value is None) else (a.value + b.value)
+				return self._store(key, value, a.edges | b.edges)
+
+		if src_parent is None and src != self.root:
+			raise KeyError(f'Reference frame {src} is not in the transform tree')
+
+		# General case: src→dst = (root→src)⁻¹ + root→dst
+		a = self._lookup(self.root, src, timestamp)
+		b = self._lookup(self.root, dst, timestamp)
+		value = None if (a.value is None or b.value is None) else (a.value.inverse() + b.value)
+		return self._store(key, value, a.edges | b.edges)
+
+	def lookup(self, src: Union[ReferenceFrame, ReferenceFrameKind], dst: Union[ReferenceFrame, ReferenceFrameKind], timestamp: Timestamp | None = None) -> Optional[Transform3d]:
+		"Get the `src`→`dst` transform at a time (or latest, if `timestamp` is None)"
+		if isinstance(src, ReferenceFrameKind):
+			src = ReferenceFrame(src)
+		if isinstance(dst, ReferenceFrameKind):
+			dst = ReferenceFrame(dst)
+		return self._lookup(src, dst, timestamp).value
+
+	def track_tf(self, src: Union[ReferenceFrame, ReferenceFrameKind], dst: Union[ReferenceFrame, ReferenceFrameKind], timestamp: Timestamp | None = None) -> TrackedTf:
+		"Track the `src`→`dst` transform at a time (or latest, if `timestamp` is None)"
+		if isinstance(src, ReferenceFrameKind):
+			src = ReferenceFrame(src)
+		if isinstance(dst, ReferenceFrameKind):
+			dst = ReferenceFrame(dst)
+		return TrackedTf(self, src, dst, timestamp, self._lookup(src, dst, timestamp))
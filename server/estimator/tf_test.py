@@ -0,0 +1,97 @@
+from unittest import TestCase
+
+from typedef.geom import Transform3d, Translation3d, Rotation3d
+from util.timestamp import Timestamp
+
+from .util.cascade import StaticValue
+from .tf import TfTracker, ReferenceFrame, ReferenceFrameKind
+
+
+class FakeProvider:
+	def __init__(self, value: Transform3d) -> None:
+		self.value = value
+		self.calls = 0
+
+	def track_tf(self, src: ReferenceFrame, dst: ReferenceFrame, timestamp: Timestamp | None = None):
+		self.calls += 1
+		return StaticValue(self.value)
+
+class FakeCameras(FakeProvider):
+	def track_tf(self, src: ReferenceFrame, dst: ReferenceFrame, timestamp: Timestamp | None = None):
+		self.calls += 1
+		return StaticValue(Transform3d(Translation3d(0, 0, dst.idx), Rotation3d()))
+
+
+FIELD = ReferenceFrame(ReferenceFrameKind.FIELD)
+ODOM = ReferenceFrame(ReferenceFrameKind.ODOM)
+ROBOT = ReferenceFrame(ReferenceFrameKind.ROBOT)
+CAM1 = ReferenceFrame(ReferenceFrameKind.CAMERA, 1)
+
+
+class TestTfTracker(TestCase):
+	def setUp(self) -> None:
+		self.f2r = FakeProvider(Transform3d(Translation3d(1, 0, 0), Rotation3d(0, 0, 1)))
+		self.f2o = FakeProvider(Transform3d(Translation3d(0, 2, 0), Rotation3d()))
+		self.cams = FakeCameras(None)
+		self.tf = TfTracker(
+			(ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT, self.f2r),
+			(ReferenceFrameKind.FIELD, ReferenceFrameKind.ODOM, self.f2o),
+			(ReferenceFrameKind.ROBOT, ReferenceFrameKind.CAMERA, self.cams),
+		)
+
+	def test_compose(self):
+		ts = Timestamp(0)
+		self.assertEqual(self.tf.lookup(FIELD, FIELD, ts), Transform3d())
+		self.assertEqual(self.tf.lookup(FIELD, ROBOT, ts), self.f2r.value)
+		self.assertEqual(self.tf.lookup(ROBOT, FIELD, ts), self.f2r.value.inverse())
+		self.assertEqual(self.tf.lookup(FIELD, CAM1, ts), self.f2r.value + Transform3d(Translation3d(0, 0, 1), Rotation3d()))
+		self.assertEqual(self.tf.lookup(ODOM, ROBOT, ts), self.f2o.value.inverse() + self.f2r.value)
+
+	def test_memoized(self):
+		ts = Timestamp(0)
+		first = self.tf.lookup(FIELD, CAM1, ts)
+		calls = (self.f2r.calls, self.cams.calls)
+		# Same time bucket
+		self.assertEqual(self.tf.lookup(FIELD, CAM1, Timestamp(1000)), first)
+		self.assertEqual((self.f2r.calls, self.cams.calls), calls)
+
+		# Different time bucket
+		self.tf.lookup(FIELD, CAM1, Timestamp(1e9))
+		self.assertEqual((self.f2r.calls, self.cams.calls), (calls[0] + 1, calls[1] + 1))
+
+	def test_invalidate(self):
+		ts = Timestamp(0)
+		tracked_cam = self.tf.track_tf(FIELD, CAM1, ts)
+		tracked_odom = self.tf.track_tf(FIELD, ReferenceFrameKind.ODOM, ts)
+		self.assertTrue(tracked_cam.is_fresh)
+
+		self.f2r.value = Transform3d(Translation3d(5, 0, 0), Rotation3d())
+		self.tf.invalidate(ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT)
+		self.assertFalse(tracked_cam.is_fresh)
+		# Doesn't depend on field→robot
+		self.assertTrue(tracked_odom.is_fresh)
+
+		tracked_cam.refresh()
+		self.assertTrue(tracked_cam.is_fresh)
+		self.assertEqual(tracked_cam.value, Transform3d(Translation3d(5, 0, 1), Rotation3d()))
+
+	def test_eviction(self):
+		tf = TfTracker((ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT, self.f2r), max_entries=4)
+		for i in range(10):
+			tf.lookup(FIELD, ROBOT, Timestamp(i * 1e9))
+		self.assertLessEqual(len(tf._cache), 4)
+		self.assertLessEqual(len(tf._dependents[(ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT)]), 4)
+
+	def test_invalidate_bounded(self):
+		tf = TfTracker(
+			(ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT, self.f2r),
+			(ReferenceFrameKind.ROBOT, ReferenceFrameKind.CAMERA, self.cams),
+			max_entries=64,
+		)
+		for i in range(1000):
+			tf.lookup(FIELD, CAM1, Timestamp(i * 1e9))
+			tf.invalidate(ReferenceFrameKind.FIELD, ReferenceFrameKind.ROBOT)
+		# Invalidated entries are untracked from their other edges
+		for deps in tf._dependents.values():
+			self.assertLessEqual(len(deps), 64)
+		self.assertLessEqual(len(tf._cache), 64)
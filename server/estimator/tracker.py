@@ -1,10 +1,11 @@
+from typing import Optional, Iterable
 import numpy as np
 from multidict import MultiDict
 
 from worker.msg import MsgDetections
 from typedef.geom import Transform3d, Translation3d, Rotation3d, Pose3d
 from typedef.cfg import ObjectTrackerConfig
-from util.timestamp import Timestamp
+from util.timestamp import Timestamp, TimestampArray
 
 class TrackedObject:
 	def __init__(self, id: int, timestamp: Timestamp, position: Translation3d, label: str, confidence: float):
@@ -25,6 +26,7 @@ class TrackedObject:
 
 		# LERP (TODO: use confidence?)
 		self.position = (other.position * alpha) + (self.position * (1.0 - alpha))
+		self._position_rs_cache = None
 		self.n_detections += 1
 	
 	@property
@@ -42,9 +44,10 @@ class TrackedObject:
 		return self._position_rs_cache[1]
 	
 	def should_remove(self, now: Timestamp, config: ObjectTrackerConfig):
-		if self.n_detections < config.object_min_detections and self.last_seen < now - config.object_detected_duration:
+		age_ns = now.nanos - self.last_seen.nanos
+		if self.n_detections < config.min_detections and age_ns > config.detected_duration.nanos:
 			return True
-		if self.last_seen < now - config.object_history_duration:
+		if age_ns > config.history_duration.nanos:
 			return True
 		return False
 
@@ -64,13 +67,13 @@ class ObjectTracker:
 		new_cs = new_obj.position_rel(field_to_camera)
 
 		best = None
-		best_dist = self.config.object_clustering_distance
+		best_dist = self.config.clustering_distance
 		for old in self.tracked_objects.getall(new_obj.label):
 			# ignore depth difference in clustering
 			old_cs = new_obj.position_rel(field_to_camera)
 
 			# Distance away from camera
-			z = max(self.config.object_min_depth, old_cs.z, new_cs.z)
+			z = max(self.config.min_depth, old_cs.z, new_cs.z)
 			dist: float = np.hypot(old_cs.x - new_cs.x, old_cs.y - new_cs.y) / z
 
 			if dist < best_dist:
@@ -95,7 +98,7 @@ class ObjectTracker:
 			id = self._next_id
 			new_obj = TrackedObject(id, t, field_to_obj, label, confidence=detection.confidence)
 			if existing := self._find_best_match(new_obj, field_to_camera):
-				existing.update(new_obj, alpha=self.config.object_alpha)
+				existing.update(new_obj, alpha=self.config.alpha)
 			else:
 				self._next_id += 1 # Only bump IDs for new objects
 				self.tracked_objects.add(label, new_obj)
@@ -104,19 +107,35 @@ class ObjectTracker:
 	
 	def cleanup(self, t: Timestamp):
 		"Remove objects that haven't been seen for a while"
+		items = list(self.tracked_objects.items())
+		if len(items) == 0:
+			return
+		# Check all ages at once (same as TrackedObject.should_remove)
+		ages = t.nanos - self.last_seen(obj for _, obj in items).nanos
+		n_detections = np.fromiter((obj.n_detections for _, obj in items), dtype=np.int64, count=len(items))
+		remove = ages > self.config.history_duration.nanos
+		remove |= (n_detections < self.config.min_detections) & (ages > self.config.detected_duration.nanos)
+		if not remove.any():
+			return
 		# remove cruft
 		self.tracked_objects = MultiDict(
-			(key, value)
-			for key, value in self.tracked_objects.items()
-			if not value.should_remove(t, self.config)
+			item
+			for item, removed in zip(items, remove.tolist())
+			if not removed
 		)
 	
+	def last_seen(self, objects: Optional[Iterable[TrackedObject]] = None) -> TimestampArray:
+		"Get when `objects` (default: all tracked objects) were last seen"
+		if objects is None:
+			objects = self.tracked_objects.values()
+		return TimestampArray.from_timestamps(obj.last_seen for obj in objects)
+	
 	def items(self):
 		"Get all currently tracked objects"
 		return (
 			obj
 			for obj in self.tracked_objects.values()
-			if obj.n_detections >= self.config.object_min_detections
+			if obj.n_detections >= self.config.min_detections
 		)
 
 	def clear(self):
@@ -0,0 +1,118 @@
+from typing import Optional
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import timedelta
+
+from util.timestamp import Timestamp, Duration
+
+
+class CheckpointPolicy(ABC):
+	"Decides when [ReplayFilter] should snapshot the filter state"
+
+	@abstractmethod
+	def should_checkpoint(self, ts: Timestamp, since_last: int, last_checkpoint: Optional[Timestamp]) -> bool:
+		"""
+		Should we save a checkpoint after integrating all measurements at `ts`?
+
+		@param since_last Number of measurements integrated since the last checkpoint
+		@param last_checkpoint Timestamp of the latest checkpoint in the history, or None if the history is empty
+		"""
+		pass
+
+	def observe_lateness(self, lateness: Duration | timedelta):
+		"Called when a measurement arrives older than the filter state"
+		pass
+
+
+class CheckpointEveryMeasurement(CheckpointPolicy):
+	"Checkpoint after every unique measurement timestamp"
+	def should_checkpoint(self, ts: Timestamp, since_last: int, last_checkpoint: Optional[Timestamp]) -> bool:
+		return True
+
+
+class CheckpointEveryN(CheckpointPolicy):
+	"Checkpoint after at least `count` measurements"
+	def __init__(self, count: int) -> None:
+		if count < 1:
+			raise ValueError(f'Invalid checkpoint count: {count}')
+		self.count = count
+
+	def should_checkpoint(self, ts: Timestamp, since_last: int, last_checkpoint: Optional[Timestamp]) -> bool:
+		return (last_checkpoint is None) or (since_last >= self.count)
+
+
+class CheckpointInterval(CheckpointPolicy):
+	"Checkpoint when at least `interval` has elapsed since the last checkpoint"
+	def __init__(self, interval: Duration | timedelta) -> None:
+		self.interval = Duration.wrap(interval)
+
+	def should_checkpoint(self, ts: Timestamp, since_last: int, last_checkpoint: Optional[Timestamp]) -> bool:
+		return (last_checkpoint is None) or (ts - last_checkpoint >= self.interval)
+
+
+class CheckpointAdaptive(CheckpointInterval):
+	"""
+	Space checkpoints based on how late measurements arrive.
+
+	Aims to keep about `target_count` checkpoints within the lateness window, so
+	a late measurement replays at most about 1/`target_count` of the window.
+	The lateness estimate jumps up to new maxima, and decays otherwise.
+	"""
+	def __init__(self, target_count: int = 8, min_interval: Duration | timedelta = timedelta(milliseconds=5), max_interval: Duration | timedelta = timedelta(milliseconds=200), decay: float = 0.05) -> None:
+		super().__init__(min_interval)
+		self.target_count = target_count
+		self.min_interval = Duration.wrap(min_interval)
+		self.max_interval = Duration.wrap(max_interval)
+		self.decay = decay
+		self.lateness = Duration(0)
+		"Estimate of lateness"
+
+	def observe_lateness(self, lateness: Duration | timedelta):
+		lateness = Duration.wrap(lateness)
+		if lateness >= self.lateness:
+			self.lateness = lateness
+		else:
+			self.lateness += (lateness - self.lateness) * self.decay
+		self.interval = min(max(self.lateness / self.target_count, self.min_interval), self.max_interval)
+
+
+@dataclass
+class ReplayStats:
+	"Cost of replaying lagged measurements"
+	checkpoints: int = 0
+	"Number of checkpoints saved"
+	reverts: int = 0
+	"Number of reverts"
+	failed_reverts: int = 0
+	"Number of reverts where the history was too short"
+	replayed: int = 0
+	"Total number of measurements re-integrated after reverting"
+	last_replayed: int = 0
+	"Number of measurements re-integrated by the latest revert"
+	max_replayed: int = 0
+	"Most measurements re-integrated by one revert"
+	last_latency: Duration = Duration(0)
+	"Time taken by the latest revert, including re-integrating measurements"
+	max_latency: Duration = Duration(0)
+	"Longest time taken by a revert"
+	total_latency: Duration = Duration(0)
+	"Total time spent reverting"
+
+	@property
+	def mean_replayed(self) -> float:
+		"Mean number of measurements re-integrated per revert"
+		return (self.replayed / self.reverts) if self.reverts > 0 else 0.0
+
+	@property
+	def mean_latency(self) -> Duration:
+		"Mean time taken by a revert"
+		return (self.total_latency // self.reverts) if self.reverts > 0 else Duration(0)
+
+	def record_revert(self, replayed: int, latency: Duration):
+		self.reverts += 1
+		self.replayed += replayed
+		self.last_replayed = replayed
+		self.max_replayed = max(self.max_replayed, replayed)
+		self.last_latency = latency
+		self.max_latency = max(self.max_latency, latency)
+		self.total_latency += latency
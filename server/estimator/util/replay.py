@@ -1,11 +1,15 @@
-from typing import Generic, TypeVar, Protocol
+from typing import Generic, TypeVar, NamedTuple
 from datetime import timedelta
 from logging import Logger
+from time import perf_counter_ns
 from collections import deque
 from abc import ABC, abstractmethod
-from util.timestamp import Timestamp
+import numpy as np
+from util.timestamp import Timestamp, Duration
 
 from .heap import Heap
+from .checkpoint import CheckpointPolicy, CheckpointEveryMeasurement, ReplayStats
+from .snapshot import SnapshotRing
 from .types import HasTimestamp, Filter
 
 
@@ -49,30 +53,167 @@ def _pop_after(queue: deque[M], cutoff: Timestamp) -> M | None:
 		last = queue.pop()
 	return last
 
+class ArraySnapshot(NamedTuple):
+	"Snapshot of an [ArrayReplayableFilter]"
+	ts: Timestamp
+	state: np.ndarray
+	covariance: np.ndarray
+
+class ArrayReplayableFilter(ReplayableFilter[M, ArraySnapshot], ABC):
+	"""
+	A filter whose state is a vector and covariance matrix of fixed size.
+
+	History for these filters is stored in preallocated arrays (see [SnapshotRing]),
+	so saving a snapshot doesn't allocate.
+	"""
+	state_len: int
+	"Length of the state vector"
+
+	@abstractmethod
+	def state_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+		"Get the current state vector and covariance matrix (may be views)"
+		pass
+
+	@abstractmethod
+	def restore_arrays(self, ts: Timestamp, state: np.ndarray, covariance: np.ndarray):
+		"Restore state. The arguments are views into the history, and must be copied."
+		pass
+
+	def snapshot(self) -> ArraySnapshot:
+		state, covariance = self.state_arrays()
+		return ArraySnapshot(self.last_measurement_ts, state.copy(), covariance.copy())
+
+	def restore(self, state: ArraySnapshot):
+		self.restore_arrays(state.ts, state.state, state.covariance)
+
+
 class FilterHistoryBuffer(Generic[M, S]):
+	"Saved filter states, in order of timestamp"
 	def __init__(self, log: Logger, filter: ReplayableFilter[M, S]) -> None:
 		super().__init__()
 		self.log = log
 		self._filter = filter
 		self._filter_state_history: deque[S] = deque()
 	
+	def __len__(self):
+		return len(self._filter_state_history)
+	
 	def clear(self):
 		self._filter_state_history.clear()
 	
+	def save(self) -> Timestamp:
+		"Snapshot the filter"
+		state = self._filter.snapshot()
+		self._filter_state_history.append(state)
+		return state.ts
+	
+	def revert(self, time: Timestamp) -> tuple[bool, Timestamp | None]:
+		"""
+		Restore the filter to the latest state at or before `time`, dropping all later states.
+		If there is no such state, restores the oldest state we have.
+
+		Returns whether the history was long enough, and the timestamp of the restored state.
+		"""
+		# Walk back through the queue until we reach a filter state whose time stamp
+		# is less than or equal to the requested time. Since every saved state after
+		# that time will be overwritten/corrected, we can pop from the queue. If the
+		# history is insufficiently short, we just take the oldest state we have.
+		last_history_state = _pop_after(self._filter_state_history, time)
+
+		# If the state history is not empty at this point, it means that our history
+		# was large enough, and we should revert to the state at the back of the
+		# history deque.
+		success = False
+		if len(self._filter_state_history) > 0:
+			success = True
+			last_history_state = self._filter_state_history[-1]
+		
+		if last_history_state is None:
+			return success, None
+		
+		self._filter.restore(last_history_state)
+		return success, last_history_state.ts
+	
+	def latest_at_or_before(self, time: Timestamp) -> Timestamp | None:
+		"Timestamp of the latest state at or before `time`"
+		result = None
+		for state in self._filter_state_history:
+			if state.ts > time:
+				break
+			result = state.ts
+		return result
+	
 	def _clear_expired_history(self, cutoff_time: Timestamp):
 		return _pop_before(self._filter_state_history, cutoff_time)
 
+class ArrayFilterHistoryBuffer(FilterHistoryBuffer[M, ArraySnapshot]):
+	"Saved filter states, stored in a [SnapshotRing]"
+	def __init__(self, log: Logger, filter: ArrayReplayableFilter[M], capacity: int) -> None:
+		# Skip deque allocation
+		self.log = log
+		self._filter = filter
+		self._filter_state_history = SnapshotRing(capacity, filter.state_len)
+	
+	def save(self) -> Timestamp:
+		ring = self._filter_state_history
+		overwritten = ring.overwritten
+		ts = self._filter.last_measurement_ts
+		ring.append(ts, *self._filter.state_arrays())
+		if ring.overwritten != overwritten:
+			self.log.debug("Filter history is full (capacity %s), dropped oldest state", ring.capacity)
+		return ts
+	
+	def revert(self, time: Timestamp) -> tuple[bool, Timestamp | None]:
+		ring = self._filter_state_history
+		if len(ring) == 0:
+			return False, None
+		
+		count = ring.count_at_or_before(time)
+		if count > 0:
+			# Revert to latest state at or before `time`
+			ts, state, covariance = ring[count - 1]
+			self._filter.restore_arrays(ts, state, covariance)
+			ring.truncate(count)
+			return True, ts
+		else:
+			# Insufficient history, take the oldest state we have
+			ts, state, covariance = ring[0]
+			self._filter.restore_arrays(ts, state, covariance)
+			ring.clear()
+			return False, ts
+	
+	def latest_at_or_before(self, time: Timestamp) -> Timestamp | None:
+		ring = self._filter_state_history
+		count = ring.count_at_or_before(time)
+		return ring.timestamp(count - 1) if count > 0 else None
+	
+	def _clear_expired_history(self, cutoff_time: Timestamp):
+		return self._filter_state_history.pop_before(cutoff_time)
+
 class ReplayFilter(Filter[M], Generic[M, S]):
 	"""
 	A lot of """
-	def __init__(self, filter: ReplayableFilter[M, S], history_length: timedelta, *, log: Logger, smooth_lagged_data: bool = False, predict_to_current_time: bool = True):
+	def __init__(self, filter: ReplayableFilter[M, S], history_length: timedelta, *, log: Logger, smooth_lagged_data: bool = False, predict_to_current_time: bool = True, history_capacity: int = 1024, checkpoint_policy: CheckpointPolicy | None = None):
 		self.log = log
 		self._filter = filter
 		self._measurement_queue: Heap[M] = Heap()
 		"Queue of measurements yet to be processed by the filter"
-		self._filter_state_history: deque[S] = deque()
+		self._filter_state_history: FilterHistoryBuffer[M, S]
+		"Filter snapshots, in order of timestamp"
+		if isinstance(filter, ArrayReplayableFilter):
+			# Only array-backed filters have a bounded history
+			self._filter_state_history = ArrayFilterHistoryBuffer(log, filter, history_capacity)
+		else:
+			self._filter_state_history = FilterHistoryBuffer(log, filter)
 		self._measurement_history: deque[M] = deque()
 		"Measurements already processed by the filter, in order of timestamp"
+		self.checkpoint_policy = checkpoint_policy or CheckpointEveryMeasurement()
+		"When to snapshot the filter"
+		self._since_checkpoint = 0
+		"Number of measurements integrated since the latest checkpoint"
+		self._last_checkpoint_ts: Timestamp | None = None
+		"Timestamp of the latest checkpoint"
+		self.stats = ReplayStats()
 		self.history_length = history_length
 		self.enabled = True
 		self.use_control = False
@@ -80,8 +221,11 @@ class ReplayFilter(Filter[M], Generic[M, S]):
 		self.predict_to_current_time = predict_to_current_time
 	
 	def _clear_expired_history(self, cutoff_time: Timestamp):
+		# Keep the latest state before the cutoff, so measurements after the cutoff can still be replayed
+		if (checkpoint_ts := self._filter_state_history.latest_at_or_before(cutoff_time)) is not None:
+			cutoff_time = checkpoint_ts
 		popped_measurements = _pop_before(self._measurement_history, cutoff_time)
-		popped_states = _pop_before(self._filter_state_history, cutoff_time)
+		popped_states = self._filter_state_history._clear_expired_history(cutoff_time)
 
 		self.log.debug("Popped %s measurements and %s states from their queues", popped_measurements, popped_states)
 	
@@ -89,6 +233,8 @@ class ReplayFilter(Filter[M], Generic[M, S]):
 		self._measurement_queue.clear()
 		self._filter_state_history.clear()
 		self._measurement_history.clear()
+		self._since_checkpoint = 0
+		self._last_checkpoint_ts = None
 		self._filter.clear()
 	
 	def observe(self, measurement: M):
@@ -96,39 +242,26 @@ class ReplayFilter(Filter[M], Generic[M, S]):
 	
 	def revert_to(self, time: Timestamp) -> bool:
 		self.log.debug("Requested time was %s to revert", time)
-		# Walk back through the queue until we reach a filter state whose time stamp
-		# is less than or equal to the requested time. Since every saved state after
-		# that time will be overwritten/corrected, we can pop from the queue. If the
-		# history is insufficiently short, we just take the oldest state we have.
-		last_history_state = _pop_after(self._filter_state_history, time)
-
-		# If the state history is not empty at this point, it means that our history
-		# was large enough, and we should revert to the state at the back of the
-		# history deque.
-		success = False
-		if len(self._filter_state_history) > 0:
-			success = True
-			last_history_state = self._filter_state_history[-1]
-		else:
+		success, state_ts = self._filter_state_history.revert(time)
+		self._since_checkpoint = 0
+		self._last_checkpoint_ts = state_ts if success else None
+		if not success:
+			self.stats.failed_reverts += 1
 			self.log.debug("Insufficient history to revert to time %s", time)
 
-			if last_history_state:
-				self.log.debug("Will revert to oldest state at %s", last_history_state.ts)
-
 		# If we have a valid reversion state, revert
-		if last_history_state:
-			# Reset filter to the latest state from the queue.
-			state = last_history_state
-			self._filter.restore(state)
-			self.log.debug("Reverted to state with time %s", state.ts)
+		if state_ts is not None:
+			self.log.debug("Reverted to state with time %s", state_ts)
 
 			# Repeat for measurements, but push every measurement onto the measurement
-			# queue as we go
+			# queue as we go. Checkpoints may be sparse, so everything after the restored
+			# state has to be replayed.
+			restore_after = state_ts if success else time
 			restored_measurements = 0
-			while len(self._measurement_history) > 0 and self._measurement_history[-1].ts > time:
+			while len(self._measurement_history) > 0 and self._measurement_history[-1].ts > restore_after:
 				# Don't need to restore measurements that predate our earliest state time
 				measurement = self._measurement_history.pop()
-				if state.ts <= measurement.ts:
+				if state_ts <= measurement.ts:
 					self._measurement_queue.push(measurement)
 					restored_measurements += 1
 
@@ -137,9 +270,11 @@ class ReplayFilter(Filter[M], Generic[M, S]):
 		return success
 
 	def _snapshot_filter(self):
-		state = self._filter.snapshot()
-		self._filter_state_history.append(state)
-		self.log.debug("Saved state with timestamp %s to history. %s measurements are in the queue. %s", state.ts, len(self._filter_state_history), state)
+		ts = self._filter_state_history.save()
+		self._since_checkpoint = 0
+		self._last_checkpoint_ts = ts
+		self.stats.checkpoints += 1
+		self.log.debug("Saved state with timestamp %s to history. %s states are in the history.", ts, len(self._filter_state_history))
 	
 	def _inner_observe(self, measurement: M):
 		self._filter.observe(measurement)
@@ -160,13 +295,17 @@ class ReplayFilter(Filter[M], Generic[M, S]):
 			# filter state and measurement queue to the first state that preceded the
 			# time stamp of our first measurement.
 			restored_measurement_count = 0
+			revert_start = None
 			if self.smooth_lagged_data and first_measurement.ts < self._filter.last_measurement_ts:
-				self.log.info("Received a measurement that was %s seconds in the past. Reverting filter state and measurement queue...", (self._filter.last_measurement_ts - first_measurement.ts).total_seconds())
+				lateness = self._filter.last_measurement_ts - first_measurement.ts
+				self.log.info("Received a measurement that was %s seconds in the past. Reverting filter state and measurement queue...", lateness.total_seconds())
+				self.checkpoint_policy.observe_lateness(lateness)
+				revert_start = perf_counter_ns()
 
 				original_count = len(self._measurement_queue)
 				first_measurement_time = first_measurement.ts
 				# revertTo may invalidate first_measurement
-				if not self.revert_to(first_measurement_time - timedelta(microseconds=1)):
+				if not self.revert_to(first_measurement_time.offset_ns(-1_000)):
 					self.log.warning("history interval is too small to revert to time %s", first_measurement_time)
 					# ROS_WARN_STREAM_DELAYED_THROTTLE(history_length_,
 					#   "Received old measurement for topic " << first_measurement_topic <<
@@ -178,6 +317,7 @@ class ReplayFilter(Filter[M], Generic[M, S]):
 					restored_measurement_count = 0
 
 				restored_measurement_count = len(self._measurement_queue) - original_count
+			replayed_count = restored_measurement_count
 
 			while (measurement := self._measurement_queue.peek()) is not None:
 				# If we've reached a measurement that has a time later than now, it
@@ -210,10 +350,17 @@ class ReplayFilter(Filter[M], Generic[M, S]):
 					# Invariant still holds: measurementHistoryDeque_.back().time_ <
 					# measurement_queue_.top().time_
 					self._measurement_history.append(measurement)
+					self._since_checkpoint += 1
 
 					# We should only save the filter state once per unique timstamp
 					if len(self._measurement_queue) == 0 or self._measurement_queue.peek().ts != self._filter.last_measurement_ts:
-						self._snapshot_filter()
+						if self.checkpoint_policy.should_checkpoint(self._filter.last_measurement_ts, self._since_checkpoint, self._last_checkpoint_ts):
+							self._snapshot_filter()
+			
+			if revert_start is not None:
+				latency = Duration(perf_counter_ns() - revert_start)
+				self.stats.record_revert(replayed_count, latency)
+				self.log.debug("Replayed %s measurements in %s", replayed_count, latency)
 		elif self._filter.is_initialized:
 			# In the event that we don't get any measurements for a long time,
 			# we still need to continue to estimate our state. Therefore, we
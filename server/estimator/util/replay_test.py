@@ -2,10 +2,12 @@ from datetime import timedelta
 import logging
 from unittest import TestCase
 import dataclasses
+import numpy as np
 
 from util.timestamp import Timestamp
 
-from .replay import ReplayFilter, ReplayableFilter
+from .replay import ReplayFilter, ReplayableFilter, ArrayReplayableFilter
+from .checkpoint import CheckpointEveryN, CheckpointInterval, CheckpointAdaptive
 from .cascade import StaticValue, PushValue
 from .cascade_replay import CascadingReplayFilter
 
@@ -49,6 +51,31 @@ class LinearFilter(ReplayableFilter[Measurement, State]):
 		self.state.x += self.state.dx * delta.total_seconds()
 		self.state.ts = now
 
+class ArrayLinearFilter(ArrayReplayableFilter[Measurement]):
+	"Same as LinearFilter, but with array state [x, dx]"
+	state_len = 2
+	def __init__(self) -> None:
+		super().__init__()
+		self.last_measurement_ts = Timestamp.invalid()
+		self.state = np.zeros(2)
+		self.covariance = np.eye(2)
+	
+	def state_arrays(self):
+		return self.state, self.covariance
+	
+	def restore_arrays(self, ts: Timestamp, state: np.ndarray, covariance: np.ndarray):
+		self.last_measurement_ts = ts
+		self.state[:] = state
+		self.covariance[:] = covariance
+	
+	def observe(self, measurement: Measurement):
+		self.state[:] = (measurement.x, measurement.dx)
+		self.last_measurement_ts = measurement.ts
+	
+	def predict(self, now: Timestamp, delta: timedelta):
+		self.state[0] += self.state[1] * delta.total_seconds()
+		self.last_measurement_ts = now
+
 class TestReplay(TestCase):
 	def test_baseline(self):
 		filter = LinearFilter()
@@ -113,6 +140,81 @@ class TestReplay(TestCase):
 		self.assertEqual(filter.last_measurement_ts, Timestamp(4e9))
 		self.assertEqual(filter.state.x, 3)
 
+	def test_replay_array(self):
+		log = logging.getLogger("filter")
+
+		filter = ArrayLinearFilter()
+		rf = ReplayFilter(filter, timedelta(seconds=10), log=log, smooth_lagged_data=True, predict_to_current_time=True, history_capacity=8)
+
+		with self.assertNoLogs(log, logging.INFO + 1):
+			rf.observe(Measurement(Timestamp(0e9), 1, 1))
+			rf.observe(Measurement(Timestamp(1e9), 3, 4))
+			rf.predict(Timestamp(3e9))
+		self.assertEqual(filter.last_measurement_ts, Timestamp(3e9))
+		self.assertEqual(filter.state[0], 11)
+
+		with self.assertNoLogs(log, logging.INFO + 1):
+			rf.observe(Measurement(Timestamp(2e9), 1, 1))
+			rf.predict(Timestamp(4e9))
+		self.assertEqual(filter.last_measurement_ts, Timestamp(4e9))
+		self.assertEqual(filter.state[0], 3)
+	
+	def test_history_capacity(self):
+		log = logging.getLogger("filter")
+
+		filter = ArrayLinearFilter()
+		rf = ReplayFilter(filter, timedelta(seconds=100), log=log, smooth_lagged_data=True, predict_to_current_time=False, history_capacity=4)
+		for i in range(10):
+			rf.observe(Measurement(Timestamp(i * 1e9), i, 0))
+			rf.predict(Timestamp(i * 1e9))
+		self.assertEqual(len(rf._filter_state_history), 4)
+
+		# Older than all the history we have, so we revert to the oldest state
+		self.assertFalse(rf.revert_to(Timestamp(1e9)))
+		self.assertEqual(filter.last_measurement_ts, Timestamp(6e9))
+		self.assertEqual(filter.state[0], 6)
+
+
+class TestCheckpoint(TestCase):
+	def run_lagged(self, policy):
+		"Feed a 100Hz stream, then a measurement that's 0.25s late"
+		log = logging.getLogger("filter")
+		filter = ArrayLinearFilter()
+		rf = ReplayFilter(filter, timedelta(seconds=10), log=log, smooth_lagged_data=True, predict_to_current_time=True, checkpoint_policy=policy)
+		for i in range(100):
+			rf.observe(Measurement(Timestamp(i * 1e7), i, 1))
+			rf.predict(Timestamp(i * 1e7))
+		rf.observe(Measurement(Timestamp(0.745e9), 100, 1))
+		rf.predict(Timestamp(1e9))
+		return rf, filter
+
+	def test_sparse_matches_dense(self):
+		dense, dense_filter = self.run_lagged(None)
+		for policy in (CheckpointEveryN(10), CheckpointInterval(timedelta(milliseconds=50))):
+			with self.subTest(policy=type(policy).__name__):
+				sparse, sparse_filter = self.run_lagged(policy)
+				self.assertEqual(sparse_filter.last_measurement_ts, dense_filter.last_measurement_ts)
+				np.testing.assert_allclose(sparse_filter.state, dense_filter.state)
+				self.assertLess(sparse.stats.checkpoints, dense.stats.checkpoints)
+				# Sparse checkpoints have to replay more
+				self.assertGreater(sparse.stats.last_replayed, dense.stats.last_replayed)
+
+	def test_stats(self):
+		rf, _ = self.run_lagged(CheckpointEveryN(10))
+		self.assertEqual(rf.stats.reverts, 1)
+		self.assertEqual(rf.stats.failed_reverts, 0)
+		# Revert to checkpoint at 0.7s, then replay 0.71 .. 0.99
+		self.assertEqual(rf.stats.last_replayed, 29)
+		self.assertGreater(rf.stats.last_latency, timedelta(0))
+	
+	def test_adaptive(self):
+		policy = CheckpointAdaptive(target_count=5, min_interval=timedelta(milliseconds=10), max_interval=timedelta(seconds=1))
+		policy.observe_lateness(timedelta(milliseconds=250))
+		self.assertEqual(policy.interval, timedelta(milliseconds=50))
+		policy.observe_lateness(timedelta(0))
+		self.assertLess(policy.interval, timedelta(milliseconds=50))
+		self.assertGreaterEqual(policy.interval, timedelta(milliseconds=10))
+
 
 class TestCascade(TestCase):
 	def test_inorder(self):
@@ -0,0 +1,128 @@
+from typing import Literal, Optional, TYPE_CHECKING
+import numpy as np
+
+from util.timestamp import Timestamp
+
+if TYPE_CHECKING:
+	from util.clock import Clock
+
+
+class SnapshotRing:
+	"""
+	Fixed-capacity history of filter snapshots, in order of timestamp.
+
+	Each snapshot is a (timestamp, state, covariance) triple, stored in preallocated
+	(capacity,), (capacity, state_len), and (capacity, state_len, state_len) ring arrays,
+	so saving a snapshot is a copy into an existing slot. Lookups by time are a bisect,
+	and expiring old snapshots only moves the head of the ring.
+
+	If the ring is full, appending overwrites the oldest snapshot.
+	"""
+
+	def __init__(self, capacity: int, state_len: int, *, dtype = np.float64) -> None:
+		if capacity <= 0:
+			raise ValueError(f'Invalid snapshot capacity: {capacity}')
+		self.capacity = int(capacity)
+		self.state_len = int(state_len)
+		self._ts = np.zeros(self.capacity, dtype=np.int64)
+		self._state = np.zeros((self.capacity, self.state_len), dtype=dtype)
+		self._cov = np.zeros((self.capacity, self.state_len, self.state_len), dtype=dtype)
+		self._head = 0
+		"Physical index of the oldest snapshot"
+		self._size = 0
+		self._clock: Optional['Clock'] = None
+		self.overwritten = 0
+		"Number of snapshots dropped because the ring was full"
+
+	@property
+	def nbytes(self) -> int:
+		"Memory used by the ring arrays"
+		return self._ts.nbytes + self._state.nbytes + self._cov.nbytes
+
+	def __len__(self):
+		return self._size
+
+	def __bool__(self):
+		return self._size > 0
+
+	def clear(self):
+		self._head = 0
+		self._size = 0
+
+	def _slot(self, idx: int) -> int:
+		"Convert logical index (0 is oldest) to physical index"
+		if idx < 0:
+			idx += self._size
+		if not (0 <= idx < self._size):
+			raise IndexError(f'Snapshot index {idx} out of range')
+		return (self._head + idx) % self.capacity
+
+	def _bisect(self, nanos: int, side: Literal['left', 'right']) -> int:
+		"Find logical insertion index for `nanos`"
+		head = self._head
+		end = head + self._size
+		if end <= self.capacity:
+			return int(np.searchsorted(self._ts[head:end], nanos, side))
+
+		# Ring wraps around, so search the two contiguous segments
+		first = self._ts[head:]
+		second = self._ts[:end - self.capacity]
+		if (nanos < second[0]) if (side == 'right') else (nanos <= second[0]):
+			return int(np.searchsorted(first, nanos, side))
+		return len(first) + int(np.searchsorted(second, nanos, side))
+
+	def append(self, ts: Timestamp, state: np.ndarray, covariance: np.ndarray):
+		"Copy a snapshot into the ring"
+		if self._size > 0:
+			last = self._ts[(self._head + self._size - 1) % self.capacity]
+			if ts.nanos < last:
+				raise ValueError(f'Snapshot at {ts} is older than the latest snapshot')
+		else:
+			self._clock = ts.clock
+
+		if self._size == self.capacity:
+			# Overwrite oldest
+			self._head = (self._head + 1) % self.capacity
+			self._size -= 1
+			self.overwritten += 1
+
+		slot = (self._head + self._size) % self.capacity
+		self._ts[slot] = ts.nanos
+		self._state[slot] = state
+		self._cov[slot] = covariance
+		self._size += 1
+
+	def timestamp(self, idx: int) -> Timestamp:
+		"Get the timestamp of a snapshot"
+		return Timestamp(int(self._ts[self._slot(idx)]), self._clock)
+
+	def __getitem__(self, idx: int) -> tuple[Timestamp, np.ndarray, np.ndarray]:
+		"Get a snapshot. The returned arrays are views into the ring, and are overwritten by later appends."
+		slot = self._slot(idx)
+		return Timestamp(int(self._ts[slot]), self._clock), self._state[slot], self._cov[slot]
+
+	def count_at_or_before(self, time: Timestamp) -> int:
+		"Number of snapshots with timestamps at or before `time`"
+		if self._size == 0:
+			return 0
+		return self._bisect(time.nanos, 'right')
+
+	def pop_before(self, cutoff: Timestamp) -> int:
+		"Drop all snapshots that happened before `cutoff`. Returns number of snapshots dropped."
+		if self._size == 0:
+			return 0
+		count = self._bisect(cutoff.nanos, 'left')
+		self._head = (self._head + count) % self.capacity
+		self._size -= count
+		return count
+
+	def truncate(self, size: int) -> int:
+		"Keep only the oldest `size` snapshots. Returns number of snapshots dropped."
+		size = max(0, min(size, self._size))
+		dropped = self._size - size
+		self._size = size
+		return dropped
+
+	def pop_after(self, time: Timestamp) -> int:
+		"Drop all snapshots that happened after `time`. Returns number of snapshots dropped."
+		return self.truncate(self.count_at_or_before(time))
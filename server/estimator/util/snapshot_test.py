@@ -0,0 +1,70 @@
+from unittest import TestCase
+import numpy as np
+
+from util.timestamp import Timestamp
+
+from .snapshot import SnapshotRing
+
+
+def push(ring: SnapshotRing, ts: int, value: float):
+	ring.append(Timestamp(ts), np.full(ring.state_len, value), np.eye(ring.state_len) * value)
+
+
+class TestSnapshotRing(TestCase):
+	def test_append(self):
+		ring = SnapshotRing(4, 2)
+		self.assertEqual(len(ring), 0)
+		push(ring, 10, 1.0)
+		push(ring, 20, 2.0)
+		self.assertEqual(len(ring), 2)
+
+		ts, state, cov = ring[-1]
+		self.assertEqual(ts, Timestamp(20))
+		np.testing.assert_array_equal(state, [2.0, 2.0])
+		np.testing.assert_array_equal(cov, np.eye(2) * 2.0)
+
+		with self.assertRaises(ValueError):
+			push(ring, 15, 3.0)
+
+	def test_overwrite(self):
+		ring = SnapshotRing(3, 1)
+		for i in range(5):
+			push(ring, i * 10, i)
+		self.assertEqual(len(ring), 3)
+		self.assertEqual(ring.overwritten, 2)
+		self.assertEqual([ring.timestamp(i).nanos for i in range(3)], [20, 30, 40])
+		self.assertEqual(ring[0][1][0], 2.0)
+
+	def test_bisect_wrapped(self):
+		ring = SnapshotRing(4, 1)
+		for i in range(6):
+			push(ring, i * 10, i)
+		# Ring holds 20, 30, 40, 50 and wraps around the end of the arrays
+		self.assertEqual(ring.count_at_or_before(Timestamp(5)), 0)
+		self.assertEqual(ring.count_at_or_before(Timestamp(20)), 1)
+		self.assertEqual(ring.count_at_or_before(Timestamp(35)), 2)
+		self.assertEqual(ring.count_at_or_before(Timestamp(40)), 3)
+		self.assertEqual(ring.count_at_or_before(Timestamp(100)), 4)
+
+	def test_pop_before(self):
+		ring = SnapshotRing(4, 1)
+		for i in range(6):
+			push(ring, i * 10, i)
+		self.assertEqual(ring.pop_before(Timestamp(40)), 2)
+		self.assertEqual(len(ring), 2)
+		self.assertEqual(ring.timestamp(0), Timestamp(40))
+
+		# Space is reclaimed
+		push(ring, 60, 6)
+		push(ring, 70, 7)
+		self.assertEqual(ring.overwritten, 2)
+		self.assertEqual(ring.timestamp(-1), Timestamp(70))
+
+	def test_pop_after(self):
+		ring = SnapshotRing(8, 1)
+		for i in range(5):
+			push(ring, i * 10, i)
+		self.assertEqual(ring.pop_after(Timestamp(25)), 2)
+		self.assertEqual(ring.timestamp(-1), Timestamp(20))
+		self.assertEqual(ring.pop_after(Timestamp(-5)), 3)
+		self.assertEqual(len(ring), 0)
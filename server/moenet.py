@@ -1,5 +1,5 @@
 from typing import TYPE_CHECKING, Optional
-import logging, sys
+import logging, sys, time
 from pathlib import Path
 
 from pydantic_core import ValidationError
@@ -9,7 +9,7 @@ from typedef.net import Status
 from typedef.geom import Pose3d
 from worker import msg as wmsg
 
-from comms import Comms
+from comms import Comms, ProcessTelemetry
 from web.web_srv import RemoteWebServer
 from worker.controller import WorkerManager
 from estimator import DataFusion
@@ -17,8 +17,11 @@ from util.watchdog import Watchdog
 from util.interrupt import InterruptHandler
 from util.clock import WallClock
 from util.timemap import IdentityTimeMapper
+from util.merge import MergeQueue
+from util.timestamp import Timestamp
+from util.telemetry import TelemetryMonitor, MsgTelemetry, fresh_telemetry
 if TYPE_CHECKING:
-	from util.timestamp import Timestamp
+	from worker.controller import WorkerHandle
 
 class MoeNet:
 	camera_workers: Optional[WorkerManager]
@@ -35,6 +38,8 @@ class MoeNet:
 
 		self.log = logging.getLogger()
 		self.datalog = None
+		self.datalog_writer = None
+		"Writes hot-path DataLog entries on a background thread"
 		self.config_path = config_path
 		self.config = config
 		self.initial_config = config
@@ -50,9 +55,11 @@ class MoeNet:
 		if datalog_folder is not None:
 			from wpiutil.log import DataLog, IntegerLogEntry, StringLogEntry
 			from wpi_compat.datalog.log import PyToNtHandler
+			from wpi_compat.datalog import AsyncDataLog
 			
 			self.log.info("DataLog write to folder %s", datalog_folder)
 			self.datalog = DataLog(dir=str(datalog_folder))
+			self.datalog_writer = AsyncDataLog(self.datalog, log=self.log.getChild('datalog'))
 			self.logStatus = IntegerLogEntry(self.datalog, 'meta/status')
 			self.logConfig = StringLogEntry(self.datalog, 'meta/config')
 			self.logConfig.append(self.config.model_dump_json())
@@ -73,6 +80,8 @@ class MoeNet:
 		self.clock = WallClock()
 
 		# Set up timer
+		self.navx = None
+		"NavX clock (and IMU source), if enabled"
 		if self.config.timer == "system":
 			self.log.info("Selected system timer")
 			self.loc_to_net = IdentityTimeMapper(self.clock)
@@ -82,20 +91,44 @@ class MoeNet:
 				self.log.info("Connecting to NavX timer")
 				from util.navx import NavXTimeMapper
 				self.loc_to_net = NavXTimeMapper(self.clock, self.config.timer)
+				self.navx = self.loc_to_net.clock_b
 			except:
 				self.log.exception("Unable to construct NavX clock")
 				self.status = Status.FATAL
 				raise
 
+		# Set up UDP pose stream
+		self.pose_udp = None
+		"Low-latency pose stream to the Rio, if enabled"
+		if self.config.pose_udp.enabled:
+			from pose_udp import PoseUdpPublisher
+			self.log.info("Sending poses over UDP to %s:%d", self.config.pose_udp.host, self.config.pose_udp.port)
+			self.pose_udp = PoseUdpPublisher(self.config.pose_udp.host, self.config.pose_udp.port)
+
 		# Set up PoseEstimator
 		self.estimator = DataFusion(
 			self.config.estimator,
 			log=self.log,
 			datalog=self.datalog,
+			datalog_writer=self.datalog_writer,
 			clock=self.clock,
 		)
+		self.camera_merge: MergeQueue[int, tuple['WorkerHandle', wmsg.AnyMsg]] = MergeQueue(self.clock, self.config.estimator.max_lateness)
+		"Merge packets from all cameras into timestamp order"
 		
 		self.build_cameras()
+
+		self.monitor = TelemetryMonitor('main')
+		"Telemetry for this process"
+		self.monitor.add_queue('merge', depth=self.camera_merge.__len__)
+		self.monitor.add_queue('workers', depth=lambda: sum(worker.msg_queue.qsize() for worker in (self.camera_workers or [])))
+		self._telemetry: Optional[MsgTelemetry] = None
+		if self.datalog is not None:
+			from wpiutil.log import StringArrayLogEntry
+			from wpi_compat.datalog import StructArrayLogEntry
+			self.logTelemetryNames = self.datalog_writer.wrap(StringArrayLogEntry(self.datalog, 'telemetry/names'))
+			self.logTelemetry = self.datalog_writer.wrap(StructArrayLogEntry(self.datalog, 'telemetry/processes', ProcessTelemetry))
+			self.monitor.add_queue('datalog', depth=self.datalog_writer.__len__)
 	
 	@property
 	def status(self) -> 'Status':
@@ -151,6 +184,7 @@ class MoeNet:
 			self.log.info("Stopping cameras")
 			self.camera_workers.stop()
 			self.camera_workers = None
+			self.camera_merge.clear()
 	
 	def build_cameras(self):
 		if self.camera_workers is not None:
@@ -162,9 +196,12 @@ class MoeNet:
 				self.config,
 				config_path=self.config_path,
 				datalog=self.datalog,
-				vidq=self.web.vid_queue
+				vidq=self.web.vid_queue,
+				datalog_writer=self.datalog_writer,
 			)
 			self.camera_workers.start()
+			for worker in self.camera_workers:
+				self.camera_merge.add_source(worker.idx, worker.config.max_lateness)
 			self.status = Status.READY
 		except:
 			self.log.exception("Error starting cameras")
@@ -179,7 +216,31 @@ class MoeNet:
 		if flush_cameras:
 			self.build_cameras()
 	
+	def telemetry(self) -> list[MsgTelemetry]:
+		"Latest telemetry from every process"
+		samples = [self._telemetry]
+		if self.camera_workers is not None:
+			samples.extend(worker.telemetry for worker in self.camera_workers)
+		samples.append(self.web.telemetry)
+		return fresh_telemetry(samples)
+	
+	def _update_telemetry(self):
+		dropped = 0
+		if self.navx is not None:
+			dropped += self.navx.imu.dropped
+		if self.datalog_writer is not None:
+			dropped += self.datalog_writer.dropped
+		self.monitor.dropped = dropped
+		if (msg := self.monitor.poll()) is None:
+			return
+		self._telemetry = msg
+		if self.datalog is not None:
+			telemetry = self.telemetry()
+			self.logTelemetryNames.append([msg.process for msg in telemetry])
+			self.logTelemetry.append([ProcessTelemetry.from_msg(msg) for msg in telemetry])
+	
 	def poll(self):
+		self._update_telemetry()
 		self.nt.update()
 		for _msg in self.web.poll():
 			pass
@@ -194,23 +255,33 @@ class MoeNet:
 			if self.status in (Status.SLEEPING, Status.INITIALIZING, Status.NOT_READY):
 				self.status = Status.READY
 
-		# Process packets from cameras
+		# Collect packets from cameras
 		active = True
 		while active:
 			active = False
 			for worker in self.camera_workers:
 				for packet in worker.poll():
-					if isinstance(packet, wmsg.MsgPose):
-						self.estimator.observe_f2r(worker.robot_to_camera, packet)
-					elif isinstance(packet, wmsg.MsgDetections):
-						self.estimator.record_detections(worker.robot_to_camera, packet)
-					elif isinstance(packet, wmsg.MsgAprilTagPoses):
-						self.estimator.record_apriltag(worker.robot_to_camera, packet)
+					if (timestamp := getattr(packet, 'timestamp', None)) is not None:
+						self.camera_merge.push(worker.idx, Timestamp.from_nanos(timestamp, self.clock), (worker, packet))
+					else:
+						# Nothing to order by, so handle it now
+						self._handle_camera_packet(worker, packet)
 					active = True
 		
+		# Drain IMU samples (all of them since the last poll)
+		if self.navx is not None:
+			self.estimator.record_imu(self.navx.imu.drain(), self.navx.fit)
+		
+		# Process camera packets in timestamp order
+		for _, (worker, packet) in self.camera_merge.pop_ready():
+			self._handle_camera_packet(worker, packet)
+		
 		# Write transforms to NT
 		if f2r := self.estimator.field_to_robot(fresh=True):
 			self.log.debug("Update pose")
+			# UDP first, as it's the low-latency path
+			if self.pose_udp is not None:
+				self.tx_pose_udp(f2r, self.estimator.f2r_timestamp)
 			self.nt.tx_pose(f2r)
 		if o2r := self.estimator.odom_to_robot(fresh=True):
 			self.log.debug("Update correction")
@@ -218,7 +289,29 @@ class MoeNet:
 		
 		# Write detections to NT
 		if dets := self.estimator.get_detections(self.loc_to_net, fresh=True):
-			self.nt.tx_detections(dets)
+			self.nt.tx_detections(dets, self.estimator.detections.serialize())
+		
+		# Send everything published this iteration together
+		self.nt.flush()
+	
+	def _handle_camera_packet(self, worker: 'WorkerHandle', packet: wmsg.AnyMsg):
+		if isinstance(packet, wmsg.MsgPose):
+			self.estimator.observe_f2r(worker, packet)
+		elif isinstance(packet, wmsg.MsgOdom):
+			self.estimator.observe_odom(worker, packet)
+		elif isinstance(packet, wmsg.MsgDetections):
+			self.estimator.record_detections(worker.robot_to_camera, packet)
+		elif isinstance(packet, wmsg.MsgAprilTagPoses):
+			self.estimator.record_apriltag(worker.robot_to_camera, packet)
+		else:
+			self.log.debug("Unhandled packet from %s: %s", worker.name, type(packet).__name__)
+	
+	def tx_pose_udp(self, pose: 'Pose3d', timestamp: Timestamp):
+		"Send a pose over UDP (with Rio timestamps)"
+		timestamp_net = self.loc_to_net.a_to_b(timestamp)
+		now_net = self.loc_to_net.a_to_b(self.clock.now())
+		variance = self.estimator.field_to_robot_variance(timestamp)
+		self.pose_udp.send(pose, timestamp_net.as_wpi(), now_net.as_wpi(), variance)
 	
 	def run(self):
 		self.reset(True)
@@ -232,7 +325,10 @@ class MoeNet:
 		with InterruptHandler(handle_interrupt):
 			while not interrupt:
 				with Watchdog('main', min=1/100, max=1/10, log=self.log) as w: # Cap at 100Hz
-					if self.poll():
+					start = time.perf_counter_ns()
+					skip = self.poll()
+					self.monitor.record_loop(time.perf_counter_ns() - start)
+					if skip:
 						w.skip()
 						continue
 		self.log.info(f"Done running int={interrupt}")
@@ -247,7 +343,11 @@ class MoeNet:
 		else:
 			self.status = Status.NOT_READY
 		self.nt.close()
+		if self.pose_udp is not None:
+			self.pose_udp.close()
+		self.loc_to_net.clock_b.close()
 		self.log.info("done cleanup")
 		if self.datalog is not None:
+			self.datalog_writer.close()
 			self.datalog.flush()
 			self.datalog.stop()
\ No newline at end of file
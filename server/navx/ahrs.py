@@ -1,16 +1,16 @@
 from typing import Callable
 from enum import IntEnum
 from dataclasses import dataclass
-from trackers import OffsetTracker, InertialDataIntegrator, ContinuousAngleTracker
+from .trackers import OffsetTracker, InertialDataIntegrator, ContinuousAngleTracker
 import numpy as np
-from callbacks import IIOCompleteNotification, BoardState, IIOProvider
-from imu_protocol import YPRUpdate, GyroUpdate
-from imu_registers import (
+from .callbacks import IIOCompleteNotification, BoardState, IIOProvider
+from .imu_protocol import YPRUpdate, GyroUpdate
+from .imu_registers import (
 	NAVX_CAL_STATUS_IMU_CAL_STATE_MASK,
 	NAVX_CAL_STATUS_IMU_CAL_COMPLETE,
 )
-from ahrs_protocol import AHRSUpdate, AHRSPosUpdate, BoardID
-from serial_io import SerialIO
+from .ahrs_protocol import AHRSUpdate, AHRSPosUpdate, BoardID
+from .serial_io import SerialIO
 import time
 from threading import Thread
 
@@ -85,7 +85,7 @@ class AHRSInternal(IIOCompleteNotification):
 
 
 		# Status/Motion Detection
-		from imu_registers import (
+		from .imu_registers import (
 			NAVX_SENSOR_STATUS_MOVING,
 			NAVX_SENSOR_STATUS_YAW_STABLE,
 			NAVX_SENSOR_STATUS_ALTITUDE_VALID,
@@ -147,7 +147,7 @@ class AHRSInternal(IIOCompleteNotification):
 
 
 		# Status/Motion Detection
-		from imu_registers import (
+		from .imu_registers import (
 			NAVX_SENSOR_STATUS_MOVING,
 			NAVX_SENSOR_STATUS_YAW_STABLE,
 			NAVX_SENSOR_STATUS_ALTITUDE_VALID,
@@ -212,23 +212,24 @@ class AHRSInternal(IIOCompleteNotification):
 
 	# IBoardCapabilities Interface Implementation        */
 	def is_omnimount_supported(self) -> bool:
-		from imu_registers import NAVX_CAPABILITY_FLAG_OMNIMOUNT
+		from .imu_registers import NAVX_CAPABILITY_FLAG_OMNIMOUNT
 		return (self.ahrs._capability_flags & NAVX_CAPABILITY_FLAG_OMNIMOUNT) != 0
 	def is_board_yaw_reset_supported(self) -> bool:
-		from imu_registers import NAVX_CAPABILITY_FLAG_YAW_RESET
+		from .imu_registers import NAVX_CAPABILITY_FLAG_YAW_RESET
 		return (self.ahrs._capability_flags & NAVX_CAPABILITY_FLAG_YAW_RESET) != 0
 	def is_displacement_supported(self) -> bool:
-		from imu_registers import NAVX_CAPABILITY_FLAG_VEL_AND_DISP
+		from .imu_registers import NAVX_CAPABILITY_FLAG_VEL_AND_DISP
 		return (self.ahrs._capability_flags & NAVX_CAPABILITY_FLAG_VEL_AND_DISP) != 0
 	def is_AHRSPosTimestamp_supported(self) -> bool:
-		from imu_registers import NAVX_CAPABILITY_FLAG_AHRSPOS_TS
+		from .imu_registers import NAVX_CAPABILITY_FLAG_AHRSPOS_TS
 		return (self.ahrs._capability_flags & NAVX_CAPABILITY_FLAG_AHRSPOS_TS) != 0
 
 YAW_HISTORY_LENGTH = 10
 DEFAULT_ACCEL_FSR_G = 2
 DEFAULT_GYRO_FSR_DPS = 2000
 
-NavXCallback = Callable[[AHRSUpdate, int, int], None]
+NavXCallback = Callable[[int, int, AHRSUpdate], None]
+"Callback(system_timestamp_ms, sensor_timestamp_ms, update)"
 
 def _thread_func(io: IIOProvider):
 	io.run()
@@ -303,7 +304,7 @@ class AHRS:
 		self._cal_mag_z = 0.0
 
 		# Configuration/Status
-		update_rate_hz = 0
+		self._update_rate_hz = 0
 		self._accel_fsr_g = DEFAULT_ACCEL_FSR_G
 		self._gyro_fsr_dps = DEFAULT_GYRO_FSR_DPS
 		self._capability_flags = 0
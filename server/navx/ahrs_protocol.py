@@ -13,15 +13,15 @@
 from typing import Optional
 from enum import IntEnum
 from dataclasses import dataclass
-from imu_protocol import (
+import struct
+from .imu_protocol import (
     PACKET_START_CHAR,
     verifyChecksum, verifyPrefix,
     decodeProtocolFloat,
-    decodeProtocolInt32,
     encodeTermination,
 )
 import numpy as np
-import imu_registers as IMURegisters
+from . import imu_registers as IMURegisters
 
 BINARY_PACKET_INDICATOR_CHAR = '#'
 
@@ -235,273 +235,267 @@ BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH =          26
 
 AHRS_PROTOCOL_MAX_MESSAGE_LENGTH = AHRS_UPDATE_MESSAGE_LENGTH
 
-def pfxBin(len: int, msgid: int):
-    return [
-        PACKET_START_CHAR,
-        BINARY_PACKET_INDICATOR_CHAR,
+def pfxBin(len: int, msgid: str) -> bytes:
+    "Prefix of a binary packet"
+    return bytes([
+        ord(PACKET_START_CHAR),
+        ord(BINARY_PACKET_INDICATOR_CHAR),
         len - 2,
-        msgid,
-    ]
-
-def verifyPrefixBin(buffer: bytes, len: int, msgid: int) -> bool:
-    return verifyPrefix(buffer, len, pfxBin(len, msgid), len - 4)
-
-@dataclass
+        ord(msgid),
+    ])
+
+def verifyPrefixBin(buffer: bytes, len: int, msgid: str, checksum: bool = True) -> bool:
+    return verifyPrefix(buffer, len, pfxBin(len, msgid), (len - 4) if checksum else None)
+
+# Scale factors for fixed-point fields
+_HUNDREDTHS = 1.0 / 100.0
+_THOUSANDTHS = 1.0 / 1000.0
+_Q16 = 1.0 / 65536.0
+_QUAT16 = 1.0 / 16384.0
+"AHRS(Pos)Update: Quaternions are signed int (16-bit resolution); divide by 16384 to yield +/- 2 radians"
+_QUAT1616 = _Q16 / 16384.0
+
+# Layouts of the data in each binary packet (from offset 4, up to the checksum)
+_AHRS_UPDATE_STRUCT = struct.Struct('<3hHiH3h3hHih3h4hih4B')
+_AHRSPOS_UPDATE_STRUCT = struct.Struct('<3hHiH3h6i4hh4B')
+_AHRSPOS_TS_UPDATE_STRUCT = struct.Struct('<19ih4BI')
+
+@dataclass(slots=True)
 class AHRSUpdateBase:
-    yaw: float
-    pitch: float
-    roll: float
-    compass_heading: float
-    altitude: float
-    fused_heading: float
-    linear_accel_x: float
-    linear_accel_y: float
-    linear_accel_z: float
-    mpu_temp: float
-    quat_w: float
-    quat_x: float
-    quat_y: float
-    quat_z: float
-    barometric_pressure: float
-    baro_temp: float
-    op_status: int
-    sensor_status: int
-    cal_status: int
-    selftest_status: int
-
+    yaw: float = 0.0
+    pitch: float = 0.0
+    roll: float = 0.0
+    compass_heading: float = 0.0
+    altitude: float = 0.0
+    fused_heading: float = 0.0
+    linear_accel_x: float = 0.0
+    linear_accel_y: float = 0.0
+    linear_accel_z: float = 0.0
+    mpu_temp: float = 0.0
+    quat_w: float = 0.0
+    quat_x: float = 0.0
+    quat_y: float = 0.0
+    quat_z: float = 0.0
+    barometric_pressure: float = 0.0
+    baro_temp: float = 0.0
+    op_status: int = 0
+    sensor_status: int = 0
+    cal_status: int = 0
+    selftest_status: int = 0
+
+@dataclass(slots=True)
 class AHRSUpdate(AHRSUpdateBase):
-    cal_mag_x: int
-    cal_mag_y: int
-    cal_mag_z: int
-    mag_field_norm_ratio: float
-    mag_field_norm_scalar: float
-    raw_mag_x: int
-    raw_mag_y: int
-    raw_mag_z: int
+    cal_mag_x: int = 0
+    cal_mag_y: int = 0
+    cal_mag_z: int = 0
+    mag_field_norm_ratio: float = 0.0
+    mag_field_norm_scalar: float = 0.0
+    raw_mag_x: int = 0
+    raw_mag_y: int = 0
+    raw_mag_z: int = 0
 
     def encode(self, protocol_buffer: bytearray) -> int:
         # Header
-        protocol_buffer[0] = PACKET_START_CHAR
-        protocol_buffer[1] = BINARY_PACKET_INDICATOR_CHAR
-        protocol_buffer[2] = AHRS_UPDATE_MESSAGE_LENGTH - 2
-        protocol_buffer[3] = MSGID_AHRS_UPDATE
-        # data
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.yaw, protocol_buffer, AHRS_UPDATE_YAW_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.pitch, protocol_buffer, AHRS_UPDATE_PITCH_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.roll, protocol_buffer, AHRS_UPDATE_ROLL_VALUE_INDEX)
-        IMURegisters.encodeProtocolUnsignedHundredthsFloat(self.compass_heading, protocol_buffer, AHRS_UPDATE_HEADING_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.altitude,protocol_buffer, AHRS_UPDATE_ALTITUDE_VALUE_INDEX)
-        IMURegisters.encodeProtocolUnsignedHundredthsFloat(self.fused_heading, protocol_buffer, AHRS_UPDATE_FUSED_HEADING_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedThousandthsFloat(self.linear_accel_x,protocol_buffer, AHRS_UPDATE_LINEAR_ACCEL_X_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedThousandthsFloat(self.linear_accel_y,protocol_buffer, AHRS_UPDATE_LINEAR_ACCEL_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedThousandthsFloat(self.linear_accel_z,protocol_buffer, AHRS_UPDATE_LINEAR_ACCEL_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.cal_mag_x, protocol_buffer, AHRS_UPDATE_CAL_MAG_X_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.cal_mag_y, protocol_buffer, AHRS_UPDATE_CAL_MAG_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.cal_mag_z, protocol_buffer, AHRS_UPDATE_CAL_MAG_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocolUnsignedHundredthsFloat(self.mag_norm_ratio, protocol_buffer, AHRS_UPDATE_CAL_MAG_NORM_RATIO_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.mag_norm_scalar, protocol_buffer, AHRS_UPDATE_CAL_MAG_SCALAR_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.mpu_temp_c, protocol_buffer, AHRS_UPDATE_MPU_TEMP_VAUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.raw_mag_x, protocol_buffer, AHRS_UPDATE_RAW_MAG_X_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.raw_mag_y, protocol_buffer, AHRS_UPDATE_RAW_MAG_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.raw_mag_z, protocol_buffer, AHRS_UPDATE_RAW_MAG_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.quat_w, protocol_buffer, AHRS_UPDATE_QUAT_W_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.quat_x, protocol_buffer, AHRS_UPDATE_QUAT_X_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.quat_y, protocol_buffer, AHRS_UPDATE_QUAT_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.quat_z, protocol_buffer, AHRS_UPDATE_QUAT_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.baro_pressure, protocol_buffer, AHRS_UPDATE_BARO_PRESSURE_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.baro_temp_c, protocol_buffer, AHRS_UPDATE_BARO_TEMP_VAUE_INDEX)
-
-        protocol_buffer[AHRS_UPDATE_OPSTATUS_VALUE_INDEX] = self.op_status
-        protocol_buffer[AHRS_UPDATE_SENSOR_STATUS_VALUE_INDEX] = self.sensor_status
-        protocol_buffer[AHRS_UPDATE_CAL_STATUS_VALUE_INDEX] = self.cal_status
-        protocol_buffer[AHRS_UPDATE_SELFTEST_STATUS_VALUE_INDEX] = self.selftest_status
+        protocol_buffer[0:4] = _AHRS_UPDATE_PREFIX
+        # Data
+        _AHRS_UPDATE_STRUCT.pack_into(protocol_buffer, AHRS_UPDATE_YAW_VALUE_INDEX,
+            round(self.yaw * 100), round(self.roll * 100), round(self.pitch * 100),
+            round(self.compass_heading * 100),
+            round(self.altitude * 65536),
+            round(self.fused_heading * 100),
+            round(self.linear_accel_x * 1000), round(self.linear_accel_y * 1000), round(self.linear_accel_z * 1000),
+            self.cal_mag_x, self.cal_mag_y, self.cal_mag_z,
+            round(self.mag_field_norm_ratio * 100),
+            round(self.mag_field_norm_scalar * 65536),
+            round(self.mpu_temp * 100),
+            self.raw_mag_x, self.raw_mag_y, self.raw_mag_z,
+            round(self.quat_w * 16384), round(self.quat_x * 16384), round(self.quat_y * 16384), round(self.quat_z * 16384),
+            round(self.barometric_pressure * 65536),
+            round(self.baro_temp * 100),
+            self.op_status, self.sensor_status, self.cal_status, self.selftest_status,
+        )
         # Footer
         encodeTermination( protocol_buffer, AHRS_UPDATE_MESSAGE_LENGTH, AHRS_UPDATE_MESSAGE_LENGTH - 4 )
         return AHRS_UPDATE_MESSAGE_LENGTH
-    def decode(self, buffer: bytes) -> Optional[int]:
-        if not verifyPrefixBin(buffer, AHRS_UPDATE_MESSAGE_LENGTH, MSGID_AHRS_UPDATE, AHRS_UPDATE_MESSAGE_CHECKSUM_INDEX):
+
+    def decode(self, buffer: bytes, checksum: bool = True) -> Optional[int]:
+        "Decode a packet (set `checksum=False` if it was already verified)"
+        if len(buffer) < AHRS_UPDATE_MESSAGE_LENGTH or buffer[:4] != _AHRS_UPDATE_PREFIX:
+            return None
+        if checksum and not verifyChecksum(buffer, AHRS_UPDATE_MESSAGE_CHECKSUM_INDEX):
             return None
 
-        self.yaw = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRS_UPDATE_YAW_VALUE_INDEX)
-        self.pitch = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRS_UPDATE_PITCH_VALUE_INDEX)
-        self.roll = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRS_UPDATE_ROLL_VALUE_INDEX)
-        self.compass_heading = IMURegisters.decodeProtocolUnsignedHundredthsFloat(buffer, AHRS_UPDATE_HEADING_VALUE_INDEX)
-        self.altitude = IMURegisters.decodeProtocol1616Float(buffer, AHRS_UPDATE_ALTITUDE_VALUE_INDEX)
-        self.fused_heading = IMURegisters.decodeProtocolUnsignedHundredthsFloat(buffer, AHRS_UPDATE_FUSED_HEADING_VALUE_INDEX)
-        self.linear_accel_x = IMURegisters.decodeProtocolSignedThousandthsFloat(buffer, AHRS_UPDATE_LINEAR_ACCEL_X_VALUE_INDEX)
-        self.linear_accel_y = IMURegisters.decodeProtocolSignedThousandthsFloat(buffer, AHRS_UPDATE_LINEAR_ACCEL_Y_VALUE_INDEX)
-        self.linear_accel_z = IMURegisters.decodeProtocolSignedThousandthsFloat(buffer, AHRS_UPDATE_LINEAR_ACCEL_Z_VALUE_INDEX)
-        self.cal_mag_x = IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_CAL_MAG_X_VALUE_INDEX)
-        self.cal_mag_y = IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_CAL_MAG_Y_VALUE_INDEX)
-        self.cal_mag_z = IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_CAL_MAG_Z_VALUE_INDEX)
-        self.mag_field_norm_ratio = IMURegisters.decodeProtocolUnsignedHundredthsFloat(buffer, AHRS_UPDATE_CAL_MAG_NORM_RATIO_VALUE_INDEX)
-        self.mag_field_norm_scalar = IMURegisters.decodeProtocol1616Float(buffer, AHRS_UPDATE_CAL_MAG_SCALAR_VALUE_INDEX)
-        self.mpu_temp = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRS_UPDATE_MPU_TEMP_VAUE_INDEX)
-        self.raw_mag_x = IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_RAW_MAG_X_VALUE_INDEX)
-        self.raw_mag_y = IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_RAW_MAG_Y_VALUE_INDEX)
-        self.raw_mag_z = IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_RAW_MAG_Z_VALUE_INDEX)
-        # AHRSPosUpdate:  Quaternions are signed int (16-bit resolution); divide by 16384 to yield +/- 2 radians
-        self.quat_w = float(IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_QUAT_W_VALUE_INDEX)) / 16384.0
-        self.quat_x = float(IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_QUAT_X_VALUE_INDEX)) / 16384.0
-        self.quat_y = float(IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_QUAT_Y_VALUE_INDEX)) / 16384.0
-        self.quat_z = float(IMURegisters.decodeProtocolInt16(buffer, AHRS_UPDATE_QUAT_Z_VALUE_INDEX)) / 16384.0
-        self.barometric_pressure = IMURegisters.decodeProtocol1616Float(buffer, AHRS_UPDATE_BARO_PRESSURE_VALUE_INDEX)
-        self.baro_temp = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRS_UPDATE_BARO_TEMP_VAUE_INDEX)
-        self.op_status = buffer[AHRS_UPDATE_OPSTATUS_VALUE_INDEX]
-        self.sensor_status = buffer[AHRS_UPDATE_SENSOR_STATUS_VALUE_INDEX]
-        self.cal_status = buffer[AHRS_UPDATE_CAL_STATUS_VALUE_INDEX]
-        self.selftest_status = buffer[AHRS_UPDATE_SELFTEST_STATUS_VALUE_INDEX]
+        (
+            yaw, roll, pitch, compass_heading,
+            altitude, fused_heading,
+            accel_x, accel_y, accel_z,
+            self.cal_mag_x, self.cal_mag_y, self.cal_mag_z,
+            norm_ratio, norm_scalar, mpu_temp,
+            self.raw_mag_x, self.raw_mag_y, self.raw_mag_z,
+            quat_w, quat_x, quat_y, quat_z,
+            baro_pressure, baro_temp,
+            self.op_status, self.sensor_status, self.cal_status, self.selftest_status,
+        ) = _AHRS_UPDATE_STRUCT.unpack_from(buffer, AHRS_UPDATE_YAW_VALUE_INDEX)
+        self.yaw = yaw * _HUNDREDTHS
+        self.pitch = pitch * _HUNDREDTHS
+        self.roll = roll * _HUNDREDTHS
+        self.compass_heading = compass_heading * _HUNDREDTHS
+        self.altitude = altitude * _Q16
+        self.fused_heading = fused_heading * _HUNDREDTHS
+        self.linear_accel_x = accel_x * _THOUSANDTHS
+        self.linear_accel_y = accel_y * _THOUSANDTHS
+        self.linear_accel_z = accel_z * _THOUSANDTHS
+        self.mag_field_norm_ratio = norm_ratio * _HUNDREDTHS
+        self.mag_field_norm_scalar = norm_scalar * _Q16
+        self.mpu_temp = mpu_temp * _HUNDREDTHS
+        self.quat_w = quat_w * _QUAT16
+        self.quat_x = quat_x * _QUAT16
+        self.quat_y = quat_y * _QUAT16
+        self.quat_z = quat_z * _QUAT16
+        self.barometric_pressure = baro_pressure * _Q16
+        self.baro_temp = baro_temp * _HUNDREDTHS
 
         return AHRS_UPDATE_MESSAGE_LENGTH
 
+@dataclass(slots=True)
 class AHRSPosUpdate(AHRSUpdateBase):
-    vel_x: float
-    vel_y: float
-    vel_z: float
-    disp_x: float
-    disp_y: float
-    disp_z: float
-
-    def encode(self, protocol_buffer: bytearray):
+    vel_x: float = 0.0
+    vel_y: float = 0.0
+    vel_z: float = 0.0
+    disp_x: float = 0.0
+    disp_y: float = 0.0
+    disp_z: float = 0.0
+
+    def encode(self, protocol_buffer: bytearray) -> int:
         # Header
-        protocol_buffer[0] = PACKET_START_CHAR
-        protocol_buffer[1] = BINARY_PACKET_INDICATOR_CHAR
-        protocol_buffer[2] = AHRSPOS_UPDATE_MESSAGE_LENGTH - 2
-        protocol_buffer[3] = MSGID_AHRSPOS_UPDATE
-        # data
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.yaw, protocol_buffer, AHRSPOS_UPDATE_YAW_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.pitch, protocol_buffer, AHRSPOS_UPDATE_PITCH_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.roll, protocol_buffer, AHRSPOS_UPDATE_ROLL_VALUE_INDEX)
-        IMURegisters.encodeProtocolUnsignedHundredthsFloat(self.compass_heading, protocol_buffer, AHRSPOS_UPDATE_HEADING_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.altitude,protocol_buffer, AHRSPOS_UPDATE_ALTITUDE_VALUE_INDEX)
-        IMURegisters.encodeProtocolUnsignedHundredthsFloat(self.fused_heading, protocol_buffer, AHRSPOS_UPDATE_FUSED_HEADING_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedThousandthsFloat(self.linear_accel_x,protocol_buffer, AHRSPOS_UPDATE_LINEAR_ACCEL_X_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedThousandthsFloat(self.linear_accel_y,protocol_buffer, AHRSPOS_UPDATE_LINEAR_ACCEL_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedThousandthsFloat(self.linear_accel_z,protocol_buffer, AHRSPOS_UPDATE_LINEAR_ACCEL_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.vel_x,protocol_buffer, AHRSPOS_UPDATE_VEL_X_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.vel_y,protocol_buffer, AHRSPOS_UPDATE_VEL_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.vel_z,protocol_buffer, AHRSPOS_UPDATE_VEL_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.disp_x,protocol_buffer, AHRSPOS_UPDATE_DISP_X_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.disp_y,protocol_buffer, AHRSPOS_UPDATE_DISP_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.disp_z,protocol_buffer, AHRSPOS_UPDATE_DISP_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.mpu_temp_c, protocol_buffer, AHRSPOS_UPDATE_MPU_TEMP_VAUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.quat_w, protocol_buffer, AHRSPOS_UPDATE_QUAT_W_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.quat_x, protocol_buffer, AHRSPOS_UPDATE_QUAT_X_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.quat_y, protocol_buffer, AHRSPOS_UPDATE_QUAT_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocolInt16(self.quat_z, protocol_buffer, AHRSPOS_UPDATE_QUAT_Z_VALUE_INDEX)
-
-        protocol_buffer[AHRSPOS_UPDATE_OPSTATUS_VALUE_INDEX] = self.op_status
-        protocol_buffer[AHRSPOS_UPDATE_SENSOR_STATUS_VALUE_INDEX] = self.sensor_status
-        protocol_buffer[AHRSPOS_UPDATE_CAL_STATUS_VALUE_INDEX] = self.cal_status
-        protocol_buffer[AHRSPOS_UPDATE_SELFTEST_STATUS_VALUE_INDEX] = self.selftest_status
+        protocol_buffer[0:4] = _AHRSPOS_UPDATE_PREFIX
+        # Data
+        _AHRSPOS_UPDATE_STRUCT.pack_into(protocol_buffer, AHRSPOS_UPDATE_YAW_VALUE_INDEX,
+            round(self.yaw * 100), round(self.roll * 100), round(self.pitch * 100),
+            round(self.compass_heading * 100),
+            round(self.altitude * 65536),
+            round(self.fused_heading * 100),
+            round(self.linear_accel_x * 1000), round(self.linear_accel_y * 1000), round(self.linear_accel_z * 1000),
+            round(self.vel_x * 65536), round(self.vel_y * 65536), round(self.vel_z * 65536),
+            round(self.disp_x * 65536), round(self.disp_y * 65536), round(self.disp_z * 65536),
+            round(self.quat_w * 16384), round(self.quat_x * 16384), round(self.quat_y * 16384), round(self.quat_z * 16384),
+            round(self.mpu_temp * 100),
+            self.op_status, self.sensor_status, self.cal_status, self.selftest_status,
+        )
         # Footer
         encodeTermination( protocol_buffer, AHRSPOS_UPDATE_MESSAGE_LENGTH, AHRSPOS_UPDATE_MESSAGE_LENGTH - 4 )
         return AHRSPOS_UPDATE_MESSAGE_LENGTH
 
-    def decode(self, buffer: bytes) -> Optional[int]:
-        if not verifyPrefixBin(buffer, AHRSPOS_UPDATE_MESSAGE_LENGTH, MSGID_AHRS_UPDATE, AHRSPOS_UPDATE_MESSAGE_CHECKSUM_INDEX):
+    def decode(self, buffer: bytes, checksum: bool = True) -> Optional[int]:
+        "Decode a packet (set `checksum=False` if it was already verified)"
+        if len(buffer) < AHRSPOS_UPDATE_MESSAGE_LENGTH or buffer[:4] != _AHRSPOS_UPDATE_PREFIX:
             return None
-        self.yaw = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRSPOS_UPDATE_YAW_VALUE_INDEX)
-        self.pitch = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRSPOS_UPDATE_PITCH_VALUE_INDEX)
-        self.roll = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRSPOS_UPDATE_ROLL_VALUE_INDEX)
-        self.compass_heading = IMURegisters.decodeProtocolUnsignedHundredthsFloat(buffer, AHRSPOS_UPDATE_HEADING_VALUE_INDEX)
-        self.altitude = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_UPDATE_ALTITUDE_VALUE_INDEX)
-        self.fused_heading = IMURegisters.decodeProtocolUnsignedHundredthsFloat(buffer, AHRSPOS_UPDATE_FUSED_HEADING_VALUE_INDEX)
-        self.linear_accel_x = IMURegisters.decodeProtocolSignedThousandthsFloat(buffer, AHRSPOS_UPDATE_LINEAR_ACCEL_X_VALUE_INDEX)
-        self.linear_accel_y = IMURegisters.decodeProtocolSignedThousandthsFloat(buffer, AHRSPOS_UPDATE_LINEAR_ACCEL_Y_VALUE_INDEX)
-        self.linear_accel_z = IMURegisters.decodeProtocolSignedThousandthsFloat(buffer, AHRSPOS_UPDATE_LINEAR_ACCEL_Z_VALUE_INDEX)
-        self.vel_x = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_UPDATE_VEL_X_VALUE_INDEX)
-        self.vel_y = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_UPDATE_VEL_Y_VALUE_INDEX)
-        self.vel_z = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_UPDATE_VEL_Z_VALUE_INDEX)
-        self.disp_x = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_UPDATE_DISP_X_VALUE_INDEX)
-        self.disp_y = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_UPDATE_DISP_Y_VALUE_INDEX)
-        self.disp_z = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_UPDATE_DISP_Z_VALUE_INDEX)
-        self.mpu_temp = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRSPOS_UPDATE_MPU_TEMP_VAUE_INDEX)
-        # AHRSPosUpdate:  Quaternions are signed int (16-bit resolution); divide by 16384 to yield +/- 2 radians
-        self.quat_w = float(IMURegisters.decodeProtocolInt16(buffer, AHRSPOS_UPDATE_QUAT_W_VALUE_INDEX)) / 16384.0
-        self.quat_x = float(IMURegisters.decodeProtocolInt16(buffer, AHRSPOS_UPDATE_QUAT_X_VALUE_INDEX)) / 16384.0
-        self.quat_y = float(IMURegisters.decodeProtocolInt16(buffer, AHRSPOS_UPDATE_QUAT_Y_VALUE_INDEX)) / 16384.0
-        self.quat_z = float(IMURegisters.decodeProtocolInt16(buffer, AHRSPOS_UPDATE_QUAT_Z_VALUE_INDEX)) / 16384.0
-        self.op_status = buffer[AHRSPOS_UPDATE_OPSTATUS_VALUE_INDEX]
-        self.sensor_status = buffer[AHRSPOS_UPDATE_SENSOR_STATUS_VALUE_INDEX]
-        self.cal_status = buffer[AHRSPOS_UPDATE_CAL_STATUS_VALUE_INDEX]
-        self.selftest_status = buffer[AHRSPOS_UPDATE_SELFTEST_STATUS_VALUE_INDEX]
+        if checksum and not verifyChecksum(buffer, AHRSPOS_UPDATE_MESSAGE_CHECKSUM_INDEX):
+            return None
+
+        (
+            yaw, roll, pitch, compass_heading,
+            altitude, fused_heading,
+            accel_x, accel_y, accel_z,
+            vel_x, vel_y, vel_z,
+            disp_x, disp_y, disp_z,
+            quat_w, quat_x, quat_y, quat_z,
+            mpu_temp,
+            self.op_status, self.sensor_status, self.cal_status, self.selftest_status,
+        ) = _AHRSPOS_UPDATE_STRUCT.unpack_from(buffer, AHRSPOS_UPDATE_YAW_VALUE_INDEX)
+        self.yaw = yaw * _HUNDREDTHS
+        self.pitch = pitch * _HUNDREDTHS
+        self.roll = roll * _HUNDREDTHS
+        self.compass_heading = compass_heading * _HUNDREDTHS
+        self.altitude = altitude * _Q16
+        self.fused_heading = fused_heading * _HUNDREDTHS
+        self.linear_accel_x = accel_x * _THOUSANDTHS
+        self.linear_accel_y = accel_y * _THOUSANDTHS
+        self.linear_accel_z = accel_z * _THOUSANDTHS
+        self.vel_x = vel_x * _Q16
+        self.vel_y = vel_y * _Q16
+        self.vel_z = vel_z * _Q16
+        self.disp_x = disp_x * _Q16
+        self.disp_y = disp_y * _Q16
+        self.disp_z = disp_z * _Q16
+        self.mpu_temp = mpu_temp * _HUNDREDTHS
+        self.quat_w = quat_w * _QUAT16
+        self.quat_x = quat_x * _QUAT16
+        self.quat_y = quat_y * _QUAT16
+        self.quat_z = quat_z * _QUAT16
 
         return AHRSPOS_UPDATE_MESSAGE_LENGTH
 
+@dataclass(slots=True)
 class AHRSPosTSUpdate(AHRSPosUpdate):
-    timestamp: int
+    timestamp: int = 0
+    "Sensor timestamp (ms)"
 
     def encode(self, protocol_buffer: bytearray) -> int:
         # Header
-        protocol_buffer[0] = PACKET_START_CHAR
-        protocol_buffer[1] = BINARY_PACKET_INDICATOR_CHAR
-        protocol_buffer[2] = AHRSPOS_TS_UPDATE_MESSAGE_LENGTH - 2
-        protocol_buffer[3] = MSGID_AHRSPOS_TS_UPDATE
-
-        # data
-        IMURegisters.encodeProtocol1616Float(self.yaw, protocol_buffer, AHRSPOS_TS_UPDATE_YAW_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.pitch, protocol_buffer, AHRSPOS_TS_UPDATE_PITCH_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.roll, protocol_buffer, AHRSPOS_TS_UPDATE_ROLL_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.compass_heading, protocol_buffer, AHRSPOS_TS_UPDATE_HEADING_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.altitude,protocol_buffer, AHRSPOS_TS_UPDATE_ALTITUDE_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.fused_heading, protocol_buffer, AHRSPOS_TS_UPDATE_FUSED_HEADING_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.linear_accel_x,protocol_buffer, AHRSPOS_TS_UPDATE_LINEAR_ACCEL_X_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.linear_accel_y,protocol_buffer, AHRSPOS_TS_UPDATE_LINEAR_ACCEL_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.linear_accel_z,protocol_buffer, AHRSPOS_TS_UPDATE_LINEAR_ACCEL_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.vel_x,protocol_buffer, AHRSPOS_TS_UPDATE_VEL_X_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.vel_y,protocol_buffer, AHRSPOS_TS_UPDATE_VEL_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.vel_z,protocol_buffer, AHRSPOS_TS_UPDATE_VEL_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.disp_x,protocol_buffer, AHRSPOS_TS_UPDATE_DISP_X_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.disp_y,protocol_buffer, AHRSPOS_TS_UPDATE_DISP_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.disp_z,protocol_buffer, AHRSPOS_TS_UPDATE_DISP_Z_VALUE_INDEX)
-        IMURegisters.encodeProtocolSignedHundredthsFloat(self.mpu_temp_c, protocol_buffer, AHRSPOS_TS_UPDATE_MPU_TEMP_VAUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.quat_w, protocol_buffer, AHRSPOS_TS_UPDATE_QUAT_W_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.quat_x, protocol_buffer, AHRSPOS_TS_UPDATE_QUAT_X_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.quat_y, protocol_buffer, AHRSPOS_TS_UPDATE_QUAT_Y_VALUE_INDEX)
-        IMURegisters.encodeProtocol1616Float(self.quat_z, protocol_buffer, AHRSPOS_TS_UPDATE_QUAT_Z_VALUE_INDEX)
-
-        protocol_buffer[AHRSPOS_TS_UPDATE_OPSTATUS_VALUE_INDEX] = self.op_status
-        protocol_buffer[AHRSPOS_TS_UPDATE_SENSOR_STATUS_VALUE_INDEX] = self.sensor_status
-        protocol_buffer[AHRSPOS_TS_UPDATE_CAL_STATUS_VALUE_INDEX] = self.cal_status
-        protocol_buffer[AHRSPOS_TS_UPDATE_SELFTEST_STATUS_VALUE_INDEX] = self.selftest_status
-        IMURegisters.encodeProtocolInt32(self.timestamp, protocol_buffer, AHRSPOS_TS_UPDATE_TIMESTAMP_INDEX)
-
+        protocol_buffer[0:4] = _AHRSPOS_TS_UPDATE_PREFIX
+        # Data
+        _AHRSPOS_TS_UPDATE_STRUCT.pack_into(protocol_buffer, AHRSPOS_TS_UPDATE_YAW_VALUE_INDEX,
+            round(self.yaw * 65536), round(self.roll * 65536), round(self.pitch * 65536),
+            round(self.compass_heading * 65536),
+            round(self.altitude * 65536),
+            round(self.fused_heading * 65536),
+            round(self.linear_accel_x * 65536), round(self.linear_accel_y * 65536), round(self.linear_accel_z * 65536),
+            round(self.vel_x * 65536), round(self.vel_y * 65536), round(self.vel_z * 65536),
+            round(self.disp_x * 65536), round(self.disp_y * 65536), round(self.disp_z * 65536),
+            round(self.quat_w / _QUAT1616), round(self.quat_x / _QUAT1616), round(self.quat_y / _QUAT1616), round(self.quat_z / _QUAT1616),
+            round(self.mpu_temp * 100),
+            self.op_status, self.sensor_status, self.cal_status, self.selftest_status,
+            self.timestamp & 0xFFFFFFFF,
+        )
         # Footer
         encodeTermination( protocol_buffer, AHRSPOS_TS_UPDATE_MESSAGE_LENGTH, AHRSPOS_TS_UPDATE_MESSAGE_LENGTH - 4 )
         return AHRSPOS_TS_UPDATE_MESSAGE_LENGTH
 
-    def decode(self, buffer: bytes) -> Optional[int]:
-        if not verifyPrefix(buffer, AHRSPOS_TS_UPDATE_MESSAGE_LENGTH, [PACKET_START_CHAR, BINARY_PACKET_INDICATOR_CHAR, AHRSPOS_TS_UPDATE_MESSAGE_LENGTH - 2, MSGID_AHRSPOS_TS_UPDATE], AHRSPOS_TS_UPDATE_MESSAGE_CHECKSUM_INDEX):
+    def decode(self, buffer: bytes, checksum: bool = True) -> Optional[int]:
+        "Decode a packet (set `checksum=False` if it was already verified)"
+        if len(buffer) < AHRSPOS_TS_UPDATE_MESSAGE_LENGTH or buffer[:4] != _AHRSPOS_TS_UPDATE_PREFIX:
+            return None
+        if checksum and not verifyChecksum(buffer, AHRSPOS_TS_UPDATE_MESSAGE_CHECKSUM_INDEX):
             return None
 
-        self.yaw = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_YAW_VALUE_INDEX)
-        self.pitch = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_PITCH_VALUE_INDEX)
-        self.roll = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_ROLL_VALUE_INDEX)
-        self.compass_heading = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_HEADING_VALUE_INDEX)
-        self.altitude = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_ALTITUDE_VALUE_INDEX)
-        self.fused_heading = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_FUSED_HEADING_VALUE_INDEX)
-        self.linear_accel_x = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_LINEAR_ACCEL_X_VALUE_INDEX)
-        self.linear_accel_y = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_LINEAR_ACCEL_Y_VALUE_INDEX)
-        self.linear_accel_z = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_LINEAR_ACCEL_Z_VALUE_INDEX)
-        self.vel_x = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_VEL_X_VALUE_INDEX)
-        self.vel_y = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_VEL_Y_VALUE_INDEX)
-        self.vel_z = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_VEL_Z_VALUE_INDEX)
-        self.disp_x = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_DISP_X_VALUE_INDEX)
-        self.disp_y = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_DISP_Y_VALUE_INDEX)
-        self.disp_z = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_DISP_Z_VALUE_INDEX)
-        self.mpu_temp = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, AHRSPOS_TS_UPDATE_MPU_TEMP_VAUE_INDEX)
-        self.quat_w = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_QUAT_W_VALUE_INDEX) / 16384.0
-        self.quat_x = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_QUAT_X_VALUE_INDEX) / 16384.0
-        self.quat_y = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_QUAT_Y_VALUE_INDEX) / 16384.0
-        self.quat_z = IMURegisters.decodeProtocol1616Float(buffer, AHRSPOS_TS_UPDATE_QUAT_Z_VALUE_INDEX) / 16384.0
-        self.op_status = buffer[AHRSPOS_TS_UPDATE_OPSTATUS_VALUE_INDEX]
-        self.sensor_status = buffer[AHRSPOS_TS_UPDATE_SENSOR_STATUS_VALUE_INDEX]
-        self.cal_status = buffer[AHRSPOS_TS_UPDATE_CAL_STATUS_VALUE_INDEX]
-        self.selftest_status = buffer[AHRSPOS_TS_UPDATE_SELFTEST_STATUS_VALUE_INDEX]
-        self.timestamp = np.uint32(IMURegisters.decodeProtocolInt32(buffer, AHRSPOS_TS_UPDATE_TIMESTAMP_INDEX))
+        (
+            yaw, roll, pitch, compass_heading,
+            altitude, fused_heading,
+            accel_x, accel_y, accel_z,
+            vel_x, vel_y, vel_z,
+            disp_x, disp_y, disp_z,
+            quat_w, quat_x, quat_y, quat_z,
+            mpu_temp,
+            self.op_status, self.sensor_status, self.cal_status, self.selftest_status,
+            self.timestamp,
+        ) = _AHRSPOS_TS_UPDATE_STRUCT.unpack_from(buffer, AHRSPOS_TS_UPDATE_YAW_VALUE_INDEX)
+        self.yaw = yaw * _Q16
+        self.pitch = pitch * _Q16
+        self.roll = roll * _Q16
+        self.compass_heading = compass_heading * _Q16
+        self.altitude = altitude * _Q16
+        self.fused_heading = fused_heading * _Q16
+        self.linear_accel_x = accel_x * _Q16
+        self.linear_accel_y = accel_y * _Q16
+        self.linear_accel_z = accel_z * _Q16
+        self.vel_x = vel_x * _Q16
+        self.vel_y = vel_y * _Q16
+        self.vel_z = vel_z * _Q16
+        self.disp_x = disp_x * _Q16
+        self.disp_y = disp_y * _Q16
+        self.disp_z = disp_z * _Q16
+        self.mpu_temp = mpu_temp * _HUNDREDTHS
+        self.quat_w = quat_w * _QUAT1616
+        self.quat_x = quat_x * _QUAT1616
+        self.quat_y = quat_y * _QUAT1616
+        self.quat_z = quat_z * _QUAT1616
 
-        return AHRSPOS_UPDATE_MESSAGE_LENGTH
+        return AHRSPOS_TS_UPDATE_MESSAGE_LENGTH
+
+_AHRS_UPDATE_PREFIX = pfxBin(AHRS_UPDATE_MESSAGE_LENGTH, MSGID_AHRS_UPDATE)
+_AHRSPOS_UPDATE_PREFIX = pfxBin(AHRSPOS_UPDATE_MESSAGE_LENGTH, MSGID_AHRSPOS_UPDATE)
+_AHRSPOS_TS_UPDATE_PREFIX = pfxBin(AHRSPOS_TS_UPDATE_MESSAGE_LENGTH, MSGID_AHRSPOS_TS_UPDATE)
 
 @dataclass
 class BoardID:
@@ -514,10 +508,7 @@ class BoardID:
 
     def encode(self, protocol_buffer: bytearray) -> int:
         # Header
-        protocol_buffer[0] = PACKET_START_CHAR
-        protocol_buffer[1] = BINARY_PACKET_INDICATOR_CHAR
-        protocol_buffer[2] = BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH - 2
-        protocol_buffer[3] = MSGID_BOARD_IDENTITY_RESPONSE
+        protocol_buffer[0:4] = pfxBin(BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH, MSGID_BOARD_IDENTITY_RESPONSE)
         # Data
         protocol_buffer[BOARD_IDENTITY_BOARDTYPE_VALUE_INDEX] = self.type
         protocol_buffer[BOARD_IDENTITY_HWREV_VALUE_INDEX] = self.hw_rev
@@ -531,7 +522,7 @@ class BoardID:
         return BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH
     
     def decode(self, buffer: bytes) -> Optional[int]:
-        if not verifyPrefix(buffer, BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH, [PACKET_START_CHAR, BINARY_PACKET_INDICATOR_CHAR, BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH - 2, MSGID_BOARD_IDENTITY_RESPONSE], BOARD_IDENTITY_RESPONSE_CHECKSUM_INDEX):
+        if not verifyPrefixBin(buffer, BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH, MSGID_BOARD_IDENTITY_RESPONSE):
             return None
 
         self.type = buffer[BOARD_IDENTITY_BOARDTYPE_VALUE_INDEX]
@@ -539,9 +530,7 @@ class BoardID:
         self.fw_ver_major = buffer[BOARD_IDENTITY_FW_VER_MAJOR]
         self.fw_ver_minor = buffer[BOARD_IDENTITY_FW_VER_MINOR]
         self.fw_revision = IMURegisters.decodeProtocolUint16(buffer, BOARD_IDENTITY_FW_VER_REVISION_VALUE_INDEX)
-        self.unique_id = np.array(12, dtype=np.uint8)
-        for i in range(12):
-            self.unique_id[i] = buffer[BOARD_IDENTITY_UNIQUE_ID_0 + i]
+        self.unique_id = list(buffer[BOARD_IDENTITY_UNIQUE_ID_0:BOARD_IDENTITY_UNIQUE_ID_0 + 12])
         return BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH
 
 
@@ -568,10 +557,7 @@ class IntegrationControl:
 
     def encode(self, protocol_buffer: bytearray) -> int:
         # Header
-        protocol_buffer[0] = PACKET_START_CHAR
-        protocol_buffer[1] = BINARY_PACKET_INDICATOR_CHAR
-        protocol_buffer[2] = INTEGRATION_CONTROL_CMD_MESSAGE_LENGTH - 2
-        protocol_buffer[3] = MSGID_INTEGRATION_CONTROL_CMD
+        protocol_buffer[0:4] = pfxBin(INTEGRATION_CONTROL_CMD_MESSAGE_LENGTH, MSGID_INTEGRATION_CONTROL_CMD)
         # Data
         protocol_buffer[INTEGRATION_CONTROL_CMD_ACTION_INDEX] = self.action
         IMURegisters.encodeProtocolInt32(self.parameter, protocol_buffer, INTEGRATION_CONTROL_CMD_PARAMETER_INDEX)
@@ -580,21 +566,17 @@ class IntegrationControl:
         return INTEGRATION_CONTROL_CMD_MESSAGE_LENGTH
     
     def decode(self, buffer: bytes) -> Optional[int]:
-        pfx = [PACKET_START_CHAR, BINARY_PACKET_INDICATOR_CHAR, INTEGRATION_CONTROL_CMD_MESSAGE_LENGTH - 2, MSGID_INTEGRATION_CONTROL_CMD]
-        if not verifyPrefix(buffer, INTEGRATION_CONTROL_CMD_MESSAGE_LENGTH, pfx, INTEGRATION_CONTROL_CMD_MESSAGE_CHECKSUM_INDEX):
+        if not verifyPrefixBin(buffer, INTEGRATION_CONTROL_CMD_MESSAGE_LENGTH, MSGID_INTEGRATION_CONTROL_CMD):
             return None
 
         # Data
         self.action = np.uint8(buffer[INTEGRATION_CONTROL_CMD_ACTION_INDEX])
-        self.parameter = decodeProtocolInt32(buffer, INTEGRATION_CONTROL_CMD_PARAMETER_INDEX)
+        self.parameter = IMURegisters.decodeProtocolInt32(buffer, INTEGRATION_CONTROL_CMD_PARAMETER_INDEX)
         return INTEGRATION_CONTROL_CMD_MESSAGE_LENGTH
 
     def encode_response(self, protocol_buffer: bytearray):
         # Header
-        protocol_buffer[0] = PACKET_START_CHAR
-        protocol_buffer[1] = BINARY_PACKET_INDICATOR_CHAR
-        protocol_buffer[2] = INTEGRATION_CONTROL_RESP_MESSAGE_LENGTH - 2
-        protocol_buffer[3] = MSGID_INTEGRATION_CONTROL_RESP
+        protocol_buffer[0:4] = pfxBin(INTEGRATION_CONTROL_RESP_MESSAGE_LENGTH, MSGID_INTEGRATION_CONTROL_RESP)
         # Data
         protocol_buffer[INTEGRATION_CONTROL_RESP_ACTION_INDEX] = self.action
         IMURegisters.encodeProtocolInt32(self.parameter, protocol_buffer, INTEGRATION_CONTROL_RESP_PARAMETER_INDEX)
@@ -603,14 +585,26 @@ class IntegrationControl:
         return INTEGRATION_CONTROL_RESP_MESSAGE_LENGTH
 
     def decode_response(self, buffer: bytes) -> Optional[int]:
-        pfx = [PACKET_START_CHAR, BINARY_PACKET_INDICATOR_CHAR, INTEGRATION_CONTROL_RESP_MESSAGE_LENGTH - 2, MSGID_INTEGRATION_CONTROL_RESP]
-        if not verifyPrefix(buffer, INTEGRATION_CONTROL_RESP_MESSAGE_LENGTH, pfx, INTEGRATION_CONTROL_RESP_MESSAGE_CHECKSUM_INDEX):
+        if not verifyPrefixBin(buffer, INTEGRATION_CONTROL_RESP_MESSAGE_LENGTH, MSGID_INTEGRATION_CONTROL_RESP):
             return None
         # Data
         self.action = np.uint8(buffer[INTEGRATION_CONTROL_RESP_ACTION_INDEX])
         self.parameter = IMURegisters.decodeProtocolInt32(buffer, INTEGRATION_CONTROL_RESP_PARAMETER_INDEX)
         return INTEGRATION_CONTROL_RESP_MESSAGE_LENGTH
 
+def encodeDataGetRequest(protocol_buffer: bytearray, type: AHRS_DATA_TYPE, subtype: AHRS_TUNING_VAR_ID) -> int:
+    # Header
+    protocol_buffer[0] = ord(PACKET_START_CHAR)
+    protocol_buffer[1] = ord(BINARY_PACKET_INDICATOR_CHAR)
+    protocol_buffer[2] = DATA_REQUEST_MESSAGE_LENGTH - 2
+    protocol_buffer[3] = ord(MSGID_DATA_REQUEST)
+    # Data
+    protocol_buffer[DATA_REQUEST_DATATYPE_VALUE_INDEX] = type
+    protocol_buffer[DATA_REQUEST_VARIABLEID_VALUE_INDEX] = subtype
+    # Footer
+    encodeTermination( protocol_buffer, DATA_REQUEST_MESSAGE_LENGTH, DATA_REQUEST_MESSAGE_LENGTH - 4 )
+    return DATA_REQUEST_MESSAGE_LENGTH
+
 """
 def encodeTuningVariableCmd( char *protocol_buffer, AHRS_DATA_ACTION getset, AHRS_TUNING_VAR_ID id, float val ):
     # Header
@@ -0,0 +1,92 @@
+from unittest import TestCase
+import struct
+from .ahrs_protocol import (
+    AHRSUpdate, AHRSPosUpdate, AHRSPosTSUpdate, BoardID,
+    AHRS_UPDATE_MESSAGE_LENGTH,
+    AHRSPOS_UPDATE_MESSAGE_LENGTH,
+    AHRSPOS_TS_UPDATE_MESSAGE_LENGTH,
+    AHRSPOS_TS_UPDATE_QUAT_W_VALUE_INDEX,
+    AHRSPOS_TS_UPDATE_TIMESTAMP_INDEX,
+    BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH,
+)
+from .imu_protocol import encodeTermination
+
+
+class AHRSProtocolTest(TestCase):
+    def roundtrip(self, update, length: int):
+        buf = bytearray(length)
+        self.assertEqual(update.encode(buf), length)
+        res = type(update)()
+        self.assertEqual(res.decode(memoryview(buf)), length)
+        return res, buf
+
+    def test_ahrs_roundtrip(self):
+        update = AHRSUpdate(
+            yaw=-12.34, pitch=5.5, roll=0.25, compass_heading=270.5,
+            altitude=12.5, fused_heading=90.0,
+            linear_accel_x=0.125, linear_accel_y=-0.5, linear_accel_z=1.0,
+            mpu_temp=31.25, quat_w=0.5, quat_x=-0.25, quat_y=0.125, quat_z=1.0,
+            barometric_pressure=1013.25, baro_temp=20.5,
+            op_status=4, sensor_status=1, cal_status=2, selftest_status=7,
+            cal_mag_x=-5, cal_mag_y=6, cal_mag_z=7, mag_field_norm_ratio=1.5, mag_field_norm_scalar=-2.5,
+            raw_mag_x=100, raw_mag_y=-100, raw_mag_z=0,
+        )
+        res, _ = self.roundtrip(update, AHRS_UPDATE_MESSAGE_LENGTH)
+        for field in AHRSUpdate.__dataclass_fields__:
+            self.assertAlmostEqual(getattr(res, field), getattr(update, field), places=3, msg=field)
+
+    def test_ahrspos_roundtrip(self):
+        update = AHRSPosUpdate(yaw=45.0, pitch=-1.5, roll=2.0, vel_x=1.5, vel_y=-0.25, disp_z=3.0, quat_w=1.0, sensor_status=5)
+        res, _ = self.roundtrip(update, AHRSPOS_UPDATE_MESSAGE_LENGTH)
+        self.assertEqual(res, update)
+
+    def test_ahrspos_ts_roundtrip(self):
+        update = AHRSPosTSUpdate(yaw=-179.5, pitch=3.0, roll=-2.0, linear_accel_x=0.0625, quat_w=0.75, quat_z=-0.5, timestamp=0xFFFF0000)
+        res, _ = self.roundtrip(update, AHRSPOS_TS_UPDATE_MESSAGE_LENGTH)
+        self.assertEqual(res, update)
+
+    def test_ahrspos_ts_layout(self):
+        "Check the layout against the protocol offsets"
+        buf = bytearray(AHRSPOS_TS_UPDATE_MESSAGE_LENGTH)
+        buf[0:4] = b'!#\x5ct'
+        struct.pack_into('<i', buf, 4, -3 * 65536)  # yaw
+        struct.pack_into('<i', buf, 8, 65536 // 2)  # roll
+        struct.pack_into('<i', buf, 12, 65536 // 4)  # pitch
+        struct.pack_into('<i', buf, AHRSPOS_TS_UPDATE_QUAT_W_VALUE_INDEX, 65536 * 16384)
+        struct.pack_into('<I', buf, AHRSPOS_TS_UPDATE_TIMESTAMP_INDEX, 1234)
+        encodeTermination(buf, AHRSPOS_TS_UPDATE_MESSAGE_LENGTH, AHRSPOS_TS_UPDATE_MESSAGE_LENGTH - 4)
+
+        res = AHRSPosTSUpdate()
+        self.assertIsNotNone(res.decode(bytes(buf)))
+        self.assertEqual(res.yaw, -3.0)
+        self.assertEqual(res.roll, 0.5)
+        self.assertEqual(res.pitch, 0.25)
+        self.assertEqual(res.quat_w, 1.0)
+        self.assertEqual(res.timestamp, 1234)
+
+    def test_checksum(self):
+        buf = bytearray(AHRSPOS_TS_UPDATE_MESSAGE_LENGTH)
+        AHRSPosTSUpdate(yaw=1.0).encode(buf)
+        buf[5] ^= 1
+        res = AHRSPosTSUpdate()
+        self.assertIsNone(res.decode(buf))
+        # Skip verification
+        self.assertIsNotNone(res.decode(buf, checksum=False))
+
+    def test_wrong_type(self):
+        buf = bytearray(AHRSPOS_TS_UPDATE_MESSAGE_LENGTH)
+        AHRSPosTSUpdate().encode(buf)
+        self.assertIsNone(AHRSUpdate().decode(buf))
+        self.assertIsNone(AHRSPosTSUpdate().decode(buf[:-1]))
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            AHRSPosTSUpdate().not_a_field = 1
+
+    def test_board_id(self):
+        board_id = BoardID(type=50, hw_rev=33, fw_ver_major=3, fw_ver_minor=1, fw_revision=400, unique_id=list(range(12)))
+        buf = bytearray(BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH)
+        board_id.encode(buf)
+        res = BoardID(0, 0, 0, 0, 0, [0] * 12)
+        self.assertEqual(res.decode(buf), BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH)
+        self.assertEqual(res, board_id)
@@ -1,7 +1,7 @@
 from abc import ABC
 from dataclasses import dataclass
-from imu_protocol import YPRUpdate, GyroUpdate
-from ahrs_protocol import AHRSUpdate, AHRSPosUpdate, BoardID
+from .imu_protocol import YPRUpdate, GyroUpdate
+from .ahrs_protocol import AHRSUpdate, AHRSPosUpdate, BoardID
 
 class IBoardCapabilities(ABC):
     def is_omnimount_supported(self) -> bool:
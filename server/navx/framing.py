@@ -0,0 +1,196 @@
+"""
+Incremental packet framing for the navX serial protocol.
+
+Bytes are read straight into a reusable buffer, and complete packets are handed to handlers as
+`memoryview`s into that buffer (so they are only valid for the duration of the call). Partial
+packets stay in place until the rest arrives.
+"""
+from typing import Callable, Optional, Any
+from dataclasses import dataclass
+from .imu_protocol import (
+    PACKET_START_CHAR,
+    CHECKSUM_LENGTH,
+    TERMINATOR_LENGTH,
+    MSGID_YPR_UPDATE, YPR_UPDATE_MESSAGE_LENGTH,
+    MSGID_GYRO_UPDATE, GYRO_UPDATE_MESSAGE_LENGTH,
+    MSGID_QUATERNION_UPDATE, QUATERNION_UPDATE_MESSAGE_LENGTH,
+    MSG_ID_STREAM_RESPONSE, STREAM_RESPONSE_MESSAGE_LENGTH,
+    MSGID_STREAM_CMD, STREAM_CMD_MESSAGE_LENGTH,
+)
+from .ahrs_protocol import BINARY_PACKET_INDICATOR_CHAR, AHRSPOS_TS_UPDATE_MESSAGE_LENGTH
+
+PacketHandler = Callable[[memoryview], Any]
+"Called with a complete, checksum-verified packet (only valid until the handler returns)"
+
+_START = ord(PACKET_START_CHAR)
+_BINARY = ord(BINARY_PACKET_INDICATOR_CHAR)
+_FOOTER_LENGTH = CHECKSUM_LENGTH + TERMINATOR_LENGTH
+_MIN_BINARY_LENGTH = 4 + _FOOTER_LENGTH
+
+ASCII_MESSAGE_LENGTHS = {
+    ord(MSGID_YPR_UPDATE): YPR_UPDATE_MESSAGE_LENGTH,
+    ord(MSGID_GYRO_UPDATE): GYRO_UPDATE_MESSAGE_LENGTH,
+    ord(MSGID_QUATERNION_UPDATE): QUATERNION_UPDATE_MESSAGE_LENGTH,
+    ord(MSG_ID_STREAM_RESPONSE): STREAM_RESPONSE_MESSAGE_LENGTH,
+    ord(MSGID_STREAM_CMD): STREAM_CMD_MESSAGE_LENGTH,
+}
+"Lengths of ASCII packets (binary packets carry their own length)"
+
+MAX_MESSAGE_LENGTH = max(AHRSPOS_TS_UPDATE_MESSAGE_LENGTH, *ASCII_MESSAGE_LENGTHS.values())
+"Longest packet the board sends (longer binary lengths must be corrupt)"
+
+def _hex_table() -> list[int]:
+    table = [-1] * 256
+    for i, c in enumerate(b'0123456789ABCDEF'):
+        table[c] = i
+    for i, c in enumerate(b'abcdef'):
+        table[c] = i + 10
+    return table
+_HEX = _hex_table()
+
+
+@dataclass
+class FramerStats:
+    bytes_received: int = 0
+    packets: int = 0
+    "Packets passed to a handler"
+    unhandled: int = 0
+    "Valid packets with no handler"
+    discarded_bytes: int = 0
+    "Bytes skipped while looking for a packet"
+    checksum_errors: int = 0
+    "Packets dropped because of a bad checksum or terminator"
+
+
+class PacketFramer:
+    def __init__(self, handlers: Optional[dict[int, PacketHandler]] = None, capacity: int = 1024) -> None:
+        if capacity < 2 * MAX_MESSAGE_LENGTH:
+            raise ValueError('Buffer must be able to hold two packets')
+        self.handlers: dict[int, PacketHandler] = dict(handlers or {})
+        "Handlers by message ID byte"
+        self.stats = FramerStats()
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        "Start of unparsed data"
+        self._end = 0
+        "End of received data"
+
+    def register(self, msgid: str, handler: PacketHandler):
+        self.handlers[ord(msgid)] = handler
+
+    @property
+    def pending(self) -> int:
+        "Number of buffered bytes that haven't been parsed yet (i.e. a partial packet)"
+        return self._end - self._start
+
+    def receive_buffer(self, size: int) -> memoryview:
+        """
+        Get a view to read up to `size` bytes into (e.g. with `readinto`), then call `commit`.
+        The view may be smaller than requested.
+        """
+        if len(self._buf) - self._end < size:
+            # Move the partial packet to the front (at most one packet long)
+            pending = self._end - self._start
+            if pending:
+                self._buf[:pending] = self._view[self._start:self._end]
+            self._start = 0
+            self._end = pending
+        return self._view[self._end:self._end + size]
+
+    def commit(self, count: int) -> int:
+        "Mark `count` bytes as received (into `receive_buffer`), and parse them. Returns the number of packets handled."
+        self._end += count
+        self.stats.bytes_received += count
+        return self._parse()
+
+    def feed(self, data: bytes) -> int:
+        "Copy `data` into the buffer and parse it. Returns the number of packets handled."
+        view = memoryview(data)
+        packets = 0
+        while len(view) > 0:
+            dst = self.receive_buffer(len(view))
+            n = len(dst)
+            dst[:] = view[:n]
+            packets += self.commit(n)
+            view = view[n:]
+        return packets
+
+    def reset(self):
+        "Drop any partial packet"
+        self.stats.discarded_bytes += self._end - self._start
+        self._start = self._end = 0
+
+    def _parse(self) -> int:
+        buf = self._buf
+        view = self._view
+        handlers = self.handlers
+        stats = self.stats
+        hex_value = _HEX
+        end = self._end
+        pos = self._start
+        packets = 0
+        while True:
+            # Find the next packet start
+            start = buf.find(_START, pos, end)
+            if start < 0:
+                stats.discarded_bytes += end - pos
+                pos = end
+                break
+            stats.discarded_bytes += start - pos
+            pos = start
+            if end - pos < 3:
+                # Need more data to identify the packet
+                break
+            if buf[pos + 1] == _BINARY:
+                if end - pos < 4:
+                    break
+                length = buf[pos + 2] + 2
+                if not (_MIN_BINARY_LENGTH <= length <= MAX_MESSAGE_LENGTH):
+                    stats.discarded_bytes += 1
+                    pos += 1
+                    continue
+                msgid = buf[pos + 3]
+            else:
+                msgid = buf[pos + 1]
+                length = ASCII_MESSAGE_LENGTHS.get(msgid)
+                if length is None:
+                    # Unknown ASCII message
+                    stats.discarded_bytes += 1
+                    pos += 1
+                    continue
+            if end - pos < length:
+                # Partial packet, wait for more data
+                break
+
+            # Verify checksum & terminator
+            content_end = pos + length - _FOOTER_LENGTH
+            hi = hex_value[buf[content_end]]
+            lo = hex_value[buf[content_end + 1]]
+            if (
+                hi < 0 or lo < 0
+                or ((sum(view[pos:content_end]) & 0xFF) != (hi << 4) | lo)
+                or buf[content_end + 2] != 0x0D
+                or buf[content_end + 3] != 0x0A
+            ):
+                # Probably a false start; resync from the next byte
+                stats.checksum_errors += 1
+                stats.discarded_bytes += 1
+                pos += 1
+                continue
+
+            handler = handlers.get(msgid)
+            if handler is None:
+                stats.unhandled += 1
+            else:
+                handler(view[pos:pos + length])
+                stats.packets += 1
+                packets += 1
+            pos += length
+
+        if pos == end:
+            self._start = self._end = 0
+        else:
+            self._start = pos
+        return packets
+
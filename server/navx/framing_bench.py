@@ -0,0 +1,149 @@
+"""
+Benchmark NavX serial framing, replaying a byte stream at a multiple of the real rate
+
+Usage: python -m navx.framing_bench [--input capture.bin] [--rate HZ] [--speedup N] [--seconds S]
+
+Without `--input`, a synthetic AHRSPosTS stream (with some line noise) is used.
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+import random
+import time
+
+from .framing import PacketFramer, ASCII_MESSAGE_LENGTHS, MAX_MESSAGE_LENGTH
+from .imu_protocol import encodeTermination
+from .ahrs_protocol import MSGID_AHRSPOS_TS_UPDATE, AHRSPOS_TS_UPDATE_MESSAGE_LENGTH
+
+BAUD_BYTES_PER_SEC = 57600 // 10
+
+
+def synthetic_stream(seconds: float, rate: float, noise: float, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    length = AHRSPOS_TS_UPDATE_MESSAGE_LENGTH
+    out = bytearray()
+    for i in range(int(seconds * rate)):
+        pkt = bytearray(length)
+        pkt[0:4] = b'!#' + bytes([length - 2]) + MSGID_AHRSPOS_TS_UPDATE.encode()
+        pkt[4:length - 4] = rng.randbytes(length - 8)
+        encodeTermination(pkt, length, length - 4)
+        if rng.random() < noise:
+            # Corrupt a byte, or drop the tail of the packet
+            if rng.random() < 0.5:
+                pkt[rng.randrange(length)] ^= 0xFF
+            else:
+                del pkt[rng.randrange(4, length):]
+        out += pkt
+    return bytes(out)
+
+
+def legacy_scan(data: bytes, on_packet) -> int:
+    "Byte-at-a-time scan with copies, like the previous `SerialIO.run`. Returns the number of bytes consumed."
+    i = 0
+    while i < len(data):
+        if data[i] != ord('!'):
+            i += 1
+            continue
+        remaining = bytes(data[i:i + MAX_MESSAGE_LENGTH])
+        if len(remaining) > 2 and remaining[1] == ord('#'):
+            length = remaining[2] + 2
+        else:
+            length = ASCII_MESSAGE_LENGTHS.get(remaining[1] if len(remaining) > 1 else -1, 0)
+        if len(remaining) < MAX_MESSAGE_LENGTH and len(remaining) < max(length, 8):
+            # Possibly a partial packet
+            break
+        if length < 8:
+            i += 1
+            continue
+        checksum = 0
+        for c in remaining[:length - 4]:
+            checksum += c
+        if remaining[length - 4:length - 2] != b'%02X' % (checksum & 0xFF):
+            i += 1
+            continue
+        on_packet(remaining[:length])
+        i += length
+    return i
+
+
+def replay(stream: bytes, chunk_sizes: list[int], period: float, consume) -> tuple[float, float]:
+    "Feed `stream` in chunks every `period` seconds. Returns (wall time, cpu time spent in `consume`)."
+    view = memoryview(stream)
+    cpu = 0.0
+    start = time.perf_counter()
+    next_time = start
+    pos = 0
+    for size in chunk_sizes:
+        next_time += period
+        delay = next_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t0 = time.process_time()
+        consume(view[pos:pos + size])
+        cpu += time.process_time() - t0
+        pos += size
+    return time.perf_counter() - start, cpu
+
+
+def main():
+    parser = ArgumentParser(description="Replay a NavX byte stream through the packet framer")
+    parser.add_argument('--input', type=Path, help="Recorded serial capture (raw bytes)")
+    parser.add_argument('--rate', type=float, default=200, help="Packet rate of the synthetic stream (Hz)")
+    parser.add_argument('--seconds', type=float, default=10.0, help="Length of the synthetic stream (s)")
+    parser.add_argument('--noise', type=float, default=0.01, help="Fraction of corrupted synthetic packets")
+    parser.add_argument('--speedup', type=float, default=10.0, help="Replay speed, relative to real time")
+    parser.add_argument('--read-hz', type=float, default=100.0, help="Serial reads per (real) second")
+    args = parser.parse_args()
+
+    if args.input is not None:
+        stream = args.input.read_bytes()
+        # Captures don't record timing, so assume the port ran at full speed
+        real_seconds = len(stream) / BAUD_BYTES_PER_SEC
+    else:
+        stream = synthetic_stream(args.seconds, args.rate, args.noise)
+        real_seconds = args.seconds
+
+    reads = max(1, int(real_seconds * args.read_hz))
+    chunk = -(-len(stream) // reads)
+    rng = random.Random(1)
+    chunk_sizes = []
+    remaining = len(stream)
+    while remaining > 0:
+        # Jitter read sizes, so packets straddle reads
+        size = min(remaining, max(1, int(chunk * rng.uniform(0.5, 1.5))))
+        chunk_sizes.append(size)
+        remaining -= size
+    period = 1.0 / (args.read_hz * args.speedup)
+
+    received = [0]
+    def on_packet(packet):
+        received[0] += 1
+
+    framer = PacketFramer({ord(MSGID_AHRSPOS_TS_UPDATE): on_packet})
+    def consume_framer(data: memoryview):
+        dst = framer.receive_buffer(len(data))
+        while len(data) > 0:
+            n = len(dst)
+            dst[:] = data[:n]
+            framer.commit(n)
+            data = data[n:]
+            dst = framer.receive_buffer(len(data))
+
+    # The legacy scanner copies leftover bytes into the next read
+    pending = bytearray()
+    def consume_legacy(data: memoryview):
+        pending.extend(data)
+        del pending[:legacy_scan(pending, on_packet)]
+
+    print(f"stream: {len(stream)} bytes, {real_seconds:.1f}s real time, replaying at {args.speedup:g}x in {len(chunk_sizes)} reads")
+    print(f"{'parser':<8} {'wall':>8} {'cpu':>8} {'cpu/real s':>11} {'MB/s':>8} {'packets':>8}")
+    for name, consume in (('legacy', consume_legacy), ('framer', consume_framer)):
+        received[0] = 0
+        wall, cpu = replay(stream, chunk_sizes, period, consume)
+        throughput = len(stream) / cpu / 1e6 if cpu > 0 else float('inf')
+        print(f"{name:<8} {wall:7.2f}s {cpu:7.3f}s {cpu / real_seconds * 1e3:8.2f}ms {throughput:8.2f} {received[0]:8}")
+    stats = framer.stats
+    print(f"framer: {stats.packets} packets, {stats.discarded_bytes} bytes discarded, {stats.checksum_errors} checksum errors")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+from unittest import TestCase
+from .framing import PacketFramer
+from .imu_protocol import encodeTermination, encodeStreamCommand, STREAM_CMD_MESSAGE_LENGTH
+from .ahrs_protocol import AHRSPOS_TS_UPDATE_MESSAGE_LENGTH
+
+
+def binary_packet(msgid: str, length: int, fill: int = 0) -> bytes:
+    buf = bytearray(length)
+    buf[0:4] = b'!#' + bytes([length - 2]) + msgid.encode()
+    for i in range(4, length - 4):
+        buf[i] = (fill + i) & 0xFF
+    encodeTermination(buf, length, length - 4)
+    return bytes(buf)
+
+
+def ts_packet(fill: int = 0) -> bytes:
+    return binary_packet('t', AHRSPOS_TS_UPDATE_MESSAGE_LENGTH, fill)
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.packets: list[bytes] = []
+
+    def __call__(self, packet: memoryview):
+        self.packets.append(bytes(packet))
+
+
+class PacketFramerTest(TestCase):
+    def framer(self, *ids: str):
+        rec = Recorder()
+        return PacketFramer({ord(msgid): rec for msgid in (ids or 't')}), rec
+
+    def test_single(self):
+        framer, rec = self.framer()
+        pkt = ts_packet()
+        self.assertEqual(framer.feed(pkt), 1)
+        self.assertEqual(rec.packets, [pkt])
+        self.assertEqual(framer.stats.bytes_received, len(pkt))
+        self.assertEqual(framer.stats.discarded_bytes, 0)
+        self.assertEqual(framer.pending, 0)
+
+    def test_ascii(self):
+        framer, rec = self.framer('S')
+        buf = bytearray(STREAM_CMD_MESSAGE_LENGTH)
+        encodeStreamCommand(buf, 't', 100)
+        self.assertEqual(bytes(buf), b'!St64' + buf[5:7] + b'\r\n')
+        framer.feed(buf)
+        self.assertEqual(rec.packets, [bytes(buf)])
+
+    def test_split(self):
+        "Partial packets are kept until the rest arrives"
+        framer, rec = self.framer()
+        stream = ts_packet(1) + ts_packet(2) + ts_packet(3)
+        for i in range(0, len(stream), 7):
+            framer.feed(stream[i:i + 7])
+        self.assertEqual(rec.packets, [ts_packet(1), ts_packet(2), ts_packet(3)])
+        self.assertEqual(framer.stats.discarded_bytes, 0)
+
+    def test_garbage(self):
+        framer, rec = self.framer()
+        framer.feed(b'xx!\x00garbage' + ts_packet() + b'\r\n!!' + ts_packet(5))
+        self.assertEqual(rec.packets, [ts_packet(), ts_packet(5)])
+        self.assertEqual(framer.stats.discarded_bytes, 11 + 4)
+
+    def test_checksum(self):
+        framer, rec = self.framer()
+        bad = bytearray(ts_packet(1))
+        bad[10] ^= 0xFF
+        framer.feed(bytes(bad) + ts_packet(2))
+        self.assertEqual(rec.packets, [ts_packet(2)])
+        self.assertEqual(framer.stats.checksum_errors, 1)
+
+    def test_embedded_start(self):
+        "Packet start characters inside binary data don't break framing"
+        framer, rec = self.framer()
+        pkt = ts_packet(ord('!') - 4)
+        self.assertEqual(pkt[4], ord('!'))
+        framer.feed(pkt[:20])
+        framer.feed(pkt[20:])
+        self.assertEqual(rec.packets, [pkt])
+
+    def test_truncated(self):
+        "A packet cut short by the next one is dropped"
+        framer, rec = self.framer()
+        framer.feed(ts_packet(1)[:50] + ts_packet(2) + ts_packet(3))
+        self.assertEqual(rec.packets[-1], ts_packet(3))
+        self.assertGreaterEqual(framer.stats.checksum_errors, 1)
+
+    def test_unhandled(self):
+        framer, rec = self.framer('t')
+        framer.feed(binary_packet('i', 26) + ts_packet())
+        self.assertEqual(rec.packets, [ts_packet()])
+        self.assertEqual(framer.stats.unhandled, 1)
+
+    def test_receive_buffer(self):
+        "Reading directly into the buffer wraps around without losing data"
+        framer, rec = self.framer()
+        stream = b''.join(ts_packet(i) for i in range(40))
+        pos = 0
+        while pos < len(stream):
+            dst = framer.receive_buffer(100)
+            n = min(len(dst), len(stream) - pos)
+            dst[:n] = stream[pos:pos + n]
+            framer.commit(n)
+            pos += n
+        self.assertEqual(rec.packets, [ts_packet(i) for i in range(40)])
@@ -1,6 +1,8 @@
-from typing import Union, Optional, Iterable
+from typing import Union, Optional
 from dataclasses import dataclass
 from io import TextIOBase
+from binascii import hexlify, unhexlify
+import struct
 import numpy as np
 
 PACKET_START_CHAR = '!'
@@ -12,12 +14,9 @@ PROTOCOL_FLOAT_LENGTH = 7
 
 def encodeTermination(buffer: bytearray, total_length: int, content_length: int ):
     if ( ( total_length >= (CHECKSUM_LENGTH + TERMINATOR_LENGTH) ) and ( total_length >= content_length + (CHECKSUM_LENGTH + TERMINATOR_LENGTH) ) ):
-        # Checksum
-        checksum = 0
-        for c in buffer[:content_length]:
-            checksum += c
-        # convert checksum to two ascii bytes
-        buffer[content_length:content_length+2] = bytes(f"{checksum:#02X}", 'ascii')
+        # Checksum (as two ascii hex digits)
+        checksum = sum(buffer[:content_length]) & 0xFF
+        buffer[content_length:content_length+2] = b"%02X" % checksum
         # Message Terminator
         buffer[content_length + CHECKSUM_LENGTH: content_length + CHECKSUM_LENGTH + 2] = b"\r\n"
 
@@ -38,11 +37,11 @@ def decodeUint8(buffer: bytes, offset: int = 0) -> np.uint8:
     decoded_checksum = np.uint8((first_digit * 16) + second_digit)
     return decoded_checksum
 
-def decodeProtocolFloat(src: Union[TextIOBase, bytes], offset: int = 0) -> float:
-    if isinstance(src, bytes):
-        temp = src[offset:offset+PROTOCOL_FLOAT_LENGTH]
-    else:
+def decodeProtocolFloat(src: Union[TextIOBase, bytes, memoryview], offset: int = 0) -> float:
+    if isinstance(src, TextIOBase):
         temp = src.read(PROTOCOL_FLOAT_LENGTH)
+    else:
+        temp = bytes(src[offset:offset+PROTOCOL_FLOAT_LENGTH])
     assert len(temp) == PROTOCOL_FLOAT_LENGTH
     return float(temp)
 
@@ -62,16 +61,10 @@ def encodeProtocolFloat(f: float, buffer: bytearray, offset: int = 0):
 
 def encodeProtocolUint16(value: np.uint16, dst: bytearray, offset: int = 0):
     value = np.uint16(value)
-    dst[offset:offset+4] = bytes(f"{value:#04X}", 'ascii')
+    dst[offset:offset+4] = b"%04X" % value
 
-def decodeProtocolUint16(buffer: bytes, offset: int = 0) -> np.uint16:
-    decoded_uint16 = 0
-    shift_left = 12
-    for i in range(4):
-        digit = np.uint16(decode_hex(buffer[i]))
-        decoded_uint16 += (digit << shift_left)
-        shift_left -= 4
-    return decoded_uint16
+def decodeProtocolUint16(buffer: bytes, offset: int = 0) -> int:
+    return int(bytes(buffer[offset:offset+4]), 16)
 
 # 0 to 655.35
 def decodeProtocolUnsignedHundredthsFloat(buffer: bytes, offset: int = 0) -> float:
@@ -82,22 +75,22 @@ def encodeProtocolUnsignedHundredthsFloat(value: float, buffer: bytes, offset: i
     return encodeProtocolUint16(input_as_uint, buffer, offset)
 
 def verifyChecksum(buffer: bytes, content_length: int) -> bool:
-    # Calculate Checksum
-    checksum = np.uint8(0)
-    for c in buffer[0:content_length]:
-        checksum += c
-
-    # Decode Checksum
-    decoded_checksum = decodeUint8(buffer[content_length] )
+    checksum = sum(memoryview(buffer)[:content_length]) & 0xFF
+    try:
+        return checksum == int(bytes(buffer[content_length:content_length+2]), 16)
+    except ValueError:
+        return False
 
-    return np.uint8(checksum) == decoded_checksum
+def pfx(msgid: str) -> bytes:
+    "Prefix of an ascii packet"
+    return (PACKET_START_CHAR + msgid).encode('ascii')
 
-def verifyPrefix(buffer: bytes, length: int, prefix: Iterable[int], checksum_idx: Optional[int] = None) -> bool:
+def verifyPrefix(buffer: bytes, length: int, prefix: bytes, checksum_idx: Optional[int] = None) -> bool:
+    "Check the length, prefix and (optionally) checksum of a packet"
     if len(buffer) < length:
         return False
-    for i in range(len(prefix)):
-        if buffer[i] != int(prefix[i]):
-            return False
+    if buffer[:len(prefix)] != prefix:
+        return False
     if checksum_idx is not None:
         if not verifyChecksum(buffer, checksum_idx):
             return False
@@ -140,7 +133,7 @@ class YPRUpdate:
 
         return YPR_UPDATE_MESSAGE_LENGTH
     def decode(self, buffer: bytes) -> Optional[int]:
-        if not verifyPrefix(buffer, YPR_UPDATE_MESSAGE_LENGTH, ['!', 'y'], checksum_idx=YPR_UPDATE_CHECKSUM_INDEX):
+        if not verifyPrefix(buffer, YPR_UPDATE_MESSAGE_LENGTH, pfx(MSGID_YPR_UPDATE), checksum_idx=YPR_UPDATE_CHECKSUM_INDEX):
             return None
         self.yaw             = decodeProtocolFloat(buffer, YPR_UPDATE_YAW_VALUE_INDEX)
         self.pitch           = decodeProtocolFloat(buffer, YPR_UPDATE_PITCH_VALUE_INDEX)
@@ -167,54 +160,57 @@ GYRO_UPDATE_TEMP_VALUE_INDEX = 38
 GYRO_UPDATE_CHECKSUM_INDEX = 42
 GYRO_UPDATE_TERMINATOR_INDEX = 44
 
-@dataclass
+_GYRO_UPDATE_STRUCT = struct.Struct('>6H3hH')
+"Fields of a Gyro update, after converting from hex"
+_GYRO_UPDATE_PREFIX = pfx(MSGID_GYRO_UPDATE)
+
+@dataclass(slots=True)
 class GyroUpdate:
-    gyro_x: int
-    gyro_y: int
-    gyro_z: int
-    accel_x: int
-    accel_y: int
-    accel_z: int
-    mag_x: int
-    mag_y: int
-    mag_z: int
-    temp_c: float
+    gyro_x: int = 0
+    gyro_y: int = 0
+    gyro_z: int = 0
+    accel_x: int = 0
+    accel_y: int = 0
+    accel_z: int = 0
+    mag_x: int = 0
+    mag_y: int = 0
+    mag_z: int = 0
+    temp_c: float = 0.0
 
-    def encode(self, protocol_buffer: bytes):
+    def encode(self, protocol_buffer: bytearray) -> int:
         # Header
-        protocol_buffer[0] = PACKET_START_CHAR
-        protocol_buffer[1] = MSGID_GYRO_UPDATE
+        protocol_buffer[0:2] = _GYRO_UPDATE_PREFIX
 
         # Data
-        encodeProtocolUint16( self.gyro_x,           protocol_buffer, GYRO_UPDATE_GYRO_X_VALUE_INDEX )
-        encodeProtocolUint16( self.gyro_y,           protocol_buffer, GYRO_UPDATE_GYRO_Y_VALUE_INDEX )
-        encodeProtocolUint16( self.gyro_z,           protocol_buffer, GYRO_UPDATE_GYRO_Z_VALUE_INDEX )
-        encodeProtocolUint16( self.accel_x,          protocol_buffer, GYRO_UPDATE_ACCEL_X_VALUE_INDEX )
-        encodeProtocolUint16( self.accel_y,          protocol_buffer, GYRO_UPDATE_ACCEL_Y_VALUE_INDEX )
-        encodeProtocolUint16( self.accel_z,          protocol_buffer, GYRO_UPDATE_ACCEL_Z_VALUE_INDEX )
-        encodeProtocolUint16( np.uint16(self.mag_x), protocol_buffer, GYRO_UPDATE_MAG_X_VALUE_INDEX )
-        encodeProtocolUint16( np.uint16(self.mag_y), protocol_buffer, GYRO_UPDATE_MAG_Y_VALUE_INDEX )
-        encodeProtocolUint16( np.uint16(self.mag_z), protocol_buffer, GYRO_UPDATE_MAG_Z_VALUE_INDEX )
-        encodeProtocolUnsignedHundredthsFloat(self.temp_c, protocol_buffer, GYRO_UPDATE_TEMP_VALUE_INDEX )
+        raw = _GYRO_UPDATE_STRUCT.pack(
+            self.gyro_x, self.gyro_y, self.gyro_z,
+            self.accel_x, self.accel_y, self.accel_z,
+            self.mag_x, self.mag_y, self.mag_z,
+            round(self.temp_c * 100),
+        )
+        protocol_buffer[GYRO_UPDATE_GYRO_X_VALUE_INDEX:GYRO_UPDATE_CHECKSUM_INDEX] = hexlify(raw).upper()
 
         # Footer
         encodeTermination( protocol_buffer, GYRO_UPDATE_MESSAGE_LENGTH, GYRO_UPDATE_MESSAGE_LENGTH - 4 )
 
         return GYRO_UPDATE_MESSAGE_LENGTH
 
-    def decode(self, buffer: bytes) -> Optional[int]:
-        if not verifyPrefix(buffer, GYRO_UPDATE_MESSAGE_LENGTH, [PACKET_START_CHAR, MSGID_GYRO_UPDATE], GYRO_UPDATE_CHECKSUM_INDEX):
+    def decode(self, buffer: bytes, checksum: bool = True) -> Optional[int]:
+        "Decode a packet (set `checksum=False` if it was already verified)"
+        if not verifyPrefix(buffer, GYRO_UPDATE_MESSAGE_LENGTH, _GYRO_UPDATE_PREFIX, GYRO_UPDATE_CHECKSUM_INDEX if checksum else None):
+            return None
+        # All fields are 4 hex digits, so convert them in one go
+        try:
+            raw = unhexlify(buffer[GYRO_UPDATE_GYRO_X_VALUE_INDEX:GYRO_UPDATE_CHECKSUM_INDEX])
+        except ValueError:
             return None
-        self.gyro_x  = decodeProtocolUint16( buffer, GYRO_UPDATE_GYRO_X_VALUE_INDEX )
-        self.gyro_y  = decodeProtocolUint16( buffer, GYRO_UPDATE_GYRO_Y_VALUE_INDEX )
-        self.gyro_z  = decodeProtocolUint16( buffer, GYRO_UPDATE_GYRO_Z_VALUE_INDEX )
-        self.accel_x = decodeProtocolUint16( buffer, GYRO_UPDATE_ACCEL_X_VALUE_INDEX )
-        self.accel_y = decodeProtocolUint16( buffer, GYRO_UPDATE_ACCEL_Y_VALUE_INDEX )
-        self.accel_z = decodeProtocolUint16( buffer, GYRO_UPDATE_ACCEL_Z_VALUE_INDEX )
-        self.mag_x   = np.int16_t(decodeProtocolUint16( buffer, GYRO_UPDATE_MAG_X_VALUE_INDEX ))
-        self.mag_y   = np.int16_t(decodeProtocolUint16( buffer, GYRO_UPDATE_MAG_Y_VALUE_INDEX ))
-        self.mag_z   = np.int16_t(decodeProtocolUint16( buffer, GYRO_UPDATE_MAG_Z_VALUE_INDEX ))
-        self.temp_c  = decodeProtocolUnsignedHundredthsFloat(  buffer, GYRO_UPDATE_TEMP_VALUE_INDEX )
+        (
+            self.gyro_x, self.gyro_y, self.gyro_z,
+            self.accel_x, self.accel_y, self.accel_z,
+            self.mag_x, self.mag_y, self.mag_z,
+            temp,
+        ) = _GYRO_UPDATE_STRUCT.unpack(raw)
+        self.temp_c = temp / 100.0
         return GYRO_UPDATE_MESSAGE_LENGTH
 
 
@@ -274,7 +270,7 @@ class QuaternionUpdate:
         return QUATERNION_UPDATE_MESSAGE_LENGTH
 
     def decode(self, buffer: bytes) -> Optional[int]:
-        if not verifyPrefix(buffer, QUATERNION_UPDATE_MESSAGE_LENGTH, [PACKET_START_CHAR, MSGID_QUATERNION_UPDATE], QUATERNION_UPDATE_CHECKSUM_INDEX):
+        if not verifyPrefix(buffer, QUATERNION_UPDATE_MESSAGE_LENGTH, pfx(MSGID_QUATERNION_UPDATE), QUATERNION_UPDATE_CHECKSUM_INDEX):
             return None
         self.q1      = np.int16(decodeProtocolUint16(buffer, QUATERNION_UPDATE_QUAT1_VALUE_INDEX))
         self.q2      = np.int16(decodeProtocolUint16(buffer, QUATERNION_UPDATE_QUAT2_VALUE_INDEX))
@@ -320,10 +316,9 @@ class StreamResponse:
     q4_offset: int = 0
     flags: int = 0
 
-    def encode(self, protocol_buffer: bytes) -> int:
+    def encode(self, protocol_buffer: bytearray) -> int:
         # Header
-        protocol_buffer[0] = PACKET_START_CHAR
-        protocol_buffer[1] = MSG_ID_STREAM_RESPONSE
+        protocol_buffer[0:2] = pfx(MSG_ID_STREAM_RESPONSE)
 
         # Data
         protocol_buffer[STREAM_RESPONSE_STREAM_TYPE_INDEX] = self.stream_type
@@ -343,7 +338,7 @@ class StreamResponse:
         return STREAM_RESPONSE_MESSAGE_LENGTH
 
     def decode(self, buffer: bytes) -> Optional[int]:
-        if not verifyPrefix(buffer, STREAM_RESPONSE_MESSAGE_LENGTH, [PACKET_START_CHAR, MSG_ID_STREAM_RESPONSE], STREAM_RESPONSE_CHECKSUM_INDEX):
+        if not verifyPrefix(buffer, STREAM_RESPONSE_MESSAGE_LENGTH, pfx(MSG_ID_STREAM_RESPONSE), STREAM_RESPONSE_CHECKSUM_INDEX):
             return None
         self.stream_type         = buffer[2]
         self.gyro_fsr_dps        = decodeProtocolUint16(buffer, STREAM_RESPONSE_GYRO_FULL_SCALE_DPS_RANGE)
@@ -363,22 +358,22 @@ class StreamResponse:
 MSGID_STREAM_CMD = 'S'
 STREAM_CMD_STREAM_TYPE_YPR = MSGID_YPR_UPDATE
 STREAM_CMD_STREAM_TYPE_QUATERNION = MSGID_QUATERNION_UPDATE
-STREAM_CMD_STREAM_TYPE_RAW = MSGID_RAW_UPDATE
+STREAM_CMD_STREAM_TYPE_GYRO = MSGID_GYRO_UPDATE
 STREAM_CMD_STREAM_TYPE_INDEX = 2
 STREAM_CMD_UPDATE_RATE_HZ_INDEX = 3
 STREAM_CMD_CHECKSUM_INDEX = 5
 STREAM_CMD_TERMINATOR_INDEX = 7
 STREAM_CMD_MESSAGE_LENGTH = 9
 
-def encodeStreamCommand(protocol_buffer: bytes, stream_type: np.int8, update_rate_hz: np.uint8) -> int:
+def encodeStreamCommand(protocol_buffer: bytearray, stream_type: str, update_rate_hz: int) -> int:
     # Header
-    protocol_buffer[0] = PACKET_START_CHAR
-    protocol_buffer[1] = MSGID_STREAM_CMD
+    protocol_buffer[0] = ord(PACKET_START_CHAR)
+    protocol_buffer[1] = ord(MSGID_STREAM_CMD)
 
     # Data
-    protocol_buffer[STREAM_CMD_STREAM_TYPE_INDEX] = stream_type
-    # convert update_rate_hz to two ascii bytes
-    protocol_buffer[STREAM_CMD_UPDATE_RATE_HZ_INDEX:STREAM_CMD_UPDATE_RATE_HZ_INDEX+2] = bytes(f"{update_rate_hz:#02}", 'ascii')
+    protocol_buffer[STREAM_CMD_STREAM_TYPE_INDEX] = ord(stream_type)
+    # convert update_rate_hz to two ascii hex digits
+    protocol_buffer[STREAM_CMD_UPDATE_RATE_HZ_INDEX:STREAM_CMD_UPDATE_RATE_HZ_INDEX+2] = b"%02X" % (update_rate_hz & 0xFF)
 
     # Footer
     encodeTermination( protocol_buffer, STREAM_CMD_MESSAGE_LENGTH, STREAM_CMD_MESSAGE_LENGTH - 4 )
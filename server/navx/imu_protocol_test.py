@@ -0,0 +1,33 @@
+from unittest import TestCase
+from .imu_protocol import GyroUpdate, GYRO_UPDATE_MESSAGE_LENGTH, verifyChecksum, encodeTermination
+
+
+class IMUProtocolTest(TestCase):
+    def test_checksum(self):
+        buf = bytearray(b'!Sp64xxxx')
+        encodeTermination(buf, len(buf), 5)
+        self.assertEqual(buf[5:], b'%02X\r\n' % (sum(b'!Sp64') & 0xFF))
+        self.assertTrue(verifyChecksum(buf, 5))
+        buf[2] = ord('q')
+        self.assertFalse(verifyChecksum(buf, 5))
+        buf[5:7] = b'zz'
+        self.assertFalse(verifyChecksum(buf, 5))
+
+    def test_gyro_roundtrip(self):
+        update = GyroUpdate(
+            gyro_x=1, gyro_y=0xFFFF, gyro_z=300,
+            accel_x=16384, accel_y=2, accel_z=3,
+            mag_x=-100, mag_y=100, mag_z=-32768,
+            temp_c=25.5,
+        )
+        buf = bytearray(GYRO_UPDATE_MESSAGE_LENGTH)
+        self.assertEqual(update.encode(buf), GYRO_UPDATE_MESSAGE_LENGTH)
+        self.assertEqual(buf[:6], b'!g0001')
+
+        res = GyroUpdate()
+        self.assertEqual(res.decode(memoryview(buf)), GYRO_UPDATE_MESSAGE_LENGTH)
+        self.assertEqual(res, update)
+
+        buf[10] = ord('x')
+        self.assertIsNone(res.decode(buf))
+        self.assertIsNone(res.decode(buf, checksum=False))
@@ -284,20 +284,20 @@ NAVX_INTEGRATION_CTL_RESET_YAW =             0x80
 # The following functions assume a little-endian processor
 #**********************************************************
 
-def decodeProtocolUint16(buffer: bytes, offset: int = 0) -> np.uint16:
-    return np.uint16(struct.unpack("<H", buffer[offset:]))
+def decodeProtocolUint16(buffer: bytes, offset: int = 0) -> int:
+    return struct.unpack_from("<H", buffer, offset)[0]
 def encodeProtocolUint16(value: np.uint16, buffer: bytearray, offset: int = 0):
-    struct.pack_into("<H", buffer[offset:], int(np.uint16(value)))
+    struct.pack_into("<H", buffer, offset, int(np.uint16(value)))
 
-def decodeProtocolInt16(buffer: bytes, offset: int = 0) -> np.int16:
-    return np.int16(struct.unpack("<h", buffer[offset:]))
+def decodeProtocolInt16(buffer: bytes, offset: int = 0) -> int:
+    return struct.unpack_from("<h", buffer, offset)[0]
 def encodeProtocolInt16(value: np.int16, buffer: bytearray, offset: int = 0):
-    struct.pack_into("<h", buffer[offset:], int(np.int16(value)))
+    struct.pack_into("<h", buffer, offset, int(np.int16(value)))
 
-def decodeProtocolInt32(buffer: bytes, offset: int = 0) -> np.int32:
-    return np.int32(struct.unpack("<i", buffer[offset:]))
+def decodeProtocolInt32(buffer: bytes, offset: int = 0) -> int:
+    return struct.unpack_from("<i", buffer, offset)[0]
 def encodeProtocolInt32(value: np.int32, buffer: bytearray, offset: int = 0):
-    struct.pack_into("<i", buffer[offset:], int(np.int32(value)))
+    struct.pack_into("<i", buffer, offset, int(np.int32(value)))
 
 
     # -327.68 to +327.68
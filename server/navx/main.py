@@ -1,5 +1,5 @@
 from time import sleep
-from ahrs import AHRS
+from .ahrs import AHRS
 
 if __name__ == '__main__':
     print("Start")
@@ -0,0 +1,146 @@
+"""
+Per-packet decode benchmark for NavX updates
+
+Usage: python -m navx.protocol_bench [--number N]
+"""
+from argparse import ArgumentParser
+from timeit import timeit
+import numpy as np
+
+from . import imu_registers as IMURegisters
+from . import ahrs_protocol as P
+from .ahrs_protocol import AHRSPosTSUpdate, AHRSUpdate
+from .imu_protocol import GyroUpdate, GYRO_UPDATE_MESSAGE_LENGTH, decode_hex
+
+
+def legacy_checksum(buffer: bytes, content_length: int) -> bool:
+    "Byte loop with numpy scalars, as before"
+    checksum = np.uint8(0)
+    for c in buffer[0:content_length]:
+        checksum = np.uint8((int(checksum) + c) & 0xFF)
+    decoded = np.uint8(decode_hex(buffer[content_length]) * 16 + decode_hex(buffer[content_length + 1]))
+    return checksum == decoded
+
+
+def legacy_ahrspos_ts(update: AHRSPosTSUpdate, buffer: bytes):
+    "Field-at-a-time decode, as before"
+    if not legacy_checksum(buffer, P.AHRSPOS_TS_UPDATE_MESSAGE_CHECKSUM_INDEX):
+        return None
+    update.yaw = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_YAW_VALUE_INDEX)
+    update.pitch = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_PITCH_VALUE_INDEX)
+    update.roll = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_ROLL_VALUE_INDEX)
+    update.compass_heading = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_HEADING_VALUE_INDEX)
+    update.altitude = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_ALTITUDE_VALUE_INDEX)
+    update.fused_heading = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_FUSED_HEADING_VALUE_INDEX)
+    update.linear_accel_x = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_LINEAR_ACCEL_X_VALUE_INDEX)
+    update.linear_accel_y = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_LINEAR_ACCEL_Y_VALUE_INDEX)
+    update.linear_accel_z = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_LINEAR_ACCEL_Z_VALUE_INDEX)
+    update.vel_x = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_VEL_X_VALUE_INDEX)
+    update.vel_y = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_VEL_Y_VALUE_INDEX)
+    update.vel_z = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_VEL_Z_VALUE_INDEX)
+    update.disp_x = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_DISP_X_VALUE_INDEX)
+    update.disp_y = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_DISP_Y_VALUE_INDEX)
+    update.disp_z = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_DISP_Z_VALUE_INDEX)
+    update.mpu_temp = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, P.AHRSPOS_TS_UPDATE_MPU_TEMP_VAUE_INDEX)
+    update.quat_w = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_QUAT_W_VALUE_INDEX) / 16384.0
+    update.quat_x = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_QUAT_X_VALUE_INDEX) / 16384.0
+    update.quat_y = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_QUAT_Y_VALUE_INDEX) / 16384.0
+    update.quat_z = IMURegisters.decodeProtocol1616Float(buffer, P.AHRSPOS_TS_UPDATE_QUAT_Z_VALUE_INDEX) / 16384.0
+    update.op_status = np.uint8(buffer[P.AHRSPOS_TS_UPDATE_OPSTATUS_VALUE_INDEX])
+    update.sensor_status = np.uint8(buffer[P.AHRSPOS_TS_UPDATE_SENSOR_STATUS_VALUE_INDEX])
+    update.cal_status = np.uint8(buffer[P.AHRSPOS_TS_UPDATE_CAL_STATUS_VALUE_INDEX])
+    update.selftest_status = np.uint8(buffer[P.AHRSPOS_TS_UPDATE_SELFTEST_STATUS_VALUE_INDEX])
+    update.timestamp = np.uint32(IMURegisters.decodeProtocolInt32(buffer, P.AHRSPOS_TS_UPDATE_TIMESTAMP_INDEX) & 0xFFFFFFFF)
+    return P.AHRSPOS_TS_UPDATE_MESSAGE_LENGTH
+
+
+def legacy_ahrs(update: AHRSUpdate, buffer: bytes):
+    "Field-at-a-time decode, as before"
+    if not legacy_checksum(buffer, P.AHRS_UPDATE_MESSAGE_CHECKSUM_INDEX):
+        return None
+    update.yaw = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, P.AHRS_UPDATE_YAW_VALUE_INDEX)
+    update.pitch = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, P.AHRS_UPDATE_PITCH_VALUE_INDEX)
+    update.roll = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, P.AHRS_UPDATE_ROLL_VALUE_INDEX)
+    update.compass_heading = IMURegisters.decodeProtocolUnsignedHundredthsFloat(buffer, P.AHRS_UPDATE_HEADING_VALUE_INDEX)
+    update.altitude = IMURegisters.decodeProtocol1616Float(buffer, P.AHRS_UPDATE_ALTITUDE_VALUE_INDEX)
+    update.fused_heading = IMURegisters.decodeProtocolUnsignedHundredthsFloat(buffer, P.AHRS_UPDATE_FUSED_HEADING_VALUE_INDEX)
+    update.linear_accel_x = IMURegisters.decodeProtocolSignedThousandthsFloat(buffer, P.AHRS_UPDATE_LINEAR_ACCEL_X_VALUE_INDEX)
+    update.linear_accel_y = IMURegisters.decodeProtocolSignedThousandthsFloat(buffer, P.AHRS_UPDATE_LINEAR_ACCEL_Y_VALUE_INDEX)
+    update.linear_accel_z = IMURegisters.decodeProtocolSignedThousandthsFloat(buffer, P.AHRS_UPDATE_LINEAR_ACCEL_Z_VALUE_INDEX)
+    update.cal_mag_x = np.int16(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_CAL_MAG_X_VALUE_INDEX))
+    update.cal_mag_y = np.int16(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_CAL_MAG_Y_VALUE_INDEX))
+    update.cal_mag_z = np.int16(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_CAL_MAG_Z_VALUE_INDEX))
+    update.mag_field_norm_ratio = IMURegisters.decodeProtocolUnsignedHundredthsFloat(buffer, P.AHRS_UPDATE_CAL_MAG_NORM_RATIO_VALUE_INDEX)
+    update.mag_field_norm_scalar = IMURegisters.decodeProtocol1616Float(buffer, P.AHRS_UPDATE_CAL_MAG_SCALAR_VALUE_INDEX)
+    update.mpu_temp = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, P.AHRS_UPDATE_MPU_TEMP_VAUE_INDEX)
+    update.raw_mag_x = np.int16(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_RAW_MAG_X_VALUE_INDEX))
+    update.raw_mag_y = np.int16(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_RAW_MAG_Y_VALUE_INDEX))
+    update.raw_mag_z = np.int16(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_RAW_MAG_Z_VALUE_INDEX))
+    update.quat_w = float(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_QUAT_W_VALUE_INDEX)) / 16384.0
+    update.quat_x = float(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_QUAT_X_VALUE_INDEX)) / 16384.0
+    update.quat_y = float(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_QUAT_Y_VALUE_INDEX)) / 16384.0
+    update.quat_z = float(IMURegisters.decodeProtocolInt16(buffer, P.AHRS_UPDATE_QUAT_Z_VALUE_INDEX)) / 16384.0
+    update.barometric_pressure = IMURegisters.decodeProtocol1616Float(buffer, P.AHRS_UPDATE_BARO_PRESSURE_VALUE_INDEX)
+    update.baro_temp = IMURegisters.decodeProtocolSignedHundredthsFloat(buffer, P.AHRS_UPDATE_BARO_TEMP_VAUE_INDEX)
+    update.op_status = np.uint8(buffer[P.AHRS_UPDATE_OPSTATUS_VALUE_INDEX])
+    update.sensor_status = np.uint8(buffer[P.AHRS_UPDATE_SENSOR_STATUS_VALUE_INDEX])
+    update.cal_status = np.uint8(buffer[P.AHRS_UPDATE_CAL_STATUS_VALUE_INDEX])
+    update.selftest_status = np.uint8(buffer[P.AHRS_UPDATE_SELFTEST_STATUS_VALUE_INDEX])
+    return P.AHRS_UPDATE_MESSAGE_LENGTH
+
+
+def legacy_gyro(update: GyroUpdate, buffer: bytes):
+    "Hex digit at a time, as before"
+    if not legacy_checksum(buffer, 42):
+        return None
+    def uint16(offset: int):
+        value = np.uint16(0)
+        for i in range(4):
+            value = np.uint16((int(value) << 4) | decode_hex(buffer[offset + i]))
+        return value
+    update.gyro_x = uint16(2)
+    update.gyro_y = uint16(6)
+    update.gyro_z = uint16(10)
+    update.accel_x = uint16(14)
+    update.accel_y = uint16(18)
+    update.accel_z = uint16(22)
+    update.mag_x = np.int16(int(uint16(26)) - (0x10000 if uint16(26) & 0x8000 else 0))
+    update.mag_y = np.int16(int(uint16(30)) - (0x10000 if uint16(30) & 0x8000 else 0))
+    update.mag_z = np.int16(int(uint16(34)) - (0x10000 if uint16(34) & 0x8000 else 0))
+    update.temp_c = float(uint16(38)) / 100.0
+    return GYRO_UPDATE_MESSAGE_LENGTH
+
+
+def main():
+    parser = ArgumentParser(description="Compare field-at-a-time and precompiled struct NavX decoding")
+    parser.add_argument('--number', type=int, default=20_000, help="Packets per measurement")
+    args = parser.parse_args()
+
+    ts_buf = bytearray(P.AHRSPOS_TS_UPDATE_MESSAGE_LENGTH)
+    AHRSPosTSUpdate(yaw=12.5, pitch=-1.25, roll=3.0, linear_accel_x=0.5, quat_w=0.75, timestamp=123456).encode(ts_buf)
+    ahrs_buf = bytearray(P.AHRS_UPDATE_MESSAGE_LENGTH)
+    AHRSUpdate(yaw=12.5, pitch=-1.25, roll=3.0, linear_accel_x=0.5, quat_w=0.75, raw_mag_x=-40).encode(ahrs_buf)
+    gyro_buf = bytearray(GYRO_UPDATE_MESSAGE_LENGTH)
+    GyroUpdate(gyro_x=100, accel_z=16384, mag_x=-20, temp_c=30.5).encode(gyro_buf)
+
+    cases = [
+        ("AHRSPosTSUpdate", AHRSPosTSUpdate(), legacy_ahrspos_ts, memoryview(ts_buf)),
+        ("AHRSUpdate", AHRSUpdate(), legacy_ahrs, memoryview(ahrs_buf)),
+        ("GyroUpdate", GyroUpdate(), legacy_gyro, memoryview(gyro_buf)),
+    ]
+    print(f"{'packet':<16} {'per-field':>11} {'struct':>10} {'unchecked':>10} {'speedup':>8}")
+    for name, update, legacy, buf in cases:
+        # Sanity check that both decode the same thing
+        expected = type(update)()
+        assert legacy(expected, buf) is not None
+        assert update.decode(buf) is not None
+        assert update == expected, (update, expected)
+
+        old_us = timeit(lambda: legacy(update, buf), number=args.number) / args.number * 1e6
+        new_us = timeit(lambda: update.decode(buf), number=args.number) / args.number * 1e6
+        unchecked_us = timeit(lambda: update.decode(buf, checksum=False), number=args.number) / args.number * 1e6
+        print(f"{name:<16} {old_us:9.2f}us {new_us:8.2f}us {unchecked_us:8.2f}us {old_us / new_us:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
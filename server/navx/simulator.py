@@ -0,0 +1,278 @@
+"""
+Simulated navX board on a pseudo-terminal, for exercising `SerialIO`/`AHRS` without hardware.
+
+The simulator answers stream configuration and board identity requests, then streams AHRSPosTS
+updates (synthetic, or re-stamped from a capture) at the requested rate. Packets can be corrupted,
+or split across writes, to exercise the receive path.
+
+Usage: python -m navx.simulator [--rate HZ] [--corrupt P] [--partial P] [--input capture.bin]
+"""
+from typing import Optional, Sequence
+from dataclasses import dataclass
+from argparse import ArgumentParser
+from pathlib import Path
+from threading import Thread, Event
+import math
+import os
+import pty
+import random
+import select
+import time
+import tty
+
+from .framing import PacketFramer
+from .imu_protocol import (
+    StreamResponse,
+    MSGID_STREAM_CMD,
+    STREAM_CMD_UPDATE_RATE_HZ_INDEX,
+    STREAM_RESPONSE_MESSAGE_LENGTH,
+    NAV6_CALIBRATION_STATE_COMPLETE,
+)
+from .ahrs_protocol import (
+    AHRSPosTSUpdate, BoardID,
+    AHRS_DATA_TYPE,
+    MSGID_AHRSPOS_TS_UPDATE,
+    MSGID_DATA_REQUEST,
+    DATA_REQUEST_DATATYPE_VALUE_INDEX,
+    AHRSPOS_TS_UPDATE_MESSAGE_LENGTH,
+    BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH,
+)
+from .imu_registers import (
+    NAVX_CAPABILITY_FLAG_VEL_AND_DISP,
+    NAVX_CAPABILITY_FLAG_YAW_RESET,
+    NAVX_CAPABILITY_FLAG_AHRSPOS_TS,
+)
+
+DEFAULT_CAPABILITIES = NAVX_CAPABILITY_FLAG_VEL_AND_DISP | NAVX_CAPABILITY_FLAG_YAW_RESET | NAVX_CAPABILITY_FLAG_AHRSPOS_TS
+MAX_PENDING_BYTES = 4096
+"Unsent bytes to buffer before dropping updates (like a UART with nobody listening)"
+
+
+@dataclass
+class SimulatorStats:
+    packets: int = 0
+    "Updates sent"
+    corrupted: int = 0
+    "Updates sent with a corrupted byte"
+    partial_writes: int = 0
+    "Updates split across two writes"
+    dropped: int = 0
+    "Updates dropped because the reader wasn't keeping up"
+    bytes_written: int = 0
+    stream_commands: int = 0
+    board_id_requests: int = 0
+
+
+def sensor_clock_ns(mono_ns: int, offset_ms: int, drift: float) -> int:
+    "Simulated sensor time at `time.monotonic_ns() == mono_ns` (before truncating to ms)"
+    return round(mono_ns * (1.0 + drift)) + offset_ms * 1_000_000
+
+
+def load_capture(path: Path) -> list[AHRSPosTSUpdate]:
+    "Read the AHRSPosTS updates from a raw serial capture"
+    updates: list[AHRSPosTSUpdate] = []
+    def on_update(packet: memoryview):
+        update = AHRSPosTSUpdate()
+        if update.decode(packet, checksum=False) is not None:
+            updates.append(update)
+    framer = PacketFramer({ord(MSGID_AHRSPOS_TS_UPDATE): on_update})
+    framer.feed(path.read_bytes())
+    return updates
+
+
+class NavXSimulator:
+    """
+    Simulated navX on a pty. Connect to `port` like a real board.
+
+    Sensor time counts `time.monotonic_ns()`, scaled by `1 + drift` and shifted by `offset_ms`, so
+    the true sensor -> monotonic offset is known (see `sensor_time_ns`).
+    """
+    def __init__(self,
+                 rate_hz: Optional[int] = None, *,
+                 updates: Optional[Sequence[AHRSPosTSUpdate]] = None,
+                 corrupt: float = 0.0,
+                 partial: float = 0.0,
+                 offset_ms: int = 1_000_000,
+                 drift: float = 0.0,
+                 yaw_rate: float = 90.0,
+                 capabilities: int = DEFAULT_CAPABILITIES,
+                 board_id: Optional[BoardID] = None,
+                 seed: int = 0) -> None:
+        self.rate_hz = rate_hz
+        "Update rate (if `None`, use the rate from the stream command)"
+        self.updates = updates
+        "Updates to replay (re-stamped with the sensor time). If `None`, the board spins at `yaw_rate` (deg/s)."
+        self.corrupt = corrupt
+        "Fraction of updates with a corrupted byte"
+        self.partial = partial
+        "Fraction of updates split across writes"
+        self.offset_ms = offset_ms
+        self.drift = drift
+        self.yaw_rate = yaw_rate
+        self.capabilities = capabilities
+        self.board_id = board_id or BoardID(type=50, hw_rev=33, fw_ver_major=3, fw_ver_minor=1, fw_revision=400, unique_id=list(range(12)))
+        self.stats = SimulatorStats()
+
+        self._rng = random.Random(seed)
+        self._streaming_rate: Optional[int] = None
+        self._pending = bytearray()
+        self._update = AHRSPosTSUpdate(op_status=0x04, selftest_status=0x07)
+        self._update_buf = bytearray(AHRSPOS_TS_UPDATE_MESSAGE_LENGTH)
+        self._framer = PacketFramer({
+            ord(MSGID_STREAM_CMD): self._handle_stream_command,
+            ord(MSGID_DATA_REQUEST): self._handle_data_request,
+        })
+
+        self._master, self._slave = pty.openpty()
+        # Keep the slave open (so the master doesn't see EOF when a client closes it) and raw (no echo)
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        "Path to connect to"
+
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def sensor_time_ns(self, mono_ns: int) -> int:
+        "Sensor time at `time.monotonic_ns() == mono_ns` (before truncating to ms)"
+        return sensor_clock_ns(mono_ns, self.offset_ms, self.drift)
+
+    def start(self):
+        self._thread = Thread(target=self._run, name="NavX simulator", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        os.close(self._master)
+        os.close(self._slave)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write(self, data: bytes | bytearray | memoryview):
+        "Write (or queue) data to the port"
+        pending = self._pending
+        if len(pending) > 0:
+            pending += data
+            data = pending
+        try:
+            written = os.write(self._master, data)
+        except BlockingIOError:
+            written = 0
+        self.stats.bytes_written += written
+        # `data` may alias `pending`
+        self._pending = bytearray(data[written:])
+
+    def _handle_stream_command(self, packet: memoryview):
+        self.stats.stream_commands += 1
+        rate = int(bytes(packet[STREAM_CMD_UPDATE_RATE_HZ_INDEX:STREAM_CMD_UPDATE_RATE_HZ_INDEX + 2]), 16)
+        self._streaming_rate = self.rate_hz or rate or 60
+        response = StreamResponse(
+            # Only AHRSPosTS updates are simulated
+            stream_type=ord(MSGID_AHRSPOS_TS_UPDATE),
+            gyro_fsr_dps=2000,
+            accel_fsr_g=2,
+            update_rate_hz=self._streaming_rate,
+            flags=self.capabilities | NAV6_CALIBRATION_STATE_COMPLETE,
+        )
+        buf = bytearray(STREAM_RESPONSE_MESSAGE_LENGTH)
+        response.encode(buf)
+        self._write(buf)
+
+    def _handle_data_request(self, packet: memoryview):
+        if packet[DATA_REQUEST_DATATYPE_VALUE_INDEX] == AHRS_DATA_TYPE.BOARD_IDENTITY:
+            self.stats.board_id_requests += 1
+            buf = bytearray(BOARD_IDENTITY_RESPONSE_MESSAGE_LENGTH)
+            self.board_id.encode(buf)
+            self._write(buf)
+
+    def _next_update(self, mono_ns: int) -> AHRSPosTSUpdate:
+        if self.updates:
+            update = self.updates[self.stats.packets % len(self.updates)]
+        else:
+            update = self._update
+            yaw = (self.yaw_rate * mono_ns * 1e-9 + 180.0) % 360.0 - 180.0
+            update.yaw = yaw
+            update.quat_w = math.cos(math.radians(yaw) / 2)
+            update.quat_z = math.sin(math.radians(yaw) / 2)
+            update.linear_accel_x = 0.1 * math.sin(mono_ns * 1e-9)
+        update.timestamp = (self.sensor_time_ns(mono_ns) // 1_000_000) & 0xFFFF_FFFF
+        return update
+
+    def _send_update(self, mono_ns: int):
+        if len(self._pending) > MAX_PENDING_BYTES:
+            self.stats.dropped += 1
+            return
+        buf = self._update_buf
+        self._next_update(mono_ns).encode(buf)
+        self.stats.packets += 1
+        data = memoryview(buf)
+        if self._rng.random() < self.corrupt:
+            buf[self._rng.randrange(len(buf))] ^= self._rng.randrange(1, 256)
+            self.stats.corrupted += 1
+        if self._rng.random() < self.partial:
+            # Send the rest with the next update
+            split = self._rng.randrange(1, len(buf))
+            self._write(data[:split])
+            self._pending += data[split:]
+            self.stats.partial_writes += 1
+        else:
+            self._write(data)
+
+    def _run(self):
+        next_update = time.monotonic()
+        while not self._stop.is_set():
+            if self._streaming_rate is None:
+                timeout = 0.1
+            else:
+                timeout = max(0.0, next_update - time.monotonic())
+            readable, _, _ = select.select([self._master], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self._master, 256)
+                except (BlockingIOError, OSError):
+                    data = b''
+                if data:
+                    self._framer.feed(data)
+
+            if self._streaming_rate is None:
+                continue
+            now = time.monotonic()
+            if now >= next_update:
+                self._send_update(time.monotonic_ns())
+                period = 1.0 / self._streaming_rate
+                next_update += period
+                if next_update < now:
+                    # Fell behind, so don't burst
+                    next_update = now + period
+
+
+def main():
+    parser = ArgumentParser(description="Simulate a navX on a pseudo-terminal")
+    parser.add_argument('--rate', type=int, default=None, help="Update rate (Hz), overriding the stream command")
+    parser.add_argument('--corrupt', type=float, default=0.0, help="Fraction of corrupted updates")
+    parser.add_argument('--partial', type=float, default=0.0, help="Fraction of updates split across writes")
+    parser.add_argument('--drift', type=float, default=0.0, help="Sensor clock drift (dimensionless)")
+    parser.add_argument('--input', type=Path, help="Raw serial capture to replay")
+    args = parser.parse_args()
+
+    updates = load_capture(args.input) if args.input is not None else None
+    with NavXSimulator(args.rate, updates=updates, corrupt=args.corrupt, partial=args.partial, drift=args.drift) as sim:
+        print(f"Simulating navX on {sim.port}")
+        try:
+            while True:
+                time.sleep(1.0)
+                print(sim.stats)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark the navX driver against the pty simulator: CPU cost of the serial thread, and the
+accuracy of the sensor clock offset estimate.
+
+Usage: python -m navx.simulator_bench [--rate HZ] [--seconds S] [--corrupt P] [--partial P] [--drift D]
+
+The simulator runs in its own process, so this process' CPU time is (almost) all driver.
+"""
+from argparse import ArgumentParser
+from multiprocessing import get_context
+import time
+
+import numpy as np
+
+from util.clock_sync import MinOffsetEstimator
+from .simulator import NavXSimulator, sensor_clock_ns
+from .ahrs import AHRS, SerialDataType
+
+
+def run_simulator(kwargs: dict, conn, stop):
+    with NavXSimulator(**kwargs) as sim:
+        conn.send(sim.port)
+        stop.wait()
+        conn.send(sim.stats)
+
+
+def main():
+    parser = ArgumentParser(description="Run the navX driver against a simulated board")
+    parser.add_argument('--rate', type=int, default=200, help="Update rate (Hz)")
+    parser.add_argument('--seconds', type=float, default=10.0, help="Benchmark length (s)")
+    parser.add_argument('--corrupt', type=float, default=0.01, help="Fraction of corrupted updates")
+    parser.add_argument('--partial', type=float, default=0.1, help="Fraction of updates split across writes")
+    parser.add_argument('--drift', type=float, default=50e-6, help="Sensor clock drift (dimensionless)")
+    args = parser.parse_args()
+
+    sim_args = dict(rate_hz=args.rate, corrupt=args.corrupt, partial=args.partial, offset_ms=1_000_000, drift=args.drift)
+    ctx = get_context('spawn')
+    conn, child_conn = ctx.Pipe()
+    stop = ctx.Event()
+    proc = ctx.Process(target=run_simulator, args=(sim_args, child_conn, stop), name='navx-sim', daemon=True)
+    proc.start()
+    port = conn.recv()
+
+    estimator = MinOffsetEstimator()
+    def on_update(sys_ts: int, sensor_ts: int, update):
+        estimator.add_sample(int(sensor_ts) * 1_000_000, time.monotonic_ns())
+
+    with AHRS(port, SerialDataType.PROCESSED_DATA, args.rate) as navx:
+        navx.register_callback(on_update)
+        # Skip connection setup
+        time.sleep(1.0)
+        updates0 = navx._io.update_count
+        cpu0 = time.process_time()
+        wall0 = time.perf_counter()
+        time.sleep(args.seconds)
+        cpu = time.process_time() - cpu0
+        wall = time.perf_counter() - wall0
+        updates = navx._io.update_count - updates0
+        framer_stats = navx._io.framer.stats
+        fit = estimator.fit()
+        now = time.monotonic_ns()
+
+    stop.set()
+    sim_stats = conn.recv()
+    proc.join()
+
+    print(f"updates: {updates} in {wall:.2f}s ({updates / wall:.1f} Hz)")
+    print(f"cpu: {cpu * 1e3 / wall:.2f} ms/s ({cpu / wall:.2%}), {cpu / max(updates, 1) * 1e6:.1f} us/update")
+    print(f"simulator: {sim_stats}")
+    print(f"framer: {framer_stats}")
+    if fit is None:
+        print("offset: no estimate")
+        return
+    sensor_now = sensor_clock_ns(now, sim_args['offset_ms'], args.drift)
+    true_offset = now - sensor_now
+    est_offset = int(fit.offsets(np.array([sensor_now]))[0])
+    true_drift = 1.0 / (1.0 + args.drift) - 1.0
+    print(f"offset error: {(est_offset - true_offset) / 1e3:+.1f} us (latency {fit.latency / 1e3:.1f} us, jitter {fit.jitter / 1e3:.1f} us)")
+    print(f"drift: {fit.drift * 1e6:+.2f} ppm (true {true_drift * 1e6:+.2f} ppm)")
+
+
+if __name__ == '__main__':
+    main()
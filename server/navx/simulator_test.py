@@ -0,0 +1,49 @@
+from unittest import TestCase
+import time
+
+from .simulator import NavXSimulator
+from .ahrs import AHRS, SerialDataType
+from .ahrs_protocol import MSGID_AHRSPOS_TS_UPDATE
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class NavXSimulatorTest(TestCase):
+    def test_connect(self):
+        "The real driver configures the stream, and receives updates"
+        with NavXSimulator(offset_ms=5_000) as sim:
+            updates = []
+            with AHRS(sim.port, SerialDataType.PROCESSED_DATA, 100) as navx:
+                navx.register_callback(lambda sys_ts, sensor_ts, update: updates.append((sensor_ts, update.yaw)))
+                self.assertTrue(wait_for(lambda: len(updates) >= 20))
+                self.assertEqual(navx._io.update_type, MSGID_AHRSPOS_TS_UPDATE)
+                self.assertEqual(navx._update_rate_hz, 100)
+                self.assertEqual(navx._board_type, sim.board_id.type)
+                self.assertTrue(navx.is_connected())
+            self.assertEqual(sim.stats.stream_commands, 1)
+            self.assertEqual(sim.stats.board_id_requests, 1)
+
+        # Sensor time is in ms, and increasing
+        stamps = [ts for ts, _ in updates]
+        self.assertEqual(stamps, sorted(stamps))
+        self.assertGreater(stamps[0], 5_000)
+
+    def test_corruption(self):
+        "Corrupt and split packets are dropped, without losing the stream"
+        with NavXSimulator(200, corrupt=0.1, partial=0.5, seed=1) as sim:
+            with AHRS(sim.port, SerialDataType.PROCESSED_DATA, 200) as navx:
+                self.assertTrue(wait_for(lambda: sim.stats.corrupted >= 5 and navx._io.update_count >= 50))
+                sent = sim.stats.packets - sim.stats.corrupted
+                received = navx._io.update_count
+                stats = navx._io.framer.stats
+        self.assertGreater(sim.stats.partial_writes, 0)
+        self.assertGreater(stats.checksum_errors + stats.discarded_bytes, 0)
+        # Allow for a few in flight, or lost with a corrupted neighbour
+        self.assertGreaterEqual(received, sent * 0.8)
@@ -0,0 +1,205 @@
+"""
+Low-latency `field`→`robot` pose stream over UDP (an alternative to NetworkTables' `tf_field_robot`).
+
+Every fresh pose is sent as one fixed-size little-endian datagram ([POSE_DATAGRAM]):
+
+| Field       | Type       | Description                                          |
+| ----------- | ---------- | ---------------------------------------------------- |
+| magic       | `char[4]`  | `MNP1`                                               |
+| sequence    | `uint32`   | Incremented every datagram (wraps)                   |
+| timestamp   | `int64`    | When the pose is for (Rio time, microseconds)        |
+| sent        | `int64`    | When the datagram was sent (Rio time, microseconds)  |
+| pose        | `double[7]`| Translation (x, y, z), then quaternion (w, x, y, z)  |
+| variance    | `double[6]`| Variance of (x, y, z, roll, pitch, yaw), NaN if unknown |
+
+Usage (stand-in receiver): python -m pose_udp [--host HOST] [--port PORT]
+"""
+from typing import Optional, Sequence
+from dataclasses import dataclass, field
+from argparse import ArgumentParser
+from struct import Struct
+import math
+import socket
+import time
+
+import numpy as np
+
+from typedef.geom import Pose3d, Translation3d, Rotation3d, Quaternion
+from wpi_compat.struct_pack import pose3d_fields
+
+POSE_MAGIC = b'MNP1'
+POSE_DATAGRAM = Struct('<4sIqq7d6d')
+"Datagram layout (128 bytes)"
+DEFAULT_PORT = 5811
+
+_NO_VARIANCE = (math.nan,) * 6
+
+
+@dataclass
+class PoseDatagram:
+	sequence: int
+	timestamp: int
+	"When the pose is for (Rio time, microseconds)"
+	sent: int
+	"When the datagram was sent (Rio time, microseconds)"
+	pose: Pose3d
+	variance: tuple[float, ...] = _NO_VARIANCE
+	"Variance of (x, y, z, roll, pitch, yaw)"
+
+	@staticmethod
+	def decode(data: bytes | memoryview) -> Optional['PoseDatagram']:
+		"Decode a datagram (or `None` if it isn't one)"
+		if len(data) != POSE_DATAGRAM.size:
+			return None
+		magic, sequence, timestamp, sent, x, y, z, qw, qx, qy, qz, *variance = POSE_DATAGRAM.unpack(data)
+		if magic != POSE_MAGIC:
+			return None
+		pose = Pose3d(Translation3d(x, y, z), Rotation3d(Quaternion(qw, qx, qy, qz)))
+		return PoseDatagram(sequence, timestamp, sent, pose, tuple(variance))
+
+
+class PoseUdpPublisher:
+	"Sends poses to a UDP endpoint (without blocking)"
+	def __init__(self, host: str, port: int = DEFAULT_PORT) -> None:
+		self.address = (host, port)
+		self.sequence = 0
+		"Sequence number of the next datagram"
+		self.sent = 0
+		self.dropped = 0
+		"Datagrams that couldn't be sent (e.g. socket buffer full, or no route)"
+		self._buffer = bytearray(POSE_DATAGRAM.size)
+		self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self._sock.setblocking(False)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		self._sock.close()
+
+	def send(self, pose: Pose3d, timestamp: int, sent: int, variance: Optional[Sequence[float]] = None) -> bool:
+		"""
+		Send a pose
+
+		Parameters:
+		 - pose: `field`→`robot` pose
+		 - timestamp: When the pose is for (Rio time, microseconds)
+		 - sent: Now (Rio time, microseconds)
+		 - variance: Variance of (x, y, z, roll, pitch, yaw), if known
+		"""
+		POSE_DATAGRAM.pack_into(
+			self._buffer, 0,
+			POSE_MAGIC,
+			self.sequence,
+			timestamp,
+			sent,
+			*pose3d_fields(pose),
+			*(_NO_VARIANCE if variance is None else variance),
+		)
+		self.sequence = (self.sequence + 1) & 0xFFFF_FFFF
+		try:
+			self._sock.sendto(self._buffer, self.address)
+		except OSError:
+			# Includes BlockingIOError
+			self.dropped += 1
+			return False
+		self.sent += 1
+		return True
+
+
+@dataclass
+class ReceiverStats:
+	received: int = 0
+	invalid: int = 0
+	"Datagrams that weren't poses"
+	lost: int = 0
+	"Gaps in the sequence numbers"
+	reordered: int = 0
+	"Datagrams older than the latest one"
+	latency_us: list[int] = field(default_factory=list)
+	"Transport latency of each datagram (now - sent)"
+
+
+class PoseUdpReceiver:
+	"Receives poses (a stand-in for the Rio, for testing and latency measurement)"
+	def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> None:
+		self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self._sock.bind((host, port))
+		self.address = self._sock.getsockname()
+		"Bound address (useful with `port=0`)"
+		self.stats = ReceiverStats()
+		self._last_sequence: Optional[int] = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		self._sock.close()
+
+	def recv(self, timeout: Optional[float] = None, now: Optional[int] = None) -> Optional[PoseDatagram]:
+		"""
+		Wait for a pose (or `None` on timeout)
+
+		Parameters:
+		 - timeout: Seconds to wait (`None` waits forever)
+		 - now: Receive time (Rio time, microseconds) for latency stats. Defaults to wall time.
+		"""
+		self._sock.settimeout(timeout)
+		try:
+			data = self._sock.recv(POSE_DATAGRAM.size + 1)
+		except TimeoutError:
+			return None
+		if now is None:
+			now = time.time_ns() // 1_000
+		stats = self.stats
+		if (msg := PoseDatagram.decode(data)) is None:
+			stats.invalid += 1
+			return None
+		stats.received += 1
+		stats.latency_us.append(now - msg.sent)
+		if (last := self._last_sequence) is not None:
+			gap = (msg.sequence - last) & 0xFFFF_FFFF
+			if gap == 0 or gap > 0x7FFF_FFFF:
+				stats.reordered += 1
+				return msg
+			stats.lost += gap - 1
+		self._last_sequence = msg.sequence
+		return msg
+
+
+def main():
+	parser = ArgumentParser(description="Receive MOEnet UDP poses, and report latency")
+	parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+	parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on")
+	args = parser.parse_args()
+
+	with PoseUdpReceiver(args.host, args.port) as receiver:
+		print(f"Listening on {receiver.address[0]}:{receiver.address[1]}")
+		stats = receiver.stats
+		last_report = time.monotonic()
+		latest = None
+		try:
+			while True:
+				if (msg := receiver.recv(timeout=1.0)) is not None:
+					latest = msg
+				if (now := time.monotonic()) - last_report < 1.0:
+					continue
+				last_report = now
+				if len(stats.latency_us) == 0:
+					print("No poses")
+					continue
+				p50, p99, pmax = np.percentile(stats.latency_us, (50, 99, 100))
+				print(f"{len(stats.latency_us)} poses (lost {stats.lost}, reordered {stats.reordered}, invalid {stats.invalid}) latency p50={p50:.0f}us p99={p99:.0f}us max={pmax:.0f}us pose={latest.pose}")
+				stats.latency_us.clear()
+		except KeyboardInterrupt:
+			pass
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,46 @@
+from unittest import TestCase
+import math
+
+from pose_udp import PoseUdpPublisher, PoseUdpReceiver, PoseDatagram, POSE_DATAGRAM
+from typedef.geom import Pose3d, Translation3d, Rotation3d
+
+
+class PoseUdpTest(TestCase):
+	def test_roundtrip(self):
+		pose = Pose3d(Translation3d(1.0, 2.0, 0.5), Rotation3d(0.1, 0.2, 0.3))
+		with PoseUdpReceiver(port=0) as receiver, PoseUdpPublisher(*receiver.address) as publisher:
+			self.assertTrue(publisher.send(pose, 1_000, 1_250))
+			self.assertTrue(publisher.send(pose, 2_000, 2_250, variance=(1, 2, 3, 4, 5, 6)))
+
+			msg = receiver.recv(timeout=1.0, now=1_500)
+			self.assertIsNotNone(msg)
+			self.assertEqual(msg.sequence, 0)
+			self.assertEqual(msg.timestamp, 1_000)
+			self.assertEqual(msg.sent, 1_250)
+			self.assertTrue(all(math.isnan(v) for v in msg.variance), "No variance")
+			self.assertAlmostEqual(msg.pose.translation().x, 1.0)
+			self.assertAlmostEqual(msg.pose.translation().y, 2.0)
+			self.assertAlmostEqual(msg.pose.translation().z, 0.5)
+			self.assertAlmostEqual(msg.pose.rotation().z, 0.3)
+
+			msg = receiver.recv(timeout=1.0, now=2_300)
+			self.assertEqual(msg.sequence, 1)
+			self.assertEqual(msg.variance, (1, 2, 3, 4, 5, 6))
+			self.assertEqual(receiver.stats.latency_us, [250, 50])
+			self.assertEqual(receiver.stats.lost, 0)
+
+	def test_lost(self):
+		pose = Pose3d()
+		with PoseUdpReceiver(port=0) as receiver, PoseUdpPublisher(*receiver.address) as publisher:
+			publisher.send(pose, 0, 0)
+			# Skip two datagrams
+			publisher.sequence += 2
+			publisher.send(pose, 0, 0)
+			self.assertEqual(receiver.recv(timeout=1.0).sequence, 0)
+			self.assertEqual(receiver.recv(timeout=1.0).sequence, 3)
+			self.assertEqual(receiver.stats.lost, 2)
+			self.assertEqual(receiver.stats.reordered, 0)
+
+	def test_invalid(self):
+		self.assertIsNone(PoseDatagram.decode(b'MNP1'))
+		self.assertIsNone(PoseDatagram.decode(bytes(POSE_DATAGRAM.size)), "Bad magic")
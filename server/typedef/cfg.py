@@ -16,8 +16,8 @@ except ImportError:
 class ObjectTrackerConfig(BaseModel):
 	"Configuration for tracking object detections over time"
 	min_detections: int = Field(8, gt=0, description="Number of times to have seen an object before accepting it")
-	detected_duration: timedelta = Field(timedelta(seconds=1), description="Length of time to keep an object detecting (seconds)")
-	history_duration: timedelta = Field(timedelta(seconds=8), description="Length of time to retain an object detection (seconds)")
+	detected_duration: common.DurationField = Field(timedelta(seconds=1), validate_default=True, description="Length of time to keep an object detecting (seconds)")
+	history_duration: common.DurationField = Field(timedelta(seconds=8), validate_default=True, description="Length of time to retain an object detection (seconds)")
 	clustering_distance: float = Field(0.3, gt=0, description="")
 	min_depth: float = Field(0.5, gt=0, description="")
 	alpha: float = Field(0.2, gt=0, description="")
@@ -31,11 +31,45 @@ class AprilTagStrategy(enum.StrEnum):
 	AVERAGE_BEST_TARGETS = enum.auto()
 	"Return the average of the best target poses using ambiguity as weight"
 
+class PoseEstimatorEngine(enum.StrEnum):
+	"Which pose estimator should we use?"
+	SIMPLE = enum.auto()
+	"Pick one AprilTag solution per frame (see `apriltagStrategy`)"
+	PARTICLE = enum.auto()
+	"Monte Carlo localization, weighted against all AprilTag solutions"
+	SMOOTHER = enum.auto()
+	"Fixed-lag pose graph smoother over SLAM odometry and AprilTag poses"
+
+class ParticleFilterConfig(BaseModel):
+	"Configuration for Monte Carlo localization"
+	count: int = Field(10_000, gt=0, description="Number of particles")
+	odometryNoise: tuple[float, float, float] = Field((0.05, 0.05, 0.05), description="Odometry noise, as a fraction of each motion update (x, y, θ)")
+	minOdometryNoise: tuple[float, float, float] = Field((0.002, 0.002, 0.002), description="Minimum odometry noise per motion update (meters, meters, radians)")
+	measurementStdDevs: tuple[float, float, float] = Field((0.1, 0.1, 0.05), description="AprilTag pose noise (meters, meters, radians)")
+	resampleThreshold: float = Field(0.5, gt=0, le=1, description="Resample when the effective number of particles drops below this fraction")
+	seed: Optional[int] = Field(None, description="Random seed (for reproducibility)")
+
+class SmootherConfig(BaseModel):
+	"Configuration for the fixed-lag pose graph smoother"
+	window: common.DurationField = Field(timedelta(seconds=2), validate_default=True, description="Length of the sliding window (older poses are marginalized)")
+	nodeSpacing: common.DurationField = Field(timedelta(milliseconds=20), validate_default=True, description="Minimum time between pose nodes")
+	budget: common.DurationField = Field(timedelta(milliseconds=5), validate_default=True, description="Time budget for each solve")
+	maxIterations: int = Field(10, gt=0, description="Maximum Gauss-Newton/LM iterations per solve")
+	odometryNoise: tuple[float, float, float] = Field((0.05, 0.05, 0.05), description="Odometry noise, as a fraction of each relative motion (x, y, θ)")
+	minOdometryNoise: tuple[float, float, float] = Field((0.002, 0.002, 0.002), description="Minimum odometry noise between nodes (meters, meters, radians)")
+	measurementStdDevs: tuple[float, float, float] = Field((0.1, 0.1, 0.05), description="AprilTag pose noise (meters, meters, radians)")
+	priorStdDevs: tuple[float, float, float] = Field((10.0, 10.0, 3.2), description="Prior on the first pose, before any AprilTags are seen (meters, meters, radians)")
+	maxVelocity: tuple[float, float, float] = Field((4.0, 4.0, 6.3), description="Maximum robot velocity, used as noise between poses not covered by odometry (m/s, m/s, rad/s)")
+	huberThreshold: float = Field(2.0, gt=0, description="Robust loss threshold for AprilTag factors (standard deviations)")
+
 class PoseEstimatorConfig(BaseModel):
-	history: timedelta = Field(timedelta(seconds=3), description="Length of pose replay buffer (seconds)")
+	history: common.DurationField = Field(timedelta(seconds=3), validate_default=True, description="Length of pose replay buffer (seconds)")
 	force2d: bool = Field(True, description="Should we force the pose to fit on the field?")
 	apriltagStrategy: AprilTagStrategy | None = Field(default=AprilTagStrategy.LOWEST_AMBIGUITY)
 	odometryStdDevs: list[float] = Field([])
+	engine: PoseEstimatorEngine = Field(PoseEstimatorEngine.SIMPLE, description="Pose estimator engine")
+	particles: ParticleFilterConfig = Field(default_factory=ParticleFilterConfig, description="Configure particle filter (when engine is 'particle')")
+	smoother: SmootherConfig = Field(default_factory=SmootherConfig, description="Configure pose graph smoother (when engine is 'smoother')")
 
 class PoseEstimatorConfig1(BaseModel):
 	publish_transform: bool = Field(True)
@@ -47,7 +81,7 @@ class PoseEstimatorConfig1(BaseModel):
 	apriltagStrategy: AprilTagStrategy | None = Field(default=AprilTagStrategy.LOWEST_AMBIGUITY)
 
 	smooth_lagged_data: bool = Field(False)
-	history_length: timedelta = Field(timedelta(seconds=0.0))
+	history_length: common.DurationField = Field(timedelta(seconds=0.0), validate_default=True)
 	force_2d: bool = Field(False)
 	update_frequency: float = Field(30)
 	publish_transform = Field(True)
@@ -66,6 +100,7 @@ class PoseEstimatorConfig1(BaseModel):
 class EstimatorConfig(BaseModel):
 	detections: ObjectTrackerConfig = Field(default_factory=ObjectTrackerConfig)
 	pose: PoseEstimatorConfig = Field(default_factory=PoseEstimatorConfig)
+	max_lateness: common.DurationField = Field(timedelta(milliseconds=50), validate_default=True, description="Maximum expected lateness of camera packets. Packets from all cameras are held this long so they can be processed in timestamp order.")
 
 
 class WebConfig(BaseModel):
@@ -77,6 +112,12 @@ class WebConfig(BaseModel):
 	cert_file: Optional[Path] = Field(None, description="SSL certificate file (for HTTPS)")
 	key_file: Optional[Path] = Field(None, description="SSL key file (for HTTPS)")
 
+class PoseUdpConfig(BaseModel):
+	"Stream `field`→`robot` poses over UDP (lower latency than NetworkTables)"
+	enabled: bool = Field(False, description="Send poses over UDP?")
+	host: str = Field("10.3.65.2", description="Host to send poses to (usually the RoboRIO)")
+	port: int = Field(5811, gt=0, lt=65536, description="UDP port to send poses to")
+
 class NetworkTablesDirection(enum.Enum):
 	"Which direction to send data?"
 	SUBSCRIBE = 'sub'
@@ -144,9 +185,20 @@ ObjectDetectionDefinition = TypeAdapter(Union[
 
 class NavXConfig(BaseModel):
 	"NavX configuration"
-	port: Literal["usb", "usb1", "usb2"] = Field("usb", description="NavX connection")
+	port: Union[Literal["usb", "usb1", "usb2"], Path] = Field("usb", description="NavX connection (or the path to a serial device)")
 	update_rate: int = Field(60, description="NavX poll rate (in hertz)", gt=0, le=255)
 
+	@property
+	def device(self) -> str:
+		"Path to the serial device"
+		if isinstance(self.port, Path):
+			return str(self.port)
+		return {
+			"usb": "/dev/ttyACM0",
+			"usb1": "/dev/ttyACM0",
+			"usb2": "/dev/ttyACM1",
+		}[self.port]
+
 PipelineConfig = pipeline.PipelineConfig
 
 class PipelineDefinition(BaseModel):
@@ -161,6 +213,7 @@ class CameraConfig(BaseModel):
 	retry: common.RetryConfig = Field(default_factory=common.RetryConfig)
 	pose: Optional[geom.Transform3d] = Field(description="Camera pose (in robot-space)")
 	dynamic_pose: Optional[str] = Field(None, description="If this camera can move, this is it's network name")
+	max_lateness: Optional[common.DurationField] = Field(None, description="Maximum expected lateness of packets from this camera (defaults to estimator.max_lateness)")
 	pipeline: Union[PipelineConfig, str, None] = Field(None, description="Configure pipeline")
 
 class LogFormatterSpec(BaseModel):
@@ -212,6 +265,7 @@ class LocalConfig(BaseModel):
 	cameras: list[CameraConfig] = Field(None, description="Configuration for individual cameras")
 	pipelines: list[PipelineDefinition] = Field(default_factory=list, description="Reusable pipelines")
 	web: WebConfig = Field(default_factory=lambda: WebConfig(enabled=False))
+	pose_udp: PoseUdpConfig = Field(default_factory=PoseUdpConfig, title="UDP pose stream")
 
 	def merge(self, update: 'RemoteConfig') -> 'LocalConfig':
 		"Merge in a remote configuration"
@@ -1,9 +1,18 @@
-from typing import Literal, Optional, TYPE_CHECKING
-from pydantic import BaseModel, Field, RootModel
+from typing import Literal, Optional, Annotated, TYPE_CHECKING
+from pydantic import BaseModel, Field, RootModel, WrapValidator, PlainSerializer
 from datetime import timedelta
+from util.timestamp import Duration
 if TYPE_CHECKING:
 	import depthai as dai
 
+def _validate_duration(value, handler) -> Duration:
+	if isinstance(value, Duration):
+		return value
+	return Duration.from_timedelta(handler(value))
+
+DurationField = Annotated[timedelta, WrapValidator(_validate_duration), PlainSerializer(Duration.as_timedelta, return_type=timedelta)]
+"Config field that's parsed like a timedelta, but loaded as a `Duration`"
+
 class Vec4(RootModel[tuple[float, float, float, float]]):
 	pass
 class Mat44(RootModel[tuple[Vec4, Vec4, Vec4, Vec4]]):
@@ -13,7 +22,7 @@ class RetryConfig(BaseModel):
 	"Configure restart/retry logic"
 	optional: bool = Field(False, description="Is it an error if this camera is not detected?")
 	connection_tries: int = Field(1)
-	connection_delay: timedelta = Field(timedelta(seconds=1))
+	connection_delay: DurationField = Field(timedelta(seconds=1), validate_default=True)
 	restart_tries: int = Field(2)
 
 
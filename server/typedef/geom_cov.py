@@ -1,9 +1,8 @@
-from typing import overload, TypeVar, Generic, Literal
+from typing import overload, TypeVar, Generic, Literal, Iterable, Union
 from dataclasses import dataclass
 
 import numpy as np
 from numpy import ndarray
-from scipy.spatial.transform import Rotation
 
 from .geom import (
 	Translation2d, Translation3d,
@@ -25,21 +24,119 @@ def rot2_to_mat(rotation: Rotation2d) -> np.ndarray[float, tuple[Literal[2], Lit
 		[-s, c],
 	], dtype=float)
 
+def rot3_to_quat(rotation: Rotation3d) -> np.ndarray[float, Literal[4]]:
+	"Rotation3d into quaternion array (w, x, y, z)"
+	q = rotation.getQuaternion()
+	return np.array([q.W(), q.X(), q.Y(), q.Z()], dtype=float)
+
+def quat_to_rot3(q: np.ndarray[float, Literal[4]]) -> Rotation3d:
+	"Quaternion array (w, x, y, z) into Rotation3d"
+	return Rotation3d(Quaternion(q[0], q[1], q[2], q[3]))
+
+def quat_to_mat(q: np.ndarray[float, tuple[..., Literal[4]]]) -> np.ndarray[float, tuple[..., Literal[3], Literal[3]]]:
+	"Quaternions (..., 4) as (w, x, y, z) into rotation matrices (..., 3, 3)"
+	q = np.asarray(q, dtype=float)
+	w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+	xx, yy, zz = x * x, y * y, z * z
+	xy, xz, yz = x * y, x * z, y * z
+	wx, wy, wz = w * x, w * y, w * z
+
+	res = np.empty(q.shape[:-1] + (3, 3), dtype=float)
+	res[..., 0, 0] = 1 - 2 * (yy + zz)
+	res[..., 0, 1] = 2 * (xy - wz)
+	res[..., 0, 2] = 2 * (xz + wy)
+	res[..., 1, 0] = 2 * (xy + wz)
+	res[..., 1, 1] = 1 - 2 * (xx + zz)
+	res[..., 1, 2] = 2 * (yz - wx)
+	res[..., 2, 0] = 2 * (xz - wy)
+	res[..., 2, 1] = 2 * (yz + wx)
+	res[..., 2, 2] = 1 - 2 * (xx + yy)
+	return res
+
+def quat_multiply(a: np.ndarray[float, tuple[..., Literal[4]]], b: np.ndarray[float, tuple[..., Literal[4]]]) -> np.ndarray[float, tuple[..., Literal[4]]]:
+	"Hamilton product of quaternions (..., 4) as (w, x, y, z)"
+	aw, ax, ay, az = np.moveaxis(np.asarray(a, dtype=float), -1, 0)
+	bw, bx, by, bz = np.moveaxis(np.asarray(b, dtype=float), -1, 0)
+	return np.stack([
+		aw * bw - ax * bx - ay * by - az * bz,
+		aw * bx + ax * bw + ay * bz - az * by,
+		aw * by - ax * bz + ay * bw + az * bx,
+		aw * bz + ax * by - ay * bx + az * bw,
+	], axis=-1)
+
+def mat3_to_mat6(rmat: np.ndarray[float, tuple[..., Literal[3], Literal[3]]]) -> np.ndarray[float, tuple[..., Literal[6], Literal[6]]]:
+	"Make block-diagonal 6d-rotation matrices from rotation matrices"
+	res = np.zeros(rmat.shape[:-2] + (6, 6), dtype=float)
+	res[..., :3, :3] = rmat
+	res[..., 3:, 3:] = rmat
+	return res
+
+def skew(v: np.ndarray[float, tuple[..., Literal[3]]]) -> np.ndarray[float, tuple[..., Literal[3], Literal[3]]]:
+	"Cross-product matrices of vectors (..., 3)"
+	v = np.asarray(v, dtype=float)
+	res = np.zeros(v.shape[:-1] + (3, 3), dtype=float)
+	res[..., 0, 1] = -v[..., 2]
+	res[..., 0, 2] = v[..., 1]
+	res[..., 1, 0] = v[..., 2]
+	res[..., 1, 2] = -v[..., 0]
+	res[..., 2, 0] = -v[..., 1]
+	res[..., 2, 1] = v[..., 0]
+	return res
+
+def rotate_cov(rmat: np.ndarray, cov: np.ndarray) -> np.ndarray:
+	"Compute `R P Rᵀ` (broadcasts over leading dimensions)"
+	return rmat @ cov @ np.swapaxes(rmat, -1, -2)
+
 def rot3_to_mat(rotation: Rotation3d) -> np.ndarray[float, tuple[Literal[3], Literal[3]]]:
 	"Rotation3d into rotation matrix"
-	i, j, k, w = rotation.X(), rotation.Y(), rotation.Z(), rotation.W()
-
-	# create rotation matrix
-	r = Rotation.from_quat([i, j, k, w])
-	return r.as_matrix()
+	return quat_to_mat(rot3_to_quat(rotation))
 
 def rot3_to_mat6(rotation: Rotation3d) -> np.ndarray[float, tuple[Literal[6], Literal[6]]]:
 	"Make 6d-rotation matrix"
-	rmat = rot3_to_mat(rotation)
-	rot6d = np.eye((6, 6), dtype=float)
-	rot6d[:3,:3] = rmat
-	rot6d[3:,3:] = rmat
-	return rot6d
+	return mat3_to_mat6(rot3_to_mat(rotation))
+
+def pose3d_compose(t1: np.ndarray, q1: np.ndarray, P1: np.ndarray | None, t2: np.ndarray, q2: np.ndarray, P2: np.ndarray | None):
+	"""
+	Compose poses `a + b` (broadcasts over leading dimensions).
+
+	Poses are translations (..., 3), quaternions (..., 4), and covariances (..., 6, 6) or None.
+	Covariance is propagated to first order, with (translation, rotation vector) perturbations
+	applied in the parent frame of each pose.
+	"""
+	R1 = quat_to_mat(q1)
+	R1_t2 = (R1 @ np.asarray(t2, dtype=float)[..., None])[..., 0]
+	t = t1 + R1_t2
+	q = quat_multiply(q1, q2)
+	q /= np.linalg.norm(q, axis=-1, keepdims=True)
+
+	P = None
+	if P1 is not None:
+		# d(result)/d(a) = [[I, -[R1 t2]×], [0, I]]
+		J1 = np.broadcast_to(np.eye(6), R1_t2.shape[:-1] + (6, 6)).copy()
+		J1[..., :3, 3:] = -skew(R1_t2)
+		P = J1 @ P1 @ np.swapaxes(J1, -1, -2)
+	if P2 is not None:
+		# d(result)/d(b) = blockdiag(R1, R1)
+		P2_rotated = rotate_cov(mat3_to_mat6(R1), P2)
+		P = P2_rotated if P is None else (P + P2_rotated)
+	return t, q, P
+
+def pose3d_inverse(t: np.ndarray, q: np.ndarray, P: np.ndarray | None):
+	"Invert poses (broadcasts over leading dimensions). See `pose3d_compose` for conventions."
+	Rt = np.swapaxes(quat_to_mat(q), -1, -2)
+	t = np.asarray(t, dtype=float)
+	t_inv = -(Rt @ t[..., None])[..., 0]
+	q_inv = np.asarray(q, dtype=float) * np.array([1, -1, -1, -1], dtype=float)
+
+	P_inv = None
+	if P is not None:
+		# d(result)/d(pose) = [[-Rᵀ, -Rᵀ[t]×], [0, -Rᵀ]]
+		J = np.zeros(Rt.shape[:-2] + (6, 6), dtype=float)
+		J[..., :3, :3] = -Rt
+		J[..., :3, 3:] = -Rt @ skew(t)
+		J[..., 3:, 3:] = -Rt
+		P_inv = J @ P @ np.swapaxes(J, -1, -2)
+	return t_inv, q_inv, P_inv
 
 def rot3_flatten(rotation: Rotation3d) -> Rotation3d:
 	yaw = rotation.Z()
@@ -120,8 +217,7 @@ class Translation3dCov(CovariantWrapper[Translation3d, Literal[3]]):
 	STATE_LEN = 3
 	def rotateBy(self, rotation: Rotation3d) -> 'Translation3dCov':
 		mean = self.mean.rotateBy(rotation)
-		rot = rot3_to_mat(rotation)
-		cov = rot @ self.cov @ rot.T
+		cov = rotate_cov(rot3_to_mat(rotation), self.cov)
 		return Translation3dCov(mean, cov)
 
 	def mean_vec(self) -> np.ndarray[float, Literal[3]]:
@@ -202,11 +298,32 @@ class Pose3dCov(CovariantWrapper[Pose3d, Literal[6]]):
 			cov=self.cov[:3, :3],
 		)
 	
+	@classmethod
+	def _from_arrays(cls, t: np.ndarray, q: np.ndarray, cov: np.ndarray) -> 'Pose3dCov':
+		return cls(Pose3d(Translation3d(t[0], t[1], t[2]), quat_to_rot3(q)), cov)
+	
+	def _arrays(self) -> tuple[np.ndarray, np.ndarray]:
+		"Get (translation, quaternion) arrays"
+		return (
+			np.array([self.mean.x, self.mean.y, self.mean.z], dtype=float),
+			rot3_to_quat(self.mean.rotation()),
+		)
+	
 	def inverse(self) -> 'Pose3dCov':
-		# This is like: b=(0,0,0)
-		#  OUT = b - THIS
-		zero = Pose3dCov(Pose3d(), np.zeros_like(self.cov))
-		return zero - self
+		t, q = self._arrays()
+		return Pose3dCov._from_arrays(*pose3d_inverse(t, q, self.cov))
+	
+	def compose(self, other: 'Pose3dCov | Transform3d') -> 'Pose3dCov':
+		"Compose with another (possibly uncertain) transform, propagating both covariances"
+		t1, q1 = self._arrays()
+		if isinstance(other, Pose3dCov):
+			t2, q2 = other._arrays()
+			P2 = other.cov
+		else:
+			t2 = np.array([other.x, other.y, other.z], dtype=float)
+			q2 = rot3_to_quat(other.rotation())
+			P2 = None
+		return Pose3dCov._from_arrays(*pose3d_compose(t1, q1, self.cov, t2, q2, P2))
 	
 	def mean_vec(self) -> np.ndarray[float, Literal[6]]:
 		rot = self.mean.rotation()
@@ -220,8 +337,7 @@ class Pose3dCov(CovariantWrapper[Pose3d, Literal[6]]):
 		])
 
 	def transformBy(self, tf: Transform3d) -> 'Pose3dCov':
-		rot = rot3_to_mat6(tf.rotation())
-		cov_rotated = rot @ self.cov @ rot.T
+		cov_rotated = rotate_cov(rot3_to_mat6(tf.rotation()), self.cov)
 		return Pose3dCov(
 			self.mean.transformBy(tf),
 			cov_rotated
@@ -232,15 +348,82 @@ class Pose3dCov(CovariantWrapper[Pose3d, Literal[6]]):
 			rot = tf.rotation()
 		else:
 			rot = tf
-		rot6d = rot3_to_mat6(rot)
 		return Pose3dCov(
 			self.mean,
-			rot6d @ self.cov @ rot6d.T
+			rotate_cov(rot3_to_mat6(rot), self.cov)
 		)
 	
 	def log(self, end: 'Pose3dCov') -> 'Twist3dCov':
 		pass
 
+class Pose3dCovArray:
+	"""
+	Stack of N poses with covariance, for batched operations.
+
+	Stored as translations (N, 3), quaternions (N, 4) as (w, x, y, z), and covariances (N, 6, 6).
+	"""
+	__slots__ = ('translation', 'quaternion', 'cov')
+	def __init__(self, translation: np.ndarray, quaternion: np.ndarray, cov: np.ndarray | None = None) -> None:
+		self.translation = np.asarray(translation, dtype=float)
+		self.quaternion = np.asarray(quaternion, dtype=float)
+		if cov is None:
+			cov = np.zeros(self.translation.shape[:-1] + (6, 6), dtype=float)
+		self.cov = np.asarray(cov, dtype=float)
+		assert self.translation.shape[-1] == 3
+		assert self.quaternion.shape[-1] == 4
+		assert self.cov.shape[-2:] == (6, 6)
+	
+	@classmethod
+	def from_poses(cls, poses: Iterable[Union[Pose3dCov, Pose3d]]) -> 'Pose3dCovArray':
+		poses = list(poses)
+		n = len(poses)
+		translation = np.empty((n, 3), dtype=float)
+		quaternion = np.empty((n, 4), dtype=float)
+		cov = np.zeros((n, 6, 6), dtype=float)
+		for i, pose in enumerate(poses):
+			if isinstance(pose, Pose3dCov):
+				cov[i] = pose.cov
+				pose = pose.mean
+			translation[i] = (pose.x, pose.y, pose.z)
+			quaternion[i] = rot3_to_quat(pose.rotation())
+		return cls(translation, quaternion, cov)
+	
+	def __len__(self):
+		return len(self.translation)
+	
+	def __getitem__(self, idx: int) -> Pose3dCov:
+		return Pose3dCov._from_arrays(self.translation[idx], self.quaternion[idx], self.cov[idx])
+	
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self[i]
+	
+	def rotation_matrices(self) -> np.ndarray[float, tuple[N, Literal[3], Literal[3]]]:
+		return quat_to_mat(self.quaternion)
+	
+	def inverse(self) -> 'Pose3dCovArray':
+		return Pose3dCovArray(*pose3d_inverse(self.translation, self.quaternion, self.cov))
+	
+	def compose(self, other: 'Pose3dCovArray | Pose3dCov | Transform3d') -> 'Pose3dCovArray':
+		"Compose each pose with `other` (either a single transform, or a stack of the same length)"
+		if isinstance(other, Pose3dCovArray):
+			t2, q2, P2 = other.translation, other.quaternion, other.cov
+		elif isinstance(other, Pose3dCov):
+			t2, q2 = other._arrays()
+			P2 = other.cov
+		else:
+			t2 = np.array([other.x, other.y, other.z], dtype=float)
+			q2 = rot3_to_quat(other.rotation())
+			P2 = None
+		t, q, P = pose3d_compose(self.translation, self.quaternion, self.cov, t2, q2, P2)
+		return Pose3dCovArray(t, q, P)
+	
+	def transformCov(self, rotation: Rotation3d | np.ndarray) -> 'Pose3dCovArray':
+		"Rotate covariances by a single rotation, or (N, 3, 3) rotation matrices"
+		if isinstance(rotation, Rotation3d):
+			rotation = rot3_to_mat(rotation)
+		return Pose3dCovArray(self.translation, self.quaternion, rotate_cov(mat3_to_mat6(rotation), self.cov))
+
 class Twist3dCov(CovariantWrapper[Twist3d, Literal[6]]):
 	STATE_LEN = 6
 	
@@ -256,8 +439,7 @@ class Twist3dCov(CovariantWrapper[Twist3d, Literal[6]]):
 	
 	def transformBy(self, tf: Transform3d) -> 'Pose3dCov':
 		tf_rot = rot3_to_mat(tf.rotation())
-		tf_rot6 = rot3_to_mat6(tf.rotation())
-		dst_cov = tf_rot6 @ self.cov @ tf_rot6.T
+		dst_cov = rotate_cov(mat3_to_mat6(tf_rot), self.cov)
 
 		mean = self.mean_vec()
 		mean_lin = mean[:3]
@@ -0,0 +1,44 @@
+"""
+Benchmark for batched covariance propagation
+
+Usage: python -m typedef.geom_cov_bench [--count N] [--repeat N]
+"""
+from argparse import ArgumentParser
+from time import perf_counter_ns
+import numpy as np
+
+from .geom_cov import Pose3dCov, Pose3dCovArray
+
+
+def main():
+	parser = ArgumentParser(description="Compare per-pose and batched covariance propagation")
+	parser.add_argument('--count', type=int, default=1_000, help="Number of poses")
+	parser.add_argument('--repeat', type=int, default=20, help="Number of repetitions")
+	args = parser.parse_args()
+
+	rng = np.random.default_rng(0)
+	q = rng.normal(size=(args.count, 4))
+	q /= np.linalg.norm(q, axis=-1, keepdims=True)
+	a = rng.normal(size=(args.count, 6, 6))
+	poses = Pose3dCovArray(rng.normal(size=(args.count, 3)), q, a @ np.swapaxes(a, -1, -2))
+	singles = list(poses)
+	tf = singles[0]
+
+	def run(name: str, func):
+		times = np.empty(args.repeat, dtype=np.int64)
+		for i in range(args.repeat):
+			start = perf_counter_ns()
+			func()
+			times[i] = perf_counter_ns() - start
+		per_pose = times.mean() / args.count / 1e3
+		print(f"  {name:<16} {times.mean() / 1e6:8.3f}ms  ({per_pose:.2f}µs/pose)")
+
+	print(f"{args.count} poses, {args.repeat} repetitions")
+	run('compose (loop)', lambda: [pose.compose(tf) for pose in singles])
+	run('compose (batch)', lambda: poses.compose(tf))
+	run('inverse (loop)', lambda: [pose.inverse() for pose in singles])
+	run('inverse (batch)', lambda: poses.inverse())
+
+
+if __name__ == '__main__':
+	main()
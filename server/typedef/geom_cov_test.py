@@ -0,0 +1,124 @@
+from unittest import TestCase
+import numpy as np
+from scipy.spatial.transform import Rotation
+
+from .geom import Pose3d, Transform3d, Translation3d, Rotation3d
+from .geom_cov import (
+	quat_to_mat, rot3_to_mat, rot3_to_quat,
+	pose3d_compose, pose3d_inverse,
+	Pose3dCov, Pose3dCovArray,
+)
+
+
+def random_poses(rng: np.random.Generator, n: int):
+	t = rng.normal(size=(n, 3))
+	q = rng.normal(size=(n, 4))
+	q /= np.linalg.norm(q, axis=-1, keepdims=True)
+	a = rng.normal(size=(n, 6, 6))
+	P = a @ np.swapaxes(a, -1, -2)
+	return t, q, P
+
+def perturb(t: np.ndarray, q: np.ndarray, delta: np.ndarray):
+	"Apply (translation, rotation vector) perturbation in the parent frame"
+	R = Rotation.from_rotvec(delta[3:]) * Rotation.from_quat(q[[1, 2, 3, 0]])
+	x, y, z, w = R.as_quat()
+	return t + delta[:3], np.array([w, x, y, z])
+
+def difference(t1: np.ndarray, q1: np.ndarray, t0: np.ndarray, q0: np.ndarray):
+	"Inverse of `perturb`"
+	R = Rotation.from_quat(q1[[1, 2, 3, 0]]) * Rotation.from_quat(q0[[1, 2, 3, 0]]).inv()
+	return np.concatenate([t1 - t0, R.as_rotvec()])
+
+def numeric_jacobian(func, t: np.ndarray, q: np.ndarray, eps: float = 1e-6):
+	t0, q0 = func(t, q)
+	J = np.empty((6, 6))
+	for i in range(6):
+		delta = np.zeros(6)
+		delta[i] = eps
+		t1, q1 = func(*perturb(t, q, delta))
+		J[:, i] = difference(t1, q1, t0, q0) / eps
+	return J
+
+
+class GeomCovTest(TestCase):
+	def test_quat_to_mat(self):
+		rot = Rotation3d(0.1, -0.4, 2.0)
+		np.testing.assert_allclose(quat_to_mat(rot3_to_quat(rot)), rot3_to_mat(rot))
+		q = rot3_to_quat(rot)
+		expected = Rotation.from_quat(q[[1, 2, 3, 0]]).as_matrix()
+		np.testing.assert_allclose(rot3_to_mat(rot), expected, atol=1e-12)
+
+	def test_compose_mean(self):
+		a = Pose3d(Translation3d(1, 2, 3), Rotation3d(0.1, 0.2, 0.3))
+		b = Transform3d(Translation3d(-1, 0.5, 2), Rotation3d(-0.3, 0.5, 1.0))
+		res = Pose3dCov(a, np.zeros((6, 6))).compose(b)
+		expected = a.transformBy(b)
+		self.assertAlmostEqual(res.mean.x, expected.x)
+		self.assertAlmostEqual(res.mean.y, expected.y)
+		self.assertAlmostEqual(res.mean.z, expected.z)
+		np.testing.assert_allclose(rot3_to_mat(res.mean.rotation()), rot3_to_mat(expected.rotation()), atol=1e-12)
+
+	def test_compose_cov(self):
+		rng = np.random.default_rng(0)
+		(t1, t2), (q1, q2), (P1, P2) = random_poses(rng, 2)
+		_, _, P = pose3d_compose(t1, q1, P1, t2, q2, P2)
+
+		def compose(t, q):
+			res = pose3d_compose(t, q, None, t2, q2, None)
+			return res[0], res[1]
+		J1 = numeric_jacobian(compose, t1, q1)
+		def compose2(t, q):
+			res = pose3d_compose(t1, q1, None, t, q, None)
+			return res[0], res[1]
+		# Perturbations of b are in a's frame
+		J2 = numeric_jacobian(compose2, t2, q2)
+		expected = J1 @ P1 @ J1.T + J2 @ P2 @ J2.T
+		np.testing.assert_allclose(P, expected, rtol=1e-4, atol=1e-4)
+
+	def test_inverse(self):
+		rng = np.random.default_rng(1)
+		t, q, P = (x[0] for x in random_poses(rng, 1))
+		t_inv, q_inv, P_inv = pose3d_inverse(t, q, P)
+
+		# Inverse composed with the original is the identity
+		t_id, q_id, _ = pose3d_compose(t, q, None, t_inv, q_inv, None)
+		np.testing.assert_allclose(t_id, 0, atol=1e-12)
+		np.testing.assert_allclose(quat_to_mat(q_id), np.eye(3), atol=1e-12)
+
+		J = numeric_jacobian(lambda t, q: pose3d_inverse(t, q, None)[:2], t, q)
+		np.testing.assert_allclose(P_inv, J @ P @ J.T, rtol=1e-4, atol=1e-4)
+
+		pose = Pose3dCov._from_arrays(t, q, P)
+		np.testing.assert_allclose(pose.inverse().cov, P_inv)
+
+	def test_array(self):
+		rng = np.random.default_rng(2)
+		t, q, P = random_poses(rng, 20)
+		poses = Pose3dCovArray(t, q, P)
+		self.assertEqual(len(poses), 20)
+
+		tf = Pose3dCov._from_arrays(*(x[0] for x in random_poses(rng, 1)))
+		composed = poses.compose(tf)
+		inverted = poses.inverse()
+		for i in range(len(poses)):
+			single = poses[i].compose(tf)
+			np.testing.assert_allclose(composed.cov[i], single.cov, atol=1e-9)
+			np.testing.assert_allclose(composed.translation[i], (single.mean.x, single.mean.y, single.mean.z), atol=1e-9)
+			np.testing.assert_allclose(inverted.cov[i], poses[i].inverse().cov, atol=1e-9)
+
+		# Pairwise composition
+		pairwise = poses.compose(inverted)
+		np.testing.assert_allclose(pairwise.translation, 0, atol=1e-9)
+
+		roundtrip = Pose3dCovArray.from_poses(poses)
+		np.testing.assert_allclose(roundtrip.cov, poses.cov)
+		np.testing.assert_allclose(quat_to_mat(roundtrip.quaternion), quat_to_mat(poses.quaternion), atol=1e-12)
+
+	def test_transform_cov(self):
+		rng = np.random.default_rng(3)
+		t, q, P = random_poses(rng, 5)
+		rot = Rotation3d(0.3, 0.2, -1.0)
+		poses = Pose3dCovArray(t, q, P).transformCov(rot)
+		for i in range(5):
+			expected = Pose3dCov._from_arrays(t[i], q[i], P[i]).transformCov(rot).cov
+			np.testing.assert_allclose(poses.cov[i], expected, atol=1e-9)
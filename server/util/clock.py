@@ -1,7 +1,7 @@
 from typing import Union, TYPE_CHECKING
 import time, abc
 from datetime import timedelta
-from .timestamp import Timestamp
+from .timestamp import Timestamp, Duration
 from .decorators import Singleton
 
 if TYPE_CHECKING:
@@ -20,16 +20,16 @@ class Clock(abc.ABC):
 
 	__call__ = now
 	
-	def __add__(self, /, offset: timedelta) -> 'Clock':
+	def __add__(self, /, offset: Union[Duration, timedelta]) -> 'Clock':
 		"Apply offset to clock"
-		if isinstance(offset, timedelta):
+		if isinstance(offset, (Duration, timedelta)):
 			return self.with_offset(offset)
 		return NotImplemented
 
-	def with_offset(self, offset: timedelta) -> 'Clock':
+	def with_offset(self, offset: Union[Duration, timedelta]) -> 'Clock':
 		return FixedOffsetClock(self, offset)
 
-	def from_offset(self, offset: timedelta) -> 'Timestamp':
+	def from_offset(self, offset: Union[Duration, timedelta]) -> 'Timestamp':
 		# Round correctly
 		return self.now() + offset
 	
@@ -63,18 +63,23 @@ class OffsetClock(Clock, abc.ABC):
 		"Get offset, in nanoseconds relative to `base`"
 		pass
 
-	def get_offset(self) -> timedelta:
+	def get_offset(self) -> Duration:
 		"Get offset relative to `base`"
-		return timedelta(microseconds=self.get_offset_ns()/1000)
+		return Duration(self.get_offset_ns())
 
 	def now_ns(self) -> int:
 		return self.base.now_ns() + self.get_offset_ns()
 
 class FixedOffsetClock(OffsetClock):
 	"A clock with a fixed offset"
-	def __init__(self, base: Clock, offset: Union[int, timedelta]) -> None:
+	def __init__(self, base: Clock, offset: Union[int, Duration, timedelta]) -> None:
 		super().__init__(base)
-		self.offset = int(offset.total_seconds() * 1e9) if isinstance(offset, timedelta) else offset
+		self._offset = offset if isinstance(offset, int) else Duration.wrap(offset).nanos
+	
+	@property
+	def offset(self) -> int:
+		"Offset from `base` (ns). Read-only, as [TimeMap] memoizes it (use an [OffsetHistoryMapper] for offsets that change)."
+		return self._offset
 
 	@property
 	def constant_offset(self):
@@ -0,0 +1,256 @@
+"Estimate the offset and drift between two clocks"
+from typing import NamedTuple, Optional, Union
+from collections import deque
+from threading import Thread, Event
+import math
+import numpy as np
+
+from .clock import Clock
+from .timemap import TimeMapper, TS
+from .timestamp import Timestamp
+
+
+class ClockSyncFit(NamedTuple):
+	"Linear fit `b = a + offset + drift * (a - reference)` (all times in nanoseconds)"
+	reference: int
+	"Reference time (in clock `a`)"
+	offset: int
+	"Offset (b - a) at `reference`"
+	drift: float
+	"Rate difference between the clocks (dimensionless)"
+	jitter: float
+	"Standard deviation of sample offsets around the fit"
+	latency: int
+	"Lowest sample round-trip time (for one-way samples, the median delay above the fit)"
+	samples: int
+	"Number of samples in the window"
+
+	def a_to_b(self, nanos_a: int) -> int:
+		return nanos_a + self.offset + round(self.drift * (nanos_a - self.reference))
+
+	def b_to_a(self, nanos_b: int) -> int:
+		return self.reference + round((nanos_b - self.reference - self.offset) / (1.0 + self.drift))
+
+	def offsets(self, nanos_a: np.ndarray) -> np.ndarray:
+		"Offsets (b - a) at each of `nanos_a`"
+		return self.offset + np.rint(self.drift * (nanos_a - self.reference)).astype(np.int64)
+
+	def inverse_offsets(self, nanos_b: np.ndarray) -> np.ndarray:
+		"Offsets (b - a) at each of `nanos_b`"
+		return self.offset + np.rint((self.drift / (1.0 + self.drift)) * (nanos_b - self.reference - self.offset)).astype(np.int64)
+
+
+def _fit_offsets(times: np.ndarray, offsets: np.ndarray, best: Union[np.ndarray, slice], reference: int, offset0: int, max_drift: float) -> tuple[int, float, np.ndarray]:
+	"""
+	Least-squares fit of `offsets` against `times`, using only the `best` samples (with the drift clamped to `max_drift`).
+
+	Works relative to `reference` and `offset0`, so floats don't lose precision. Returns (offset at `reference`,
+	drift, residuals of every sample).
+	"""
+	x = (times - reference).astype(np.float64)
+	y = (offsets - offset0).astype(np.float64)
+	x_best = x[best]
+	y_best = y[best]
+	x_mean = x_best.mean()
+	y_mean = y_best.mean()
+	var_x = np.square(x_best - x_mean).sum()
+	if var_x > 0:
+		drift = float(np.dot(x_best - x_mean, y_best - y_mean) / var_x)
+		drift = min(max(drift, -max_drift), max_drift)
+	else:
+		drift = 0.0
+	offset = offset0 + round(y_mean - drift * x_mean)
+	residuals = y - (offset - offset0) - drift * x
+	return offset, drift, residuals
+
+
+class ClockSyncEstimator:
+	"""
+	Estimates the offset and drift from clock `a` to clock `b` from paired samples.
+
+	Each sample reads `a` before and after reading `b`. Samples that were delayed (e.g. by the
+	scheduler) have a long round-trip, so only the lowest-latency fraction of the window is fitted.
+	"""
+	def __init__(self, window: int = 64, quantile: float = 0.25, max_drift: float = 500e-6) -> None:
+		self.quantile = quantile
+		self.max_drift = max_drift
+		self._samples: deque[tuple[int, int, int]] = deque(maxlen=window)
+		self.current: Optional[ClockSyncFit] = None
+		"Most recent fit (replaced atomically, so it's safe to read from other threads)"
+
+	def __len__(self):
+		return len(self._samples)
+
+	def add_sample(self, a_before: int, b: int, a_after: int):
+		"Add a paired sample"
+		rtt = a_after - a_before
+		if rtt < 0:
+			raise ValueError('Clock `a` went backwards')
+		a_mid = a_before + rtt // 2
+		self._samples.append((a_mid, b - a_mid, rtt))
+
+	def fit(self) -> Optional[ClockSyncFit]:
+		"Update `current` from the samples in the window"
+		if len(self._samples) == 0:
+			return None
+		samples = np.array(self._samples, dtype=np.int64)
+		times, offsets, rtts = samples[:, 0], samples[:, 1], samples[:, 2]
+
+		# Minimum-latency filter
+		n_best = max(2, math.ceil(len(samples) * self.quantile))
+		if n_best < len(samples):
+			best = np.argpartition(rtts, n_best - 1)[:n_best]
+		else:
+			best = slice(None)
+
+		reference = int(times[-1])
+		offset, drift, residuals = _fit_offsets(times, offsets, best, reference, int(offsets[-1]), self.max_drift)
+
+		# Jitter of all samples (including the ones we filtered out)
+		res = ClockSyncFit(
+			reference=reference,
+			offset=offset,
+			drift=drift,
+			jitter=float(np.std(residuals)),
+			latency=int(rtts.min()),
+			samples=len(samples),
+		)
+		self.current = res
+		return res
+
+
+class MinOffsetEstimator:
+	"""
+	Estimates the offset and drift from clock `a` to clock `b` from one-way samples, where `b` was
+	read some unknown (non-negative) delay after `a` (e.g. a sensor timestamp, and when we received it).
+
+	The window is split into buckets, and the minimum-delay sample from each bucket is fitted.
+	"""
+	def __init__(self, window: int = 512, buckets: int = 16, max_drift: float = 500e-6) -> None:
+		self.buckets = buckets
+		self.max_drift = max_drift
+		self._samples: deque[tuple[int, int]] = deque(maxlen=window)
+		self.current: Optional[ClockSyncFit] = None
+		"Most recent fit (replaced atomically, so it's safe to read from other threads)"
+
+	def __len__(self):
+		return len(self._samples)
+
+	def add_sample(self, a: int, b: int):
+		"Add a sample (`b` was read after `a`)"
+		self._samples.append((a, b - a))
+
+	def fit(self) -> Optional[ClockSyncFit]:
+		"Update `current` from the samples in the window"
+		# Copy first, samples may be added from another thread
+		samples = list(self._samples)
+		if len(samples) == 0:
+			return None
+		samples = np.array(samples, dtype=np.int64)
+		times, offsets = samples[:, 0], samples[:, 1]
+
+		# Minimum filter
+		buckets = np.array_split(np.arange(len(samples)), min(self.buckets, len(samples)))
+		best = np.array([bucket[np.argmin(offsets[bucket])] for bucket in buckets])
+
+		reference = int(times[-1])
+		offset, drift, delays = _fit_offsets(times, offsets, best, reference, int(offsets.min()), self.max_drift)
+		res = ClockSyncFit(
+			reference=reference,
+			offset=offset,
+			drift=drift,
+			jitter=float(np.std(delays)),
+			latency=int(np.median(delays)),
+			samples=len(samples),
+		)
+		self.current = res
+		return res
+
+
+class ClockSyncSampler:
+	"Periodically samples a pair of clocks in the background, keeping a [ClockSyncEstimator] up to date"
+	def __init__(self, clock_a: Clock, clock_b: Clock, *, rate: float = 4.0, burst: int = 5, estimator: Optional[ClockSyncEstimator] = None) -> None:
+		self.clock_a = clock_a
+		self.clock_b = clock_b
+		self.period = 1.0 / rate
+		self.burst = burst
+		self.estimator = estimator or ClockSyncEstimator()
+		self._stop = Event()
+		self._thread: Optional[Thread] = None
+
+	@property
+	def current(self) -> Optional[ClockSyncFit]:
+		return self.estimator.current
+
+	def sample(self) -> Optional[ClockSyncFit]:
+		"Take a burst of samples, and update the fit with the best one"
+		now_a = self.clock_a.now_ns
+		now_b = self.clock_b.now_ns
+		best = None
+		for _ in range(self.burst):
+			a_before = now_a()
+			b = now_b()
+			a_after = now_a()
+			if (best is None) or (a_after - a_before < best[2] - best[0]):
+				best = (a_before, b, a_after)
+		self.estimator.add_sample(*best)
+		return self.estimator.fit()
+
+	def _run(self):
+		while not self._stop.wait(self.period):
+			self.sample()
+
+	def start(self):
+		"Take an initial sample, then keep sampling in a background thread"
+		if self._thread is not None:
+			return
+		self.sample()
+		self._stop.clear()
+		self._thread = Thread(target=self._run, name='clock_sync', daemon=True)
+		self._thread.start()
+
+	def close(self):
+		if self._thread is None:
+			return
+		self._stop.set()
+		self._thread.join()
+		self._thread = None
+
+
+class ClockSyncMapper(TimeMapper):
+	"Map between clocks using a [ClockSyncEstimator]"
+	def __init__(self, clock_a: Clock, clock_b: Clock, estimator: ClockSyncEstimator) -> None:
+		super().__init__(clock_a, clock_b)
+		self.estimator = estimator
+
+	@property
+	def constant_offset(self):
+		return False
+
+	def get_offset(self) -> int:
+		now_a = self.clock_a.now_ns()
+		if (fit := self.estimator.current) is None:
+			return self.clock_b.now_ns() - now_a
+		return fit.a_to_b(now_a) - now_a
+
+	def get_offsets(self, nanos_a: np.ndarray) -> Union[int, np.ndarray]:
+		if (fit := self.estimator.current) is None:
+			return self.get_offset()
+		return fit.offsets(nanos_a)
+
+	def get_inverse_offsets(self, nanos_b: np.ndarray) -> Union[int, np.ndarray]:
+		if (fit := self.estimator.current) is None:
+			return self.get_offset()
+		return fit.inverse_offsets(nanos_b)
+
+	def a_to_b(self, ts_a: TS) -> TS:
+		if isinstance(ts_a, Timestamp) and (fit := self.estimator.current) is not None:
+			ts_a.assert_src(self.clock_a)
+			return Timestamp(fit.a_to_b(ts_a.nanos), clock=self.clock_b)
+		return super().a_to_b(ts_a)
+
+	def b_to_a(self, ts_b: TS) -> TS:
+		if isinstance(ts_b, Timestamp) and (fit := self.estimator.current) is not None:
+			ts_b.assert_src(self.clock_b)
+			return Timestamp(fit.b_to_a(ts_b.nanos), clock=self.clock_a)
+		return super().b_to_a(ts_b)
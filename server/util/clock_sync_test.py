@@ -0,0 +1,119 @@
+from unittest import TestCase
+import numpy as np
+
+from .clock import MonoClock, WallClock, FixedOffsetClock
+from .clock_sync import ClockSyncEstimator, MinOffsetEstimator, ClockSyncSampler, ClockSyncMapper
+from .timestamp import Timestamp, TimestampArray
+
+
+def synthetic_samples(rng: np.random.Generator, n: int, offset: int, drift: float):
+	"Samples with one-sided scheduling delays"
+	for i in range(n):
+		a_before = 1_000_000_000 + i * 250_000_000
+		# Usually ~20us, sometimes much longer
+		delay_1 = int(rng.exponential(10_000)) + (int(rng.uniform(0, 5_000_000)) if rng.random() < 0.3 else 0)
+		delay_2 = int(rng.exponential(10_000)) + (int(rng.uniform(0, 5_000_000)) if rng.random() < 0.3 else 0)
+		a_read = a_before + delay_1
+		b = a_read + offset + round(drift * (a_read - 1_000_000_000))
+		yield a_before, b, a_read + delay_2
+
+
+class ClockSyncEstimatorTest(TestCase):
+	def test_fit(self):
+		rng = np.random.default_rng(0)
+		est = ClockSyncEstimator()
+		self.assertIsNone(est.fit())
+		offset = 1_700_000_000_000_000_000
+		drift = 40e-6
+		for sample in synthetic_samples(rng, 64, offset, drift):
+			est.add_sample(*sample)
+		fit = est.fit()
+		self.assertIs(est.current, fit)
+		self.assertEqual(fit.samples, 64)
+		self.assertAlmostEqual(fit.drift, drift, delta=2e-6)
+		# Conversion error is much less than the scheduling jitter
+		a = 1_000_000_000 + 63 * 250_000_000
+		expected = a + offset + round(drift * (a - 1_000_000_000))
+		self.assertLess(abs(fit.a_to_b(a) - expected), 50_000)
+		self.assertGreater(fit.jitter, 100_000)
+		self.assertEqual(fit.b_to_a(fit.a_to_b(a)), a)
+
+	def test_single(self):
+		est = ClockSyncEstimator()
+		est.add_sample(100, 1_100, 110)
+		fit = est.fit()
+		self.assertEqual(fit.drift, 0.0)
+		self.assertEqual(fit.a_to_b(200), 1_195)
+		self.assertEqual(fit.latency, 10)
+		with self.assertRaises(ValueError):
+			est.add_sample(100, 0, 90)
+
+	def test_vectorized(self):
+		rng = np.random.default_rng(1)
+		est = ClockSyncEstimator()
+		for sample in synthetic_samples(rng, 32, -5_000_000, -100e-6):
+			est.add_sample(*sample)
+		fit = est.fit()
+		nanos_a = np.arange(0, 20_000_000_000, 1_000_000_007, dtype=np.int64)
+		np.testing.assert_array_equal(nanos_a + fit.offsets(nanos_a), [fit.a_to_b(int(a)) for a in nanos_a])
+		nanos_b = nanos_a + fit.offsets(nanos_a)
+		np.testing.assert_allclose(nanos_b - fit.inverse_offsets(nanos_b), nanos_a, atol=1)
+
+
+class MinOffsetEstimatorTest(TestCase):
+	def test_fit(self):
+		rng = np.random.default_rng(2)
+		est = MinOffsetEstimator()
+		self.assertIsNone(est.fit())
+		offset = -3_000_000_000
+		drift = 25e-6
+		for i in range(512):
+			# Sensor time, received after a variable delay (1-3ms, sometimes 20ms)
+			a = 10_000_000_000 + i * 16_666_667
+			delay = int(rng.uniform(1_000_000, 3_000_000)) + (20_000_000 if rng.random() < 0.1 else 0)
+			est.add_sample(a, a + offset + round(drift * a) + delay)
+		fit = est.fit()
+		self.assertEqual(fit.samples, 512)
+		self.assertAlmostEqual(fit.drift, drift, delta=1e-5)
+		a = 10_000_000_000 + 511 * 16_666_667
+		# Tracks the minimum delay (much better than the mean)
+		error = fit.a_to_b(a) - (a + offset + round(drift * a))
+		self.assertLess(abs(error - 1_000_000), 300_000)
+		self.assertGreater(fit.latency, 0)
+
+
+class ClockSyncSamplerTest(TestCase):
+	def test_sampler(self):
+		c0 = MonoClock()
+		c1 = FixedOffsetClock(c0, 1_000_000)
+		sampler = ClockSyncSampler(c0, c1, rate=100)
+		sampler.start()
+		try:
+			self.assertIsNotNone(sampler.current)
+			# Within the sampling round-trip
+			self.assertAlmostEqual(sampler.current.offset, 1_000_000, delta=sampler.current.latency)
+		finally:
+			sampler.close()
+		self.assertIsNone(sampler._thread)
+
+	def test_mapper(self):
+		c_m = MonoClock()
+		c_w = WallClock()
+		sampler = ClockSyncSampler(c_m, c_w)
+		mapper = ClockSyncMapper(c_m, c_w, sampler.estimator)
+		t_m = c_m.now()
+		# No estimate yet
+		self.assertLess(abs(int(mapper.a_to_b(t_m)) - c_w.now_ns()), 10_000_000)
+
+		for _ in range(4):
+			sampler.sample()
+		fit = sampler.current
+		t_w = mapper.a_to_b(t_m)
+		self.assertEqual(t_w.clock, c_w)
+		self.assertEqual(t_w.nanos, fit.a_to_b(t_m.nanos))
+		self.assertEqual(mapper.b_to_a(t_w), t_m)
+
+		ts_m = TimestampArray(t_m.nanos + np.arange(5) * 1_000_000, c_m)
+		ts_w = mapper.a_to_b(ts_m)
+		self.assertEqual(list(ts_w), [mapper.a_to_b(t) for t in ts_m])
+		np.testing.assert_allclose((-mapper).a_to_b(ts_w).nanos, ts_m.nanos, atol=1)
@@ -0,0 +1,93 @@
+"Lock-free shared-memory ring of IMU samples, for streaming high-rate data between processes"
+from typing import TYPE_CHECKING, Optional, Sequence
+import ctypes
+import numpy as np
+
+if TYPE_CHECKING:
+	from multiprocessing.context import BaseContext
+
+IMU_SAMPLE = np.dtype([
+	('sensor_ns', np.int64),
+	('local_ns', np.int64),
+	('quat', np.float64, 4),
+	('accel', np.float64, 3),
+])
+"""
+Layout of one IMU sample:
+ - `sensor_ns`: Sensor timestamp (0 if the update didn't have one)
+ - `local_ns`: When the sample was received (local clock)
+ - `quat`: Orientation quaternion (w, x, y, z)
+ - `accel`: World-frame linear acceleration (g)
+"""
+
+_HEADER_SIZE = 8
+
+class ImuRing:
+	"""
+	Fixed-size ring of [IMU_SAMPLE] records in shared memory, with one writer and any number of readers.
+
+	The writer fills a record, then bumps the (monotonic) write count. Each reader keeps its own read
+	count, and copies everything since then with one or two array slices. If the writer laps a reader,
+	the overwritten samples are dropped (and counted in `dropped`).
+
+	Pass the ring to a child process in its `Process` args.
+	"""
+	def __init__(self, capacity: int = 512, *, ctx: Optional['BaseContext'] = None) -> None:
+		if capacity <= 0:
+			raise ValueError(f'Invalid capacity: {capacity}')
+		if ctx is None:
+			from multiprocessing import get_context
+			ctx = get_context('spawn')
+		self.capacity = capacity
+		self._raw = ctx.RawArray(ctypes.c_uint8, _HEADER_SIZE + capacity * IMU_SAMPLE.itemsize)
+		self._setup()
+
+	def _setup(self):
+		self._count = np.frombuffer(self._raw, dtype=np.uint64, count=1)
+		self._records = np.frombuffer(self._raw, dtype=IMU_SAMPLE, count=self.capacity, offset=_HEADER_SIZE)
+		self._write_count = int(self._count[0])
+		self._read_count = self._write_count
+		self.dropped = 0
+		"Number of samples overwritten before this reader got to them"
+
+	def __getstate__(self):
+		return (self.capacity, self._raw)
+
+	def __setstate__(self, state):
+		self.capacity, self._raw = state
+		self._setup()
+
+	@property
+	def count(self) -> int:
+		"Number of samples written so far"
+		return int(self._count[0])
+
+	def append(self, sensor_ns: int, local_ns: int, quat: Sequence[float], accel: Sequence[float]):
+		"Write a sample (must only be called from one process)"
+		i = self._write_count
+		self._records[i % self.capacity] = (sensor_ns, local_ns, quat, accel)
+		self._write_count = i + 1
+		self._count[0] = i + 1
+
+	def drain(self) -> np.ndarray:
+		"Copy all samples written since the last call (oldest first)"
+		end = int(self._count[0])
+		start = max(self._read_count, end - self.capacity)
+		self.dropped += start - self._read_count
+		self._read_count = end
+		if start >= end:
+			return np.empty(0, dtype=IMU_SAMPLE)
+
+		lo = start % self.capacity
+		hi = (end - 1) % self.capacity + 1
+		if lo < hi:
+			res = self._records[lo:hi].copy()
+		else:
+			res = np.concatenate((self._records[lo:], self._records[:hi]))
+
+		# The writer may have lapped us while copying (it's always overwriting sample `count - capacity`)
+		lapped = int(self._count[0]) - self.capacity + 1 - start
+		if lapped > 0:
+			self.dropped += lapped
+			res = res[lapped:]
+		return res
@@ -0,0 +1,70 @@
+from unittest import TestCase
+from multiprocessing import get_context
+import numpy as np
+
+from .imu_ring import ImuRing
+
+
+def _writer(ring: ImuRing, count: int):
+	for i in range(1, count + 1):
+		ring.append(i, -i, (i, 0, 0, 0), (0, 0, i / 2))
+
+
+class ImuRingTest(TestCase):
+	def test_local(self):
+		ring = ImuRing(8)
+		self.assertEqual(len(ring.drain()), 0)
+		_writer(ring, 3)
+		res = ring.drain()
+		self.assertEqual(res['sensor_ns'].tolist(), [1, 2, 3])
+		self.assertEqual(res['local_ns'].tolist(), [-1, -2, -3])
+		self.assertEqual(res['quat'][:, 0].tolist(), [1, 2, 3])
+		self.assertEqual(res['accel'][:, 2].tolist(), [0.5, 1.0, 1.5])
+		# Drained
+		self.assertEqual(len(ring.drain()), 0)
+		self.assertEqual(ring.count, 3)
+
+	def test_wrap(self):
+		ring = ImuRing(8)
+		_writer(ring, 6)
+		ring.drain()
+		for i in range(7, 12):
+			ring.append(i, 0, (1, 0, 0, 0), (0, 0, 0))
+		res = ring.drain()
+		self.assertEqual(res['sensor_ns'].tolist(), list(range(7, 12)))
+		self.assertEqual(ring.dropped, 0)
+
+	def test_overrun(self):
+		ring = ImuRing(8)
+		_writer(ring, 20)
+		res = ring.drain()
+		# The oldest slot might be mid-write, so it's dropped too
+		self.assertEqual(res['sensor_ns'].tolist(), list(range(14, 21)))
+		self.assertEqual(ring.dropped, 13)
+		self.assertTrue(np.all(np.diff(res['sensor_ns']) == 1))
+
+	def test_process(self):
+		ctx = get_context('spawn')
+		ring = ImuRing(256, ctx=ctx)
+		count = 20_000
+		proc = ctx.Process(target=_writer, args=(ring, count))
+		proc.start()
+		last = 0
+		received = 0
+		while True:
+			alive = proc.is_alive()
+			res = ring.drain()
+			if len(res) > 0:
+				seq = res['sensor_ns']
+				# In order, and never torn
+				self.assertGreater(seq[0], last)
+				self.assertTrue(np.all(np.diff(seq) == 1))
+				self.assertTrue(np.all(res['local_ns'] == -seq))
+				self.assertTrue(np.all(res['accel'][:, 2] == seq / 2))
+				last = int(seq[-1])
+				received += len(res)
+			if not alive:
+				break
+		proc.join()
+		self.assertEqual(last, count)
+		self.assertEqual(received + ring.dropped, count)
@@ -0,0 +1,201 @@
+"Merge timestamped streams from multiple sources"
+
+from typing import Generic, TypeVar, Hashable, Iterator, Optional
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+import heapq
+
+from .clock import Clock
+from .timestamp import Timestamp, Duration
+
+K = TypeVar('K', bound=Hashable)
+"Source key"
+T = TypeVar('T')
+"Item"
+
+
+@dataclass
+class LatenessStats:
+	"Arrival statistics for a single source"
+	received: int = 0
+	"Number of items received"
+	late: int = 0
+	"Items that arrived after newer items (from any source) had already been released"
+	reordered: int = 0
+	"Items that were older than the previous item from the same source"
+	max_late_by: Duration = Duration(0)
+	"How far behind the release point the latest late item was"
+	max_latency: Duration = Duration(0)
+	"Longest delay between an item's timestamp and its arrival"
+	total_latency: Duration = Duration(0)
+
+	@property
+	def mean_latency(self) -> Duration:
+		"Mean delay between an item's timestamp and its arrival"
+		return (self.total_latency // self.received) if self.received > 0 else Duration(0)
+
+
+class _Source(Generic[T]):
+	__slots__ = ('lateness_ns', 'buffer', 'last_ns', 'stats')
+	def __init__(self, lateness: Duration | timedelta) -> None:
+		self.lateness_ns = Duration.wrap(lateness).nanos
+		"Maximum expected lateness"
+		self.buffer: deque[tuple[int, T]] = deque()
+		"Pending items, in order of timestamp"
+		self.last_ns: Optional[int] = None
+		"Newest timestamp received from this source"
+		self.stats = LatenessStats()
+
+	def frontier(self, now_ns: int) -> int:
+		"We don't expect to receive any more items from this source older than this"
+		watermark = now_ns - self.lateness_ns
+		if self.last_ns is None:
+			return watermark
+		return max(self.last_ns, watermark)
+
+
+class MergeQueue(Generic[K, T]):
+	"""
+	Merge items from several sources into timestamp order.
+
+	Each source has a buffer, and pending items are released by a k-way heap merge. An item
+	is released once every source has either sent something at least as new, or had its
+	watermark (`now - lateness`) pass the item's timestamp.
+
+	Items that arrive older than something we've already released are passed through
+	immediately, and counted in that source's `LatenessStats`.
+	"""
+	def __init__(self, clock: Clock, lateness: Duration | timedelta = timedelta(milliseconds=50)) -> None:
+		self.clock = clock
+		self.lateness = lateness
+		"Default maximum lateness for sources"
+		self._sources: dict[K, _Source[T]] = dict()
+		self._heap: list[tuple[int, int, K]] = list()
+		"Heads of source buffers (timestamp, seq, source)"
+		self._seq = 0
+		"Tiebreaker for heap entries"
+		self._late: deque[tuple[K, T]] = deque()
+		"Late items, to be released immediately"
+		self._released_ns: Optional[int] = None
+		"Newest released timestamp"
+
+	def __len__(self):
+		return len(self._late) + sum(len(source.buffer) for source in self._sources.values())
+
+	@property
+	def stats(self) -> dict[K, LatenessStats]:
+		"Lateness statistics for each source"
+		return {
+			key: source.stats
+			for key, source in self._sources.items()
+		}
+
+	def add_source(self, key: K, lateness: Optional[Duration | timedelta] = None):
+		"Register a source (sources are also registered on first push)"
+		if key not in self._sources:
+			self._sources[key] = _Source(self.lateness if lateness is None else lateness)
+		elif lateness is not None:
+			self._sources[key].lateness_ns = Duration.wrap(lateness).nanos
+
+	def remove_source(self, key: K) -> list[T]:
+		"Stop waiting for a source. Returns its pending items."
+		source = self._sources.pop(key, None)
+		if source is None:
+			return []
+		self._heap = [entry for entry in self._heap if entry[2] != key]
+		heapq.heapify(self._heap)
+		return [item for _, item in source.buffer]
+
+	def clear(self):
+		for source in self._sources.values():
+			source.buffer.clear()
+		self._heap.clear()
+		self._late.clear()
+		self._released_ns = None
+
+	def _push_head(self, key: K, source: _Source[T]):
+		self._seq += 1
+		heapq.heappush(self._heap, (source.buffer[0][0], self._seq, key))
+
+	def push(self, key: K, timestamp: Timestamp, item: T):
+		"Add an item"
+		if (source := self._sources.get(key, None)) is None:
+			self.add_source(key)
+			source = self._sources[key]
+
+		ts_ns = timestamp.nanos
+		now_ns = self.clock.now_ns()
+		stats = source.stats
+		stats.received += 1
+		latency_ns = now_ns - ts_ns
+		stats.total_latency = Duration(stats.total_latency.nanos + latency_ns)
+		if latency_ns > stats.max_latency.nanos:
+			stats.max_latency = Duration(latency_ns)
+
+		if (self._released_ns is not None) and (ts_ns < self._released_ns):
+			# Too late to put in order
+			stats.late += 1
+			stats.max_late_by = max(stats.max_late_by, Duration(self._released_ns - ts_ns))
+			self._late.append((key, item))
+			return
+
+		buffer = source.buffer
+		if (source.last_ns is not None) and (ts_ns < source.last_ns):
+			stats.reordered += 1
+			# Insert in order (rare)
+			idx = len(buffer)
+			while idx > 0 and buffer[idx - 1][0] > ts_ns:
+				idx -= 1
+			buffer.insert(idx, (ts_ns, item))
+			if idx == 0:
+				self._push_head(key, source)
+		else:
+			source.last_ns = ts_ns
+			buffer.append((ts_ns, item))
+			if len(buffer) == 1:
+				self._push_head(key, source)
+
+	def frontier(self, now: Optional[Timestamp] = None) -> Optional[Timestamp]:
+		"Items at or before this time can be released"
+		if len(self._sources) == 0:
+			return None
+		now_ns = self.clock.now_ns() if now is None else now.nanos
+		return Timestamp(min(source.frontier(now_ns) for source in self._sources.values()), self.clock)
+
+	def _pop(self, frontier_ns: Optional[int]) -> Iterator[tuple[K, T]]:
+		heap = self._heap
+		while heap:
+			ts_ns, _, key = heap[0]
+			if (frontier_ns is not None) and ts_ns > frontier_ns:
+				break
+			source = self._sources[key]
+			buffer = source.buffer
+			if len(buffer) == 0 or buffer[0][0] != ts_ns:
+				# Stale head (source was reordered)
+				heapq.heappop(heap)
+				continue
+			_, item = buffer.popleft()
+			if buffer:
+				self._seq += 1
+				heapq.heapreplace(heap, (buffer[0][0], self._seq, key))
+			else:
+				heapq.heappop(heap)
+			if (self._released_ns is None) or (ts_ns > self._released_ns):
+				self._released_ns = ts_ns
+			yield key, item
+
+	def pop_ready(self, now: Optional[Timestamp] = None) -> Iterator[tuple[K, T]]:
+		"Release items whose watermark has passed, in timestamp order"
+		while self._late:
+			yield self._late.popleft()
+		frontier = self.frontier(now)
+		if frontier is None:
+			return
+		yield from self._pop(frontier.nanos)
+
+	def drain(self) -> Iterator[tuple[K, T]]:
+		"Release all pending items, in timestamp order"
+		while self._late:
+			yield self._late.popleft()
+		yield from self._pop(None)
@@ -0,0 +1,80 @@
+from unittest import TestCase
+from datetime import timedelta
+
+from .clock import Clock
+from .timestamp import Timestamp
+from .merge import MergeQueue
+
+
+class FakeClock(Clock):
+	def __init__(self) -> None:
+		super().__init__()
+		self.time = 0
+	def now_ns(self):
+		return self.time
+
+MS = 1_000_000
+
+class MergeQueueTest(TestCase):
+	def setUp(self) -> None:
+		self.clock = FakeClock()
+		self.queue: MergeQueue[str, str] = MergeQueue(self.clock, timedelta(milliseconds=50))
+		self.queue.add_source('a')
+		self.queue.add_source('b')
+
+	def push(self, key: str, ts_ms: int):
+		self.queue.push(key, Timestamp(ts_ms * MS, self.clock), f'{key}{ts_ms}')
+
+	def test_merge_order(self):
+		self.clock.time = 40 * MS
+		self.push('a', 10)
+		self.push('a', 30)
+		self.push('b', 20)
+		self.push('b', 40)
+		# Both sources have sent newer data than 30
+		self.assertEqual([item for _, item in self.queue.pop_ready()], ['a10', 'b20', 'a30'])
+		self.assertEqual(len(self.queue), 1)
+
+	def test_watermark(self):
+		self.clock.time = 20 * MS
+		self.push('a', 10)
+		# Source b might still send something older
+		self.assertEqual(list(self.queue.pop_ready()), [])
+
+		# b hasn't sent anything, but its watermark has passed
+		self.clock.time = 61 * MS
+		self.assertEqual([item for _, item in self.queue.pop_ready()], ['a10'])
+
+	def test_late(self):
+		self.clock.time = 100 * MS
+		self.push('a', 10)
+		self.push('b', 20)
+		self.assertEqual([item for _, item in self.queue.pop_ready()], ['a10', 'b20'])
+
+		# Older than what we've released
+		self.push('a', 15)
+		self.assertEqual([item for _, item in self.queue.pop_ready()], ['a15'])
+		stats = self.queue.stats['a']
+		self.assertEqual(stats.received, 2)
+		self.assertEqual(stats.late, 1)
+		self.assertEqual(stats.max_late_by, timedelta(milliseconds=5))
+		self.assertEqual(stats.max_latency, timedelta(milliseconds=90))
+		self.assertEqual(self.queue.stats['b'].late, 0)
+
+	def test_reordered(self):
+		self.clock.time = 30 * MS
+		self.push('a', 20)
+		self.push('a', 10)
+		self.push('b', 25)
+		self.push('b', 50)
+		# Source a might still send something between 20 and 25
+		self.assertEqual([item for _, item in self.queue.pop_ready()], ['a10', 'a20'])
+		self.assertEqual(self.queue.stats['a'].reordered, 1)
+
+	def test_drain(self):
+		self.clock.time = 0
+		self.push('a', 20)
+		self.push('a', 10)
+		self.assertEqual(list(self.queue.pop_ready()), [])
+		self.assertEqual([item for _, item in self.queue.drain()], ['a10', 'a20'])
+		self.assertEqual(len(self.queue), 0)
@@ -1,30 +1,91 @@
-from threading import Lock
+from typing import TYPE_CHECKING, Optional
+from multiprocessing import get_context
+
 from .clock import OffsetClock, Clock
+from .clock_sync import ClockSyncFit, MinOffsetEstimator
+from .seqlock import SeqlockSlot
+from .imu_ring import ImuRing
 from .timemap import OffsetClockMapper
-from ..typedef.cfg import NavXConfig
-from ..navx.ahrs import AHRS, SerialDataType
+from typedef.cfg import NavXConfig
+
+if TYPE_CHECKING:
+	from multiprocessing.synchronize import Event
+
+_FIT_FORMAT = 'qqddqq'
+"Layout of [ClockSyncFit] in shared memory"
+
+def navx_main(clock: Clock, config: NavXConfig, slot: SeqlockSlot, imu: ImuRing, stop: 'Event', publish_rate: float = 4.0):
+	"NavX process: read the serial port, publish the (sensor -> `clock`) offset estimate to `slot`, and every update to `imu`"
+	from navx.ahrs import AHRS, SerialDataType
+
+	estimator = MinOffsetEstimator()
+	def on_update(sys_ts: int, sensor_ts: int, packet):
+		now = clock.now_ns()
+		# Sensor time is in ms
+		sensor_ns = int(sensor_ts) * 1_000_000
+		if sensor_ns > 0:
+			estimator.add_sample(sensor_ns, now)
+		imu.append(
+			sensor_ns,
+			now,
+			(packet.quat_w, packet.quat_x, packet.quat_y, packet.quat_z),
+			(packet.linear_accel_x, packet.linear_accel_y, packet.linear_accel_z),
+		)
+
+	with AHRS(config.device, SerialDataType.PROCESSED_DATA, config.update_rate) as navx:
+		navx.register_callback(on_update)
+		while not stop.wait(1.0 / publish_rate):
+			if (fit := estimator.fit()) is not None:
+				slot.write(*fit)
+
 
 class NavXClock(OffsetClock):
+	"Clock that counts NavX sensor time. The NavX is read in its own process."
 	def __init__(self, clock: Clock, config: NavXConfig) -> None:
 		super().__init__(clock)
-		self.navx = AHRS(config.port, SerialDataType.PROCESSED_DATA, config.update_rate)
-		self._offset_lock = Lock()
-		self._offset = 0
-		def update_offset(packet, sensor_ts: int, sys_ts: int):
-			# Update offset every packet
-			with self._offset_lock:
-				self._offset = sensor_ts - sys_ts
-		self.navx.register_callback(update_offset)
-		# TODO: NavX in subprocess?
+		ctx = get_context('spawn')
+		self._slot = SeqlockSlot(_FIT_FORMAT, ctx=ctx)
+		self.imu = ImuRing(ctx=ctx)
+		"High-rate samples from the NavX"
+		self._stop = ctx.Event()
+		self._proc = ctx.Process(
+			target=navx_main,
+			name='navx',
+			args=(clock, config, self._slot, self.imu, self._stop),
+			daemon=True,
+		)
+		self._proc.start()
+		self._fit_values = None
+		self._fit: Optional[ClockSyncFit] = None
+	
+	@property
+	def fit(self) -> Optional[ClockSyncFit]:
+		"Latest (sensor -> base) offset estimate"
+		values = self._slot.read()
+		# The slot returns the same tuple until it's updated
+		if values is not self._fit_values:
+			self._fit_values = values
+			self._fit = ClockSyncFit._make(values)
+		return self._fit
+	
+	@property
+	def samples(self) -> int:
+		"Number of samples in the current estimate"
+		fit = self.fit
+		return 0 if fit is None else fit.samples
 	
 	def get_offset_ns(self) -> int:
-		with self._offset_lock:
-			offset_ms = self._offset
-		# Offset is in ms
-		return offset_ms * 1_000_000
+		if (fit := self.fit) is None:
+			return 0
+		now = self.base.now_ns()
+		return fit.b_to_a(now) - now
 	
 	def close(self):
-		self.navx.close()
+		self._stop.set()
+		self._proc.join(1.0)
+		if self._proc.is_alive():
+			self._proc.kill()
+			self._proc.join()
 
 class NavXTimeMapper(OffsetClockMapper):
 	def __init__(self, clock: Clock, config: NavXConfig):
@@ -0,0 +1,81 @@
+"Lock-free shared-memory record, for publishing small values between processes"
+from typing import TYPE_CHECKING, Optional
+import ctypes, struct, zlib
+
+if TYPE_CHECKING:
+	from multiprocessing.context import BaseContext
+
+_HEADER = struct.Struct('<Q')
+_CRC = struct.Struct('<I')
+
+class SeqlockSlot:
+	"""
+	Fixed-layout record in shared memory, with one writer and any number of readers.
+
+	The writer makes the sequence number odd while writing, and even when done. Readers retry if the
+	sequence was odd or changed while they copied the record, so neither side ever blocks the other.
+	Python can't emit memory barriers, so records also carry a CRC (which catches torn reads on
+	weakly-ordered CPUs).
+
+	Pass the slot to a child process in its `Process` args.
+	"""
+	def __init__(self, fmt: str, *, ctx: Optional['BaseContext'] = None) -> None:
+		if ctx is None:
+			from multiprocessing import get_context
+			ctx = get_context('spawn')
+		self._payload = struct.Struct('<' + fmt.lstrip('<>=!@'))
+		self._raw = ctx.RawArray(ctypes.c_uint8, _HEADER.size + self._payload.size + _CRC.size)
+		self._setup()
+
+	def _setup(self):
+		self._buf = memoryview(self._raw).cast('B')
+		self._body = slice(_HEADER.size, _HEADER.size + self._payload.size + _CRC.size)
+		self._write_seq = 0
+		self._read_seq = 0
+		"Sequence number of `_last`"
+		self._last: Optional[tuple] = None
+
+	def __getstate__(self):
+		return (self._payload.format, self._raw)
+
+	def __setstate__(self, state):
+		fmt, self._raw = state
+		self._payload = struct.Struct(fmt)
+		self._setup()
+
+	@property
+	def sequence(self) -> int:
+		"Number of writes so far"
+		return _HEADER.unpack_from(self._buf, 0)[0] // 2
+
+	def write(self, *values):
+		"Publish values (must only be called from one process)"
+		body = self._payload.pack(*values)
+		seq = self._write_seq + 1
+		_HEADER.pack_into(self._buf, 0, seq)
+		self._buf[self._body] = body + _CRC.pack(zlib.crc32(body))
+		_HEADER.pack_into(self._buf, 0, seq + 1)
+		self._write_seq = seq + 1
+
+	def read(self, max_tries: int = 100) -> Optional[tuple]:
+		"Read the latest values (or `None` if nothing has been written)"
+		buf = self._buf
+		for _ in range(max_tries):
+			seq = _HEADER.unpack_from(buf, 0)[0]
+			if seq == self._read_seq:
+				# Unchanged since last read
+				return self._last
+			if seq & 1:
+				# Write in progress
+				continue
+			record = bytes(buf[self._body])
+			if _HEADER.unpack_from(buf, 0)[0] != seq:
+				continue
+			body = record[:self._payload.size]
+			if _CRC.unpack_from(record, self._payload.size)[0] != zlib.crc32(body):
+				continue
+			self._last = self._payload.unpack(body)
+			self._read_seq = seq
+			return self._last
+		# Writer is too busy; return the previous values
+		return self._last
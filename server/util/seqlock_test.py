@@ -0,0 +1,40 @@
+from unittest import TestCase
+from multiprocessing import get_context
+
+from .seqlock import SeqlockSlot
+
+
+def _writer(slot: SeqlockSlot, count: int):
+	for i in range(1, count + 1):
+		slot.write(i, -i, i / 2)
+
+
+class SeqlockSlotTest(TestCase):
+	def test_local(self):
+		slot = SeqlockSlot('qqd')
+		self.assertIsNone(slot.read())
+		self.assertEqual(slot.sequence, 0)
+		slot.write(1, 2, 0.5)
+		self.assertEqual(slot.read(), (1, 2, 0.5))
+		self.assertEqual(slot.sequence, 1)
+		# Cached until changed
+		self.assertIs(slot.read(), slot.read())
+		slot.write(3, 4, 1.5)
+		self.assertEqual(slot.read(), (3, 4, 1.5))
+
+	def test_process(self):
+		ctx = get_context('spawn')
+		slot = SeqlockSlot('qqd', ctx=ctx)
+		count = 20_000
+		proc = ctx.Process(target=_writer, args=(slot, count))
+		proc.start()
+		try:
+			# Every read is consistent while the writer is running
+			while proc.is_alive():
+				if (values := slot.read()) is not None:
+					i, j, k = values
+					self.assertEqual((j, k), (-i, i / 2))
+		finally:
+			proc.join()
+		self.assertEqual(slot.read(), (count, -count, count / 2))
+		self.assertEqual(slot.sequence, count)
@@ -0,0 +1,143 @@
+"Per-process telemetry (CPU, memory, loop timing, queues), reported to the main process at a low rate"
+from typing import TYPE_CHECKING, Optional, Callable
+from dataclasses import dataclass, field
+import os
+import time
+import numpy as np
+
+if TYPE_CHECKING:
+	from multiprocessing.queues import Queue
+
+
+@dataclass
+class MsgTelemetry:
+	"Telemetry snapshot for one process"
+	process: str
+	"Process name (`main`, `web`, or the camera name)"
+	pid: int
+	timestamp: int
+	"When the snapshot was taken (monotonic ns)"
+	cpu_percent: float = 0.0
+	"CPU usage since the last snapshot (100% = one core)"
+	rss: int = 0
+	"Resident memory (bytes)"
+	threads: int = 0
+	loop_hz: float = 0.0
+	"Loop iterations per second"
+	loop_p50_ms: float = 0.0
+	loop_p90_ms: float = 0.0
+	loop_p99_ms: float = 0.0
+	loop_max_ms: float = 0.0
+	queues: dict[str, int] = field(default_factory=dict)
+	"Depth of each queue"
+	dropped: int = 0
+	"Total messages dropped (since the process started)"
+
+	@property
+	def queue_depth(self) -> int:
+		"Total depth of all queues"
+		return sum(self.queues.values())
+
+
+class TelemetryMonitor:
+	"""
+	Collects telemetry for the current process.
+
+	Call [record_loop] every loop iteration, and [poll] whenever convenient; it returns a snapshot
+	every `interval` seconds.
+	"""
+	def __init__(self, name: str, interval: float = 1.0, history: int = 256) -> None:
+		self.name = name
+		self.interval_ns = int(interval * 1e9)
+		"Time between snapshots (ns)"
+		self.dropped = 0
+		"Messages dropped"
+		self._queues: dict[str, Callable[[], int]] = dict()
+		self._loop_ns = np.zeros(history, dtype=np.int64)
+		"Ring of loop durations"
+		self._loops = 0
+		"Loop iterations since the last snapshot"
+		self._last_ns = time.monotonic_ns()
+		try:
+			import psutil
+		except ImportError:
+			self._proc = None
+		else:
+			self._proc = psutil.Process(os.getpid())
+			# The first call always reports 0
+			self._proc.cpu_percent()
+
+	def add_queue(self, name: str, queue: Optional['Queue'] = None, *, depth: Optional[Callable[[], int]] = None):
+		"Report the depth of a queue (or anything else with a `depth` callback)"
+		if depth is None:
+			if queue is None:
+				return
+			depth = queue.qsize
+		self._queues[name] = depth
+
+	def remove_queue(self, name: str):
+		self._queues.pop(name, None)
+
+	def drop(self, count: int = 1):
+		"Count dropped messages"
+		self.dropped += count
+
+	def record_loop(self, duration_ns: int):
+		"Record how long one loop iteration took (excluding any sleep)"
+		self._loop_ns[self._loops % len(self._loop_ns)] = duration_ns
+		self._loops += 1
+
+	def _queue_depths(self) -> dict[str, int]:
+		depths = dict()
+		for name, depth in self._queues.items():
+			try:
+				depths[name] = int(depth())
+			except (NotImplementedError, OSError, ValueError):
+				# qsize() isn't implemented on macOS, and fails on closed queues
+				pass
+		return depths
+
+	def poll(self, now_ns: Optional[int] = None) -> Optional[MsgTelemetry]:
+		"Get a snapshot, if one is due"
+		if now_ns is None:
+			now_ns = time.monotonic_ns()
+		elapsed_ns = now_ns - self._last_ns
+		if elapsed_ns < self.interval_ns:
+			return None
+		self._last_ns = now_ns
+
+		msg = MsgTelemetry(
+			process=self.name,
+			pid=os.getpid(),
+			timestamp=now_ns,
+			queues=self._queue_depths(),
+			dropped=self.dropped,
+		)
+
+		if (loops := self._loops) > 0:
+			msg.loop_hz = loops * 1e9 / elapsed_ns
+			p50, p90, p99, pmax = np.percentile(self._loop_ns[:min(loops, len(self._loop_ns))], (50, 90, 99, 100)) / 1e6
+			msg.loop_p50_ms = float(p50)
+			msg.loop_p90_ms = float(p90)
+			msg.loop_p99_ms = float(p99)
+			msg.loop_max_ms = float(pmax)
+			self._loops = 0
+
+		if (proc := self._proc) is not None:
+			with proc.oneshot():
+				msg.cpu_percent = proc.cpu_percent()
+				msg.rss = proc.memory_info().rss
+				msg.threads = proc.num_threads()
+		return msg
+
+
+def fresh_telemetry(samples: list[Optional[MsgTelemetry]], max_age: float = 5.0, now_ns: Optional[int] = None) -> list[MsgTelemetry]:
+	"Filter out missing and stale snapshots (e.g. from processes that exited)"
+	if now_ns is None:
+		now_ns = time.monotonic_ns()
+	max_age_ns = int(max_age * 1e9)
+	return [
+		sample
+		for sample in samples
+		if (sample is not None) and (now_ns - sample.timestamp) <= max_age_ns
+	]
@@ -0,0 +1,57 @@
+from unittest import TestCase
+import os
+
+from .telemetry import TelemetryMonitor, MsgTelemetry, fresh_telemetry
+
+
+class TelemetryMonitorTest(TestCase):
+	def test_interval(self):
+		monitor = TelemetryMonitor('test', interval=1.0)
+		start = monitor._last_ns
+		self.assertIsNone(monitor.poll(start + 500_000_000), "Not due yet")
+		msg = monitor.poll(start + 1_000_000_000)
+		self.assertIsNotNone(msg)
+		self.assertEqual(msg.process, 'test')
+		self.assertEqual(msg.pid, os.getpid())
+		self.assertIsNone(monitor.poll(start + 1_500_000_000), "Interval restarts after a snapshot")
+
+	def test_loops(self):
+		monitor = TelemetryMonitor('test', interval=1.0, history=64)
+		start = monitor._last_ns
+		# Older durations are overwritten
+		for _ in range(100):
+			monitor.record_loop(50_000_000)
+		for i in range(1, 101):
+			monitor.record_loop(i * 1_000_000)
+		msg = monitor.poll(start + 2_000_000_000)
+		self.assertAlmostEqual(msg.loop_hz, 100.0)
+		self.assertAlmostEqual(msg.loop_max_ms, 100.0)
+		self.assertGreater(msg.loop_p50_ms, 60.0)
+		self.assertLessEqual(msg.loop_p50_ms, msg.loop_p90_ms)
+		self.assertLessEqual(msg.loop_p90_ms, msg.loop_p99_ms)
+
+		# No loops in the next window
+		msg = monitor.poll(start + 3_000_000_000)
+		self.assertEqual(msg.loop_hz, 0.0)
+		self.assertEqual(msg.loop_max_ms, 0.0)
+
+	def test_queues(self):
+		monitor = TelemetryMonitor('test', interval=0.0)
+		def broken():
+			raise NotImplementedError()
+		monitor.add_queue('a', depth=lambda: 3)
+		monitor.add_queue('b', depth=lambda: 4)
+		monitor.add_queue('broken', depth=broken)
+		monitor.add_queue('missing', None)
+		monitor.drop(2)
+		monitor.drop()
+		msg = monitor.poll()
+		self.assertEqual(msg.queues, {'a': 3, 'b': 4})
+		self.assertEqual(msg.queue_depth, 7)
+		self.assertEqual(msg.dropped, 3)
+
+	def test_fresh(self):
+		now = 10_000_000_000
+		old = MsgTelemetry('old', 1, now - 6_000_000_000)
+		new = MsgTelemetry('new', 2, now - 1_000_000_000)
+		self.assertEqual(fresh_telemetry([old, None, new], max_age=5.0, now_ns=now), [new])
@@ -1,14 +1,19 @@
 from typing import TYPE_CHECKING, Sequence, Optional, TypeVar, Union
 from abc import ABC, abstractmethod
 from functools import cached_property
+from collections import deque
 import operator, contextvars
+import numpy as np
 
 from .decorators import classproperty
+from .timestamp import TimestampArray
 
 if TYPE_CHECKING:
 	from .clock import Clock, OffsetClock
 	from .timestamp import Timestamp
 
+TS = TypeVar('TS', 'Timestamp', TimestampArray)
+
 class TimeMapper(ABC):
 	"Identity time mapper"
 	clock_a: 'Clock'
@@ -39,17 +44,29 @@ class TimeMapper(ABC):
 		"Is `get_offset` constant?"
 		return False
 
+	def get_offsets(self, nanos_a: np.ndarray) -> Union[int, np.ndarray]:
+		"Offsets (b - a) at each of `nanos_a`. Override if the offset history is known."
+		return self.get_offset()
+	
+	def get_inverse_offsets(self, nanos_b: np.ndarray) -> Union[int, np.ndarray]:
+		"Offsets (b - a) at each of `nanos_b` (in terms of `clock_b`)"
+		return self.get_offset()
+
 	@property
 	def conversion_cost(self) -> int:
 		"The cost of applying this map (for looking up in [TimeMap]). Must be non-negative integer."
 		return 10
 	
-	def a_to_b(self, ts_a: 'Timestamp') -> 'Timestamp':
+	def a_to_b(self, ts_a: TS) -> TS:
 		ts_a.assert_src(self.clock_a)
+		if isinstance(ts_a, TimestampArray):
+			return ts_a.offset_ns(self.get_offsets(ts_a.nanos), clock=self.clock_b)
 		return ts_a.offset_ns(self.get_offset(), clock=self.clock_b)
 	
-	def b_to_a(self, ts_b: 'Timestamp') -> 'Timestamp':
+	def b_to_a(self, ts_b: TS) -> TS:
 		ts_b.assert_src(self.clock_b)
+		if isinstance(ts_b, TimestampArray):
+			return ts_b.offset_ns(-self.get_inverse_offsets(ts_b.nanos), clock=self.clock_a)
 		return ts_b.offset_ns(-self.get_offset(), clock=self.clock_a)
 	
 	def __neg__(self) -> 'TimeMapper':
@@ -75,6 +92,8 @@ class TimeMap:
 	def __init__(self, *mappers: Sequence[Union['TimeMap', TimeMapper]]):
 		self._prev_t = None
 		self.conversions: dict['Clock', dict['Clock', tuple[TimeMapper, bool]]] = dict()
+		self._paths: dict[tuple['Clock', 'Clock'], Optional[TimeMapper]] = dict()
+		"Memoized results of `get_conversion` (cleared when conversions change)"
 		for mapper in mappers:
 			if isinstance(mapper, TimeMap):
 				# Inherit mappings
@@ -104,6 +123,7 @@ class TimeMap:
 		if replace or (prev_a is None) or (prev_a[1] and not is_caching):
 			from_a[mapper.clock_b] = (mapper, is_caching)
 			did_replace = True
+			self._paths.clear()
 		
 		# Skip for identity maps
 		if mapper.clock_a == mapper.clock_b:
@@ -115,6 +135,7 @@ class TimeMap:
 		# We are more selective, because this is always 'cached'
 		if (prev_b is None) or (prev_b[1] and (replace or (did_replace and prev_b[0] == -prev_a[0]))):
 			from_b[mapper.clock_a] = (-mapper, True)
+			self._paths.clear()
 		return did_replace
 	
 	def get_direct(self, src: 'Clock', dst: 'Clock') -> Optional[TimeMapper]:
@@ -145,6 +166,26 @@ class TimeMap:
 			return [IdentityTimeMapper(src)]
 
 	def get_conversion(self, src: 'Clock', dst: 'Clock') -> Optional[TimeMapper]:
+		"""
+		Find the cheapest conversion from `src` to `dst`.
+
+		Results are memoized until the next `register`. Paths with a constant offset are collapsed
+		into a single [FixedOffsetMapper], so they must not change afterwards.
+		"""
+		key = (src, dst)
+		try:
+			return self._paths[key]
+		except KeyError:
+			pass
+
+		res = self._find_path(src, dst)
+		if (res is not None) and (not isinstance(res, IdentityTimeMapper)) and res.constant_offset:
+			res = FixedOffsetMapper(src, dst, res.get_offset())
+		self._paths[key] = res
+		return res
+
+	def _find_path(self, src: 'Clock', dst: 'Clock') -> Optional[TimeMapper]:
+		"Search for the cheapest path (Dijkstra)"
 		import heapq
 		prev: dict['Clock', tuple[int, Optional[TimeMapper]]] = dict()
 		# prev[src] = (0, None)
@@ -200,6 +241,12 @@ class InverseTimeMapper(TimeMapper):
 	
 	def get_offset(self) -> int:
 		return -self._parent.get_offset()
+	
+	def get_offsets(self, nanos_a: np.ndarray) -> Union[int, np.ndarray]:
+		return -self._parent.get_inverse_offsets(nanos_a)
+	
+	def get_inverse_offsets(self, nanos_b: np.ndarray) -> Union[int, np.ndarray]:
+		return -self._parent.get_offsets(nanos_b)
 
 	@property
 	def constant_offset(self):
@@ -210,10 +257,10 @@ class InverseTimeMapper(TimeMapper):
 		# Slightly more than forwards
 		return self._parent.conversion_cost + 1
 	
-	def a_to_b(self, ts_a: 'Timestamp') -> 'Timestamp':
+	def a_to_b(self, ts_a: TS) -> TS:
 		return self._parent.b_to_a(ts_a)
 	
-	def b_to_a(self, ts_b: 'Timestamp') -> 'Timestamp':
+	def b_to_a(self, ts_b: TS) -> TS:
 		return self._parent.a_to_b(ts_b)
 
 	def __neg__(self) -> 'TimeMapper':
@@ -270,6 +317,38 @@ class ChainedTimeMapper(TimeMapper):
 			offset += step.get_offset()
 		return offset
 	
+	def get_offsets(self, nanos_a: np.ndarray) -> Union[int, np.ndarray]:
+		if self.constant_offset:
+			return self.get_offset()
+		# Each step's offset depends on the time in its own source clock
+		offset = 0
+		for step in self.steps:
+			offset = offset + step.get_offsets(nanos_a + offset)
+		return offset
+	
+	def get_inverse_offsets(self, nanos_b: np.ndarray) -> Union[int, np.ndarray]:
+		if self.constant_offset:
+			return self.get_offset()
+		offset = 0
+		for step in reversed(self.steps):
+			offset = offset + step.get_inverse_offsets(nanos_b - offset)
+		return offset
+	
+	def a_to_b(self, ts_a: TS) -> TS:
+		if self.constant_offset or isinstance(ts_a, TimestampArray):
+			return super().a_to_b(ts_a)
+		# Each step's offset depends on the time in its own source clock
+		for step in self.steps:
+			ts_a = step.a_to_b(ts_a)
+		return ts_a
+	
+	def b_to_a(self, ts_b: TS) -> TS:
+		if self.constant_offset or isinstance(ts_b, TimestampArray):
+			return super().b_to_a(ts_b)
+		for step in reversed(self.steps):
+			ts_b = step.b_to_a(ts_b)
+		return ts_b
+	
 	@cached_property
 	def conversion_cost(self) -> int:
 		return sum(step.conversion_cost for step in self.steps) + 1
@@ -346,6 +425,90 @@ class DynamicOffsetMapper(TimeMapper):
 		return super().__eq__(other)
 
 
+class OffsetHistoryMapper(TimeMapper):
+	"""
+	Piecewise-constant offset, from a history of offset measurements.
+
+	Each offset applies from the time (in `clock_a`) it was recorded until the next one, so
+	conversions of past timestamps use the offset that was valid at the time.
+	"""
+
+	def __init__(self, clock_a: 'Clock', clock_b: 'Clock', history: int = 1024) -> None:
+		super().__init__(clock_a, clock_b)
+		self._history: deque[tuple[int, int]] = deque(maxlen=history)
+		self._arrays: Optional[tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+		self._latest_b: Optional[int] = None
+		"First time (in `clock_b`) that the latest offset applies"
+	
+	def record(self, ts_a: Union['Timestamp', int], offset_ns: int):
+		"Record that the offset was `offset_ns` as of `ts_a`"
+		nanos_a = ts_a if isinstance(ts_a, int) else ts_a.nanos
+		if len(self._history) > 0 and nanos_a < self._history[-1][0]:
+			raise ValueError('Offsets must be recorded in order')
+		self._history.append((nanos_a, offset_ns))
+		self._arrays = None
+		nanos_b = nanos_a + offset_ns
+		if (self._latest_b is None) or (nanos_b > self._latest_b):
+			self._latest_b = nanos_b
+	
+	def _get_arrays(self):
+		if self._arrays is None:
+			history = np.array(self._history, dtype=np.int64).reshape(-1, 2)
+			times_a = history[:, 0]
+			offsets = history[:, 1]
+			# Offset changes can make this non-monotonic; take the first time each offset applies
+			times_b = np.maximum.accumulate(times_a + offsets)
+			self._arrays = (times_a, times_b, offsets)
+		return self._arrays
+	
+	@property
+	def constant_offset(self):
+		return False
+	
+	def get_offset(self) -> int:
+		if len(self._history) == 0:
+			return 0
+		return self._history[-1][1]
+	
+	def get_offsets(self, nanos_a: np.ndarray) -> Union[int, np.ndarray]:
+		if len(self._history) == 0:
+			return 0
+		times_a, _, offsets = self._get_arrays()
+		# Times before the history use the oldest offset
+		idx = np.searchsorted(times_a, nanos_a, side='right') - 1
+		return offsets[np.maximum(idx, 0)]
+	
+	def get_inverse_offsets(self, nanos_b: np.ndarray) -> Union[int, np.ndarray]:
+		if len(self._history) == 0:
+			return 0
+		_, times_b, offsets = self._get_arrays()
+		idx = np.searchsorted(times_b, nanos_b, side='right') - 1
+		return offsets[np.maximum(idx, 0)]
+	
+	def _offset_at(self, nanos: int, inverse: bool) -> int:
+		"Offset at a single time (same as `get_offsets`/`get_inverse_offsets`)"
+		if len(self._history) == 0:
+			return 0
+		time_a, offset = self._history[-1]
+		# Most conversions are of recent timestamps, which don't need the arrays
+		if nanos >= (self._latest_b if inverse else time_a):
+			return offset
+		offsets = self.get_inverse_offsets(np.int64(nanos)) if inverse else self.get_offsets(np.int64(nanos))
+		return int(offsets)
+	
+	def a_to_b(self, ts_a: TS) -> TS:
+		if isinstance(ts_a, TimestampArray):
+			return super().a_to_b(ts_a)
+		ts_a.assert_src(self.clock_a)
+		return ts_a.offset_ns(self._offset_at(ts_a.nanos, False), clock=self.clock_b)
+	
+	def b_to_a(self, ts_b: TS) -> TS:
+		if isinstance(ts_b, TimestampArray):
+			return super().b_to_a(ts_b)
+		ts_b.assert_src(self.clock_b)
+		return ts_b.offset_ns(-self._offset_at(ts_b.nanos, True), clock=self.clock_a)
+
+
 class IdentityTimeMapper(TimeMapper):
 	def __init__(self, clock: 'Clock') -> None:
 		super().__init__(clock, clock)
@@ -0,0 +1,47 @@
+"""
+Microbenchmarks for TimeMap conversion lookup
+
+Usage: python -m util.timemap_bench [--number N]
+"""
+from argparse import ArgumentParser
+from timeit import timeit
+
+from .clock import MonoClock, WallClock, FixedOffsetClock
+from .timemap import TimeMap, DynamicOffsetMapper, OffsetClockMapper
+
+
+def main():
+	parser = ArgumentParser(description="Compare path search and memoized TimeMap conversions")
+	parser.add_argument('--number', type=int, default=50_000, help="Iterations per conversion")
+	args = parser.parse_args()
+
+	mono = MonoClock()
+	wall = WallClock()
+	c1 = FixedOffsetClock(mono, 100)
+	c2 = FixedOffsetClock(c1, 200)
+	dev = FixedOffsetClock(c2, 300)
+	map = TimeMap(
+		DynamicOffsetMapper(wall, mono),
+		OffsetClockMapper(c1),
+		OffsetClockMapper(c2),
+		OffsetClockMapper(dev),
+	)
+	ts_mono = mono.now()
+	ts_wall = wall.now()
+
+	cases = [
+		("constant (3 hops)", mono, dev, ts_mono),
+		("constant reverse", dev, mono, ts_mono.offset_ns(600, clock=dev)),
+		("dynamic (4 hops)", wall, dev, ts_wall),
+	]
+
+	print(f"{'conversion':<20} {'search':>12} {'memoized':>12} {'speedup':>8}")
+	for name, src, dst, ts in cases:
+		# Previous behaviour: search every time
+		old_ns = timeit(lambda: map._find_path(src, dst).a_to_b(ts), number=args.number) / args.number * 1e9
+		new_ns = timeit(lambda: map.get_conversion(src, dst).a_to_b(ts), number=args.number) / args.number * 1e9
+		print(f"{name:<20} {old_ns:10.1f}ns {new_ns:10.1f}ns {old_ns / new_ns:7.2f}x")
+
+
+if __name__ == '__main__':
+	main()
@@ -1,6 +1,8 @@
 from unittest import TestCase
+import numpy as np
 from .clock import MonoClock, WallClock, FixedOffsetClock
-from .timemap import TimeMap, FixedOffsetMapper, IdentityTimeMapper, OffsetClockMapper
+from .timestamp import Timestamp, TimestampArray
+from .timemap import TimeMap, FixedOffsetMapper, DynamicOffsetMapper, IdentityTimeMapper, OffsetClockMapper, OffsetHistoryMapper
 
 class TimeMapperTest(TestCase):
 	def test_identity(self):
@@ -23,6 +25,71 @@ class TimeMapperTest(TestCase):
 		assert t_w.clock == c_w
 		assert int(t_m) + 100 == int(t_w)
 	
+	def test_array(self):
+		c_m = MonoClock()
+		c_w = WallClock()
+		fom = FixedOffsetMapper(c_m, c_w, 100)
+		ts_m = TimestampArray(np.arange(5) * 1_000, c_m)
+		ts_w = fom.a_to_b(ts_m)
+		assert ts_w.clock == c_w
+		np.testing.assert_array_equal(ts_w.nanos, ts_m.nanos + 100)
+		assert (-fom).a_to_b(ts_w) == ts_m
+		assert fom.b_to_a(ts_w) == ts_m
+		# Same as one-at-a-time
+		assert list(ts_w) == [fom.a_to_b(t) for t in ts_m]
+	
+	def test_history(self):
+		c_m = MonoClock()
+		c_w = WallClock()
+		m = OffsetHistoryMapper(c_m, c_w)
+		m.record(1_000, 10)
+		m.record(2_000, 20)
+		m.record(3_000, 30)
+		assert m.get_offset() == 30
+		ts_m = TimestampArray([0, 1_500, 2_000, 2_999, 5_000], c_m)
+		ts_w = m.a_to_b(ts_m)
+		np.testing.assert_array_equal(ts_w.nanos, [10, 1_510, 2_020, 3_019, 5_030])
+		assert m.b_to_a(ts_w) == ts_m
+		assert (-m).a_to_b(ts_w) == ts_m
+		# Single timestamps use the history too
+		assert [m.a_to_b(t) for t in ts_m] == list(ts_w)
+		assert [m.b_to_a(t) for t in ts_w] == list(ts_m)
+		with self.assertRaises(ValueError):
+			m.record(2_500, 40)
+	
+	def test_history_chained(self):
+		c0 = MonoClock()
+		c1 = FixedOffsetClock(c0, 100)
+		c2 = WallClock()
+		hist = OffsetHistoryMapper(c1, c2)
+		hist.record(0, 1_000)
+		hist.record(10_000, 2_000)
+		map = TimeMap(OffsetClockMapper(c1), hist)
+		conv = map.get_conversion(c0, c2)
+		assert conv is not None
+		ts0 = TimestampArray([0, 9_899, 9_900, 20_000], c0)
+		ts2 = conv.a_to_b(ts0)
+		np.testing.assert_array_equal(ts2.nanos, [1_100, 10_999, 12_000, 22_100])
+		assert ts0.localize(c2, map) == ts2
+		assert ts2.localize(c0, map) == ts0
+		assert [conv.a_to_b(t) for t in ts0] == list(ts2)
+		assert [conv.b_to_a(t) for t in ts2] == list(ts0)
+	
+	def test_history_scalar(self):
+		c_m = MonoClock()
+		c_w = WallClock()
+		m = OffsetHistoryMapper(c_m, c_w)
+		m.record(0, 100)
+		m.record(1_000, 500)
+		ts_m = Timestamp(10, c_m)
+		ts_w = m.a_to_b(ts_m)
+		np.testing.assert_array_equal(m.a_to_b(TimestampArray([10], c_m)).nanos, [110])
+		assert ts_w.nanos == 110
+		assert m.b_to_a(ts_w) == ts_m
+		# Latest offset
+		assert m.a_to_b(Timestamp(1_000, c_m)).nanos == 1_500
+		assert m.b_to_a(Timestamp(1_500, c_w)).nanos == 1_000
+
 
 class TimeMapTest(TestCase):
 	def test_search_identity(self):
@@ -91,6 +158,61 @@ class TimeMapTest(TestCase):
 		assert t0.clock == c0
 		assert int(t0) + 300 == int(t2)
 	
+	def test_memoized(self):
+		c0 = MonoClock()
+		c1 = FixedOffsetClock(c0, 100)
+		c2 = FixedOffsetClock(c1, 200)
+		c3 = WallClock()
+		map = TimeMap(
+			OffsetClockMapper(c1),
+			OffsetClockMapper(c2),
+		)
+		conv = map.get_conversion(c0, c2)
+		# Constant chain is collapsed
+		assert isinstance(conv, FixedOffsetMapper)
+		assert conv.get_offset() == 300
+		assert map.get_conversion(c0, c2) is conv
+		assert map.get_conversion(c0, c3) is None
+
+		# Invalidated on register
+		map.register(FixedOffsetMapper(c2, c3, 1_000))
+		conv3 = map.get_conversion(c0, c3)
+		assert conv3 is not None
+		assert conv3.get_offset() == 1_300
+		assert map.get_conversion(c0, c2) is not conv
+		assert map.get_conversion(c0, c2) == conv
+
+	def test_memoized_dynamic(self):
+		c0 = MonoClock()
+		c1 = FixedOffsetClock(c0, 100)
+		c2 = WallClock()
+		map = TimeMap(
+			OffsetClockMapper(c1),
+			DynamicOffsetMapper(c0, c2),
+		)
+		conv = map.get_conversion(c1, c2)
+		assert conv is not None
+		# Not collapsed, as the offset can change
+		assert not conv.constant_offset
+		assert map.get_conversion(c1, c2) is conv
+	
+	def test_memoized_history(self):
+		c0 = MonoClock()
+		c1 = FixedOffsetClock(c0, 100)
+		c2 = WallClock()
+		hist = OffsetHistoryMapper(c1, c2)
+		hist.record(0, 1_000)
+		map = TimeMap(OffsetClockMapper(c1), hist)
+		conv = map.get_conversion(c0, c2)
+		assert conv.a_to_b(Timestamp(10_000, c0)).nanos == 11_100
+		# Memoized paths see new offsets
+		hist.record(5_000, 2_000)
+		assert map.get_conversion(c0, c2) is conv
+		assert conv.a_to_b(Timestamp(10_000, c0)).nanos == 12_100
+		# Fixed offsets can't change after they're memoized
+		with self.assertRaises(AttributeError):
+			c1.offset = 200
+
 	def test_context(self):
 		c0 = MonoClock()
 		c1 = FixedOffsetClock(c0, 100)
@@ -1,7 +1,8 @@
-from typing import TYPE_CHECKING, overload, Optional, Literal, Union, TypeVar, Generic
+from typing import TYPE_CHECKING, overload, Optional, Literal, Union, TypeVar, Generic, Iterable, Iterator
 from functools import total_ordering
 from datetime import timedelta
 import warnings
+import numpy as np
 
 if TYPE_CHECKING:
 	from logging import Logger
@@ -14,6 +15,191 @@ class TimestampContext:
 	incompatible_clock_strategy: Literal[None, 'warn', 'error'] = 'warn'
 	unknown_clock_strategy: Literal[None, 'warn', 'error'] = 'warn'
 
+def _timedelta_ns(value: timedelta) -> int:
+	"Convert timedelta to integer nanoseconds (exactly)"
+	return ((value.days * 86_400 + value.seconds) * 1_000_000 + value.microseconds) * 1_000
+
+@total_ordering
+class Duration:
+	"""
+	Represents a span of time, in integer nanoseconds.
+
+	Can be used (almost) anywhere a `timedelta` can: it has `total_seconds()`, and arithmetic and
+	comparisons work against `timedelta`s. Unlike `timedelta`, it doesn't lose nanosecond precision,
+	and it's cheap to create.
+	"""
+	__slots__ = ('nanos',)
+	__match_args__ = ('nanos',)
+
+	nanos: int
+
+	@classmethod
+	def from_seconds(cls, seconds: float) -> 'Duration':
+		return cls(round(seconds * 1_000_000_000))
+	
+	@classmethod
+	def from_millis(cls, millis: float) -> 'Duration':
+		return cls(round(millis * 1_000_000))
+	
+	@classmethod
+	def from_micros(cls, micros: float) -> 'Duration':
+		return cls(round(micros * 1_000))
+	
+	@staticmethod
+	def from_nanos(nanos: int) -> 'Duration':
+		return Duration(nanos)
+	
+	@classmethod
+	def from_timedelta(cls, value: timedelta) -> 'Duration':
+		return cls(_timedelta_ns(value))
+	
+	@classmethod
+	def wrap(cls, value: Union['Duration', timedelta]) -> 'Duration':
+		"Wrap a (possibly timedelta) argument"
+		if isinstance(value, Duration):
+			return value
+		if isinstance(value, timedelta):
+			return cls(_timedelta_ns(value))
+		raise TypeError(f'Expected Duration or timedelta, not {type(value).__name__}')
+
+	def __init__(self, nanos: int = 0):
+		_set_duration_nanos(self, int(nanos))
+	
+	def __setattr__(self, name, value):
+		raise AttributeError('Duration is immutable')
+	
+	def __delattr__(self, name):
+		raise AttributeError('Duration is immutable')
+	
+	def __reduce__(self):
+		return (Duration, (self.nanos,))
+	
+	def total_seconds(self) -> float:
+		"Get duration in fractional seconds (like `timedelta.total_seconds()`)"
+		return self.nanos / 1_000_000_000
+	
+	def as_timedelta(self) -> timedelta:
+		"Convert to timedelta (truncated to microseconds)"
+		return timedelta(microseconds=self.nanos // 1_000)
+	
+	def __int__(self):
+		return self.nanos
+	
+	def __bool__(self):
+		return self.nanos != 0
+	
+	def __neg__(self) -> 'Duration':
+		return Duration(-self.nanos)
+	
+	def __pos__(self) -> 'Duration':
+		return self
+	
+	def __abs__(self) -> 'Duration':
+		return self if self.nanos >= 0 else Duration(-self.nanos)
+
+	def __add__(self, other: Union['Duration', timedelta]) -> 'Duration':
+		if isinstance(other, Duration):
+			return Duration(self.nanos + other.nanos)
+		if isinstance(other, timedelta):
+			return Duration(self.nanos + _timedelta_ns(other))
+		return NotImplemented
+	__radd__ = __add__
+	
+	def __sub__(self, other: Union['Duration', timedelta]) -> 'Duration':
+		if isinstance(other, Duration):
+			return Duration(self.nanos - other.nanos)
+		if isinstance(other, timedelta):
+			return Duration(self.nanos - _timedelta_ns(other))
+		return NotImplemented
+	
+	def __rsub__(self, other: timedelta) -> 'Duration':
+		if isinstance(other, timedelta):
+			return Duration(_timedelta_ns(other) - self.nanos)
+		return NotImplemented
+	
+	def __mul__(self, other: Union[int, float]) -> 'Duration':
+		if isinstance(other, int):
+			return Duration(self.nanos * other)
+		if isinstance(other, float):
+			return Duration(round(self.nanos * other))
+		return NotImplemented
+	__rmul__ = __mul__
+
+	@overload
+	def __truediv__(self, other: Union['Duration', timedelta]) -> float: ...
+	@overload
+	def __truediv__(self, other: Union[int, float]) -> 'Duration': ...
+	def __truediv__(self, other):
+		if isinstance(other, Duration):
+			return self.nanos / other.nanos
+		if isinstance(other, timedelta):
+			return self.nanos / _timedelta_ns(other)
+		if isinstance(other, (int, float)):
+			return Duration(round(self.nanos / other))
+		return NotImplemented
+	
+	def __rtruediv__(self, other: timedelta) -> float:
+		if isinstance(other, timedelta):
+			return _timedelta_ns(other) / self.nanos
+		return NotImplemented
+	
+	@overload
+	def __floordiv__(self, other: Union['Duration', timedelta]) -> int: ...
+	@overload
+	def __floordiv__(self, other: int) -> 'Duration': ...
+	def __floordiv__(self, other):
+		if isinstance(other, Duration):
+			return self.nanos // other.nanos
+		if isinstance(other, timedelta):
+			return self.nanos // _timedelta_ns(other)
+		if isinstance(other, int):
+			return Duration(self.nanos // other)
+		return NotImplemented
+	
+	def __mod__(self, other: Union['Duration', timedelta]) -> 'Duration':
+		if isinstance(other, Duration):
+			return Duration(self.nanos % other.nanos)
+		if isinstance(other, timedelta):
+			return Duration(self.nanos % _timedelta_ns(other))
+		return NotImplemented
+
+	def __hash__(self) -> int:
+		# Must match timedelta's hash when they're equal
+		if self.nanos % 1_000 == 0:
+			return hash(timedelta(microseconds=self.nanos // 1_000))
+		return hash(self.nanos)
+	
+	def __eq__(self, other: Union['Duration', timedelta]):
+		if isinstance(other, Duration):
+			return self.nanos == other.nanos
+		if isinstance(other, timedelta):
+			return self.nanos == _timedelta_ns(other)
+		return NotImplemented
+	
+	def __lt__(self, other: Union['Duration', timedelta]):
+		if isinstance(other, Duration):
+			return self.nanos < other.nanos
+		if isinstance(other, timedelta):
+			return self.nanos < _timedelta_ns(other)
+		return NotImplemented
+	
+	def __gt__(self, other: Union['Duration', timedelta]):
+		if isinstance(other, Duration):
+			return self.nanos > other.nanos
+		if isinstance(other, timedelta):
+			return self.nanos > _timedelta_ns(other)
+		return NotImplemented
+
+	def __str__(self):
+		return str(self.as_timedelta()) if self.nanos % 1_000 == 0 else f'{self.nanos / 1e9:.9f}s'
+	
+	def __repr__(self):
+		return f'Duration({self.nanos:,})'
+
+_set_duration_nanos = Duration.nanos.__set__
+"Set slot directly (bypassing `Duration.__setattr__`)"
+
+
 @total_ordering
 class Timestamp:
 	"""
@@ -88,15 +274,16 @@ class Timestamp:
 		"Assert source clock"
 		pass
 	
-	def offset(self, offset: timedelta) -> 'Timestamp':
-		return Timestamp(self.nanos + (offset.total_seconds() * 1e9), clock=self.clock)
+	def offset(self, offset: Union[Duration, timedelta]) -> 'Timestamp':
+		if isinstance(offset, Duration):
+			return Timestamp(self.nanos + offset.nanos, clock=self.clock)
+		return Timestamp(self.nanos + _timedelta_ns(offset), clock=self.clock)
 	
 	def offset_ns(self, offset: int, clock: Optional['Clock'] = None) -> 'Timestamp':
 		return Timestamp(self.nanos + offset, clock=clock or self.clock)
 
-	def difference(self, other: 'Timestamp') -> timedelta:
-		delta_ns = self.nanos - other.nanos
-		return timedelta(microseconds=delta_ns / 1e3)
+	def difference(self, other: 'Timestamp') -> Duration:
+		return Duration(self.nanos - other.nanos)
 	
 	def localize(self, clock: 'Clock', map: Optional['TimeMap'] = None) -> 'Timestamp':
 		if self.clock is None:
@@ -114,27 +301,32 @@ class Timestamp:
 			raise RuntimeError('No conversion available')
 		return conv.a_to_b(self)
 
-	def __add__(self, other: timedelta) -> 'Timestamp':
+	def __add__(self, other: Union[Duration, timedelta]) -> 'Timestamp':
 		"Apply offset"
+		if isinstance(other, Duration):
+			return Timestamp(self.nanos + other.nanos, clock=self.clock)
 		if isinstance(other, timedelta):
 			return self.offset(other)
 		return NotImplemented
+	__radd__ = __add__
 	
 	@overload
-	def __sub__(self, /, other: timedelta) -> 'Timestamp':
+	def __sub__(self, /, other: Union[Duration, timedelta]) -> 'Timestamp':
 		"Apply negative offset"
 		...
 	
 	@overload
-	def __sub__(self, /, other: 'Timestamp') -> timedelta:
+	def __sub__(self, /, other: 'Timestamp') -> Duration:
 		"Compute the difference between two timestamps"
 	def __sub__(self, /, other):
-		if isinstance(other, timedelta):
-			return self.offset(-other)
 		if isinstance(other, Timestamp):
 			if other.clock != self.clock:
 				return NotImplemented
-			return self.difference(other)
+			return Duration(self.nanos - other.nanos)
+		if isinstance(other, Duration):
+			return Timestamp(self.nanos - other.nanos, clock=self.clock)
+		if isinstance(other, timedelta):
+			return Timestamp(self.nanos - _timedelta_ns(other), clock=self.clock)
 		return NotImplemented
 	
 	def __hash__(self) -> int:
@@ -178,6 +370,137 @@ class Timestamp:
 	__repr__ = __str__
 
 
+class TimestampArray:
+	"""
+	Array of timestamps from a single clock.
+
+	Stores integer nanoseconds in an `int64` ndarray, so that offsets, clock conversions, and
+	comparisons can be applied to many timestamps at once.
+	"""
+
+	@classmethod
+	def from_timestamps(cls, timestamps: Iterable[Timestamp], clock: Optional['Clock'] = None) -> 'TimestampArray':
+		"Pack timestamps (which must share a clock)"
+		timestamps = list(timestamps)
+		if clock is None and len(timestamps) > 0:
+			clock = timestamps[0].clock
+		for ts in timestamps:
+			if ts.clock != clock:
+				raise ValueError(f'Mixed clocks ({ts.clock} and {clock})')
+		return cls(np.fromiter((ts.nanos for ts in timestamps), dtype=np.int64, count=len(timestamps)), clock)
+
+	@classmethod
+	def from_seconds(cls, seconds: np.ndarray, clock: Optional['Clock'] = None) -> 'TimestampArray':
+		return cls(np.floor(np.asarray(seconds, dtype=np.float64) * 1_000_000_000 + 0.5), clock)
+	
+	@classmethod
+	def from_wpi(cls, micros: np.ndarray, clock: Optional['Clock'] = None) -> 'TimestampArray':
+		"From WPIlib time (microseconds)"
+		return cls(np.asarray(micros, dtype=np.int64) * 1_000, clock)
+
+	@staticmethod
+	def from_nanos(nanos: np.ndarray, clock: Optional['Clock'] = None) -> 'TimestampArray':
+		return TimestampArray(nanos, clock)
+
+	__slots__ = ('nanos', 'clock')
+
+	nanos: np.ndarray
+	clock: Optional['Clock']
+
+	def __init__(self, nanos: np.ndarray, clock: Optional['Clock'] = None):
+		self.nanos = np.asarray(nanos, dtype=np.int64)
+		self.clock = clock
+	
+	def __len__(self):
+		return len(self.nanos)
+	
+	@overload
+	def __getitem__(self, idx: int) -> Timestamp: ...
+	@overload
+	def __getitem__(self, idx: Union[slice, np.ndarray]) -> 'TimestampArray': ...
+	def __getitem__(self, idx):
+		res = self.nanos[idx]
+		if isinstance(res, np.ndarray):
+			return TimestampArray(res, self.clock)
+		return Timestamp(res, self.clock)
+	
+	def __iter__(self) -> Iterator[Timestamp]:
+		clock = self.clock
+		for nanos in self.nanos.tolist():
+			yield Timestamp(nanos, clock)
+	
+	def as_seconds(self) -> np.ndarray:
+		"Get times in fractional seconds"
+		return self.nanos / 1_000_000_000
+	
+	def as_wpi(self) -> np.ndarray:
+		"Get in wpi-time (integer microseconds)"
+		return self.nanos // 1_000
+	
+	def split(self) -> tuple[np.ndarray, np.ndarray]:
+		"Split into seconds and partial-nanoseconds"
+		return np.divmod(self.nanos, 1_000_000_000)
+
+	def assert_src(self, clock: Optional['Clock']):
+		"Assert source clock"
+		pass
+	
+	def offset(self, offset: Union[Duration, timedelta]) -> 'TimestampArray':
+		return TimestampArray(self.nanos + Duration.wrap(offset).nanos, clock=self.clock)
+	
+	def offset_ns(self, offset: Union[int, np.ndarray], clock: Optional['Clock'] = None) -> 'TimestampArray':
+		"Apply offset (which may be per-element)"
+		return TimestampArray(self.nanos + offset, clock=clock or self.clock)
+
+	def difference(self, other: Union[Timestamp, 'TimestampArray']) -> np.ndarray:
+		"Difference in integer nanoseconds"
+		return self.nanos - other.nanos
+	
+	def localize(self, clock: 'Clock', map: Optional['TimeMap'] = None) -> 'TimestampArray':
+		"Convert all timestamps to `clock`"
+		if self.clock is None:
+			warnings.warn('Convert from unknown clock', RuntimeWarning, stacklevel=2)
+			return TimestampArray(self.nanos, clock)
+		if self.clock == clock:
+			return self
+		
+		if map is None:
+			from .timemap import TimeMap
+			map = TimeMap.default
+		
+		conv = map.get_conversion(self.clock, clock)
+		if conv is None:
+			raise RuntimeError('No conversion available')
+		return conv.a_to_b(self)
+	
+	def __add__(self, other: Union[Duration, timedelta]) -> 'TimestampArray':
+		"Apply offset"
+		if isinstance(other, (Duration, timedelta)):
+			return self.offset(other)
+		return NotImplemented
+	__radd__ = __add__
+
+	def __sub__(self, other: Union[Duration, timedelta]) -> 'TimestampArray':
+		"Apply negative offset"
+		if isinstance(other, (Duration, timedelta)):
+			return TimestampArray(self.nanos - Duration.wrap(other).nanos, clock=self.clock)
+		return NotImplemented
+	
+	def __eq__(self, other: 'TimestampArray'):
+		if isinstance(other, TimestampArray):
+			return (self.clock == other.clock) and np.array_equal(self.nanos, other.nanos)
+		return NotImplemented
+	
+	__hash__ = None
+
+	def __str__(self):
+		if self.clock is None:
+			return f'TimestampArray({self.nanos})'
+		else:
+			return f'TimestampArray({self.nanos}, clock={self.clock})'
+	__repr__ = __str__
+
+
 T = TypeVar('T')
 class Stamped(Generic[T]):
 	def __init__(self, value: T, ts: Timestamp):
@@ -0,0 +1,64 @@
+"""
+Microbenchmarks for Duration vs timedelta
+
+Usage: python -m util.timestamp_bench [--number N]
+"""
+from argparse import ArgumentParser
+from datetime import timedelta
+from timeit import timeit
+
+from .clock import MonoClock
+from .timestamp import Timestamp, Duration
+
+
+def main():
+	parser = ArgumentParser(description="Compare Duration and timedelta per-operation cost")
+	parser.add_argument('--number', type=int, default=200_000, help="Iterations per operation")
+	args = parser.parse_args()
+
+	clock = MonoClock()
+	t0 = Timestamp(1_000_000_000, clock)
+	t1 = Timestamp(1_016_666_667, clock)
+	td = timedelta(milliseconds=50)
+	d = Duration.wrap(td)
+
+	# Previous (timedelta-based) implementations
+	def old_difference(a: Timestamp, b: Timestamp) -> timedelta:
+		return timedelta(microseconds=(a.nanos - b.nanos) / 1e3)
+	def old_offset(t: Timestamp, offset: timedelta) -> Timestamp:
+		return Timestamp(t.nanos + (offset.total_seconds() * 1e9), clock=t.clock)
+
+	cases = [
+		(
+			"difference",
+			lambda: old_difference(t1, t0),
+			lambda: t1.difference(t0),
+		),
+		(
+			"offset",
+			lambda: old_offset(t0, td),
+			lambda: t0.offset(d),
+		),
+		(
+			"elapsed > limit",
+			# Watchdog
+			lambda: old_difference(t1, t0) > td,
+			lambda: t1.difference(t0) > d,
+		),
+		(
+			"age check",
+			# ObjectTracker.should_remove
+			lambda: t0 < old_offset(t1, -td),
+			lambda: t1.nanos - t0.nanos > d.nanos,
+		),
+	]
+
+	print(f"{'operation':<18} {'timedelta':>12} {'Duration':>12} {'speedup':>8}")
+	for name, old, new in cases:
+		old_ns = timeit(old, number=args.number) / args.number * 1e9
+		new_ns = timeit(new, number=args.number) / args.number * 1e9
+		print(f"{name:<18} {old_ns:10.1f}ns {new_ns:10.1f}ns {old_ns / new_ns:7.2f}x")
+
+
+if __name__ == '__main__':
+	main()
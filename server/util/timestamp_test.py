@@ -0,0 +1,87 @@
+from unittest import TestCase
+from datetime import timedelta
+import pickle
+import numpy as np
+
+from .clock import MonoClock
+from .timestamp import Timestamp, TimestampArray, Duration
+
+class DurationTest(TestCase):
+	def test_precision(self):
+		c = MonoClock()
+		t0 = Timestamp(1_000_000_001, c)
+		t1 = Timestamp(3_000_000_004, c)
+		delta = t1 - t0
+		assert isinstance(delta, Duration)
+		assert delta.nanos == 2_000_000_003
+		assert (t0 + delta) == t1
+		assert (t1 - delta) == t0
+
+	def test_timedelta_compat(self):
+		d = Duration.from_millis(1500)
+		assert d == timedelta(seconds=1.5)
+		assert timedelta(seconds=1.5) == d
+		assert hash(d) == hash(timedelta(seconds=1.5))
+		assert d < timedelta(seconds=2)
+		assert timedelta(seconds=2) > d
+		assert d.total_seconds() == 1.5
+		assert d + timedelta(seconds=1) == Duration.from_seconds(2.5)
+		assert timedelta(seconds=1) + d == Duration.from_seconds(2.5)
+		assert timedelta(seconds=2) - d == Duration.from_millis(500)
+		assert d / timedelta(seconds=0.5) == 3.0
+		assert timedelta(seconds=3) / d == 2.0
+		assert max(timedelta(seconds=1), d) is d
+		assert Duration.wrap(timedelta(days=1, microseconds=1)).nanos == 86_400_000_001_000
+		assert d.as_timedelta() == timedelta(seconds=1.5)
+
+	def test_arithmetic(self):
+		d = Duration(1_000)
+		assert d * 3 == Duration(3_000)
+		assert 0.5 * d == Duration(500)
+		assert d / 4 == Duration(250)
+		assert d // 3 == Duration(333)
+		assert Duration(10) // Duration(3) == 3
+		assert Duration(10) % Duration(3) == Duration(1)
+		assert -d == Duration(-1_000)
+		assert abs(-d) == d
+		assert not Duration(0)
+		assert d
+
+	def test_timestamp_offset(self):
+		c = MonoClock()
+		t0 = Timestamp(0, c)
+		# Used to go through float seconds
+		assert (t0 + timedelta(days=365, microseconds=1)).nanos == 31_536_000_000_001_000
+		assert (t0 + Duration(1)).nanos == 1
+		assert (t0 - Duration(1)).nanos == -1
+		assert (Duration(1) + t0).nanos == 1
+
+	def test_immutable(self):
+		d = Duration(5)
+		with self.assertRaises(AttributeError):
+			d.nanos = 3
+		assert pickle.loads(pickle.dumps(d)) == d
+
+
+class TimestampArrayTest(TestCase):
+	def test_roundtrip(self):
+		c = MonoClock()
+		stamps = [Timestamp(n, c) for n in (1_000_000_001, 2_500_000_000, 3)]
+		arr = TimestampArray.from_timestamps(stamps)
+		assert arr.clock == c
+		assert len(arr) == 3
+		assert list(arr) == stamps
+		assert arr[1] == stamps[1]
+		assert arr[1:] == TimestampArray.from_timestamps(stamps[1:])
+		s, ns = arr.split()
+		assert [(int(a), int(b)) for a, b in zip(s, ns)] == [t.split() for t in stamps]
+		with self.assertRaises(ValueError):
+			TimestampArray.from_timestamps([Timestamp(0, c), Timestamp(0, None)])
+	
+	def test_offset(self):
+		c = MonoClock()
+		arr = TimestampArray(np.array([0, 10]), c)
+		np.testing.assert_array_equal((arr + Duration(5)).nanos, [5, 15])
+		np.testing.assert_array_equal((arr - timedelta(microseconds=1)).nanos, [-1_000, -990])
+		np.testing.assert_array_equal(arr.offset_ns(np.array([1, 2])).nanos, [1, 12])
+		np.testing.assert_array_equal(arr.difference(Timestamp(5, c)), [-5, 5])
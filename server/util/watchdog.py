@@ -3,6 +3,7 @@ from datetime import timedelta
 import time, warnings
 
 from .clock import Clock, MonoClock
+from .timestamp import Duration
 if TYPE_CHECKING:
 	from typing_extensions import TypedDict
 	import logging
@@ -14,28 +15,28 @@ if TYPE_CHECKING:
 
 class Watchdog:
 	"Watchdog for loop timing"
-	min: timedelta
+	min: Duration
 	"Minimum time to take"
-	max: timedelta
+	max: Duration | None
 	"Maximum time to take (logs error if exceeded)"
 
-	def __init__(self, name: str, *, min: timedelta | float | None = None, max: timedelta | float | None = None, clock: Clock | None = None, log: Optional['logging.Logger'] = None, log_overrun: bool = True) -> None:
+	def __init__(self, name: str, *, min: Duration | timedelta | float | None = None, max: Duration | timedelta | float | None = None, clock: Clock | None = None, log: Optional['logging.Logger'] = None, log_overrun: bool = True) -> None:
 		self.name = name
 		if min is None:
-			self.min = timedelta(seconds=0)
-		elif isinstance(min, timedelta):
-			self.min = min
+			self.min = Duration(0)
+		elif isinstance(min, (Duration, timedelta)):
+			self.min = Duration.wrap(min)
 		else:
-			self.min = timedelta(seconds=min)
-		assert self.min.total_seconds() >= 0
+			self.min = Duration.from_seconds(min)
+		assert self.min.nanos >= 0
 		
 		self.clock = clock or MonoClock()
 		if max is None:
 			self.max = None
-		elif isinstance(max, timedelta):
-			self.max = max
+		elif isinstance(max, (Duration, timedelta)):
+			self.max = Duration.wrap(max)
 		else:
-			self.max = timedelta(seconds=max)
+			self.max = Duration.from_seconds(max)
 		
 		if (self.max is not None) and self.max < self.min:
 			warnings.warn(f"Watchdog '{name}': max < min", RuntimeWarning)
@@ -48,12 +49,12 @@ class Watchdog:
 		self.ignore_exceeded = not log_overrun
 		self.start = None
 	
-	def elapsed(self) -> timedelta | None:
+	def elapsed(self) -> Duration | None:
 		if (start := self.start) is not None:
 			return self.clock.now() - start
 		return None
 	
-	def remaining(self) -> timedelta | None:
+	def remaining(self) -> Duration | None:
 		if (max := self.max) is not None:
 			if (elapsed := self.elapsed()) is not None:
 				return max - elapsed
@@ -82,17 +83,18 @@ class Watchdog:
 		self._skip = True
 
 	def __enter__(self):
-		self._start = self.clock.now()
+		self._start_ns = self.clock.now_ns()
 		return self
 	
 	def __exit__(self, *args):
 		if self._skip:
 			return
 		
-		delta = (self.clock.now() - self._start)
-		if delta < self.min:
-			time.sleep((self.min - delta).total_seconds())
-		elif (self.max is not None) and (delta > self.max) and (not self.ignore_exceeded):
+		delta_ns = self.clock.now_ns() - self._start_ns
+		if delta_ns < self.min.nanos:
+			time.sleep((self.min.nanos - delta_ns) / 1e9)
+		elif (self.max is not None) and (delta_ns > self.max.nanos) and (not self.ignore_exceeded):
+			delta = Duration(delta_ns)
 			if self._log is not None:
 				self._log.warning('Watchdog %s exceeded period (%s of %s)', self.name, delta, self.max)
 			else:
@@ -14,6 +14,7 @@ from aiohttp.web_response import StreamResponse
 from yarl import URL
 from . import msg as ty
 from queue import Queue, Empty, Full
+from util.telemetry import TelemetryMonitor
 
 from aiohttp import web
 from aiortc import RTCPeerConnection, RTCSessionDescription
@@ -32,11 +33,14 @@ class IPCTrack(VideoStreamTrack):
 	def __init__(self):
 		super().__init__()
 		self._queue: asyncio.Queue[ty.MsgFrame] = asyncio.Queue(10)
+		self.dropped = 0
+		"Frames dropped because the local queue was full"
 	
 	def provide_frame(self, frame: ty.MsgFrame):
 		try:
 			self._queue.put_nowait(frame)
 		except (asyncio.QueueFull, asyncio.TimeoutError):
+			self.dropped += 1
 			print("Local queue drop frame")
 	
 	def get_raw(self):
@@ -179,10 +183,19 @@ class WebServer:
 			daemon=True,
 		)
 		self.pcs: set[RTCPeerConnection] = set()
+
+		self.telemetry = TelemetryMonitor('web')
+		self.telemetry.add_queue('video', self.vidq)
+		self._telemetry_thread = Thread(
+			name='telemetry',
+			target=self.send_telemetry,
+			daemon=True,
+		)
 	
 	def read_frame(self):
 		while True:
 			frame = self.vidq.get()
+			start = time.perf_counter_ns()
 			frame.timestamp_extract = time.time_ns()
 			with self.si_lock:
 				handler = self.stream_info.get((frame.worker, frame.stream), None)
@@ -191,6 +204,20 @@ class WebServer:
 				self._loop.run_until_complete(handler.provide_frame(frame))
 			else:
 				print(f"No handler for stream {frame.worker}.{frame.stream}")
+			self.telemetry.record_loop(time.perf_counter_ns() - start)
+	
+	def send_telemetry(self):
+		"Periodically report telemetry to the main process"
+		while True:
+			time.sleep(self.telemetry.interval_ns / 1e9)
+			with self.si_lock:
+				self.telemetry.dropped = sum(si.track.dropped for si in self.stream_info.values())
+			if (msg := self.telemetry.poll()) is None:
+				continue
+			try:
+				self.msgq.put_nowait(msg)
+			except Full:
+				pass
 	
 	async def web_enumerate_cameras(self, req: web.Request):
 		"Enumerate connected cameras"
@@ -360,6 +387,7 @@ class WebServer:
 		])
 		self.dispatch.start()
 		self._vid_thread.start()
+		self._telemetry_thread.start()
 		web.run_app(app, host=self.config.host, port=self.config.port, ssl_context=ssl_context)
 
 def app_main(config: ty.WebConfig, msgq: Queue, cmdq: Queue, vidq: Queue):
@@ -1,7 +1,8 @@
-from typing import TYPE_CHECKING, TypeVar
+from typing import TYPE_CHECKING, TypeVar, Optional
 from queue import Full
 from . import msg as ty
 from util.subproc import Subprocess
+from util.telemetry import MsgTelemetry
 
 if TYPE_CHECKING:
     from ..moenet import MoeNet
@@ -26,6 +27,8 @@ class RemoteWebServer(Subprocess[ty.WMsgAny, ty.WCmdAny, None]):
     def __init__(self, moenet: 'MoeNet') -> None:
         self.moenet = moenet
         self.proc = None
+        self.telemetry: Optional[MsgTelemetry] = None
+        "Latest process telemetry"
         if not moenet.config.web.enabled:
             self.vid_queue = None
             return
@@ -40,6 +43,7 @@ class RemoteWebServer(Subprocess[ty.WMsgAny, ty.WCmdAny, None]):
         self.add_handler(ty.WMsgRequestConfig, self._process_request_config)
         self.add_handler(ty.WMsgRequestStreams, self._process_request_streams)
         self.add_handler(ty.WMsgStreamCtl, self._process_streamctl)
+        self.add_handler(MsgTelemetry, self._process_telemetry)
 
         self.vid_queue = self._make_queue(4)
 
@@ -106,6 +110,9 @@ class RemoteWebServer(Subprocess[ty.WMsgAny, ty.WCmdAny, None]):
         if workers := self.moenet.camera_workers:
             workers.enable_stream(msg.worker, msg.name, msg.enable)
     
+    def _process_telemetry(self, msg: MsgTelemetry):
+        self.telemetry = msg
+    
     def close1(self):
         self.close()
         del self.moenet
@@ -242,6 +242,7 @@ class WorkerConfigResolver:
 			retry=camera.retry,
 			robot_to_camera=robot_to_camera,
 			dynamic_pose=dynamic_pose,
+			max_lateness=camera.max_lateness,
 			pipeline=pipeline,
 		)
 
@@ -8,7 +8,7 @@ from queue import Empty
 from pathlib import Path
 from logging import Logger
 
-from wpiutil.log import DataLog, StringLogEntry, IntegerLogEntry
+from wpiutil.log import DataLog, StringLogEntry, IntegerLogEntry, DoubleLogEntry
 
 from . import msg as worker
 from .config_resolver import WorkerConfigResolver
@@ -19,13 +19,18 @@ from util.log import child_logger
 if TYPE_CHECKING:
 	from multiprocessing.context import BaseContext
 	from queue import Queue
+	from wpi_compat.datalog import AsyncDataLog
+
+def _format_log(packet: worker.MsgLog) -> str:
+	return f'[{logging.getLevelName(packet.level)}]{packet.name}:{packet.msg}'
 
 class WorkerManager:
-	def __init__(self, log: Logger, config: LocalConfig, config_path: Optional[Path] = None, datalog: Optional['DataLog'] = None, vidq: Optional['Queue'] = None) -> None:
+	def __init__(self, log: Logger, config: LocalConfig, config_path: Optional[Path] = None, datalog: Optional['DataLog'] = None, vidq: Optional['Queue'] = None, datalog_writer: Optional['AsyncDataLog'] = None) -> None:
 		self.log = log.getChild('worker')
 		self.config = WorkerConfigResolver(self.log, config, config_path)
 		self._workers: list['WorkerHandle'] = list()
 		self.datalog = datalog
+		self.datalog_writer = datalog_writer
 		self.ctx = get_context('spawn')
 		self.video_queue = vidq
 
@@ -33,7 +38,7 @@ class WorkerManager:
 		"Start all camera processes"
 		for i, cfg in enumerate(self.config):
 			name = cfg.name if cfg.name is not None else f'cam_{i}'
-			wh = WorkerHandle(i, name, cfg, log=self.log, datalog=self.datalog, ctx=self.ctx, vidq=self.video_queue)
+			wh = WorkerHandle(i, name, cfg, log=self.log, datalog=self.datalog, ctx=self.ctx, vidq=self.video_queue, datalog_writer=self.datalog_writer)
 			self._workers.append(wh)
 			wh.start()
 	
@@ -68,7 +73,7 @@ class WorkerManager:
 
 
 class WorkerHandle(Subprocess[worker.WorkerMsg, worker.AnyCmd, worker.AnyMsg]):
-	def __init__(self, idx: int, name: str, config: worker.WorkerInitConfig, *, log: logging.Logger | None = None, ctx: BaseContext | None = None, datalog: Optional['DataLog'] = None, vidq: Optional['Queue'] = None):
+	def __init__(self, idx: int, name: str, config: worker.WorkerInitConfig, *, log: logging.Logger | None = None, ctx: BaseContext | None = None, datalog: Optional['DataLog'] = None, vidq: Optional['Queue'] = None, datalog_writer: Optional['AsyncDataLog'] = None):
 		if ctx is None:
 			ctx = get_context('spawn')
 		
@@ -89,6 +94,19 @@ class WorkerHandle(Subprocess[worker.WorkerMsg, worker.AnyCmd, worker.AnyMsg]):
 
 			self.logStatus = IntegerLogEntry(self.datalog, f'worker/{name}/status')
 			self.logLog = StringLogEntry(self.datalog, f'worker/{name}/log')
+			self.logTimeOffset = IntegerLogEntry(self.datalog, f'worker/{name}/timesync/offset')
+			self.logTimeDrift = DoubleLogEntry(self.datalog, f'worker/{name}/timesync/drift')
+			self.logTimeJitter = DoubleLogEntry(self.datalog, f'worker/{name}/timesync/jitter')
+			self.logTimeLatency = IntegerLogEntry(self.datalog, f'worker/{name}/timesync/latency')
+			self._log_formatted = datalog_writer is not None
+			"Does `logLog` format [MsgLog]s itself?"
+			if datalog_writer is not None:
+				# Format and write on the DataLog thread
+				self.logLog = datalog_writer.wrap(self.logLog, format=_format_log)
+				self.logTimeOffset = datalog_writer.wrap(self.logTimeOffset)
+				self.logTimeDrift = datalog_writer.wrap(self.logTimeDrift)
+				self.logTimeJitter = datalog_writer.wrap(self.logTimeJitter)
+				self.logTimeLatency = datalog_writer.wrap(self.logTimeLatency)
 
 		self.config = config
 		self.video_queue = vidq
@@ -102,9 +120,15 @@ class WorkerHandle(Subprocess[worker.WorkerMsg, worker.AnyCmd, worker.AnyMsg]):
 		self._source_apriltag = None
 		self._source_imu = None
 		self._source_odom = None
+		self.time_sync: Optional[worker.MsgTimeSync] = None
+		"Latest clock sync telemetry"
+		self.telemetry: Optional[worker.MsgTelemetry] = None
+		"Latest process telemetry"
 		self.add_handler(worker.MsgLog, self._handle_log)
 		self.add_handler(worker.MsgFlush, self._handle_flush)
 		self.add_handler(worker.MsgChangeState, self._handle_changestate)
+		self.add_handler(worker.MsgTimeSync, self._handle_timesync)
+		self.add_handler(worker.MsgTelemetry, self._handle_telemetry)
 
 	def _get_args(self):
 		return (
@@ -132,7 +156,7 @@ class WorkerHandle(Subprocess[worker.WorkerMsg, worker.AnyCmd, worker.AnyMsg]):
 		log = self.log if packet.name == 'root' else self.log.getChild(packet.name)
 		log.log(packet.level, packet.msg)
 		if self.datalog is not None:
-			self.logLog.append(f'[{logging.getLevelName(packet.level)}]{packet.name}:{packet.msg}')
+			self.logLog.append(packet if self._log_formatted else _format_log(packet))
 	
 	def _handle_flush(self, packet: worker.MsgFlush):
 		self.log.debug('Finished flush %d', packet.id)
@@ -144,6 +168,17 @@ class WorkerHandle(Subprocess[worker.WorkerMsg, worker.AnyCmd, worker.AnyMsg]):
 		if self.datalog is not None:
 			self.logStatus.append(int(self.child_state))
 	
+	def _handle_timesync(self, packet: worker.MsgTimeSync):
+		self.time_sync = packet
+		if self.datalog is not None:
+			self.logTimeOffset.append(packet.offset_ns)
+			self.logTimeDrift.append(packet.drift_ppm)
+			self.logTimeJitter.append(packet.jitter_ns)
+			self.logTimeLatency.append(packet.latency_ns)
+	
+	def _handle_telemetry(self, packet: worker.MsgTelemetry):
+		self.telemetry = packet
+	
 	def handle_default(self, msg: worker.WorkerMsg) -> worker.AnyMsg | None:
 		if self._last_flush_id < self._require_flush_id:
 			# Packets are invalidated by a flush
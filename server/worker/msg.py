@@ -8,10 +8,11 @@ from pydantic import BaseModel, Field
 from dataclasses import dataclass
 import numpy as np
 
-from typedef.common import OakSelector, RetryConfig
+from typedef.common import OakSelector, RetryConfig, DurationField
 from typedef.geom import Pose3d, Translation3d, Twist3d, Transform3d
 from typedef.geom_cov import Pose3dCov, Twist3dCov
 from typedef.pipeline import PipelineConfigWorker
+from util.telemetry import MsgTelemetry
 
 Mat33 = np.ndarray[float, tuple[Literal[3], Literal[3]]]
 Mat44 = np.ndarray[float, tuple[Literal[4], Literal[4]]]
@@ -26,6 +27,7 @@ class WorkerInitConfig(BaseModel):
     maxRefresh: float = Field(10, description="Maximum polling rate (Hz)")
     robot_to_camera: Transform3d
     dynamic_pose: Optional[str] = Field(None)
+    max_lateness: Optional[DurationField] = Field(None, description="Maximum expected lateness of packets")
     pipeline: PipelineConfigWorker = Field(default_factory=PipelineConfigWorker)
 
 
@@ -179,6 +181,19 @@ class MsgOdom:
     twist: Twist3dCov
     "Field-to-camera twist"
 
+@dataclass
+class MsgTimeSync:
+    "Device clock synchronization telemetry"
+    offset_ns: int
+    "Offset from DepthAI clock to wall time (ns)"
+    drift_ppm: float
+    "Estimated clock drift (ppm)"
+    jitter_ns: float
+    "Jitter of clock samples around the estimate (ns)"
+    latency_ns: int
+    "Best clock sample round-trip (ns)"
+    samples: int
+
 class MsgLog(BaseModel):
     level: int
     name: str
@@ -200,6 +215,8 @@ WorkerMsg: TypeAlias = Union[
     MsgFlush,
     MsgDetections,
     MsgPose,
+    MsgTimeSync,
+    MsgTelemetry,
     MsgLog,
 ]
 "Worker message types"
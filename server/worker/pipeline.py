@@ -30,6 +30,7 @@ class MoeNetPipeline:
 
 		self.poll_stages: list[NodeRuntime] = list()
 		self.event_targets: dict[str, NodeRuntime] = dict()
+		self.tsyn: Optional[DeviceTimeSync] = None
 
 		def register(name: str, cfg: Type[S], builder_path: tuple[str]):
 			self._msg_types[name] = cfg
@@ -259,6 +260,10 @@ class MoeNetPipeline:
 				continue # If we processed an event, don't poll again
 			if res := stage.poll(None):
 				yield from res
+		
+		if (telemetry := self.tsyn.telemetry()) is not None:
+			yield telemetry
 
 	def close(self):
-		pass
\ No newline at end of file
+		if self.tsyn is not None:
+			self.tsyn.close()
\ No newline at end of file
@@ -1,9 +1,11 @@
-from typing import TYPE_CHECKING, Protocol
+from typing import TYPE_CHECKING, Protocol, Optional
 import depthai as dai
-from util.clock import Clock, FixedOffsetClock, WallClock
+from util.clock import Clock, OffsetClock, WallClock
+from util.clock_sync import ClockSyncSampler, ClockSyncMapper, ClockSyncFit
 from util.decorators import Singleton
-from util.timemap import TimeMap, DynamicOffsetMapper, OffsetClockMapper
-from util.timestamp import Timestamp
+from util.timemap import TimeMap, OffsetHistoryMapper
+from util.timestamp import Timestamp, Duration
+from .msg import MsgTimeSync
 if TYPE_CHECKING:
 	from datetime import timedelta
 
@@ -14,33 +16,60 @@ class StampedPacket(Protocol):
 
 
 class DaiClock(Clock, Singleton):
-	"Monotonic clock, wraps `time.monotonic_ns()`"
+	"Host-synced DepthAI clock, wraps `dai.Clock.now()`"
 	def now_ns(self) -> int:
-		raw: timedelta = dai.Clock.now()
-		return int(raw.total_seconds() * 1e9)
+		return Duration.from_timedelta(dai.Clock.now()).nanos
+
+class DeviceClock(OffsetClock):
+	"DepthAI device clock, offset from [DaiClock] by the offset seen in the latest packet"
+	def __init__(self, base: Clock, history: int = 1024) -> None:
+		super().__init__(base)
+		self.offsets = OffsetHistoryMapper(base, self, history)
+		"Offset history, so past timestamps are converted with the offset at the time"
+		self._last: Optional[tuple[int, int]] = None
+	
+	def get_offset_ns(self) -> int:
+		return self.offsets.get_offset()
+	
+	def record(self, ts_base: int, ts_dev: int):
+		"Record a packet's (base, device) timestamps"
+		offset = ts_dev - ts_base
+		if self._last is not None:
+			last_ts, last_offset = self._last
+			# Skip late packets (from other streams), and unchanged offsets (so we don't churn the history)
+			if (ts_base < last_ts) or (offset == last_offset):
+				return
+		self._last = (ts_base, offset)
+		self.offsets.record(ts_base, offset)
 
 class DeviceTimeSync:
-	def __init__(self, reference_clock: Clock | None = None) -> None:
+	def __init__(self, reference_clock: Clock | None = None, *, rate: float = 4.0) -> None:
 		self.reference_clock = reference_clock or WallClock()
 		self.dai_clock = DaiClock()
-		self.dev_clock = FixedOffsetClock(self.dai_clock, 0)
+		self.dev_clock = DeviceClock(self.dai_clock)
+		# Estimate DepthAI -> reference offset in the background, so packets don't need clock reads
+		self.sync = ClockSyncSampler(self.dai_clock, self.reference_clock, rate=rate)
+		self.sync.start()
+		self._last_telemetry: Optional[ClockSyncFit] = None
 		self.map = TimeMap(
-			DynamicOffsetMapper(self.reference_clock, self.dai_clock),
-			OffsetClockMapper(self.dev_clock),
+			ClockSyncMapper(self.dai_clock, self.reference_clock, self.sync.estimator),
+			self.dev_clock.offsets,
 		)
 	
 	def local_timestamp(self, packet: StampedPacket) -> 'Timestamp':
 		"Convert device time to wall time"
-		ts_dai = Timestamp.from_seconds(packet.getTimestamp().total_seconds(), self.dai_clock)
-		ts_dev = Timestamp.from_seconds(packet.getTimestampDevice().total_seconds(), self.dev_clock)
-		now_dai = self.dai_clock.now()
-		now_wall = self.reference_clock.now()
-		latency = now_dai - ts_dai
+		ts_dai = Duration.from_timedelta(packet.getTimestamp()).nanos
+		ts_dev = Duration.from_timedelta(packet.getTimestampDevice()).nanos
 
 		# Update system -> device time
-		self.dev_clock.offset = ts_dev.nanos - ts_dai.nanos
+		self.dev_clock.record(ts_dai, ts_dev)
 
-		return now_wall - latency
+		if (fit := self.sync.current) is not None:
+			return Timestamp(fit.a_to_b(ts_dai), clock=self.reference_clock)
+		
+		# No estimate yet, so use the latency
+		latency = self.dai_clock.now_ns() - ts_dai
+		return self.reference_clock.now().offset_ns(-latency)
 
 	def wall_to_device(self, wall: Timestamp) -> float:
 		"Convert wall time to device time (useful for SpectacularAI)"
@@ -54,4 +83,21 @@ class DeviceTimeSync:
 		dev = Timestamp.from_seconds(devtime, self.dev_clock)
 		mapper = self.map.get_conversion(self.dev_clock, self.reference_clock)
 		wall = mapper.a_to_b(dev)
-		return wall.as_seconds()
\ No newline at end of file
+		return wall.as_seconds()
+	
+	def telemetry(self) -> Optional[MsgTimeSync]:
+		"Get clock sync telemetry, if the estimate was updated since the last call"
+		fit = self.sync.current
+		if (fit is None) or (fit is self._last_telemetry):
+			return None
+		self._last_telemetry = fit
+		return MsgTimeSync(
+			offset_ns=fit.offset,
+			drift_ppm=fit.drift * 1e6,
+			jitter_ns=fit.jitter,
+			latency_ns=fit.latency,
+			samples=fit.samples,
+		)
+	
+	def close(self):
+		self.sync.close()
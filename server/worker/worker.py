@@ -12,6 +12,7 @@ from .msg import (
 	MsgLog,
 	WorkerMsg, AnyCmd
 )
+from util.telemetry import TelemetryMonitor
 
 if TYPE_CHECKING:
 	from multiprocessing import Queue
@@ -197,6 +198,11 @@ class CameraWorker:
 		self.log.setLevel(logging.DEBUG)
 
 		self.dev_mgr = DeviceManager(config, self.log)
+
+		self.telemetry = TelemetryMonitor(config.name)
+		self.telemetry.add_queue('data', data_queue)
+		self.telemetry.add_queue('command', command_queue)
+		self.telemetry.add_queue('video', video_queue)
 	
 	@property
 	def state(self):
@@ -260,10 +266,19 @@ class CameraWorker:
 					self.video_queue.put(packet, timeout=0.1)
 				except Full:
 					self.log.info('Drop frame (%d frames)', self.video_queue.qsize())
-					pass
+					self.telemetry.drop()
 				continue
 			self.data_queue.put(packet)
 	
+	def send_telemetry(self):
+		"Report telemetry to the main process (if due)"
+		if (msg := self.telemetry.poll()) is None:
+			return
+		try:
+			self.data_queue.put_nowait(msg)
+		except Full:
+			self.telemetry.drop()
+	
 	def process_command(self, command: AnyCmd):
 		"Process a command"
 
@@ -322,6 +337,7 @@ def main(config: WorkerInitConfig, data_queue: Queue[WorkerMsg], command_queue:
 		with (CameraWorker(config, data_queue, command_queue, video_queue) as worker, InterruptHandler(handle_sigint)):
 			while True:
 				with Watchdog('worker', min=min_loop_duration, max=0.5, log=worker.log) as w:
+					loop_start = time.perf_counter_ns()
 					try:
 						try:
 							if worker.is_paused:
@@ -337,6 +353,9 @@ def main(config: WorkerInitConfig, data_queue: Queue[WorkerMsg], command_queue:
 						
 						if worker.state == WorkerState.RUNNING:
 							worker.poll()
+						
+						worker.telemetry.record_loop(time.perf_counter_ns() - loop_start)
+						worker.send_telemetry()
 					except WorkerStop:
 						worker.log.info("Stopping gracefully")
 						break
@@ -1,2 +1,3 @@
 from .protobuf import ProtoLogEntry
 from .struct import StructLogEntry, StructArrayLogEntry
+from .writer import AsyncDataLog, AsyncLogEntry
@@ -1,4 +1,4 @@
-from typing import TypeVar, Type, TYPE_CHECKING
+from typing import TypeVar, Type, Union, TYPE_CHECKING
 from wpiutil.log import DataLog
 from .. import protobuf
 from .wrappers import WrappedLogEntry
@@ -11,6 +11,5 @@ class ProtoLogEntry(WrappedLogEntry[T]):
         super().__init__(log, name, protobuf.type_string(type), metadata, timestamp)
         self._type = type
     
-    def _serialize(self, data: T) -> bytes:
-        ser: bytes = data.SerializeToString()
-        return ser
+    def _serialize(self, data: Union[T, bytes]) -> bytes:
+        return protobuf.serialize(data)
@@ -1,6 +1,7 @@
 from typing import TypeVar, Type, TYPE_CHECKING
 from wpiutil.log import DataLog
 from .. import struct
+from ..struct_pack import get_packer, StructArrayPacker
 from .wrappers import WrappedLogEntry
 
 T = TypeVar('T')
@@ -11,6 +12,9 @@ class StructLogEntry(WrappedLogEntry[T]):
         type_string = struct.add_schema(log, type, timestamp)
         super().__init__(log, name, type_string, metadata, timestamp)
         self._sd = struct.get_descriptor(type)
+        if (packer := get_packer(type)) is not None:
+            # Precompiled (own buffer, as this may serialize on the DataLog thread)
+            self._serialize = packer.copy().pack
     
     def _serialize(self, data: T) -> bytes:
         return self._sd.pack(data)
@@ -21,9 +25,13 @@ class StructArrayLogEntry(WrappedLogEntry[list[T]]):
         type_string = struct.add_schema(log, type, timestamp)
         super().__init__(log, name, type_string + "[]", metadata, timestamp)
         self._sd = struct.get_descriptor(type)
+        packer = get_packer(type)
+        self._packer = None if packer is None else StructArrayPacker(packer)
     
     def _serialize(self, data: list[T]) -> bytes:
         if not isinstance(data, list):
             raise TypeError(f'Unexpected data: {repr(data)}')
         
+        if self._packer is not None:
+            return self._packer.pack(data)
         return b''.join(self._sd.pack(entry) for entry in data)
\ No newline at end of file
@@ -0,0 +1,132 @@
+"Asynchronous DataLog writes (serialization happens on a background thread)"
+from typing import TypeVar, Generic, Any, Callable, Optional, Protocol
+from collections import deque
+import threading
+import logging
+import time
+
+from ntcore import _now as wpi_now
+from wpiutil.log import DataLog
+
+T = TypeVar('T')
+U = TypeVar('U')
+
+
+class LogEntryLike(Protocol[T]):
+    def append(self, data: T, timestamp: int = 0) -> None: ...
+
+
+class AsyncDataLog:
+    """
+    Queues DataLog appends, and serializes/writes them on a background thread (in batches).
+
+    Appending costs a `deque.append` (the timestamp is captured then, so records aren't stamped with the write time).
+    If the queue is full, new records are dropped (and counted).
+    """
+    def __init__(self, datalog: DataLog, maxlen: int = 4096, *, batch: int = 256, interval: float = 0.02, log: Optional[logging.Logger] = None) -> None:
+        self.datalog = datalog
+        self.maxlen = maxlen
+        "Maximum queued records"
+        self.batch = batch
+        "Records written between yielding to other threads"
+        self.interval = interval
+        "Time between background writes (seconds)"
+        self.log = log or logging.getLogger(__name__)
+        self.written = 0
+        self.dropped = 0
+        "Records dropped because the queue was full"
+        self.errors = 0
+        "Records that failed to serialize"
+        self._queue: deque[tuple[Callable[[Any, int], None], Any, int]] = deque()
+        self._lock = threading.Lock()
+        "Held while draining"
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='datalog', daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        "Queue depth"
+        return len(self._queue)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def wrap(self, entry: LogEntryLike[T], format: Optional[Callable[[U], T]] = None) -> 'AsyncLogEntry[U]':
+        "Append to `entry` asynchronously (`format` converts values on the background thread)"
+        return AsyncLogEntry(self, entry, format)
+
+    def append(self, entry: LogEntryLike[T], data: T, timestamp: int = 0) -> bool:
+        "Queue a record for `entry`. Returns false if it was dropped."
+        return self._enqueue(entry.append, data, timestamp)
+
+    def _enqueue(self, append: Callable[[Any, int], None], data: Any, timestamp: int) -> bool:
+        queue = self._queue
+        if self._closed or len(queue) >= self.maxlen:
+            self.dropped += 1
+            return False
+        queue.append((append, data, timestamp or wpi_now()))
+        return True
+
+    def _drain(self) -> int:
+        "Write every queued record. Returns the number written."
+        queue = self._queue
+        count = 0
+        with self._lock:
+            while queue:
+                for _ in range(min(self.batch, len(queue))):
+                    append, data, timestamp = queue.popleft()
+                    try:
+                        append(data, timestamp)
+                    except Exception:
+                        if self.errors == 0:
+                            self.log.exception("Error writing to DataLog")
+                        self.errors += 1
+                    else:
+                        count += 1
+                # Yield the GIL to the main loop between batches
+                time.sleep(0)
+        self.written += count
+        return count
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self._drain()
+
+    def flush(self):
+        "Write all queued records (on this thread), then flush the DataLog"
+        self._drain()
+        self.datalog.flush()
+
+    def close(self):
+        "Stop the background thread, and write any remaining records"
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._drain()
+
+
+class AsyncLogEntry(Generic[T]):
+    "Log entry facade that appends through an [AsyncDataLog]"
+    def __init__(self, writer: AsyncDataLog, entry: LogEntryLike, format: Optional[Callable[[T], Any]] = None) -> None:
+        self.entry = entry
+        self._writer = writer
+        if format is None:
+            self._append = entry.append
+        else:
+            self._append = lambda data, timestamp: entry.append(format(data), timestamp)
+
+    def append(self, data: T, timestamp: int = 0) -> bool:
+        "Queue a value. Returns false if it was dropped."
+        return self._writer._enqueue(self._append, data, timestamp)
+
+    def finish(self, timestamp: int = 0) -> None:
+        # Queued, so it happens after any pending appends
+        self._writer._enqueue(lambda _, timestamp: self.entry.finish(timestamp), None, timestamp)
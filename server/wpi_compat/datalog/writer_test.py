@@ -0,0 +1,82 @@
+from unittest import TestCase
+import time
+
+from .writer import AsyncDataLog
+
+
+class RecordingEntry:
+    def __init__(self) -> None:
+        self.records = list()
+        self.finished = False
+
+    def append(self, data, timestamp: int = 0) -> None:
+        self.records.append((data, timestamp))
+
+    def finish(self, timestamp: int = 0) -> None:
+        self.finished = True
+
+
+class FakeDataLog:
+    def __init__(self) -> None:
+        self.flushes = 0
+
+    def flush(self) -> None:
+        self.flushes += 1
+
+
+class AsyncDataLogTest(TestCase):
+    def test_order(self):
+        datalog = FakeDataLog()
+        entry = RecordingEntry()
+        with AsyncDataLog(datalog, interval=3600) as writer:
+            wrapped = writer.wrap(entry, format=str)
+            for i in range(10):
+                wrapped.append(i, timestamp=100 + i)
+            wrapped.finish()
+            self.assertEqual(entry.records, [], "Not written until the thread runs")
+            self.assertEqual(len(writer), 11)
+            writer.flush()
+            self.assertEqual(len(writer), 0)
+        self.assertEqual(entry.records, [(str(i), 100 + i) for i in range(10)])
+        self.assertTrue(entry.finished)
+        self.assertEqual(datalog.flushes, 1)
+
+    def test_timestamp(self):
+        entry = RecordingEntry()
+        with AsyncDataLog(FakeDataLog(), interval=3600) as writer:
+            writer.append(entry, 'a')
+            writer.flush()
+        self.assertGreater(entry.records[0][1], 0, "Stamped when queued")
+
+    def test_drop(self):
+        entry = RecordingEntry()
+        writer = AsyncDataLog(FakeDataLog(), maxlen=2, interval=3600)
+        self.assertTrue(writer.append(entry, 1, 1))
+        self.assertTrue(writer.append(entry, 2, 2))
+        self.assertFalse(writer.append(entry, 3, 3))
+        self.assertEqual(writer.dropped, 1)
+        writer.close()
+        self.assertEqual([data for data, _ in entry.records], [1, 2])
+        self.assertFalse(writer.append(entry, 4, 4), "Closed")
+
+    def test_background(self):
+        entry = RecordingEntry()
+        with AsyncDataLog(FakeDataLog(), interval=0.001, batch=4) as writer:
+            for i in range(20):
+                writer.append(entry, i, i + 1)
+            deadline = time.monotonic() + 5.0
+            while len(entry.records) < 20 and time.monotonic() < deadline:
+                time.sleep(0.001)
+        self.assertEqual([data for data, _ in entry.records], list(range(20)))
+        self.assertEqual(writer.written, 20)
+
+    def test_errors(self):
+        def broken(value):
+            raise ValueError(value)
+        entry = RecordingEntry()
+        with AsyncDataLog(FakeDataLog(), interval=3600) as writer:
+            writer.wrap(entry, format=broken).append(1, 1)
+            writer.append(entry, 2, 2)
+            writer.flush()
+        self.assertEqual(writer.errors, 1)
+        self.assertEqual(entry.records, [(2, 2)], "Later records are still written")
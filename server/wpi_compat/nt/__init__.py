@@ -1,2 +1,2 @@
-from .dynamic import DynamicPublisher, DynamicSubscriber
+from .dynamic import DynamicPublisher, DynamicSubscriber, PublishBatch, PublisherStats
 from .protobuf import ProtobufTopic
\ No newline at end of file
@@ -1,5 +1,7 @@
 from typing import overload, Generic, TypeVar, Callable, Optional, Union, Type, Literal
+from dataclasses import dataclass
 import typing
+import time
 
 from wpiutil import wpistruct
 import numpy as np
@@ -42,7 +44,7 @@ ARRAY_FACTORIES: dict[type, Callable[[NetworkTableLike, str], GenericTopic]] = {
 	wpistruct.double: _topic_list_f64,
 }
 
-def _topic_factory(type: Type[T], mode: Literal['scalar', 'struct', 'proto', None] = None) -> Callable[[NetworkTableLike, str], GenericTopic[T]]:
+def _topic_factory(type: Type[T], mode: Literal['scalar', 'struct', 'proto', None] = None, packed: bool = False) -> Callable[[NetworkTableLike, str], GenericTopic[T]]:
 	# Check scalar types
 	if mode in ('scalar', None):
 		try:
@@ -53,11 +55,16 @@ def _topic_factory(type: Type[T], mode: Literal['scalar', 'struct', 'proto', Non
 	if mode in ('struct', None):
 		# Struct types
 		from ..struct import get_descriptor
+		from ..struct_pack import get_packer
 		try:
 			get_descriptor(type)
 		except TypeError:
 			pass
 		else:
+			if packed and (packer := get_packer(type)) is not None:
+				# Publish-only topic, with precompiled packer
+				from .struct import PackedStructTopic
+				return lambda nt, path: PackedStructTopic.wrap(nt, path, packer)
 			return lambda nt, path: nt.getStructTopic(path, type)
 	
 	# Protobuf types
@@ -87,6 +94,9 @@ def _topic_factory(type: Type[T], mode: Literal['scalar', 'struct', 'proto', Non
 				except TypeError:
 					pass
 				else:
+					if packed and (packer := get_packer(t0)) is not None:
+						from .struct import PackedStructTopic
+						return lambda nt, path: PackedStructTopic.wrap(nt, path, packer, array=True)
 					return lambda nt, path: nt.getStructArrayTopic(path, t0)
 			
 			#TODO: protobuf arrays
@@ -94,19 +104,66 @@ def _topic_factory(type: Type[T], mode: Literal['scalar', 'struct', 'proto', Non
 	raise TypeError(f'Unable to map type {type} to NetworkTables topic')
 
 
-def _make_topic_factory(base: Union[NetworkTableLike, Callable[[], NetworkTableLike]], path: str, type: Type[T], mode: Literal['scalar', 'struct', 'proto', None] = None) -> Union[GenericTopic[T], Callable[[], GenericTopic[T]]]:
-	factory = _topic_factory(type, mode=mode)
+def _make_topic_factory(base: Union[NetworkTableLike, Callable[[], NetworkTableLike]], path: str, type: Type[T], mode: Literal['scalar', 'struct', 'proto', None] = None, packed: bool = False) -> Union[GenericTopic[T], Callable[[], GenericTopic[T]]]:
+	factory = _topic_factory(type, mode=mode, packed=packed)
 	if isinstance(base, (NetworkTableInstance, NetworkTable)):
 		return factory(base, path)
 	else:
 		assert callable(base)
 		return lambda: factory(base(), path)
 	
+@dataclass
+class PublisherStats:
+	"Counters for a [DynamicPublisher]"
+	sets: int = 0
+	"Calls to `set` (while enabled)"
+	published: int = 0
+	"Values sent to NetworkTables"
+	suppressed: int = 0
+	"Values skipped because they were equal to the previous value"
+	superseded: int = 0
+	"Values replaced by a newer value before they were published (e.g. while rate-limited)"
+
+
+class PublishBatch:
+	"""
+	Stages values from a group of publishers, so they can be committed together (then flushed once).
+
+	Call [flush] once per main-loop iteration.
+	"""
+	def __init__(self) -> None:
+		self._staged: dict[int, 'DynamicPublisher'] = dict()
+	
+	def __len__(self):
+		return len(self._staged)
+	
+	def stage(self, publisher: 'DynamicPublisher'):
+		self._staged.setdefault(id(publisher), publisher)
+	
+	def flush(self, nt: Optional[NetworkTableInstance] = None) -> int:
+		"Commit staged values, then flush `nt`. Returns the number of values published."
+		if len(self._staged) == 0:
+			return 0
+		count = 0
+		now = time.monotonic()
+		staged = self._staged
+		self._staged = dict()
+		for key, publisher in staged.items():
+			if publisher.flush(now):
+				count += 1
+			elif publisher.pending:
+				# Rate-limited, try again next time
+				self._staged[key] = publisher
+		if count > 0 and nt is not None:
+			nt.flush()
+		return count
+
+
 class DynamicPublisher(Generic[T]):
 	@classmethod
-	def create(cls, base: Union[NetworkTableLike, Callable[[], NetworkTableLike]], path: str, type: Type[T], options: Optional[PubSubOptions] = None, *, enabled: bool = False, mode: Literal['scalar', 'struct', 'proto', None] = None) -> 'DynamicPublisher[T]':
-		topic = _make_topic_factory(base, path, type, mode=mode)
-		return cls(topic, options, enabled=enabled)
+	def create(cls, base: Union[NetworkTableLike, Callable[[], NetworkTableLike]], path: str, type: Type[T], options: Optional[PubSubOptions] = None, *, enabled: bool = False, mode: Literal['scalar', 'struct', 'proto', None] = None, dedupe: bool = False, min_interval: Optional[float] = None, batch: Optional[PublishBatch] = None) -> 'DynamicPublisher[T]':
+		topic = _make_topic_factory(base, path, type, mode=mode, packed=True)
+		return cls(topic, options, enabled=enabled, dedupe=dedupe, min_interval=min_interval, batch=batch)
 
 
 	_builder: Optional[Callable[[], GenericTopic[T]]]
@@ -118,8 +175,10 @@ class DynamicPublisher(Generic[T]):
 	_publisher: Optional[GenericPublisher[T]]
 	"Real publisher handle"
 	_last: Optional[T]
+	_pending: Optional[tuple[T, int]]
+	"Value (and timestamp) waiting to be published"
 
-	def __init__(self, topic: Union[Callable[[], GenericTopic[T]], GenericTopic[T]], options: Optional[PubSubOptions] = None, *, enabled: bool = False):
+	def __init__(self, topic: Union[Callable[[], GenericTopic[T]], GenericTopic[T]], options: Optional[PubSubOptions] = None, *, enabled: bool = False, dedupe: bool = False, min_interval: Optional[float] = None, batch: Optional[PublishBatch] = None):
 		super().__init__()
 		if callable(topic):
 			self._builder = topic
@@ -130,6 +189,15 @@ class DynamicPublisher(Generic[T]):
 		self._options = options or PubSubOptions()
 		self._publisher = None
 		self._last = None
+		self._pending = None
+		self._last_publish = float('-inf')
+		self.dedupe = dedupe
+		"Skip values equal to the previous value"
+		self.min_interval = min_interval
+		"Minimum time between publishing values (seconds)"
+		self.batch = batch
+		"If set, values are staged until the batch is flushed"
+		self.stats = PublisherStats()
 
 		# Enable on start?
 		if enabled:
@@ -157,9 +225,24 @@ class DynamicPublisher(Generic[T]):
 			self._topic = None
 		
 		self._last = None
+		self._pending = None
+		self._last_publish = float('-inf')
 	
 	close = stop
 	
+	@property
+	def options(self) -> PubSubOptions:
+		"Options to use when publishing"
+		return self._options
+	
+	@options.setter
+	def options(self, options: PubSubOptions):
+		"Change publish options (restarts the publisher, if enabled)"
+		self._options = options
+		if self._publisher is not None:
+			self._publisher.close()
+			self._publisher = self._topic.publish(self._options)
+	
 	@property
 	def enabled(self) -> bool:
 		"Is this publisher currently publishing?"
@@ -176,6 +259,21 @@ class DynamicPublisher(Generic[T]):
 		else:
 			self.stop()
 	
+	@property
+	def pending(self) -> bool:
+		"Is there a value waiting to be published?"
+		return self._pending is not None
+	
+	def is_due(self, now: Optional[float] = None) -> bool:
+		"Would a value be published now? (Useful to skip computing values that would be rate-limited)"
+		if self._publisher is None:
+			return False
+		if self.min_interval is None:
+			return True
+		if now is None:
+			now = time.monotonic()
+		return now - self._last_publish >= self.min_interval
+	
 	def __bool__(self):
 		return self.enabled
 	
@@ -187,9 +285,49 @@ class DynamicPublisher(Generic[T]):
 		self.stop()
 
 	def set(self, value: T, time: int = 0):
-		if self._publisher:
-			self._publisher.set(value, time)
-			self._last = value
+		if self._publisher is None:
+			return
+		stats = self.stats
+		stats.sets += 1
+		if self.dedupe:
+			if (self._pending is not None) and (self._pending[0] == value):
+				stats.suppressed += 1
+				return
+			if (self.stats.published > 0) and (self._last == value):
+				stats.suppressed += 1
+				if self._pending is not None:
+					# Back to the published value
+					stats.superseded += 1
+					self._pending = None
+				return
+		if self._pending is not None:
+			stats.superseded += 1
+		self._pending = (value, time)
+
+		if self.batch is not None:
+			self.batch.stage(self)
+		else:
+			# If rate-limited, this is published by a later `set` or `flush`
+			self.flush()
+	
+	def flush(self, now: Optional[float] = None) -> bool:
+		"Publish the pending value, unless rate-limited. Returns if a value was published."
+		if (self._pending is None) or (self._publisher is None):
+			return False
+		if self.min_interval is not None:
+			if now is None:
+				now = time.monotonic()
+			if now - self._last_publish < self.min_interval:
+				return False
+		elif now is None:
+			now = time.monotonic()
+		value, timestamp = self._pending
+		self._pending = None
+		self._publisher.set(value, timestamp)
+		self._last = value
+		self._last_publish = now
+		self.stats.published += 1
+		return True
 	
 	def set_fresh(self, value: T):
 		"Set, but only if the value is new"
@@ -287,10 +425,12 @@ class DynamicSubscriber(Generic[P]):
 			self._fresh_data = qv[-1]
 
 	def readQueue(self) -> list[GenericTsValue[P]]:
+		"Get all values received since the last call (oldest first)"
 		self._pull_queue()
 		res = self._read_queue
-		self._read_queue.clear()
+		self._read_queue = list()
 		if self._read_queue_truncated:
+			self._read_queue_truncated = False
 			import warnings
 			warnings.warn(f"read queue for NT topic {self._topic.getName()} was truncated", RuntimeWarning)
 		return res
@@ -1,5 +1,5 @@
 from ..core_test import NtTestCase
-from .dynamic import DynamicSubscriber, DynamicPublisher
+from .dynamic import DynamicSubscriber, DynamicPublisher, PublishBatch
 from ntcore import PubSubOptions
 
 class DpubTest(NtTestCase):
@@ -19,6 +19,69 @@ class DpubTest(NtTestCase):
 			pub.set(5)
 			self.assertEqual(sub.get(), 5, "Publish when enabled")
 
+	def test_dedupe(self):
+		with (
+			DynamicPublisher.create(self.server, "test_dedupe", int, PubSubOptions(sendAll=True, keepDuplicates=True), enabled=True, dedupe=True) as pub,
+			self.client.getIntegerTopic("test_dedupe").subscribe(1, PubSubOptions(sendAll=True, keepDuplicates=True)) as sub
+		):
+			for value in (5, 5, 6, 6, 5):
+				pub.set(value)
+			self.assertEqual([v.value for v in sub.readQueue()], [5, 6, 5])
+			self.assertEqual(pub.stats.sets, 5)
+			self.assertEqual(pub.stats.published, 3)
+			self.assertEqual(pub.stats.suppressed, 2)
+	
+	def test_min_interval(self):
+		with (
+			DynamicPublisher.create(self.server, "test_interval", int, enabled=True, min_interval=3600) as pub,
+			self.client.getIntegerTopic("test_interval").subscribe(1) as sub
+		):
+			self.assertTrue(pub.is_due())
+			pub.set(5)
+			self.assertFalse(pub.is_due())
+			pub.set(6)
+			pub.set(7)
+			self.assertEqual(sub.get(), 5, "Rate-limited")
+			self.assertTrue(pub.pending)
+			self.assertEqual(pub.stats.superseded, 1)
+			# Publish once the interval has passed
+			self.assertTrue(pub.flush(float('inf')))
+			self.assertEqual(sub.get(), 7)
+	
+	def test_options(self):
+		with (
+			DynamicPublisher.create(self.server, "test_options", int, enabled=True) as pub,
+			self.client.getIntegerTopic("test_options").subscribe(1, PubSubOptions(sendAll=True, keepDuplicates=True)) as sub
+		):
+			pub.set(5)
+			pub.options = PubSubOptions(periodic=0.5, keepDuplicates=True)
+			self.assertTrue(pub.enabled, "Still enabled")
+			self.assertEqual(pub.options.periodic, 0.5)
+			pub.set(5)
+			self.assertEqual([v.value for v in sub.readQueue()], [5, 5])
+	
+	def test_batch(self):
+		batch = PublishBatch()
+		with (
+			DynamicPublisher.create(self.server, "test_batch1", int, enabled=True, batch=batch) as pub1,
+			DynamicPublisher.create(self.server, "test_batch2", int, enabled=True, batch=batch) as pub2,
+			DynamicPublisher.create(self.server, "test_batch3", int, enabled=False, batch=batch) as pub3,
+			self.client.getIntegerTopic("test_batch1").subscribe(1) as sub1,
+			self.client.getIntegerTopic("test_batch2").subscribe(1) as sub2,
+		):
+			pub1.set(5)
+			pub1.set(6)
+			pub2.set(7)
+			pub3.set(8)
+			self.assertEqual((sub1.get(), sub2.get()), (1, 1), "Staged until flush")
+			self.assertEqual(len(batch), 2)
+			self.assertEqual(batch.flush(self.server), 2)
+			self.assertEqual((sub1.get(), sub2.get()), (6, 7))
+			self.assertEqual(len(batch), 0)
+			self.assertEqual(pub1.stats.published, 1)
+			self.assertEqual(pub1.stats.superseded, 1)
+			self.assertEqual(pub3.stats.sets, 0, "Disabled")
+
 class DsubTest(NtTestCase):
 	def test_start_disabled(self):
 		with DynamicSubscriber(lambda: self.server.getIntegerTopic("test"), 1) as sub:
@@ -62,3 +125,17 @@ class DsubTest(NtTestCase):
 			pub.set(6)
 			self.assertEqual(sub.get_fresh(), 6, "Repeated same value is fresh")
 			self.assertIsNone(sub.get_fresh(), "Second call is not fresh")
+	
+	def test_read_queue(self):
+		with (
+			self.server.getIntegerTopic("test_queue").publish(PubSubOptions(sendAll=True, keepDuplicates=True)) as pub,
+			DynamicSubscriber.create(self.client, "test_queue", int, 1, PubSubOptions(sendAll=True, keepDuplicates=True), enabled=True) as sub
+		):
+			self.assertEqual(sub.readQueue(), [], "No data")
+			pub.set(5, 100)
+			pub.set(6, 200)
+			pub.set(6, 300)
+			values = sub.readQueue()
+			self.assertEqual([v.value for v in values], [5, 6, 6], "Every value is returned")
+			self.assertEqual([v.time for v in values], [100, 200, 300], "With publish timestamps")
+			self.assertEqual(sub.readQueue(), [], "Values are only returned once")
@@ -26,11 +26,12 @@ class ProtobufPublisher(Generic[T]):
 		del self._publisher
 	
 	# def getTopic(self) -> 'ProtoTopic[P]': ...
-	def set(self, value: T, time: int = 0):
-		b: bytes = value.SerializeToString()
+	def set(self, value: Union[T, bytes], time: int = 0):
+		"Publish a message (or an already-serialized one)"
+		b: bytes = protobuf.serialize(value)
 		self._publisher.set(b, time)
-	def setDefault(self, value: T):
-		b: bytes = value.SerializeToString()
+	def setDefault(self, value: Union[T, bytes]):
+		b: bytes = protobuf.serialize(value)
 		self._publisher.set(b)
 
 @dataclass
@@ -0,0 +1,72 @@
+from typing import Generic, Type, TypeVar, Union, Callable
+from ntcore import NetworkTableInstance, NetworkTable, PubSubOptions, RawTopic, RawPublisher
+
+from .. import struct
+from ..struct_pack import StructPacker, StructArrayPacker
+
+T = TypeVar("T")
+
+
+class PackedStructPublisher(Generic[T]):
+	"Publishes struct values with a precompiled packer"
+	def __init__(self, pack: Callable[[T], memoryview], publisher: RawPublisher) -> None:
+		super().__init__()
+		self._pack = pack
+		self._publisher = publisher
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		self._publisher.close()
+		del self._publisher
+
+	def set(self, value: T, time: int = 0):
+		self._publisher.set(self._pack(value), time)
+
+	def setDefault(self, value: T):
+		self._publisher.setDefault(self._pack(value))
+
+
+_default_pso = PubSubOptions()
+class PackedStructTopic(Generic[T]):
+	"""
+	Struct (or struct array) topic that publishes with a precompiled [StructPacker].
+
+	Only publishing is supported (subscribe with the native struct topics).
+	"""
+	@staticmethod
+	def wrap(root: Union[NetworkTableInstance, NetworkTable], name: str, packer: StructPacker, *, array: bool = False) -> 'PackedStructTopic':
+		topic = root.getRawTopic(name)
+		return PackedStructTopic(topic, packer, array=array)
+
+	def __init__(self, topic: RawTopic, packer: StructPacker, *, array: bool = False):
+		self._topic = topic
+		self._packer = packer
+		self._array = array
+
+	def __enter__(self):
+		self._topic.__enter__()
+		return self
+
+	def __exit__(self, *args):
+		self._topic.__exit__(*args)
+
+	def close(self) -> None:
+		self._topic.close()
+
+	def publish(self, options: PubSubOptions = _default_pso):
+		type_string = struct.add_schema(self._topic.getInstance(), self._packer.type)
+		if self._array:
+			type_string += "[]"
+			pack = StructArrayPacker(self._packer).pack
+		else:
+			# Own buffer, as the registered packer is shared
+			pack = self._packer.copy().pack
+		return PackedStructPublisher(
+			pack,
+			self._topic.publish(type_string, options)
+		)
@@ -1,10 +1,11 @@
 "Helpers for serializing protobuf-valued types"
 
-from typing import TYPE_CHECKING, Callable, Iterable
+from typing import TYPE_CHECKING, Callable, Iterable, Union
 
 from google.protobuf.pyext.cpp_message import GeneratedProtocolMessageType
 if TYPE_CHECKING:
 	from google.protobuf.descriptor import FileDescriptor
+	from google.protobuf.message import Message
 	from .typedef import SchemaRegistry
 
 
@@ -17,6 +18,12 @@ def type_string(proto: 'GeneratedProtocolMessageType') -> str:
 		return name
 	return 'proto:' + proto.DESCRIPTOR.name
 
+def serialize(value: Union['Message', bytes]) -> bytes:
+	"Serialize a message (already-serialized messages are passed through)"
+	if isinstance(value, (bytes, bytearray, memoryview)):
+		return value
+	return value.SerializeToString()
+
 def _iter_descriptor(file: 'FileDescriptor', exists: Callable[[str], bool]) -> Iterable[tuple[str, bytes]]:
 	"Iterate (recursively) through FileDescriptor schemas"
 	name = "proto:" + file.name #TODO: is this file.package + file.name?
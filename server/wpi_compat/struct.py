@@ -57,16 +57,19 @@ def add_schema(registry: 'SchemaRegistry', type: Type[T], timestamp: Union[int,
     else:
         timestamp = Timestamp.wrap_wpi(timestamp).as_wpi()
 
+    # NetworkTables' addSchema doesn't take a timestamp
+    extra = (timestamp,) if timestamp else ()
+
     sd = get_descriptor(type)
     if registry.hasSchema(sd.typeString):
         return sd.typeString
     # Add main schema
-    registry.addSchema(sd.typeString, "structschema", sd.schema, timestamp)
+    registry.addSchema(sd.typeString, "structschema", sd.schema, *extra)
     if sd.forEachNested is not None:
         def handle_nested(nested_tstr: str, nested_schema: str):
             if registry.hasSchema(nested_tstr):
                 return
-            registry.addSchema(nested_tstr, "structschema", nested_schema, timestamp)
+            registry.addSchema(nested_tstr, "structschema", nested_schema, *extra)
         sd.forEachNested(handle_nested)
     
     return sd.typeString
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Precompiled packers for WPIstruct types that we serialize a lot.
+
+`wpistruct` packs each value into a new `bytes` (and arrays element-by-element). These pack into
+reusable buffers with a single `struct.Struct`, and produce byte-identical output.
+
+Registered packers are shared, so each consumer (publisher, log entry) should pack with its own [StructPacker.copy],
+as they may run on different threads.
+"""
+from typing import TYPE_CHECKING, Generic, TypeVar, Type, Callable, Optional, Any
+from struct import Struct
+
+from wpimath.geometry import Pose3d, Transform3d
+
+if TYPE_CHECKING:
+    from typing_extensions import Buffer
+
+T = TypeVar('T')
+
+
+class StructPacker(Generic[T]):
+    "Packs a struct type with a precompiled layout"
+    def __init__(self, type: Type[T], fmt: str, flatten: Callable[[T], tuple[Any, ...]]) -> None:
+        self.type = type
+        self.format = fmt.lstrip('<')
+        "Layout (without byte order), for nesting in other packers"
+        self.flatten = flatten
+        "Get the struct fields of a value, in order"
+        self._struct = Struct('<' + self.format)
+        self.size = self._struct.size
+        self._buffer = bytearray(self.size)
+
+    def copy(self) -> 'StructPacker[T]':
+        "Copy with its own buffer (the layout is shared)"
+        res = object.__new__(StructPacker)
+        res.__dict__.update(self.__dict__)
+        res._buffer = bytearray(self.size)
+        return res
+
+    def pack_into(self, buffer: 'Buffer', offset: int, value: T):
+        self._struct.pack_into(buffer, offset, *self.flatten(value))
+
+    def pack(self, value: T) -> memoryview:
+        "Pack into a reusable buffer (only valid until the next call)"
+        self._struct.pack_into(self._buffer, 0, *self.flatten(value))
+        return memoryview(self._buffer)
+
+
+class StructArrayPacker(Generic[T]):
+    "Packs a `list[T]` into a reusable buffer"
+    def __init__(self, packer: StructPacker[T]) -> None:
+        self.packer = packer
+        self._buffer = bytearray()
+
+    def pack(self, values: list[T]) -> memoryview:
+        "Pack into a reusable buffer (only valid until the next call)"
+        size = self.packer.size
+        length = len(values) * size
+        if len(self._buffer) < length:
+            self._buffer = bytearray(length)
+        buffer = self._buffer
+        pack_into = self.packer._struct.pack_into
+        flatten = self.packer.flatten
+        for i, value in enumerate(values):
+            pack_into(buffer, i * size, *flatten(value))
+        return memoryview(buffer)[:length]
+
+
+_PACKERS: dict[type, StructPacker] = dict()
+
+def register_packer(type: Type[T], fmt: str, flatten: Callable[[T], tuple[Any, ...]]) -> StructPacker[T]:
+    "Register a precompiled packer for `type` (it must match the type's WPIstruct schema)"
+    packer = StructPacker(type, fmt, flatten)
+    _PACKERS[type] = packer
+    return packer
+
+def get_packer(type: Type[T]) -> Optional[StructPacker[T]]:
+    "Get the precompiled packer for `type`, if there is one"
+    return _PACKERS.get(type)
+
+
+def pose3d_fields(pose: Pose3d | Transform3d) -> tuple[float, ...]:
+    "Fields of a Pose3d/Transform3d struct (Translation3d, then the rotation's Quaternion)"
+    t = pose.translation()
+    q = pose.rotation().getQuaternion()
+    return (t.x, t.y, t.z, q.W(), q.X(), q.Y(), q.Z())
+
+POSE3D = register_packer(Pose3d, '<7d', pose3d_fields)
+TRANSFORM3D = register_packer(Transform3d, '<7d', pose3d_fields)
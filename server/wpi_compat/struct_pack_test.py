@@ -0,0 +1,68 @@
+from unittest import TestCase
+from dataclasses import dataclass
+
+from wpiutil import wpistruct
+from wpimath.geometry import Pose3d, Transform3d, Rotation3d, Translation3d
+
+from .struct_pack import StructArrayPacker, register_packer, get_packer, pose3d_fields, POSE3D, TRANSFORM3D
+
+
+@wpistruct.make_wpistruct(name="PackTestDetection")
+@dataclass
+class PackTestDetection:
+    id: wpistruct.dataclass.int32
+    score: wpistruct.dataclass.double
+    pose: Pose3d
+
+PACK_TEST_DETECTION = register_packer(PackTestDetection, '<id7d', lambda d: (d.id, d.score, *pose3d_fields(d.pose)))
+
+
+def poses():
+    yield Pose3d()
+    yield Pose3d(1.5, -2.25, 3.0, Rotation3d(0.1, -0.2, 0.3))
+    yield Pose3d(Translation3d(-1e6, 1e-9, 0.0), Rotation3d(3.1, 0.0, -1.5))
+
+
+class StructPackTest(TestCase):
+    def test_registry(self):
+        self.assertIs(get_packer(Pose3d), POSE3D)
+        self.assertIs(get_packer(Transform3d), TRANSFORM3D)
+        self.assertIsNone(get_packer(int))
+
+    def test_pose3d(self):
+        for pose in poses():
+            self.assertEqual(bytes(POSE3D.pack(pose)), wpistruct.pack(pose))
+
+    def test_transform3d(self):
+        for pose in poses():
+            tf = Transform3d(pose.translation(), pose.rotation())
+            self.assertEqual(bytes(TRANSFORM3D.pack(tf)), wpistruct.pack(tf))
+
+    def test_nested(self):
+        for i, pose in enumerate(poses()):
+            det = PackTestDetection(i - 1, 0.75 * i, pose)
+            self.assertEqual(PACK_TEST_DETECTION.size, wpistruct.getSize(PackTestDetection))
+            self.assertEqual(bytes(PACK_TEST_DETECTION.pack(det)), wpistruct.pack(det))
+
+    def test_pack_into(self):
+        buf = bytearray(POSE3D.size + 4)
+        pose = next(iter(poses()))
+        POSE3D.pack_into(buf, 4, pose)
+        self.assertEqual(bytes(buf[4:]), wpistruct.pack(pose))
+
+    def test_array(self):
+        packer = StructArrayPacker(PACK_TEST_DETECTION)
+        dets = [PackTestDetection(i, 0.5, pose) for i, pose in enumerate(poses())]
+        self.assertEqual(bytes(packer.pack(dets)), b''.join(wpistruct.pack(det) for det in dets))
+        # Shrinking reuses the buffer
+        self.assertEqual(bytes(packer.pack(dets[:1])), wpistruct.pack(dets[0]))
+        self.assertEqual(bytes(packer.pack([])), b'')
+
+    def test_copy(self):
+        a, b = list(poses())[1:]
+        packer = POSE3D.copy()
+        self.assertEqual(packer.size, POSE3D.size)
+        view_shared = POSE3D.pack(a)
+        view_copy = packer.pack(b)
+        self.assertEqual(bytes(view_shared), wpistruct.pack(a), "Buffers aren't shared")
+        self.assertEqual(bytes(view_copy), wpistruct.pack(b))